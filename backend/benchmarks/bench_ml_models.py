@@ -0,0 +1,307 @@
+"""
+Reproducible throughput/latency benchmark for the ml_models package.
+
+Runs TriageClassifier, MisinformationDetector and FactCheckEngine over fixed
+synthetic corpora (short/medium/long texts, several batch sizes) through both
+their sync and async entry points, and writes the results as JSON so two runs
+can be diffed.
+
+External services (HuggingFace inference, news APIs) are replaced with
+in-process stubs so the benchmark runs fully offline.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_ml_models --output bench.json
+    python -m benchmarks.bench_ml_models compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import types
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SEED = 1337
+TEXT_LENGTHS = {"short": 12, "medium": 48, "long": 220}
+BATCH_SIZES = [1, 8, 32]
+
+# Vocabulary the synthetic corpora are drawn from. It mixes the phrases the
+# rule tables look for with neutral filler so every code path gets exercised.
+CORPUS_FRAGMENTS = {
+    "triage": [
+        "trapped on the roof", "water rising fast", "need ambulance", "chest pain",
+        "elderly neighbour", "no food since yesterday", "bleeding badly", "please help",
+        "near Riverside district", "at 12 Station road", "phone signal lost",
+        "bridge collapsed", "children with us", "when possible", "urgent", "now",
+    ],
+    "misinformation": [
+        "BREAKING", "dam burst", "evacuate immediately", "share this", "officials say",
+        "heavy rainfall expected", "government hiding the truth", "cyclone alert",
+        "stay indoors", "tsunami warning", "according to IMD", "shocking video",
+        "local shelters open", "emergency", "no cause for panic", "!!",
+    ],
+    "factcheck": [
+        "according to", "the meteorological department", "flood", "in Jaipur",
+        "dam burst", "breaking news", "cyclone", "rainfall of 200 mm",
+        "official statement", "immediate evacuation", "thousands affected",
+        "share this", "temperature reaching 48°C", "major city", "Delhi", "warning",
+    ],
+}
+
+FILLER = ["the", "area", "people", "road", "today", "report", "local", "water",
+          "town", "family", "update", "after", "night", "morning", "crowd"]
+
+
+def build_corpus(kind: str, length_words: int, size: int, seed: int) -> List[str]:
+    """Build a deterministic list of synthetic texts for one model."""
+    rng = random.Random(f"{kind}:{length_words}:{size}:{seed}")
+    fragments = CORPUS_FRAGMENTS[kind]
+    corpus = []
+    for _ in range(size):
+        words: List[str] = []
+        while len(words) < length_words:
+            source = fragments if rng.random() < 0.4 else FILLER
+            words.extend(rng.choice(source).split())
+        corpus.append(" ".join(words[:length_words]))
+    return corpus
+
+
+class StubHuggingFaceService:
+    """Offline stand-in for services.huggingface_service.HuggingFaceService."""
+
+    async def analyze_misinformation(self, text: str) -> Dict:
+        lowered = text.lower()
+        suspicious = sum(w in lowered for w in ("breaking", "share", "hiding", "shocking"))
+        return {
+            "is_fake": suspicious >= 2,
+            "confidence": min(0.95, 0.5 + 0.1 * suspicious),
+            "emotions": {"fear": 0.4, "surprise": 0.2, "neutral": 0.4},
+            "analysis_method": "benchmark_stub",
+        }
+
+
+class StubNewsService:
+    """Offline stand-in for services.news_service.NewsService."""
+
+    async def fetch_disaster_news(self, limit: int = 20) -> List[Dict]:
+        return []
+
+
+def _install_service_stubs():
+    """Register stub service modules before ml_models imports the real ones."""
+    hf_module = types.ModuleType("services.huggingface_service")
+    hf_module.HuggingFaceService = StubHuggingFaceService
+    news_module = types.ModuleType("services.news_service")
+    news_module.NewsService = StubNewsService
+
+    import services
+    sys.modules["services.huggingface_service"] = hf_module
+    sys.modules["services.news_service"] = news_module
+    services.huggingface_service = hf_module
+    services.news_service = news_module
+
+
+def load_models() -> Dict[str, Dict[str, Callable]]:
+    """Instantiate the models and return their sync/async entry points."""
+    _install_service_stubs()
+
+    from ml_models.triage_classifier import TriageClassifier
+    from ml_models.misinformation_detector import MisinformationDetector
+    from ml_models.factcheck_engine import FactCheckEngine
+    from ml_models.claim_cache import ClaimCache
+
+    triage = TriageClassifier()
+    misinformation = MisinformationDetector()
+    # Zero TTL: the corpora repeat texts, so a live cache would only measure lookups
+    factcheck = FactCheckEngine(claim_cache=ClaimCache(ttl_seconds=0))
+
+    return {
+        "triage": {
+            "sync": lambda text: triage._classify_request_sync(text),
+            "async": lambda text: triage.classify_request(text),
+        },
+        "misinformation": {
+            # The detector has no thread-bound path; its "_sync" coroutine is
+            # driven one item at a time to mirror the other models' sync path.
+            "sync": lambda text: asyncio.run(misinformation._analyze_post_sync(text)),
+            "async": lambda text: misinformation.analyze_post(text),
+        },
+        "factcheck": {
+            "sync": lambda text: factcheck._verify_claim_sync(text),
+            "async": lambda text: factcheck.verify_claim(text),
+        },
+    }
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+async def _gather_batch(entry: Callable, batch: List[str]):
+    return await asyncio.gather(*(entry(text) for text in batch))
+
+
+def _run_batch(path: str, entry: Callable, batch: List[str], loop: asyncio.AbstractEventLoop):
+    if path == "sync":
+        for text in batch:
+            entry(text)
+    else:
+        loop.run_until_complete(_gather_batch(entry, batch))
+
+
+def run_case(path: str, entry: Callable, corpus: List[str], batch_size: int,
+             iterations: int, warmup: int, seed: int) -> Dict:
+    """Time one (model, path, text length, batch size) combination."""
+    random.seed(seed)
+    loop = asyncio.new_event_loop()
+    try:
+        batches = [
+            [corpus[(i * batch_size + j) % len(corpus)] for j in range(batch_size)]
+            for i in range(iterations)
+        ]
+
+        for batch in batches[:warmup]:
+            _run_batch(path, entry, batch, loop)
+
+        latencies = []
+        started = time.perf_counter()
+        for batch in batches:
+            t0 = time.perf_counter()
+            _run_batch(path, entry, batch, loop)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        elapsed = time.perf_counter() - started
+
+        # Memory is measured in a separate pass so tracemalloc overhead does
+        # not distort the timings above.
+        tracemalloc.start()
+        for batch in batches[:max(1, iterations // 10)]:
+            _run_batch(path, entry, batch, loop)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+    latencies.sort()
+    items = iterations * batch_size
+    return {
+        "iterations": iterations,
+        "items": items,
+        "ops_per_sec": round(items / elapsed, 2) if elapsed > 0 else None,
+        "batch_latency_ms": {
+            "p50": round(_percentile(latencies, 50), 4),
+            "p99": round(_percentile(latencies, 99), 4),
+            "mean": round(sum(latencies) / len(latencies), 4),
+        },
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(models: Optional[List[str]] = None, iterations: int = 50,
+                   warmup: int = 5, seed: int = DEFAULT_SEED,
+                   batch_sizes: Optional[List[int]] = None) -> Dict:
+    """Run the full benchmark matrix and return a JSON-serialisable report."""
+    entries = load_models()
+    selected = models or list(entries.keys())
+    batch_sizes = batch_sizes or BATCH_SIZES
+
+    results = []
+    for model in selected:
+        for length_name, length_words in TEXT_LENGTHS.items():
+            corpus = build_corpus(model, length_words, size=64, seed=seed)
+            for batch_size in batch_sizes:
+                for path in ("sync", "async"):
+                    print(f"  {model:<15} {path:<5} {length_name:<6} batch={batch_size}")
+                    case = run_case(path, entries[model][path], corpus, batch_size,
+                                    iterations, warmup, seed)
+                    case.update({
+                        "model": model,
+                        "path": path,
+                        "text_length": length_name,
+                        "batch_size": batch_size,
+                    })
+                    results.append(case)
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "iterations": iterations,
+            "warmup": warmup,
+        },
+        "results": results,
+    }
+
+
+def _case_key(case: Dict) -> tuple:
+    return (case["model"], case["path"], case["text_length"], case["batch_size"])
+
+
+def compare_reports(before: Dict, after: Dict) -> List[Dict]:
+    """Return per-case throughput and latency changes between two reports."""
+    baseline = {_case_key(c): c for c in before["results"]}
+    changes = []
+    for case in after["results"]:
+        old = baseline.get(_case_key(case))
+        if not old or not old["ops_per_sec"]:
+            continue
+        changes.append({
+            "case": "/".join(str(part) for part in _case_key(case)),
+            "ops_per_sec_change_pct": round(
+                (case["ops_per_sec"] - old["ops_per_sec"]) / old["ops_per_sec"] * 100, 1),
+            "p99_ms_before": old["batch_latency_ms"]["p99"],
+            "p99_ms_after": case["batch_latency_ms"]["p99"],
+        })
+    return changes
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the SentinelX ml_models package")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark (default)")
+    compare_parser = subparsers.add_parser("compare", help="Diff two benchmark reports")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    for target in (parser, run_parser):
+        target.add_argument("--output", default="bench_ml_models.json")
+        target.add_argument("--models", nargs="*", choices=["triage", "misinformation", "factcheck"])
+        target.add_argument("--iterations", type=int, default=50)
+        target.add_argument("--warmup", type=int, default=5)
+        target.add_argument("--seed", type=int, default=DEFAULT_SEED)
+        target.add_argument("--batch-sizes", type=int, nargs="*")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        for change in compare_reports(before, after):
+            print(f"{change['case']:<40} {change['ops_per_sec_change_pct']:>+8.1f}% ops/sec  "
+                  f"p99 {change['p99_ms_before']:.3f} -> {change['p99_ms_after']:.3f} ms")
+        return
+
+    print("Running ml_models benchmark...")
+    report = run_benchmarks(args.models, args.iterations, args.warmup, args.seed, args.batch_sizes)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Query latency benchmark for the road routing service.
+
+Builds a synthetic city grid (mixed road classes, some oneway streets) or
+loads a real extract, then times random point-to-point routes per travel
+mode, first with the haversine heuristic alone and then with landmark
+tables. Local queries (a few km, the usual evacuation case) and cross-city
+queries are reported separately.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_routing --grid 300
+    python -m benchmarks.bench_routing --network city.geojson --queries 100 --output routing.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.routing_service import RoadGraph, RoutingService
+
+GRID_STEP = 0.001  # degrees between grid junctions (~110 m)
+GRID_ORIGIN = (28.50, 77.10)
+
+
+def build_grid(size: int, seed: int = 1) -> Dict:
+    """GeoJSON FeatureCollection of a size x size street grid."""
+    rng = random.Random(seed)
+    classes = ["residential"] * 6 + ["tertiary", "secondary", "primary", "footway", "service"]
+    lat0, lng0 = GRID_ORIGIN
+    features = []
+    for i in range(size):
+        for j in range(size):
+            for di, dj in ((0, 1), (1, 0)):
+                if i + di >= size or j + dj >= size:
+                    continue
+                properties = {"highway": rng.choice(classes), "name": f"Road {i if di == 0 else j}"}
+                if rng.random() < 0.1:
+                    properties["oneway"] = "yes"
+                features.append({
+                    "type": "Feature",
+                    "geometry": {"type": "LineString", "coordinates": [
+                        [lng0 + j * GRID_STEP, lat0 + i * GRID_STEP],
+                        [lng0 + (j + dj) * GRID_STEP, lat0 + (i + di) * GRID_STEP]
+                    ]},
+                    "properties": properties
+                })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+def time_queries(service: RoutingService, mode: str, pairs) -> Dict:
+    """Latency distribution (ms) of routing every pair."""
+    latencies, failed = [], 0
+    for (lat1, lng1), (lat2, lng2) in pairs:
+        started = time.perf_counter()
+        if service.route(lat1, lng1, lat2, lng2, mode) is None:
+            failed += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "queries": len(pairs),
+        "unroutable": failed,
+        "p50": round(_percentile(latencies, 50), 3),
+        "p95": round(_percentile(latencies, 95), 3),
+        "max": round(latencies[-1], 3) if latencies else 0.0
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Road routing latency benchmark")
+    parser.add_argument("--network", help="Road network file (GeoJSON, .osm.pbf or .npz)")
+    parser.add_argument("--grid", type=int, default=300, help="Synthetic grid size when no network is given")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--local-km", type=float, default=3.0, help="Max offset of local query destinations")
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--modes", default="walking,driving")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--output", help="Optional JSON report path")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    graph = RoadGraph.load(args.network) if args.network else RoadGraph.from_geojson(build_grid(args.grid))
+    report = {
+        "graph": {"nodes": graph.node_count, "edges": graph.edge_count,
+                  "load_sec": round(time.perf_counter() - started, 3)},
+        "results": {}
+    }
+    service = RoutingService(graph, max_snap_km=5.0)
+    modes = args.modes.split(",")
+
+    rng = random.Random(args.seed)
+    lat_lo, lat_hi = float(graph.node_lat.min()), float(graph.node_lat.max())
+    lng_lo, lng_hi = float(graph.node_lng.min()), float(graph.node_lng.max())
+    offset = args.local_km / 111.0
+
+    def point():
+        return rng.uniform(lat_lo, lat_hi), rng.uniform(lng_lo, lng_hi)
+
+    workloads = {
+        "cross_city": [(point(), point()) for _ in range(args.queries)],
+        "local": [(p, (p[0] + rng.uniform(-offset, offset), p[1] + rng.uniform(-offset, offset)))
+                  for p in (point() for _ in range(args.queries))]
+    }
+
+    for mode in modes:
+        graph.profile(mode)
+        for name, pairs in workloads.items():
+            report["results"].setdefault(mode, {})[f"{name}_haversine"] = time_queries(service, mode, pairs)
+
+    started = time.perf_counter()
+    graph.prepare(modes, landmarks=args.landmarks)
+    report["graph"]["landmark_sec"] = round(time.perf_counter() - started, 3)
+    for mode in modes:
+        for name, pairs in workloads.items():
+            report["results"][mode][f"{name}_landmarks"] = time_queries(service, mode, pairs)
+
+    report["config"] = {k: v for k, v in vars(args).items() if k != "output"}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
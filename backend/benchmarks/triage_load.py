@@ -0,0 +1,246 @@
+"""
+Synthetic load generator for the triage service.
+
+Emits an open-loop stream of realistic helpline messages (see
+ml_models.triage_scenarios.generate_helpline_messages) following a rate
+profile with optional bursts, and sends them through the classify or batch
+paths, either in-process against TriageClassifier or over HTTP against a
+running server. Latency is measured from each message's scheduled arrival
+time, so queueing delay under overload is included rather than hidden.
+
+Examples (from the backend directory):
+    python -m benchmarks.triage_load --rate constant:50 --duration 30
+    python -m benchmarks.triage_load --rate ramp:10:200 --burst spike:10:300 \\
+        --language-mix en=6,hi=2,hinglish=2 --urgency-mix CRITICAL=1,HIGH=2,MEDIUM=4,LOW=3
+    python -m benchmarks.triage_load --target http --url http://localhost:8000 --path batch
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_models.triage_scenarios import generate_helpline_messages, parse_mix
+
+
+def rate_profile(spec: str, duration: float) -> Callable[[float], float]:
+    """
+    Build a base arrival-rate function (messages/sec) from a spec.
+
+    Specs:
+        constant:R           fixed rate R
+        ramp:R0:R1           linear ramp from R0 to R1 over the run
+        step:R0:R1:T         R0 until T seconds, then R1
+    """
+    kind, *args = spec.split(":")
+    values = [float(a) for a in args]
+    if kind == "constant":
+        return lambda t: values[0]
+    if kind == "ramp":
+        return lambda t: values[0] + (values[1] - values[0]) * min(1.0, t / duration)
+    if kind == "step":
+        return lambda t: values[0] if t < values[2] else values[1]
+    raise ValueError(f"Unknown rate profile: {spec}")
+
+
+def burst_shape(spec: Optional[str]) -> Callable[[int, float], Tuple[float, int]]:
+    """
+    Build a burst function returning (rate multiplier, extra messages) for a
+    schedule step, given the step index and the tick length in seconds.
+
+    Specs:
+        spike:EVERY:SIZE             SIZE extra messages at once every EVERY seconds
+        square:PERIOD:DUTY:FACTOR    rate x FACTOR for the first DUTY fraction of each PERIOD
+    """
+    if not spec:
+        return lambda step, tick: (1.0, 0)
+    kind, *args = spec.split(":")
+    values = [float(a) for a in args]
+    if kind == "spike":
+        every, size = values
+        return lambda step, tick: (1.0, int(size) if step > 0 and step % max(1, round(every / tick)) == 0 else 0)
+    if kind == "square":
+        period, duty, factor = values
+        return lambda step, tick: (factor if (step * tick % period) < duty * period else 1.0, 0)
+    raise ValueError(f"Unknown burst shape: {spec}")
+
+
+def build_schedule(duration: float, rate: Callable[[float], float],
+                   burst: Callable[[int, float], Tuple[float, int]], tick: float = 0.1) -> List[float]:
+    """Return arrival offsets (seconds) for the whole run, evenly spread per tick."""
+    arrivals: List[float] = []
+    carry = 0.0
+    steps = int(round(duration / tick))
+    for step in range(steps):
+        t = step * tick
+        multiplier, extra = burst(step, tick)
+        expected = rate(t) * multiplier * tick + carry
+        n = int(expected)
+        carry = expected - n
+        arrivals.extend([t] * extra)
+        arrivals.extend(t + tick * i / max(1, n) for i in range(n))
+    return arrivals
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class InProcessTarget:
+    """Sends messages straight to a TriageClassifier instance."""
+
+    def __init__(self):
+        from ml_models.triage_classifier import TriageClassifier
+        self.classifier = TriageClassifier()
+
+    async def classify(self, message: Dict):
+        await self.classifier.classify_request(message["message"], message["location"])
+
+    async def classify_batch(self, messages: List[Dict]):
+        await self.classifier.classify_batch(messages)
+
+    async def close(self):
+        pass
+
+
+class HttpTarget:
+    """Sends messages to a running SentinelX server."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("The HTTP target requires httpx (pip install httpx)") from e
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+
+    async def classify(self, message: Dict):
+        response = await self.client.post(
+            "/api/triage/classify",
+            json={"message": message["message"], "location": message["location"]}
+        )
+        response.raise_for_status()
+
+    async def classify_batch(self, messages: List[Dict]):
+        response = await self.client.post(
+            "/api/triage/batch-classify",
+            json={"requests": [{"message": m["message"], "location": m["location"]} for m in messages]}
+        )
+        response.raise_for_status()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+async def run_load(target, messages: List[Dict], arrivals: List[float], path: str = "classify",
+                   batch_size: int = 16, max_in_flight: int = 256) -> Dict:
+    """
+    Replay messages at their scheduled arrival offsets and collect latencies.
+
+    For the batch path, messages that have arrived are grouped into batches
+    of up to batch_size; each message's latency runs from its own arrival.
+    """
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(max_in_flight)
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    tasks = []
+
+    async def send(group: List[Tuple[float, Dict]]):
+        nonlocal errors
+        async with semaphore:
+            try:
+                if path == "batch":
+                    await target.classify_batch([m for _, m in group])
+                else:
+                    await target.classify(group[0][1])
+                done = loop.time()
+                latencies.extend((done - (start + offset)) * 1000 for offset, _ in group)
+            except Exception:
+                errors += len(group)
+
+    pending: List[Tuple[float, Dict]] = []
+    for offset, message in zip(arrivals, messages):
+        delay = start + offset - loop.time()
+        if delay > 0:
+            if pending:
+                tasks.append(asyncio.ensure_future(send(pending)))
+                pending = []
+            await asyncio.sleep(delay)
+        pending.append((offset, message))
+        if path != "batch" or len(pending) >= batch_size:
+            tasks.append(asyncio.ensure_future(send(pending)))
+            pending = []
+    if pending:
+        tasks.append(asyncio.ensure_future(send(pending)))
+
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "offered": len(arrivals),
+        "completed": completed,
+        "errors": errors,
+        "elapsed_sec": round(elapsed, 3),
+        "offered_rate": round(len(arrivals) / arrivals[-1], 2) if arrivals and arrivals[-1] > 0 else None,
+        "sustained_throughput": round(completed / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 3),
+            "p90": round(_percentile(latencies, 90), 3),
+            "p99": round(_percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0
+        }
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Synthetic helpline load generator for triage")
+    parser.add_argument("--target", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", choices=["classify", "batch"], default="classify")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Run length in seconds")
+    parser.add_argument("--rate", default="constant:50", help="Rate profile spec")
+    parser.add_argument("--burst", default=None, help="Burst shape spec")
+    parser.add_argument("--urgency-mix", default="CRITICAL=1,HIGH=2,MEDIUM=4,LOW=3")
+    parser.add_argument("--language-mix", default="en=6,hi=2,hinglish=2")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--output", help="Optional JSON report path")
+    args = parser.parse_args(argv)
+
+    arrivals = build_schedule(args.duration, rate_profile(args.rate, args.duration), burst_shape(args.burst))
+    messages = generate_helpline_messages(
+        len(arrivals), parse_mix(args.urgency_mix), parse_mix(args.language_mix), args.seed
+    )
+
+    async def _run():
+        target = InProcessTarget() if args.target == "inprocess" else HttpTarget(args.url)
+        try:
+            return await run_load(target, messages, arrivals, args.path, args.batch_size, args.max_in_flight)
+        finally:
+            await target.close()
+
+    print(f"Sending {len(arrivals)} messages over {args.duration}s ({args.target}, {args.path})...")
+    started = time.time()
+    report = asyncio.run(_run())
+    report["config"] = {k: v for k, v in vars(args).items() if k != "output"}
+    report["wall_clock_sec"] = round(time.time() - started, 3)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
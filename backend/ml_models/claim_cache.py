@@ -0,0 +1,307 @@
+"""
+Verdict reuse cache for near-duplicate claims.
+
+Claims are canonicalized (lowercased, URLs, punctuation, stopwords and
+forwarding boilerplate removed) and turned into word and bigram shingles.
+A MinHash signature with LSH banding finds candidate near-duplicates in
+constant time; candidates are confirmed with exact Jaccard similarity on
+the shingles. Each cached claim is the head of a cluster whose variant
+counts power the trending view.
+
+Cached verdicts expire after a TTL and are invalidated when newly indexed
+articles share enough keywords with the claim.
+"""
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ml_models.claim_text import STOPWORDS
+
+# Boilerplate that varies between forwards of the same rumour
+FILLER_WORDS = {
+    "breaking", "urgent", "share", "forward", "forwarded", "please", "viral", "news",
+    "alert", "must", "read", "everyone", "immediately", "just", "now"
+}
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+")
+WORD_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def canonicalize(claim: str, location: Optional[str] = None) -> List[str]:
+    """Normalized content tokens of a claim (and its location), in order."""
+    text = URL_PATTERN.sub(" ", claim.lower())
+    if location:
+        text += " " + location.lower()
+    return [t for t in WORD_PATTERN.findall(text)
+            if len(t) > 1 and t not in STOPWORDS and t not in FILLER_WORDS]
+
+
+def shingles(tokens: List[str]) -> set:
+    """Unigram and bigram shingles of a token sequence."""
+    grams = set(tokens)
+    grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return grams
+
+
+class ClaimCache:
+    """
+    MinHash/LSH cache of fact-check verdicts.
+
+    Args:
+        ttl_seconds: How long a verdict may be reused
+        similarity_threshold: Minimum Jaccard similarity to reuse a verdict
+        num_perm: MinHash signature length
+        bands: LSH bands (num_perm must be divisible by bands)
+        max_entries: Least recently seen clusters are evicted beyond this
+        trending_window_seconds: Window over which cluster counts are reported
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, similarity_threshold: float = 0.6,
+                 num_perm: int = 64, bands: int = 16, max_entries: int = 10000,
+                 trending_window_seconds: float = 86400, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.trending_window_seconds = trending_window_seconds
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], set] = {}
+        self._keyword_index: Dict[str, set] = {}
+        self._next_id = 1
+        self.stats = Counter()
+
+    # ------------------------------------------------------------------
+    # Signatures
+    # ------------------------------------------------------------------
+
+    def _signature(self, grams: set) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        if not len(hashes):
+            return np.full(len(self._a), MERSENNE_PRIME, dtype=np.uint64)
+        # a * x fits in 64 bits since a < 2**31 and x < 2**32
+        permuted = (hashes[:, None] * self._a[None, :] + self._b[None, :]) % MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+
+    def _best_match(self, grams: set, signature: np.ndarray) -> Tuple[Optional[Dict], float]:
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        best, best_similarity = None, 0.0
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            union = len(grams | entry["shingles"])
+            similarity = len(grams & entry["shingles"]) / union if union else 0.0
+            if similarity > best_similarity:
+                best, best_similarity = entry, similarity
+        if best_similarity < self.similarity_threshold:
+            return None, best_similarity
+        return best, best_similarity
+
+    def lookup(self, claim: str, location: Optional[str] = None) -> Optional[Tuple[Dict, float, int]]:
+        """
+        Find a reusable verdict for a near-duplicate claim.
+
+        Every lookup that matches a cluster is counted towards trending,
+        whether or not its verdict is still fresh.
+
+        Returns:
+            (cached result, similarity, cluster id), or None on a miss
+        """
+        grams = shingles(canonicalize(claim, location))
+        signature = self._signature(grams)
+        now = time.time()
+        with self._lock:
+            entry, similarity = self._best_match(grams, signature)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._record_sighting(entry, now)
+            if entry["expires_at"] <= now:
+                self.stats["stale"] += 1
+                return None
+            self.stats["hits"] += 1
+            return entry["result"], round(similarity, 3), entry["cluster_id"]
+
+    def store(self, claim: str, result: Dict, location: Optional[str] = None) -> int:
+        """
+        Cache a verdict, refreshing the matching cluster if one exists.
+
+        Returns:
+            Cluster id
+        """
+        tokens = canonicalize(claim, location)
+        grams = shingles(tokens)
+        signature = self._signature(grams)
+        now = time.time()
+        with self._lock:
+            entry, _ = self._best_match(grams, signature)
+            if entry is None:
+                entry = {
+                    "cluster_id": self._next_id,
+                    "claim": claim,
+                    "location": location,
+                    "shingles": grams,
+                    "band_keys": self._band_keys(signature),
+                    "keywords": set(tokens),
+                    "sightings": deque(),
+                    "check_count": 0
+                }
+                self._next_id += 1
+                self._entries[entry["cluster_id"]] = entry
+                for key in entry["band_keys"]:
+                    self._buckets.setdefault(key, set()).add(entry["cluster_id"])
+                for keyword in entry["keywords"]:
+                    self._keyword_index.setdefault(keyword, set()).add(entry["cluster_id"])
+                self._record_sighting(entry, now)
+                self._evict()
+            entry["result"] = result
+            entry["expires_at"] = now + self.ttl_seconds
+            entry["last_checked"] = datetime.utcnow().isoformat()
+            return entry["cluster_id"]
+
+    def _record_sighting(self, entry: Dict, now: float):
+        entry["check_count"] += 1
+        entry["sightings"].append(now)
+        cutoff = now - self.trending_window_seconds
+        while entry["sightings"] and entry["sightings"][0] < cutoff:
+            entry["sightings"].popleft()
+        self._entries.move_to_end(entry["cluster_id"])
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            _, entry = self._entries.popitem(last=False)
+            self._unlink(entry)
+
+    def _unlink(self, entry: Dict):
+        cluster_id = entry["cluster_id"]
+        for key in entry["band_keys"]:
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(cluster_id)
+                if not bucket:
+                    del self._buckets[key]
+        for keyword in entry["keywords"]:
+            ids = self._keyword_index.get(keyword)
+            if ids:
+                ids.discard(cluster_id)
+                if not ids:
+                    del self._keyword_index[keyword]
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate_for_documents(self, documents: Iterable[Dict], min_overlap: float = 0.5) -> int:
+        """
+        Expire verdicts that new evidence may change.
+
+        A cached claim is invalidated when at least min_overlap of its
+        keywords appear in a new document's title or description.
+
+        Returns:
+            Number of verdicts invalidated
+        """
+        invalidated = 0
+        now = time.time()
+        with self._lock:
+            for doc in documents:
+                terms = set(canonicalize(f"{doc.get('title', '')} {doc.get('description', '')}"))
+                overlap = Counter()
+                for term in terms:
+                    for cluster_id in self._keyword_index.get(term, ()):
+                        overlap[cluster_id] += 1
+                for cluster_id, count in overlap.items():
+                    entry = self._entries[cluster_id]
+                    if entry["expires_at"] > now and count >= min_overlap * len(entry["keywords"]):
+                        entry["expires_at"] = 0.0
+                        invalidated += 1
+            self.stats["invalidated"] += invalidated
+        return invalidated
+
+    def clear(self):
+        """Drop every cached verdict and cluster."""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._keyword_index.clear()
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def trending(self, limit: int = 20, verified_only: bool = False) -> List[Dict]:
+        """Claim clusters ranked by how often they were checked within the trending window."""
+        cutoff = time.time() - self.trending_window_seconds
+        with self._lock:
+            clusters = []
+            for entry in self._entries.values():
+                recent = sum(1 for t in entry["sightings"] if t >= cutoff)
+                if not recent:
+                    continue
+                result = entry["result"]
+                verdict = result.get("verdict", "Unverified")
+                if verified_only and verdict == "Unverified":
+                    continue
+                clusters.append({
+                    "id": entry["cluster_id"],
+                    "claim": entry["claim"],
+                    "verdict": verdict,
+                    "confidence": result.get("confidence"),
+                    "check_count": recent,
+                    "total_checks": entry["check_count"],
+                    "last_checked": entry.get("last_checked"),
+                    "risk_level": result.get("risk_assessment"),
+                    "location": entry["location"]
+                })
+        clusters.sort(key=lambda c: c["check_count"], reverse=True)
+        return clusters[:limit]
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters and cache size."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["stale"]
+            return {
+                "clusters": len(self._entries),
+                "hits": self.stats["hits"],
+                "misses": self.stats["misses"],
+                "stale": self.stats["stale"],
+                "invalidated": self.stats["invalidated"],
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+            }
+
+
+# Create global instance
+claim_cache = None
+
+
+def get_claim_cache() -> ClaimCache:
+    """Get the global claim cache, creating it on first use"""
+    global claim_cache
+    if claim_cache is None:
+        claim_cache = ClaimCache()
+    return claim_cache
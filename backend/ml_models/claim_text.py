@@ -0,0 +1,51 @@
+"""
+Claim keyword extraction and evidence scoring.
+
+Plain-Python text helpers shared by live evidence retrieval, the local
+news index and the claim cache, kept free of network dependencies so the
+offline paths import without aiohttp.
+"""
+import re
+from typing import List, Tuple
+
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were", "has",
+    "have", "been", "will", "into", "over", "after", "about", "its", "near", "due",
+    "all", "not", "but", "our", "your", "their", "they", "there", "what", "when"
+}
+
+CONTRADICTION_CUES = [
+    "false", "fake", "hoax", "rumour", "rumor", "misleading", "no truth",
+    "denied", "denies", "debunk", "not true", "baseless", "no official confirmation"
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def claim_keywords(claim: str, limit: int = 12) -> List[str]:
+    """Extract distinct content words from a claim, in order of appearance."""
+    seen = []
+    for token in TOKEN_PATTERN.findall(claim.lower()):
+        if len(token) > 2 and token not in STOPWORDS and token not in seen:
+            seen.append(token)
+    return seen[:limit]
+
+
+def score_evidence(keywords: List[str], title: str, text: str) -> Tuple[float, bool]:
+    """
+    Score a document against claim keywords.
+
+    Returns:
+        (relevance in [0, 1], whether the document appears to support the claim)
+    """
+    if not keywords:
+        return 0.0, True
+    title_tokens = set(TOKEN_PATTERN.findall(title.lower()))
+    body_tokens = set(TOKEN_PATTERN.findall(text.lower()))
+    title_hits = sum(1 for k in keywords if k in title_tokens)
+    body_hits = sum(1 for k in keywords if k in body_tokens)
+    relevance = min(1.0, (2 * title_hits + body_hits) / (2 * len(keywords)))
+
+    lead = (title + " " + text[:600]).lower()
+    supports = not any(cue in lead for cue in CONTRADICTION_CUES)
+    return round(relevance, 3), supports
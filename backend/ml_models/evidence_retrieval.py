@@ -0,0 +1,259 @@
+"""
+Async evidence retrieval for the fact-check engine.
+
+Claims are verified against the trusted domains through a four-stage
+pipeline (search -> fetch -> extract -> score) connected by bounded queues,
+so a slow stage applies back-pressure instead of buffering without limit.
+All HTTP goes through one aiohttp session whose connector keeps a separate
+connection pool per host (limit_per_host) under a global cap. The whole
+claim runs under a deadline; when it expires, whatever evidence has been
+scored so far is returned and the remaining work is cancelled.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote_plus, urljoin, urlparse
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from ml_models.claim_text import claim_keywords, score_evidence
+
+DEFAULT_SEARCH_TEMPLATE = "{base}/search?q={query}"
+
+
+def link_in_source(url: str, base: str) -> bool:
+    """
+    Whether a link belongs to the source served at base.
+
+    The host must be the base host or one of its subdomains (www.reuters.com for
+    https://reuters.com, not reuters.com.evil.example), and the path must lie
+    under the base path when the base has one.
+    """
+    link, root = urlparse(url), urlparse(base)
+    if link.scheme not in ("http", "https") or not link.hostname or not root.hostname:
+        return False
+    if link.hostname != root.hostname and not link.hostname.endswith("." + root.hostname):
+        return False
+    prefix = root.path.rstrip("/")
+    return not prefix or link.path == prefix or link.path.startswith(prefix + "/")
+
+
+class EvidenceRetriever:
+    """
+    Pooled, deadline-bounded evidence retrieval over trusted domains.
+
+    Args:
+        trusted_sources: Category -> list of domains (FactCheckEngine.trusted_sources)
+        source_reliability: Domain -> reliability score (dict or SourceReliabilityIndex)
+        base_urls: Optional domain -> base URL overrides (e.g. a local stand-in)
+        search_template: Search URL template with {base} and {query}
+        per_host_limit: Max concurrent connections per host
+        total_limit: Max concurrent connections overall
+        fetch_workers: Concurrent fetch workers
+        max_results_per_source: Article links taken from each search page
+        queue_size: Capacity of each inter-stage queue
+        request_timeout: Per-request timeout in seconds
+        min_relevance: Documents below this relevance are dropped
+    """
+
+    def __init__(self, trusted_sources: Dict[str, List[str]], source_reliability: Dict[str, float],
+                 base_urls: Optional[Dict[str, str]] = None,
+                 search_template: str = DEFAULT_SEARCH_TEMPLATE,
+                 per_host_limit: int = 4, total_limit: int = 32, fetch_workers: int = 16,
+                 max_results_per_source: int = 3, queue_size: int = 32,
+                 request_timeout: float = 4.0, min_relevance: float = 0.2):
+        self.domains = [domain for domains in trusted_sources.values() for domain in domains]
+        self.source_reliability = source_reliability
+        self.base_urls = base_urls or {}
+        self.search_template = search_template
+        self.per_host_limit = per_host_limit
+        self.total_limit = total_limit
+        self.fetch_workers = fetch_workers
+        self.max_results_per_source = max_results_per_source
+        self.queue_size = queue_size
+        self.request_timeout = request_timeout
+        self.min_relevance = min_relevance
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+
+    def _base_url(self, domain: str) -> str:
+        return self.base_urls.get(domain, f"https://{domain}").rstrip("/")
+
+    def _reliability(self, domain: str) -> float:
+        return self.source_reliability.get(domain, 0.7)
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self.total_limit, limit_per_host=self.per_host_limit)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            headers={"User-Agent": "SentinelX-FactCheck/1.0"}
+        )
+
+    async def _get_session(self) -> Tuple[aiohttp.ClientSession, bool]:
+        """
+        Return a session usable on the running loop and whether it is the shared one.
+
+        The shared session belongs to the loop that created it. While that loop is
+        alive, other loops get a session of their own that the caller closes when
+        done; once it has ended, its session is closed and the running loop takes over.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._session_loop is not loop:
+            if not self._session_loop.is_closed():
+                return self._new_session(), False
+            await self._session.close()
+        if self._session is None or self._session.closed:
+            self._session = self._new_session()
+            self._session_loop = loop
+        return self._session, True
+
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_text(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        try:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    return None
+                return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
+    # ------------------------------------------------------------------
+    # Pipeline stages
+    # ------------------------------------------------------------------
+
+    async def _search(self, session, domain: str, query: str, fetch_queue: asyncio.Queue):
+        base = self._base_url(domain)
+        search_url = self.search_template.format(base=base, query=quote_plus(query))
+        html = await self._get_text(session, search_url)
+        if not html:
+            return
+
+        soup = BeautifulSoup(html, "html.parser")
+        links = []
+        for anchor in soup.find_all("a", href=True):
+            url = urljoin(search_url, anchor["href"])
+            if link_in_source(url, base) and url != search_url and url not in links:
+                links.append(url)
+            if len(links) >= self.max_results_per_source:
+                break
+        for url in links:
+            await fetch_queue.put((domain, url))
+
+    async def _fetch_worker(self, session, fetch_queue: asyncio.Queue, extract_queue: asyncio.Queue):
+        while True:
+            domain, url = await fetch_queue.get()
+            try:
+                html = await self._get_text(session, url)
+                if html:
+                    await extract_queue.put((domain, url, html))
+            finally:
+                fetch_queue.task_done()
+
+    async def _extract_worker(self, extract_queue: asyncio.Queue, score_queue: asyncio.Queue):
+        while True:
+            domain, url, html = await extract_queue.get()
+            try:
+                # HTML parsing is CPU-bound; keep it off the event loop
+                title, text = await asyncio.to_thread(self._extract, html)
+                await score_queue.put((domain, url, title, text))
+            finally:
+                extract_queue.task_done()
+
+    @staticmethod
+    def _extract(html: str) -> Tuple[str, str]:
+        soup = BeautifulSoup(html, "html.parser")
+        heading = soup.find("h1")
+        title = (heading.get_text(" ", strip=True) if heading else
+                 soup.title.get_text(" ", strip=True) if soup.title else "")
+        paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
+        return title, " ".join(paragraphs)[:5000]
+
+    async def _score_worker(self, keywords: List[str], score_queue: asyncio.Queue, evidence: List[Dict]):
+        while True:
+            domain, url, title, text = await score_queue.get()
+            try:
+                relevance, supports = score_evidence(keywords, title, text)
+                if relevance >= self.min_relevance:
+                    evidence.append({
+                        "source": domain,
+                        "title": title or url,
+                        "url": url,
+                        "relevance": relevance,
+                        "supports_claim": supports,
+                        "reliability": self._reliability(domain)
+                    })
+            finally:
+                score_queue.task_done()
+
+    # ------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------
+
+    async def retrieve(self, claim: str, location: Optional[str] = None, deadline: float = 3.0) -> Dict:
+        """
+        Retrieve and score evidence for a claim within a deadline.
+
+        Args:
+            claim: Claim text
+            location: Optional location appended to the search query
+            deadline: Seconds allowed for the whole claim
+
+        Returns:
+            Sources analysis in the same shape as FactCheckEngine._search_sources,
+            plus "partial" (deadline hit) and "retrieval_time"
+        """
+        started = time.monotonic()
+        keywords = claim_keywords(claim)
+        query = " ".join(keywords[:8] + ([location] if location else []))
+        session, shared = await self._get_session()
+
+        fetch_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        extract_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        score_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        evidence: List[Dict] = []
+
+        workers = [asyncio.create_task(self._fetch_worker(session, fetch_queue, extract_queue))
+                   for _ in range(self.fetch_workers)]
+        workers += [asyncio.create_task(self._extract_worker(extract_queue, score_queue))
+                    for _ in range(max(2, self.fetch_workers // 4))]
+        workers.append(asyncio.create_task(self._score_worker(keywords, score_queue, evidence)))
+        searches = [asyncio.create_task(self._search(session, domain, query, fetch_queue))
+                    for domain in self.domains]
+
+        async def drain():
+            await asyncio.gather(*searches)
+            await fetch_queue.join()
+            await extract_queue.join()
+            await score_queue.join()
+
+        partial = False
+        try:
+            await asyncio.wait_for(drain(), timeout=deadline)
+        except asyncio.TimeoutError:
+            partial = True
+        finally:
+            for task in searches + workers:
+                task.cancel()
+            await asyncio.gather(*searches, *workers, return_exceptions=True)
+            if not shared:
+                await session.close()
+
+        supporting = [e for e in evidence if e["supports_claim"]]
+        contradicting = [e for e in evidence if not e["supports_claim"]]
+        reliabilities = [e["reliability"] for e in evidence]
+        return {
+            "supporting_sources": supporting,
+            "contradicting_sources": contradicting,
+            "total_sources": len(evidence),
+            "avg_reliability": sum(reliabilities) / len(reliabilities) if reliabilities else 0.0,
+            "search_keywords": keywords[:5],
+            "partial": partial,
+            "retrieval_time": round(time.monotonic() - started, 3)
+        }
@@ -0,0 +1,126 @@
+"""
+Local HTTP stand-in for the trusted evidence sources.
+
+Serves a search page and article pages per domain from in-memory fixtures
+so EvidenceRetriever can be exercised offline. Each domain is mounted under
+/<domain>/, so the retriever is pointed at it with
+base_urls={domain: f"{server.url}/{domain}"}. An optional per-domain delay
+simulates slow hosts for deadline testing.
+
+Run standalone (from the backend directory):
+    python -m ml_models.evidence_standin --port 8765
+"""
+import argparse
+import asyncio
+import html
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+# domain -> list of {"slug", "title", "body"}
+SAMPLE_ARTICLES = {
+    "imd.gov.in": [
+        {"slug": "cyclone-warning", "title": "Cyclone warning issued for Odisha coast",
+         "body": "The meteorological department issued a cyclone warning with heavy rainfall expected over Odisha."},
+        {"slug": "heatwave", "title": "Heatwave conditions over Rajasthan",
+         "body": "Temperature above 45 C recorded in several districts of Rajasthan."}
+    ],
+    "ndma.gov.in": [
+        {"slug": "flood-advisory", "title": "Flood advisory for Assam districts",
+         "body": "Evacuation of low lying areas in Assam is under way as rivers cross the danger mark."}
+    ],
+    "ptinews.com": [
+        {"slug": "dam-rumour", "title": "Reports of dam collapse in Assam are fake, officials say",
+         "body": "Officials denied reports of a dam collapse and called the viral flood message a hoax."}
+    ]
+}
+
+
+class EvidenceStandInServer:
+    """
+    In-process aiohttp server mimicking the trusted domains.
+
+    Args:
+        articles: Domain -> list of article fixtures (defaults to SAMPLE_ARTICLES)
+        delays: Optional domain -> seconds to wait before every response
+    """
+
+    def __init__(self, articles: Optional[Dict[str, List[Dict]]] = None,
+                 delays: Optional[Dict[str, float]] = None):
+        self.articles = articles if articles is not None else SAMPLE_ARTICLES
+        self.delays = delays or {}
+        self.request_count = 0
+        self.url = None
+        self._runner = None
+
+    def _build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/{domain}/search", self._search)
+        app.router.add_get("/{domain}/article/{slug}", self._article)
+        return app
+
+    async def _delay(self, domain: str):
+        self.request_count += 1
+        if self.delays.get(domain):
+            await asyncio.sleep(self.delays[domain])
+
+    async def _search(self, request: web.Request) -> web.Response:
+        domain = request.match_info["domain"]
+        await self._delay(domain)
+        terms = request.query.get("q", "").lower().split()
+        links = []
+        for article in self.articles.get(domain, []):
+            text = (article["title"] + " " + article["body"]).lower()
+            if any(term in text for term in terms):
+                links.append(f'<a href="/{domain}/article/{article["slug"]}">{html.escape(article["title"])}</a>')
+        return web.Response(text="<html><body>" + "".join(links) + "</body></html>", content_type="text/html")
+
+    async def _article(self, request: web.Request) -> web.Response:
+        domain = request.match_info["domain"]
+        await self._delay(domain)
+        for article in self.articles.get(domain, []):
+            if article["slug"] == request.match_info["slug"]:
+                page = (f"<html><head><title>{html.escape(article['title'])}</title></head><body>"
+                        f"<h1>{html.escape(article['title'])}</h1><p>{html.escape(article['body'])}</p>"
+                        "</body></html>")
+                return web.Response(text=page, content_type="text/html")
+        raise web.HTTPNotFound()
+
+    def base_urls(self) -> Dict[str, str]:
+        """Base URL overrides for EvidenceRetriever, one per served domain."""
+        return {domain: f"{self.url}/{domain}" for domain in self.articles}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving; returns the root URL."""
+        self._runner = web.AppRunner(self._build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}"
+        return self.url
+
+    async def stop(self):
+        """Stop the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Local stand-in for trusted evidence sources")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    async def _serve():
+        server = EvidenceStandInServer()
+        url = await server.start(args.host, args.port)
+        print(f"Evidence stand-in serving {len(server.articles)} domains at {url}")
+        await asyncio.Event().wait()
+
+    asyncio.run(_serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import asyncio
+import os
 import re
+import threading
 from typing import Dict, List, Optional
 import requests
 from datetime import datetime
@@ -7,24 +9,57 @@ import random
 from bs4 import BeautifulSoup
 import time
 
+from ml_models.source_reliability import SourceReliabilityIndex
+
 class FactCheckEngine:
     """
     AI-powered fact-checking engine for disaster-related claims.
     Combines NLP analysis with web scraping for verification.
     """
     
-    def __init__(self):
+    def __init__(self, evidence_retriever=None, news_index=None, claim_cache=None, scheduler=None):
         print("Loading fact-check engine...")
         
         # Initialize trusted sources
         self._initialize_sources()
         
+        # Live evidence retrieval (falls back to simulated sources when unset)
+        self.retrieval_deadline = float(os.getenv("FACTCHECK_RETRIEVAL_DEADLINE", "3.0"))
+        self.evidence_retriever = evidence_retriever
+        if self.evidence_retriever is None and os.getenv("FACTCHECK_LIVE_RETRIEVAL") == "1":
+            from ml_models.evidence_retrieval import EvidenceRetriever
+            self.evidence_retriever = EvidenceRetriever(self.trusted_sources, self.reliability_index)
+        
+        # Local BM25 index of ingested news, queried before any live search
+        if news_index is None:
+            from ml_models.news_index import get_news_index
+            news_index = get_news_index()
+        self.news_index = news_index
+        if not self.news_index.source_reliability:
+            self.news_index.source_reliability = self.reliability_index
+        
+        # Verdict reuse for near-duplicate claims; new evidence invalidates it
+        if claim_cache is None:
+            from ml_models.claim_cache import get_claim_cache
+            claim_cache = get_claim_cache()
+        self.claim_cache = claim_cache
+        self.news_index.add_listener(self.claim_cache.invalidate_for_documents)
+        
+        # Urgency-aware worker pool for the CPU-bound analysis
+        if scheduler is None:
+            from services.job_scheduler import get_factcheck_scheduler
+            scheduler = get_factcheck_scheduler()
+        self.scheduler = scheduler
+        
         # Initialize claim patterns
         self._initialize_patterns()
         
         # Initialize risk assessment criteria
         self._initialize_risk_criteria()
         
+        # Compile all phrase tables into a single matcher
+        self._compile_matchers()
+        
         print("Fact-check engine loaded successfully!")
     
     def _initialize_sources(self):
@@ -67,6 +102,12 @@ class FactCheckEngine:
             "aninews.in": 0.85,
             "who.int": 0.94
         }
+        
+        # Suffix index over the tables above; subdomains and full URLs resolve
+        # to their registered parent domain
+        self.reliability_index = SourceReliabilityIndex.from_sources(
+            self.trusted_sources, self.source_reliability
+        )
     
     def _initialize_patterns(self):
         """Initialize patterns for different types of claims."""
@@ -132,6 +173,81 @@ class FactCheckEngine:
             }
         }
     
+    def _compile_matchers(self):
+        """
+        Compile the phrase tables into a token-level matcher.
+        
+        The claim is split on whitespace once. Every distinct token is mapped
+        (and memoized) to the phrase words it contains, and tokens with a
+        digit are remembered. Single-word phrases are then set lookups. A multi-word phrase
+        can only occur when each of its words is inside some token, so only
+        those candidates are confirmed with a substring test. This gives the
+        same result as testing each phrase with `phrase in claim_lower`.
+        """
+        self.urgency_words = ["urgent", "breaking", "immediate", "emergency"]
+        self.default_risk_words = {
+            "HIGH": ["emergency", "evacuation", "life"],
+            "MEDIUM": ["warning", "alert", "danger"]
+        }
+        
+        phrases = set(self.misinformation_indicators) | set(self.credibility_boosters) | set(self.urgency_words)
+        for patterns in self.claim_patterns.values():
+            phrases.update(patterns["keywords"])
+        for criteria in self.risk_criteria.values():
+            phrases.update(criteria["keywords"])
+            phrases.update(criteria["impact"])
+        for words in self.default_risk_words.values():
+            phrases.update(words)
+        
+        # Per-table phrase sets, in the tables' precedence order
+        self._type_phrases = [(category, frozenset(patterns["keywords"]))
+                              for category, patterns in self.claim_patterns.items()]
+        self._risk_phrases = [(level, frozenset(criteria["keywords"] + criteria["impact"]))
+                              for level, criteria in self.risk_criteria.items()]
+        self._risk_phrases += [(level, frozenset(words)) for level, words in self.default_risk_words.items()]
+        self._misinfo_phrases = frozenset(self.misinformation_indicators)
+        self._credibility_phrases = frozenset(self.credibility_boosters)
+        self._urgency_phrases = frozenset(self.urgency_words)
+        
+        self._single_phrases = frozenset(p for p in phrases if " " not in p)
+        self._multi_phrases = [(p, frozenset(p.split())) for p in phrases if " " in p]
+        self._phrase_words = tuple(self._single_phrases.union(*(w for _, w in self._multi_phrases)))
+        # token -> (phrase words it contains, whether it has a digit); shared by the scheduler threads
+        self._token_memo: Dict[str, tuple] = {}
+        self._token_memo_limit = 50000
+        self._token_lock = threading.Lock()
+        self._capitalized_pattern = re.compile(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b')
+    
+    def _token_entries(self, token_set: set) -> List[tuple]:
+        """Memoized (phrase words, has digit) for each token, scanning the ones not seen before."""
+        with self._token_lock:
+            unseen = token_set.difference(self._token_memo)
+            if len(self._token_memo) + len(unseen) > self._token_memo_limit:
+                self._token_memo.clear()
+                unseen = token_set
+            for token in unseen:
+                self._token_memo[token] = (frozenset(w for w in self._phrase_words if w in token),
+                                           any(ch.isdecimal() for ch in token))
+            return [self._token_memo[token] for token in token_set]
+    
+    def _match_phrases(self, claim_lower: str) -> tuple:
+        """
+        Scan a lowercased claim once.
+        
+        Returns:
+            (set of table phrases occurring in the claim, whether it contains a digit, token count)
+        """
+        tokens = claim_lower.split()
+        entries = self._token_entries(set(tokens))
+        words = set().union(*(entry[0] for entry in entries))
+        has_digit = any(entry[1] for entry in entries)
+        
+        found = words & self._single_phrases
+        for phrase, phrase_words in self._multi_phrases:
+            if phrase_words <= words and phrase in claim_lower:
+                found.add(phrase)
+        return found, has_digit, len(tokens)
+    
     async def verify_claim(self, claim: str, context: Optional[str] = None,
                           location: Optional[str] = None, urgency: str = "normal") -> Dict:
         """
@@ -146,14 +262,33 @@ class FactCheckEngine:
         Returns:
             Dictionary with verification results
         """
-        # Run verification in executor to avoid blocking
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, self._verify_claim_sync, claim, context, location, urgency
+        # Reuse the verdict of a recently checked near-duplicate claim
+        cached = self.claim_cache.lookup(claim, location)
+        if cached is not None:
+            result, similarity, cluster_id = cached
+            return {**result, "cached": True, "cache_similarity": similarity, "claim_cluster": cluster_id}
+        
+        # Retrieve evidence concurrently on the event loop, within the claim deadline
+        sources_analysis = None
+        if self.evidence_retriever is not None:
+            sources_analysis = await self.evidence_retriever.retrieve(
+                claim, location, deadline=self.retrieval_deadline
+            )
+        
+        # Run verification on the scheduler so urgent claims jump queued batch work
+        result = await self.scheduler.run(
+            urgency, self._verify_claim_sync, claim, context, location, urgency, sources_analysis
         )
+        
+        # Verdicts built from partial evidence are not reused
+        if result["evidence_partial"]:
+            return {**result, "cached": False, "cache_similarity": None, "claim_cluster": None}
+        cluster_id = self.claim_cache.store(claim, result, location)
+        return {**result, "cached": False, "cache_similarity": None, "claim_cluster": cluster_id}
     
     def _verify_claim_sync(self, claim: str, context: Optional[str] = None,
-                          location: Optional[str] = None, urgency: str = "normal") -> Dict:
+                          location: Optional[str] = None, urgency: str = "normal",
+                          sources_analysis: Optional[Dict] = None) -> Dict:
         """Synchronous verification function."""
         start_time = time.time()
         
@@ -161,7 +296,7 @@ class FactCheckEngine:
         claim_analysis = self._analyze_claim(claim)
         
         # Search for supporting/contradicting sources
-        sources_analysis = self._search_sources(claim, location)
+        sources_analysis = self._gather_evidence(claim, location, sources_analysis)
         
         # Determine verdict based on analysis
         verdict = self._determine_verdict(claim_analysis, sources_analysis)
@@ -169,8 +304,8 @@ class FactCheckEngine:
         # Calculate confidence score
         confidence = self._calculate_confidence(claim_analysis, sources_analysis, verdict)
         
-        # Assess risk if claim is true
-        risk_assessment = self._assess_risk(claim, location)
+        # Assess risk if claim is true (matched in the same pass as the analysis)
+        risk_assessment = claim_analysis["risk_level"]
         
         # Generate explanation
         explanation = self._generate_explanation(
@@ -194,35 +329,32 @@ class FactCheckEngine:
             "verification_sources": verification_sources,
             "processing_time": round(processing_time, 2),
             "claim_type": claim_analysis["type"],
+            "evidence_partial": sources_analysis.get("partial", False),
             "timestamp": datetime.utcnow().isoformat()
         }
     
     def _analyze_claim(self, claim: str) -> Dict:
         """Analyze the structure and content of the claim."""
-        claim_lower = claim.lower()
+        found, has_numbers, word_count = self._match_phrases(claim.lower())
         
         # Determine claim type
         claim_type = "general"
-        for category, patterns in self.claim_patterns.items():
-            if any(keyword in claim_lower for keyword in patterns["keywords"]):
+        for category, keywords in self._type_phrases:
+            if not found.isdisjoint(keywords):
                 claim_type = category
                 break
         
         # Check for misinformation indicators
-        misinfo_score = sum(1 for indicator in self.misinformation_indicators 
-                           if indicator in claim_lower) / len(self.misinformation_indicators)
+        misinfo_score = len(found & self._misinfo_phrases) / len(self.misinformation_indicators)
         
         # Check for credibility boosters
-        credibility_score = sum(1 for booster in self.credibility_boosters 
-                               if booster in claim_lower) / len(self.credibility_boosters)
+        credibility_score = len(found & self._credibility_phrases) / len(self.credibility_boosters)
         
         # Analyze language patterns
-        urgency_words = ["urgent", "breaking", "immediate", "emergency"]
-        urgency_score = sum(1 for word in urgency_words if word in claim_lower) / len(urgency_words)
+        urgency_score = len(found & self._urgency_phrases) / len(self.urgency_words)
         
         # Check for specific facts/numbers
-        has_numbers = bool(re.search(r'\d+', claim))
-        has_locations = bool(re.search(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', claim))
+        has_locations = bool(self._capitalized_pattern.search(claim))
         
         return {
             "type": claim_type,
@@ -231,10 +363,32 @@ class FactCheckEngine:
             "urgency_score": urgency_score,
             "has_numbers": has_numbers,
             "has_locations": has_locations,
+            "risk_level": self._risk_from_phrases(found),
             "length": len(claim),
-            "word_count": len(claim.split())
+            "word_count": word_count
         }
     
+    def _gather_evidence(self, claim: str, location: Optional[str] = None,
+                         live_sources: Optional[Dict] = None) -> Dict:
+        """Combine local index hits with live retrieval, falling back to simulated sources."""
+        indexed = self.news_index.evidence_for_claim(claim, location) if len(self.news_index) else None
+        if live_sources is None:
+            if indexed and indexed["total_sources"]:
+                return indexed
+            return self._search_sources(claim, location)
+        if not indexed:
+            return live_sources
+        
+        merged = dict(live_sources)
+        seen = {s["url"] for s in live_sources["supporting_sources"] + live_sources["contradicting_sources"]}
+        for key in ("supporting_sources", "contradicting_sources"):
+            merged[key] = live_sources[key] + [s for s in indexed[key] if s["url"] not in seen]
+        all_sources = merged["supporting_sources"] + merged["contradicting_sources"]
+        merged["total_sources"] = len(all_sources)
+        merged["avg_reliability"] = (sum(s["reliability"] for s in all_sources) / len(all_sources)
+                                     if all_sources else 0.0)
+        return merged
+    
     def _search_sources(self, claim: str, location: Optional[str] = None) -> Dict:
         """Search trusted sources for information about the claim."""
         # In a real implementation, this would perform actual web searches
@@ -361,23 +515,15 @@ class FactCheckEngine:
     
     def _assess_risk(self, claim: str, location: Optional[str] = None) -> str:
         """Assess the risk level if the claim is true."""
-        claim_lower = claim.lower()
-        
-        # Check against risk criteria
-        for risk_level, criteria in self.risk_criteria.items():
-            keyword_match = any(keyword in claim_lower for keyword in criteria["keywords"])
-            impact_match = any(impact in claim_lower for impact in criteria["impact"])
-            
-            if keyword_match or impact_match:
+        return self._risk_from_phrases(self._match_phrases(claim.lower())[0])
+    
+    def _risk_from_phrases(self, found: set) -> str:
+        """Risk level from the phrases matched in a claim."""
+        # Risk criteria first, then the default keywords, in order of severity
+        for risk_level, phrases in self._risk_phrases:
+            if not found.isdisjoint(phrases):
                 return risk_level
-        
-        # Default risk assessment based on claim type
-        if any(word in claim_lower for word in ["emergency", "evacuation", "life"]):
-            return "HIGH"
-        elif any(word in claim_lower for word in ["warning", "alert", "danger"]):
-            return "MEDIUM"
-        else:
-            return "LOW"
+        return "LOW"
     
     def _generate_explanation(self, claim_analysis: Dict, sources_analysis: Dict, 
                             verdict: str, confidence: float) -> str:
@@ -433,7 +579,7 @@ class FactCheckEngine:
                 "source": source["source"],
                 "relevance": source["relevance"],
                 "supports_claim": source["supports_claim"],
-                "url": f"https://{source['source']}/article-url",
+                "url": source.get("url", f"https://{source['source']}/article-url"),
                 "reliability_score": source["reliability"]
             })
         
@@ -443,7 +589,7 @@ class FactCheckEngine:
                 "source": source["source"],
                 "relevance": source["relevance"],
                 "supports_claim": source["supports_claim"],
-                "url": f"https://{source['source']}/article-url",
+                "url": source.get("url", f"https://{source['source']}/article-url"),
                 "reliability_score": source["reliability"]
             })
         
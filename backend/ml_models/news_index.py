@@ -0,0 +1,327 @@
+"""
+Local BM25 index over ingested news articles.
+
+Articles collected by NewsService (feed/search results, RSS items) or read
+from the news_articles table are tokenized into immutable index segments.
+Writers build a new segment off to the side and publish it by swapping a
+tuple of segments, so queries always run against a consistent snapshot and
+never wait on ingestion. Once there are too many segments, the writer
+merges them into one before publishing.
+"""
+import hashlib
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+from ml_models.claim_text import STOPWORDS, claim_keywords, score_evidence
+
+TITLE_WEIGHT = 2  # title terms are counted this many times
+
+INDEX_TOKEN_PATTERN = re.compile(r"[a-z0-9]{3,}")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens of three or more characters, without stopwords."""
+    return [t for t in INDEX_TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def normalize_article(article: Dict) -> Optional[Dict]:
+    """
+    Map a NewsService article, RSS item or news_articles row to index fields.
+
+    Returns:
+        Normalized article, or None if it has no title
+    """
+    title = (article.get("title") or "").strip()
+    if not title:
+        return None
+    url = article.get("url") or article.get("link") or ""
+    doc_id = url or hashlib.sha1(title.encode("utf-8")).hexdigest()
+    source = article.get("source") or ""
+    if isinstance(source, dict):
+        source = source.get("name") or ""
+    return {
+        "doc_id": doc_id,
+        "title": title,
+        "description": article.get("description") or article.get("summary") or "",
+        "content": article.get("content") or article.get("text") or "",
+        "url": url,
+        "source": source,
+        "domain": urlparse(url).netloc.lower().removeprefix("www.") if url else "",
+        "published_at": str(article.get("published_at") or article.get("published") or "")
+    }
+
+
+class _Segment:
+    """
+    Immutable postings for a batch of documents.
+
+    Postings are stored CSR-style: the documents and term frequencies of the
+    term with id t are post_ids/post_tfs[offsets[t]:offsets[t + 1]].
+    """
+
+    def __init__(self, docs: List[Dict], doc_len: np.ndarray, vocabulary: Dict[str, int],
+                 offsets: np.ndarray, post_ids: np.ndarray, post_tfs: np.ndarray):
+        self.docs = docs
+        self.doc_ids = [d["doc_id"] for d in docs]
+        self.doc_len = doc_len
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.post_ids = post_ids
+        self.post_tfs = post_tfs
+
+    @classmethod
+    def build(cls, docs: List[Dict]) -> "_Segment":
+        """Tokenize documents into a new segment."""
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        lengths = []
+        for doc in docs:
+            terms = tokenize(doc["title"]) * TITLE_WEIGHT + tokenize(doc["description"] + " " + doc["content"])
+            lengths.append(len(terms))
+            term_ids.extend([vocabulary.setdefault(term, len(vocabulary)) for term in terms])
+        doc_of_token = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)
+        return cls._from_triples(docs, np.asarray(lengths, dtype=np.float32), vocabulary,
+                                 np.asarray(term_ids, dtype=np.int64), doc_of_token,
+                                 np.ones(len(term_ids), dtype=np.float32))
+
+    @classmethod
+    def _from_triples(cls, docs, doc_len, vocabulary, term_ids, doc_ids, tfs) -> "_Segment":
+        """Aggregate (term, doc, tf) triples into sorted CSR postings."""
+        keys = term_ids * max(1, len(docs)) + doc_ids
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        summed = np.bincount(inverse, weights=tfs).astype(np.float32)
+        unique_terms = unique_keys // max(1, len(docs))
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(unique_terms, minlength=len(vocabulary)), out=offsets[1:])
+        post_ids = (unique_keys % max(1, len(docs))).astype(np.int32)
+        return cls(docs, doc_len, vocabulary, offsets, post_ids, summed)
+
+    @classmethod
+    def merged(cls, segments: Tuple["_Segment", ...], masks: Tuple[np.ndarray, ...]) -> "_Segment":
+        """Splice the live documents of several segments without re-tokenizing."""
+        docs, lengths, vocabulary = [], [], {}
+        term_parts, doc_parts, tf_parts = [], [], []
+        offset = 0
+        for segment, mask in zip(segments, masks):
+            new_ids = np.cumsum(mask, dtype=np.int64) - 1 + offset
+            docs.extend(doc for doc, keep in zip(segment.docs, mask) if keep)
+            lengths.append(segment.doc_len[mask])
+
+            remap = np.empty(len(segment.vocabulary), dtype=np.int64)
+            for term, term_id in segment.vocabulary.items():
+                remap[term_id] = vocabulary.setdefault(term, len(vocabulary))
+            local_terms = np.repeat(np.arange(len(segment.vocabulary)), np.diff(segment.offsets))
+            keep = mask[segment.post_ids]
+            term_parts.append(remap[local_terms[keep]])
+            doc_parts.append(new_ids[segment.post_ids[keep]])
+            tf_parts.append(segment.post_tfs[keep])
+            offset += int(mask.sum())
+
+        return cls._from_triples(docs, np.concatenate(lengths), vocabulary, np.concatenate(term_parts),
+                                 np.concatenate(doc_parts), np.concatenate(tf_parts))
+
+    def posting(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(document ids, term frequencies) for a term, or None if absent."""
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            return None
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.post_ids[start:end], self.post_tfs[start:end]
+
+
+class NewsIndex:
+    """
+    Incrementally updated BM25 index with lock-free reads.
+
+    Args:
+        source_reliability: Domain -> reliability score used for evidence
+            (dict or SourceReliabilityIndex)
+        k1: BM25 term-frequency saturation
+        b: BM25 length normalization
+        max_segments: Merge segments once more than this many exist
+    """
+
+    def __init__(self, source_reliability: Optional[Dict[str, float]] = None,
+                 k1: float = 1.5, b: float = 0.75, max_segments: int = 8):
+        self.source_reliability = source_reliability or {}
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self._write_lock = threading.Lock()
+        self._listeners: List[Callable[[List[Dict]], object]] = []
+        # Published snapshot: (segments, per-segment live masks,
+        # live doc_id -> (segment index, local id)). Never mutated in place.
+        self._snapshot: Tuple[Tuple[_Segment, ...], Tuple[np.ndarray, ...], Dict[str, Tuple[int, int]]] = ((), (), {})
+
+    def __len__(self) -> int:
+        return len(self._snapshot[2])
+
+    @staticmethod
+    def _drop(masks: List[np.ndarray], live: Dict[str, Tuple[int, int]], doc_id: str, copied: set):
+        """Clear a document's live bit, copying its segment mask on first write."""
+        seg_index, local_id = live.pop(doc_id)
+        if seg_index not in copied:
+            masks[seg_index] = masks[seg_index].copy()
+            copied.add(seg_index)
+        masks[seg_index][local_id] = False
+
+    def add_articles(self, articles: Iterable[Dict]) -> int:
+        """
+        Index articles; an article whose URL is already indexed replaces the old copy.
+
+        Returns:
+            Number of articles indexed
+        """
+        docs: Dict[str, Dict] = {}
+        for article in articles:
+            doc = normalize_article(article)
+            if doc:
+                docs[doc["doc_id"]] = doc
+        if not docs:
+            return 0
+
+        segment = _Segment.build(list(docs.values()))
+        with self._write_lock:
+            segments, masks, live = self._snapshot
+            masks, live, copied = list(masks), dict(live), set()
+            for doc_id in segment.doc_ids:
+                if doc_id in live:
+                    self._drop(masks, live, doc_id, copied)
+            segments = segments + (segment,)
+            masks.append(np.ones(len(segment.docs), dtype=bool))
+            for local_id, doc_id in enumerate(segment.doc_ids):
+                live[doc_id] = (len(segments) - 1, local_id)
+            if len(segments) > self.max_segments:
+                segments, masks, live = self._merge(segments, tuple(masks))
+            self._snapshot = (segments, tuple(masks), live)
+        for listener in self._listeners:
+            listener(segment.docs)
+        return len(docs)
+
+    def add_listener(self, callback: Callable[[List[Dict]], object]):
+        """Call callback(documents) after each batch of articles is published."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove(self, doc_id: str) -> bool:
+        """Drop a document from the index."""
+        with self._write_lock:
+            segments, masks, live = self._snapshot
+            if doc_id not in live:
+                return False
+            masks, live = list(masks), dict(live)
+            self._drop(masks, live, doc_id, set())
+            self._snapshot = (segments, tuple(masks), live)
+            return True
+
+    @staticmethod
+    def _merge(segments: Tuple[_Segment, ...], masks: Tuple[np.ndarray, ...]):
+        """Combine all segments into one, dropping replaced and removed documents."""
+        merged = _Segment.merged(segments, masks)
+        masks = [np.ones(len(merged.docs), dtype=bool)]
+        return (merged,), masks, {doc_id: (0, i) for i, doc_id in enumerate(merged.doc_ids)}
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Dict, float]]:
+        """
+        Rank indexed articles against a query with BM25.
+
+        Returns:
+            Up to k (article, score) pairs, best first
+        """
+        segments, alive, live = self._snapshot
+        terms = list(dict.fromkeys(tokenize(query)))
+        total_docs = len(live)
+        if not terms or not total_docs:
+            return []
+
+        # Corpus statistics over live documents only
+        avg_len = float(sum(s.doc_len[m].sum() for s, m in zip(segments, alive))) / total_docs or 1.0
+
+        df = Counter()
+        for segment, mask in zip(segments, alive):
+            for term in terms:
+                posting = segment.posting(term)
+                if posting is not None:
+                    df[term] += int(mask[posting[0]].sum())
+
+        results = []
+        for segment, mask in zip(segments, alive):
+            scores = np.zeros(len(segment.docs), dtype=np.float32)
+            norm = self.k1 * (1 - self.b + self.b * segment.doc_len / avg_len)
+            for term in terms:
+                posting = segment.posting(term)
+                if posting is None or not df[term]:
+                    continue
+                ids, tfs = posting
+                idf = np.log(1 + (total_docs - df[term] + 0.5) / (df[term] + 0.5))
+                scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[ids])
+            scores[~mask] = 0
+            hits = np.nonzero(scores)[0]
+            if len(hits) > k:
+                hits = hits[np.argpartition(-scores[hits], k)[:k]]
+            results.extend((segment.docs[i], float(scores[i])) for i in hits)
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:k]
+
+    def evidence_for_claim(self, claim: str, location: Optional[str] = None,
+                           k: int = 8, min_relevance: float = 0.2) -> Dict:
+        """
+        Find indexed articles supporting or contradicting a claim.
+
+        Returns:
+            Sources analysis in the same shape as FactCheckEngine._search_sources
+        """
+        keywords = claim_keywords(claim)
+        query = claim + (" " + location if location else "")
+        supporting, contradicting = [], []
+        for doc, bm25 in self.search(query, k):
+            relevance, supports = score_evidence(keywords, doc["title"], doc["description"] + " " + doc["content"])
+            if relevance < min_relevance:
+                continue
+            entry = {
+                "source": doc["domain"] or doc["source"],
+                "title": doc["title"],
+                "url": doc["url"],
+                "relevance": relevance,
+                "supports_claim": supports,
+                "reliability": self.source_reliability.get(doc["domain"], 0.7),
+                "bm25": round(bm25, 3),
+                "published_at": doc["published_at"]
+            }
+            (supporting if supports else contradicting).append(entry)
+
+        reliabilities = [e["reliability"] for e in supporting + contradicting]
+        return {
+            "supporting_sources": supporting,
+            "contradicting_sources": contradicting,
+            "total_sources": len(reliabilities),
+            "avg_reliability": sum(reliabilities) / len(reliabilities) if reliabilities else 0.0,
+            "search_keywords": keywords[:5]
+        }
+
+    def stats(self) -> Dict:
+        """Index size and segment layout."""
+        segments, _, live = self._snapshot
+        return {
+            "documents": len(live),
+            "segments": len(segments),
+            "terms": len(set().union(*(s.vocabulary.keys() for s in segments))) if segments else 0
+        }
+
+
+# Create global instance
+news_index = None
+
+
+def get_news_index() -> NewsIndex:
+    """Get the global news index, creating it on first use"""
+    global news_index
+    if news_index is None:
+        news_index = NewsIndex()
+    return news_index
@@ -0,0 +1,196 @@
+"""
+Domain-suffix reliability index for evidence sources.
+
+Domains are stored in a trie keyed by reversed labels (imd.gov.in ->
+in -> gov -> imd), so any host or URL resolves to its most specific
+registered suffix in O(label count): www.imd.gov.in and
+mausam.imd.gov.in inherit imd.gov.in, and an unknown *.gov.in host falls
+back to the gov.in entry. Scores can be nudged at runtime from moderation
+feedback without a restart.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+DEFAULT_RELIABILITY = 0.7
+
+# Suffix-level defaults for hosts under well-known institutional zones
+SUFFIX_DEFAULTS = {
+    "gov.in": {"reliability": 0.85, "category": "government"},
+    "nic.in": {"reliability": 0.8, "category": "government"},
+    "ac.in": {"reliability": 0.8, "category": "research"},
+}
+
+
+def host_of(url_or_domain: str) -> str:
+    """Lowercase host of a URL or bare domain, without port or trailing dot."""
+    value = url_or_domain.strip().lower()
+    if "://" in value:
+        value = urlparse(value).netloc
+    else:
+        value = value.split("/", 1)[0]
+    value = value.rsplit("@", 1)[-1].split(":", 1)[0]
+    return value.rstrip(".")
+
+
+class _Node:
+    __slots__ = ("children", "entry")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.entry: Optional[Dict] = None
+
+
+class SourceReliabilityIndex:
+    """
+    Reversed-label suffix trie of source reliability and categories.
+
+    Entries may omit reliability or category; lookups then inherit the
+    value from the nearest registered parent suffix, or the default.
+    Dict-style get() makes the index a drop-in for the old flat tables.
+
+    Args:
+        default_reliability: Score for hosts with no registered suffix
+        learning_rate: Step size for moderation feedback updates
+    """
+
+    def __init__(self, default_reliability: float = DEFAULT_RELIABILITY, learning_rate: float = 0.1):
+        self.default_reliability = default_reliability
+        self.learning_rate = learning_rate
+        self._root = _Node()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_sources(cls, trusted_sources: Dict[str, List[str]], source_reliability: Dict[str, float],
+                     **kwargs) -> "SourceReliabilityIndex":
+        """Build an index from FactCheckEngine-style category lists and score table."""
+        index = cls(**kwargs)
+        for suffix, entry in SUFFIX_DEFAULTS.items():
+            index.set(suffix, entry["reliability"], entry["category"])
+        for category, domains in trusted_sources.items():
+            for domain in domains:
+                index.set(domain, source_reliability.get(domain), category)
+        for domain, reliability in source_reliability.items():
+            index.set(domain, reliability)
+        return index
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def set(self, domain: str, reliability: Optional[float] = None, category: Optional[str] = None,
+            source: str = "config", feedback: bool = False) -> Dict:
+        """Register or update a domain suffix; None keeps (or inherits) the current value."""
+        labels = host_of(domain).split(".")[::-1]
+        with self._lock:
+            node = self._root
+            for label in labels:
+                node = node.children.setdefault(label, _Node())
+            entry = dict(node.entry) if node.entry else {"domain": ".".join(labels[::-1]), "feedback_count": 0}
+            if node.entry is None:
+                self._size += 1
+            if reliability is not None:
+                entry["reliability"] = min(1.0, max(0.0, float(reliability)))
+            if category is not None:
+                entry["category"] = category
+            entry["feedback_count"] += int(feedback)
+            entry["updated_by"] = source
+            entry["updated_at"] = datetime.utcnow().isoformat()
+            # Publish a fresh dict so concurrent readers never see a half-updated entry
+            node.entry = entry
+            return entry
+
+    def remove(self, domain: str) -> bool:
+        """Unregister a domain suffix (its subdomains fall back to the parent)."""
+        labels = host_of(domain).split(".")[::-1]
+        with self._lock:
+            path = [self._root]
+            for label in labels:
+                child = path[-1].children.get(label)
+                if child is None:
+                    return False
+                path.append(child)
+            if path[-1].entry is None:
+                return False
+            path[-1].entry = None
+            self._size -= 1
+            # Prune empty branches
+            for label, parent, node in zip(reversed(labels), reversed(path[:-1]), reversed(path[1:])):
+                if node.children or node.entry:
+                    break
+                del parent.children[label]
+            return True
+
+    def apply_feedback(self, url_or_domain: str, reliable: bool, weight: float = 1.0) -> Dict:
+        """
+        Move a source's score towards 1 (reliable) or 0 (unreliable).
+
+        Feedback is recorded on the exact host, which starts from its
+        inherited score if it was not registered yet.
+        """
+        host = host_of(url_or_domain)
+        current = self.lookup(host)
+        step = min(1.0, self.learning_rate * weight)
+        target = 1.0 if reliable else 0.0
+        updated = current["reliability"] + step * (target - current["reliability"])
+        self.set(host, round(updated, 4), current["category"], source="feedback", feedback=True)
+        return self.lookup(host)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def lookup(self, url_or_domain: str) -> Dict:
+        """
+        Resolve a URL or host to its most specific registered suffix.
+
+        Returns:
+            {"host", "matched_suffix", "reliability", "category", "exact"}
+        """
+        host = host_of(url_or_domain)
+        labels = host.split(".")[::-1] if host else []
+        node = self._root
+        matched, reliability, category = None, None, None
+        for label in labels:
+            node = node.children.get(label)
+            if node is None:
+                break
+            entry = node.entry
+            if entry is not None:
+                matched = entry["domain"]
+                reliability = entry.get("reliability", reliability)
+                category = entry.get("category", category)
+        return {
+            "host": host,
+            "matched_suffix": matched,
+            "reliability": reliability if reliability is not None else self.default_reliability,
+            "category": category,
+            "exact": matched is not None and matched == host
+        }
+
+    def get(self, url_or_domain: str, default: Optional[float] = None) -> Optional[float]:
+        """Reliability score for a URL or host (dict-compatible)."""
+        result = self.lookup(url_or_domain)
+        if result["matched_suffix"] is None and default is not None:
+            return default
+        return result["reliability"]
+
+    def category(self, url_or_domain: str) -> Optional[str]:
+        """Source category (government, news, research, international) for a URL or host."""
+        return self.lookup(url_or_domain)["category"]
+
+    def entries(self) -> List[Dict]:
+        """All registered suffixes."""
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.entry is not None:
+                found.append(dict(node.entry))
+            stack.extend(node.children.values())
+        return sorted(found, key=lambda e: e["domain"])
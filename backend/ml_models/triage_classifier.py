@@ -3,6 +3,9 @@ import re
 from typing import Dict, List, Optional
 from datetime import datetime
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_models.triage_linear_model import TriageLinearModel
 
 class TriageClassifier:
     """
@@ -22,7 +25,8 @@ class TriageClassifier:
         # Initialize medical patterns
         self._initialize_medical_patterns()
         
-        # Using rule-based classification instead of ML model
+        # Optional learned scorer, blended with the rule-based score
+        self._load_learned_model()
         
         print("Triage classifier loaded successfully!")
     
@@ -115,7 +119,20 @@ class TriageClassifier:
             ]
         }
     
-    # Removed sklearn-based model methods - using rule-based classification
+    def _load_learned_model(self):
+        """Load the hashed TF-IDF urgency model if TRIAGE_MODEL_DIR is set."""
+        self.learned_model = None
+        self.learned_weight = float(os.getenv("TRIAGE_MODEL_WEIGHT", "0.35"))
+        
+        model_dir = os.getenv("TRIAGE_MODEL_DIR")
+        if not model_dir:
+            return
+        
+        try:
+            self.learned_model = TriageLinearModel.load(model_dir)
+            print(f"Learned triage model loaded from {model_dir}")
+        except Exception as e:
+            print(f"Failed to load learned triage model, using rules only: {e}")
     
     async def classify_request(self, message: str, location: Optional[str] = None, 
                              additional_info: Optional[str] = None) -> Dict:
@@ -136,19 +153,57 @@ class TriageClassifier:
             None, self._classify_request_sync, message, location, additional_info
         )
     
+    async def classify_batch(self, requests: List[Dict]) -> List[Dict]:
+        """
+        Classify several requests at once.
+        
+        The learned scorer (if loaded) scores the whole batch in one sparse
+        matrix product instead of once per request.
+        
+        Args:
+            requests: Dicts with "message" and optional "location"/"additional_info"
+            
+        Returns:
+            List of triage classification results in input order
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._classify_batch_sync, requests)
+    
+    def _classify_batch_sync(self, requests: List[Dict]) -> List[Dict]:
+        """Synchronous batch classification function."""
+        learned_scores = [None] * len(requests)
+        if self.learned_model is not None and requests:
+            texts = [
+                self._preprocess_text(self._combine_text(r["message"], r.get("additional_info")))
+                for r in requests
+            ]
+            learned_scores = [float(s) for s in self.learned_model.score_batch(texts)]
+        
+        return [
+            self._classify_request_sync(
+                r["message"], r.get("location"), r.get("additional_info"), learned_score
+            )
+            for r, learned_score in zip(requests, learned_scores)
+        ]
+    
+    def _combine_text(self, message: str, additional_info: Optional[str] = None) -> str:
+        """Combine the message and any additional context for analysis."""
+        if additional_info:
+            return message + " " + additional_info
+        return message
+    
     def _classify_request_sync(self, message: str, location: Optional[str] = None,
-                              additional_info: Optional[str] = None) -> Dict:
+                              additional_info: Optional[str] = None,
+                              learned_score: Optional[float] = None) -> Dict:
         """Synchronous classification function."""
         # Combine all text for analysis
-        full_text = message
-        if additional_info:
-            full_text += " " + additional_info
+        full_text = self._combine_text(message, additional_info)
         
         # Clean and preprocess text
         cleaned_text = self._preprocess_text(full_text)
         
         # Calculate urgency score
-        urgency_score = self._calculate_urgency_score(cleaned_text)
+        urgency_score = self._calculate_urgency_score(cleaned_text, learned_score)
         
         # Determine triage level
         triage_level = self._determine_triage_level(urgency_score)
@@ -194,8 +249,13 @@ class TriageClassifier:
         text = re.sub(r'[^\w\s.,!?-]', '', text)
         return text
     
-    def _calculate_urgency_score(self, text: str) -> float:
-        """Calculate urgency score based on keywords and patterns."""
+    def _calculate_urgency_score(self, text: str, learned_score: Optional[float] = None) -> float:
+        """
+        Calculate urgency score based on keywords and patterns.
+        
+        If a learned model is loaded, its score (precomputed for batches, or
+        computed here) is blended with the rule score.
+        """
         base_score = 0.0
         
         # Keyword-based scoring
@@ -219,7 +279,11 @@ class TriageClassifier:
         urgency_modifier = min(0.15, exclamation_count * 0.05 + caps_words * 0.03)
         base_score = min(1.0, base_score + urgency_modifier)
         
-        # Using rule-based scoring only (ML model removed for API demo)
+        # Blend with the learned model score when available
+        if learned_score is None and self.learned_model is not None:
+            learned_score = self.learned_model.score(text)
+        if learned_score is not None:
+            base_score = (1 - self.learned_weight) * base_score + self.learned_weight * learned_score
         
         return min(1.0, max(0.0, base_score))
     
@@ -0,0 +1,245 @@
+"""
+Optional learned urgency scorer for the triage classifier.
+
+A hashed TF-IDF vectorizer feeds a logistic model whose output is blended with
+the rule-based urgency score. Batches are scored with a single sparse
+matrix-vector product over a CSR matrix held in NumPy arrays.
+
+Artifacts are a directory of two .npy arrays plus a small JSON header; the
+arrays are memory-mapped on load so classifier startup stays fast.
+
+Train from the simulation scenarios and a JSONL history file
+(one {"message": ..., "triage_level": ...} object per line):
+    python -m ml_models.triage_linear_model --history history.jsonl --out models/triage
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_models.triage_scenarios import SIMULATION_SCENARIOS, TRIAGE_LEVEL_TARGETS
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+DEFAULT_N_FEATURES = 2 ** 16
+MODEL_FILE = "model.json"
+WEIGHTS_FILE = "weights.npy"
+IDF_FILE = "idf.npy"
+
+
+class HashingTfidfVectorizer:
+    """
+    Stateless hashing vectorizer with optional IDF weighting.
+
+    Unigrams and bigrams are hashed with CRC32 (stable across processes,
+    unlike hash()) into a fixed number of buckets.
+    """
+
+    def __init__(self, n_features: int = DEFAULT_N_FEATURES, idf: Optional[np.ndarray] = None):
+        self.n_features = n_features
+        self.idf = idf
+
+    def _features(self, text: str) -> Dict[int, float]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+        counts: Dict[int, float] = {}
+        for term in terms:
+            bucket = zlib.crc32(term.encode("utf-8")) % self.n_features
+            counts[bucket] = counts.get(bucket, 0.0) + 1.0
+        return counts
+
+    def transform(self, texts: Iterable[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorize texts into a CSR matrix.
+
+        Returns:
+            (indptr, indices, data) arrays; rows are sublinear-TF * IDF, L2-normalised.
+        """
+        indptr = [0]
+        indices: List[int] = []
+        counts: List[float] = []
+
+        for text in texts:
+            features = self._features(text)
+            indices.extend(features.keys())
+            counts.extend(features.values())
+            indptr.append(len(indices))
+
+        indptr_arr = np.asarray(indptr, dtype=np.int64)
+        indices_arr = np.asarray(indices, dtype=np.int32)
+        data = 1.0 + np.log(np.asarray(counts, dtype=np.float32))
+        if self.idf is not None and len(indices_arr):
+            data *= self.idf[indices_arr]
+
+        row_ids = _csr_row_ids(indptr_arr)
+        norms = np.sqrt(np.bincount(row_ids, weights=data * data, minlength=len(indptr) - 1))
+        norms[norms == 0] = 1.0
+        data = (data / norms[row_ids]).astype(np.float32)
+
+        return indptr_arr, indices_arr, data
+
+    def fit_idf(self, texts: List[str]) -> np.ndarray:
+        """Compute smoothed IDF weights from a training corpus."""
+        doc_freq = np.zeros(self.n_features, dtype=np.float64)
+        for text in texts:
+            doc_freq[list(self._features(text).keys())] += 1
+        n_docs = len(texts)
+        self.idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1.0).astype(np.float32)
+        return self.idf
+
+
+def _csr_row_ids(indptr: np.ndarray) -> np.ndarray:
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _csr_matvec(indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                weights: np.ndarray) -> np.ndarray:
+    """Sparse matrix-vector product X @ w for a CSR matrix."""
+    n_rows = len(indptr) - 1
+    contributions = data * weights[indices]
+    return np.bincount(_csr_row_ids(indptr), weights=contributions, minlength=n_rows)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class TriageLinearModel:
+    """Logistic urgency scorer over hashed TF-IDF features."""
+
+    def __init__(self, weights: np.ndarray, bias: float, vectorizer: HashingTfidfVectorizer,
+                 metadata: Optional[Dict] = None):
+        self.weights = weights
+        self.bias = bias
+        self.vectorizer = vectorizer
+        self.metadata = metadata or {}
+
+    @classmethod
+    def train(cls, examples: List[Tuple[str, float]], n_features: int = DEFAULT_N_FEATURES,
+              epochs: int = 300, learning_rate: float = 2.0, l2: float = 1e-4) -> "TriageLinearModel":
+        """
+        Fit the model with full-batch gradient descent on soft urgency targets.
+
+        Args:
+            examples: (message, urgency target in [0, 1]) pairs
+            n_features: Number of hash buckets
+            epochs: Gradient descent iterations
+            learning_rate: Step size
+            l2: L2 regularisation strength
+
+        Returns:
+            Trained TriageLinearModel
+        """
+        if not examples:
+            raise ValueError("Cannot train triage model without examples")
+
+        texts = [text for text, _ in examples]
+        targets = np.asarray([target for _, target in examples], dtype=np.float64)
+
+        vectorizer = HashingTfidfVectorizer(n_features)
+        vectorizer.fit_idf(texts)
+        indptr, indices, data = vectorizer.transform(texts)
+        row_ids = _csr_row_ids(indptr)
+
+        weights = np.zeros(n_features, dtype=np.float64)
+        bias = float(np.log(targets.mean() / (1 - targets.mean()))) if 0 < targets.mean() < 1 else 0.0
+        n = len(texts)
+
+        for _ in range(epochs):
+            predictions = _sigmoid(_csr_matvec(indptr, indices, data, weights) + bias)
+            residual = predictions - targets
+            gradient = np.bincount(indices, weights=data * residual[row_ids], minlength=n_features) / n
+            weights -= learning_rate * (gradient + l2 * weights)
+            bias -= learning_rate * residual.mean()
+
+        metadata = {
+            "n_samples": n,
+            "epochs": epochs,
+            "trained_at": datetime.utcnow().isoformat()
+        }
+        return cls(weights.astype(np.float32), bias, vectorizer, metadata)
+
+    def score_batch(self, texts: List[str]) -> np.ndarray:
+        """Score a batch of messages with one sparse matrix-vector product."""
+        if not texts:
+            return np.zeros(0, dtype=np.float64)
+        indptr, indices, data = self.vectorizer.transform(texts)
+        return _sigmoid(_csr_matvec(indptr, indices, data, self.weights) + self.bias)
+
+    def score(self, text: str) -> float:
+        """Score a single message."""
+        return float(self.score_batch([text])[0])
+
+    def save(self, directory: str):
+        """Write the model artifacts to a directory."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, WEIGHTS_FILE), np.asarray(self.weights, dtype=np.float32))
+        np.save(os.path.join(directory, IDF_FILE), np.asarray(self.vectorizer.idf, dtype=np.float32))
+        header = dict(self.metadata, n_features=self.vectorizer.n_features, bias=self.bias)
+        with open(os.path.join(directory, MODEL_FILE), "w") as f:
+            json.dump(header, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str) -> "TriageLinearModel":
+        """Load model artifacts, memory-mapping the weight and IDF arrays."""
+        with open(os.path.join(directory, MODEL_FILE)) as f:
+            header = json.load(f)
+        weights = np.load(os.path.join(directory, WEIGHTS_FILE), mmap_mode="r")
+        idf = np.load(os.path.join(directory, IDF_FILE), mmap_mode="r")
+        vectorizer = HashingTfidfVectorizer(header["n_features"], idf=idf)
+        return cls(weights, header["bias"], vectorizer, header)
+
+
+def load_training_examples(history_path: Optional[str] = None,
+                           include_scenarios: bool = True) -> List[Tuple[str, float]]:
+    """
+    Collect (message, urgency target) pairs from the simulation scenarios and
+    an optional JSONL history of labelled requests.
+    """
+    examples: List[Tuple[str, float]] = []
+
+    if include_scenarios:
+        for scenario in SIMULATION_SCENARIOS:
+            examples.append((scenario["message"], TRIAGE_LEVEL_TARGETS[scenario["urgency"]]))
+
+    if history_path:
+        with open(history_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if "urgency_score" in record:
+                    target = float(record["urgency_score"])
+                else:
+                    target = TRIAGE_LEVEL_TARGETS[record["triage_level"].upper()]
+                examples.append((record["message"], min(0.99, max(0.01, target))))
+
+    return examples
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Train the learned triage urgency scorer")
+    parser.add_argument("--history", help="JSONL file of labelled helpline requests")
+    parser.add_argument("--out", required=True, help="Output directory for model artifacts")
+    parser.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--no-scenarios", action="store_true",
+                        help="Do not include the built-in simulation scenarios")
+    args = parser.parse_args(argv)
+
+    examples = load_training_examples(args.history, include_scenarios=not args.no_scenarios)
+    model = TriageLinearModel.train(examples, n_features=args.n_features, epochs=args.epochs)
+    model.save(args.out)
+    print(f"Trained triage model on {len(examples)} examples -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
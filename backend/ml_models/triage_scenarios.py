@@ -0,0 +1,170 @@
+"""
+Sample helpline scenarios shared by the triage simulator and model training,
+plus a generator for synthetic load.
+"""
+import math
+import random
+from typing import Dict, List, Optional
+
+# Urgency targets used when a labelled example only carries a triage level.
+TRIAGE_LEVEL_TARGETS = {
+    "CRITICAL": 0.95,
+    "HIGH": 0.75,
+    "MEDIUM": 0.45,
+    "LOW": 0.15
+}
+
+SIMULATION_SCENARIOS = [
+    {
+        "message": "House is flooding rapidly, water level rising, need immediate evacuation",
+        "location": "Riverside Area",
+        "urgency": "CRITICAL"
+    },
+    {
+        "message": "Elderly person having chest pain, can't reach hospital due to blocked roads",
+        "location": "Suburb District",
+        "urgency": "CRITICAL"
+    },
+    {
+        "message": "Family of 4 without food for 2 days, local stores closed",
+        "location": "Downtown",
+        "urgency": "HIGH"
+    },
+    {
+        "message": "Internet and phone lines down in entire neighborhood",
+        "location": "Tech Park",
+        "urgency": "MEDIUM"
+    },
+    {
+        "message": "Minor injury from falling debris, need first aid supplies",
+        "location": "Construction Zone",
+        "urgency": "LOW"
+    }
+]
+
+# Message templates for synthetic load, by urgency and language. "{place}"
+# and "{count}" are filled in by generate_helpline_messages.
+MESSAGE_TEMPLATES = {
+    "en": {
+        "CRITICAL": [
+            "Water rising fast, {count} people trapped on the roof near {place}, need rescue now",
+            "My father is unconscious and not breathing properly, ambulance needed at {place}",
+            "Building collapse at {place}, people buried under debris, please hurry",
+            "Fire spreading in our street at {place}, children trapped inside, help immediately"
+        ],
+        "HIGH": [
+            "Flooding in our house at {place}, elderly woman injured, need evacuation",
+            "Road washed away near {place}, {count} people stranded and hurt",
+            "Broken bone after wall fell at {place}, severe pain, urgent help",
+            "Rising water around the school at {place}, dangerous, need help quickly"
+        ],
+        "MEDIUM": [
+            "Need food and water for {count} families at {place}",
+            "Power outage at {place} since last night, need shelter for the night",
+            "Minor injury at {place}, need first aid supplies",
+            "Need transportation to relief camp from {place}"
+        ],
+        "LOW": [
+            "Want an update on when the roads near {place} will reopen",
+            "General question about relief camp timings at {place}",
+            "Checking status of the complaint I filed earlier about {place}",
+            "Information about ration distribution at {place}, not urgent"
+        ]
+    },
+    "hi": {
+        "CRITICAL": [
+            "{place} में पानी तेजी से बढ़ रहा है, {count} लोग छत पर फंसे हैं, तुरंत बचाव चाहिए",
+            "{place} में इमारत गिर गई, लोग मलबे में दबे हैं, जल्दी आइए"
+        ],
+        "HIGH": [
+            "{place} में घर में बाढ़ का पानी, बुजुर्ग घायल हैं, निकालने में मदद करें",
+            "{place} के पास सड़क बह गई, {count} लोग फंसे हुए हैं"
+        ],
+        "MEDIUM": [
+            "{place} में {count} परिवारों को खाना और पानी चाहिए",
+            "{place} में कल रात से बिजली नहीं है, रहने की जगह चाहिए"
+        ],
+        "LOW": [
+            "{place} की सड़कें कब खुलेंगी, जानकारी चाहिए",
+            "{place} में राहत शिविर का समय क्या है"
+        ]
+    },
+    "hinglish": {
+        "CRITICAL": [
+            "Bhai {place} mein paani bahut tez badh raha hai, {count} log trapped hain, rescue bhejo abhi",
+            "{place} mein aag lagi hai, bachche andar trapped hain, help immediately"
+        ],
+        "HIGH": [
+            "{place} mein ghar mein flooding ho gayi, dadi injured hain, evacuation chahiye",
+            "{place} ke paas road toot gayi, {count} log stranded hain, urgent help"
+        ],
+        "MEDIUM": [
+            "{place} mein {count} families ko food aur water chahiye",
+            "{place} mein power outage hai, shelter chahiye raat ke liye"
+        ],
+        "LOW": [
+            "{place} ki roads kab khulengi, bas update chahiye",
+            "Relief camp ka timing kya hai {place} mein, general question"
+        ]
+    }
+}
+
+SAMPLE_PLACES = [
+    "Riverside Area", "Suburb District", "Downtown", "Tech Park", "Construction Zone",
+    "Old City", "Station Road", "Lake View Colony", "Industrial Zone", "Market Chowk"
+]
+
+
+def generate_helpline_messages(count: int, urgency_mix: Optional[Dict[str, float]] = None,
+                               language_mix: Optional[Dict[str, float]] = None,
+                               seed: Optional[int] = None) -> List[Dict]:
+    """
+    Generate synthetic helpline messages.
+    
+    Args:
+        count: Number of messages
+        urgency_mix: Relative weights per triage level (defaults to uniform)
+        language_mix: Relative weights per language code (defaults to uniform)
+        seed: Seed for reproducible streams
+        
+    Returns:
+        List of {"message", "location", "urgency", "language"} dicts
+    """
+    rng = random.Random(seed)
+    urgency_mix = urgency_mix or {level: 1.0 for level in TRIAGE_LEVEL_TARGETS}
+    language_mix = language_mix or {language: 1.0 for language in MESSAGE_TEMPLATES}
+    
+    unknown = sorted(set(urgency_mix) - set(TRIAGE_LEVEL_TARGETS)) + sorted(set(language_mix) - set(MESSAGE_TEMPLATES))
+    if unknown:
+        raise ValueError(f"Unknown mix keys: {', '.join(unknown)}")
+    
+    levels, level_weights = zip(*urgency_mix.items())
+    languages, language_weights = zip(*language_mix.items())
+    
+    messages = []
+    for level, language in zip(rng.choices(levels, level_weights, k=count),
+                               rng.choices(languages, language_weights, k=count)):
+        place = rng.choice(SAMPLE_PLACES)
+        template = rng.choice(MESSAGE_TEMPLATES[language][level])
+        messages.append({
+            "message": template.format(place=place, count=rng.randint(2, 12)),
+            "location": place,
+            "urgency": level,
+            "language": language
+        })
+    
+    return messages
+
+
+def parse_mix(spec: Optional[str]) -> Optional[Dict[str, float]]:
+    """Parse a "key=weight,key=weight" mix specification; weights must be finite and non-negative."""
+    if not spec:
+        return None
+    mix = {}
+    for part in spec.split(","):
+        key, _, weight = part.partition("=")
+        value = float(weight) if weight else 1.0
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f"Mix weight for {key.strip()} must be a non-negative number, got {weight}")
+        mix[key.strip()] = value
+    return mix
@@ -10,6 +10,9 @@ import os
 from PIL import Image
 from PIL.ExifTags import TAGS
 import io
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.geodesy import within_radius
 
 router = APIRouter()
 
@@ -246,15 +249,17 @@ async def get_community_reports(
         if category:
             filtered_reports = [r for r in filtered_reports if r["category"] == category]
         
-        # Filter by location (simplified - in production use proper geospatial queries)
-        if lat and lng:
-            def calculate_distance(lat1, lng1, lat2, lng2):
-                # Simplified distance calculation
-                return ((lat1 - lat2) ** 2 + (lng1 - lng2) ** 2) ** 0.5
-            
+        # Filter by location
+        if lat is not None and lng is not None:
+            inside, distances = within_radius(
+                lat, lng,
+                [r["location"]["lat"] for r in filtered_reports],
+                [r["location"]["lng"] for r in filtered_reports],
+                radius_km
+            )
             filtered_reports = [
-                r for r in filtered_reports 
-                if calculate_distance(lat, lng, r["location"]["lat"], r["location"]["lng"]) <= (radius_km * 0.01)
+                dict(r, distance_km=round(float(distance), 2))
+                for r, distance, keep in zip(filtered_reports, distances, inside) if keep
             ]
         
         # Limit results
@@ -264,8 +269,8 @@ async def get_community_reports(
             "reports": filtered_reports,
             "total": len(filtered_reports),
             "filters_applied": {
-                "location": f"{lat}, {lng}" if lat and lng else None,
-                "radius_km": radius_km if lat and lng else None,
+                "location": f"{lat}, {lng}" if lat is not None and lng is not None else None,
+                "radius_km": radius_km if lat is not None and lng is not None else None,
                 "category": category,
                 "min_credibility": min_credibility
             }
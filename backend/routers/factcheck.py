@@ -1,8 +1,14 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_models.news_index import get_news_index
+from ml_models.claim_cache import get_claim_cache
+from services.job_scheduler import get_factcheck_scheduler
 
 router = APIRouter()
 
@@ -10,7 +16,7 @@ class FactCheckRequest(BaseModel):
     claim: str = Field(..., description="The disaster-related claim to fact-check")
     context: Optional[str] = Field(None, description="Additional context or source")
     location: Optional[str] = Field(None, description="Location reference in claim")
-    urgency: Optional[str] = Field("normal", description="Urgency level: low, normal, high")
+    urgency: Optional[str] = Field("normal", description="Urgency level: low, normal, high (high is scheduled first)")
 
 class FactCheckResult(BaseModel):
     verdict: str = Field(..., description="Verdict: True, False, Partially True, Unverified")
@@ -19,10 +25,20 @@ class FactCheckResult(BaseModel):
     model_explanation: str = Field(..., description="Detailed explanation of the verdict")
     risk_assessment: str = Field(..., description="Risk level if claim is true")
     verification_sources: List[str] = Field(..., description="Sources used for verification")
+    cached: bool = Field(False, description="Verdict reused from a near-duplicate claim")
+    cache_similarity: Optional[float] = Field(None, description="Similarity to the cached claim")
 
 class BatchFactCheckRequest(BaseModel):
     claims: List[FactCheckRequest]
 
+class SourceFeedbackRequest(BaseModel):
+    source: str = Field(..., description="Domain or article URL the feedback is about")
+    reliable: bool = Field(..., description="Whether moderators found the source reliable")
+    weight: float = Field(1.0, gt=0, le=10, description="Strength of the feedback")
+
+class NewsIngestRequest(BaseModel):
+    articles: List[Dict[str, Any]] = Field(..., description="NewsService articles or news_articles rows")
+
 @router.post("/", response_model=FactCheckResult)
 async def fact_check_claim(request_data: FactCheckRequest, request: Request):
     """
@@ -67,15 +83,17 @@ async def batch_fact_check(batch_request: BatchFactCheckRequest, request: Reques
         if not factcheck_model:
             raise HTTPException(status_code=503, detail="Fact-check model not available")
         
-        results = []
-        for claim_request in batch_request.claims:
-            result = await factcheck_model.verify_claim(
+        # Claims are queued together; the scheduler orders them by urgency
+        raw_results = await asyncio.gather(*[
+            factcheck_model.verify_claim(
                 claim=claim_request.claim,
                 context=claim_request.context,
                 location=claim_request.location,
                 urgency=claim_request.urgency
             )
-            results.append(FactCheckResult(**result))
+            for claim_request in batch_request.claims
+        ])
+        results = [FactCheckResult(**result) for result in raw_results]
         
         # Generate batch summary
         verdicts = [r.verdict for r in results]
@@ -105,53 +123,33 @@ async def get_trending_claims(request: Request, limit: int = 20, verified_only:
     Get trending disaster-related claims being fact-checked.
     """
     try:
-        # Sample trending claims (would be from database in production)
-        trending_claims = [
-            {
-                "id": 1,
-                "claim": "Dam burst in Rajasthan causing massive flooding",
-                "verdict": "False",
-                "confidence": 0.89,
-                "check_count": 247,
-                "last_checked": "2024-01-15T11:30:00Z",
-                "risk_level": "HIGH",
-                "location": "Rajasthan, India"
-            },
-            {
-                "id": 2,
-                "claim": "Heatwave temperatures reaching 52°C in Delhi",
-                "verdict": "Partially True",
-                "confidence": 0.76,
-                "check_count": 156,
-                "last_checked": "2024-01-15T10:45:00Z",
-                "risk_level": "MEDIUM",
-                "location": "Delhi, India"
-            },
-            {
-                "id": 3,
-                "claim": "Emergency evacuation ordered for coastal areas due to cyclone",
-                "verdict": "True",
-                "confidence": 0.94,
-                "check_count": 89,
-                "last_checked": "2024-01-15T09:15:00Z",
-                "risk_level": "CRITICAL",
-                "location": "Coastal Andhra Pradesh"
-            }
-        ]
-        
-        # Filter verified claims if requested
-        if verified_only:
-            trending_claims = [c for c in trending_claims if c["verdict"] != "Unverified"]
+        # Near-duplicate claim clusters, ranked by checks within the trending window
+        trending_claims = get_claim_cache().trending(limit=limit, verified_only=verified_only)
         
         return {
-            "trending_claims": trending_claims[:limit],
+            "trending_claims": trending_claims,
             "total": len(trending_claims),
-            "filters": {"verified_only": verified_only}
+            "filters": {"verified_only": verified_only},
+            "cache": get_claim_cache().get_stats()
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get trending claims: {str(e)}")
 
+@router.get("/scheduler/metrics")
+async def get_scheduler_metrics():
+    """
+    Get fact-check queue depth, running jobs and wait times per urgency class.
+    """
+    try:
+        return {
+            "scheduler": get_factcheck_scheduler().get_metrics(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get scheduler metrics: {str(e)}")
+
 @router.get("/sources")
 async def get_verification_sources(request: Request):
     """
@@ -215,6 +213,50 @@ async def get_verification_sources(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get sources: {str(e)}")
 
+@router.get("/sources/lookup")
+async def lookup_source_reliability(url: str, request: Request):
+    """
+    Resolve a URL or domain to its reliability score and source category.
+    """
+    try:
+        factcheck_model = request.app.state.ml_models.get("factcheck")
+        if not factcheck_model:
+            raise HTTPException(status_code=503, detail="Fact-check model not available")
+        
+        return factcheck_model.reliability_index.lookup(url)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Source lookup failed: {str(e)}")
+
+@router.post("/sources/feedback")
+async def submit_source_feedback(feedback: SourceFeedbackRequest, request: Request):
+    """
+    Adjust a source's reliability from moderation feedback; takes effect immediately.
+    """
+    try:
+        factcheck_model = request.app.state.ml_models.get("factcheck")
+        if not factcheck_model:
+            raise HTTPException(status_code=503, detail="Fact-check model not available")
+        
+        index = factcheck_model.reliability_index
+        previous = index.lookup(feedback.source)["reliability"]
+        updated = index.apply_feedback(feedback.source, feedback.reliable, feedback.weight)
+        
+        return {
+            "source": updated["host"],
+            "previous_reliability": previous,
+            "reliability": updated["reliability"],
+            "category": updated["category"],
+            "updated_at": datetime.utcnow().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to apply source feedback: {str(e)}")
+
 @router.get("/statistics")
 async def get_factcheck_statistics(request: Request):
     """
@@ -276,4 +318,59 @@ async def report_suspicious_claim(request_data: FactCheckRequest, request: Reque
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to report claim: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to report claim: {str(e)}")
+
+@router.post("/index/articles")
+async def ingest_news_articles(ingest_request: NewsIngestRequest):
+    """
+    Add news articles (e.g. rows exported from the news_articles table) to the
+    local evidence index used for offline claim verification.
+    """
+    try:
+        loop = asyncio.get_event_loop()
+        indexed = await loop.run_in_executor(None, get_news_index().add_articles, ingest_request.articles)
+        
+        return {
+            "indexed": indexed,
+            "index": get_news_index().stats()
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to index articles: {str(e)}")
+
+@router.get("/index/search")
+async def search_news_index(q: str, limit: int = Query(10, ge=1, le=100)):
+    """
+    Search the local news index with BM25 ranking.
+    """
+    try:
+        results = get_news_index().search(q, k=limit)
+        
+        return {
+            "query": q,
+            "results": [
+                {
+                    "title": doc["title"],
+                    "url": doc["url"],
+                    "source": doc["source"],
+                    "published_at": doc["published_at"],
+                    "score": round(score, 3)
+                }
+                for doc, score in results
+            ],
+            "total": len(results)
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"News index search failed: {str(e)}")
+
+@router.get("/index/stats")
+async def get_news_index_stats():
+    """
+    Get size and segment layout of the local news index.
+    """
+    try:
+        return get_news_index().stats()
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get index stats: {str(e)}")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -9,6 +9,7 @@ from services.news_service import NewsService
 from services.weather_service import WeatherService
 from services.sentinel_hub_service import SentinelHubService
 from services.gemini_service import get_gemini_service
+from ml_models.news_index import get_news_index
 
 router = APIRouter()
 
@@ -30,7 +31,7 @@ class SatelliteImageryRequest(BaseModel):
     time_range_days: Optional[int] = 30
 
 @router.get("/news/disaster-feed")
-async def get_disaster_news_feed(limit: int = 50, ai_filter: bool = True):
+async def get_disaster_news_feed(background_tasks: BackgroundTasks, limit: int = 50, ai_filter: bool = True):
     """
     Get real-time disaster news from multiple sources with optional AI filtering.
     """
@@ -38,6 +39,9 @@ async def get_disaster_news_feed(limit: int = 50, ai_filter: bool = True):
         news_service = NewsService()
         articles = await news_service.fetch_disaster_news(limit)
         
+        # Feed the local fact-check index after the response is sent
+        background_tasks.add_task(get_news_index().add_articles, articles)
+        
         # Apply Gemini AI filtering if requested
         if ai_filter:
             try:
@@ -58,7 +62,7 @@ async def get_disaster_news_feed(limit: int = 50, ai_filter: bool = True):
         raise HTTPException(status_code=500, detail=f"Failed to fetch news feed: {str(e)}")
 
 @router.post("/news/search-location")
-async def search_location_news(search_request: NewsSearchRequest):
+async def search_location_news(search_request: NewsSearchRequest, background_tasks: BackgroundTasks):
     """
     Search for disaster news in a specific location.
     """
@@ -72,6 +76,7 @@ async def search_location_news(search_request: NewsSearchRequest):
             location=search_request.location,
             keywords=search_request.keywords
         )
+        background_tasks.add_task(get_news_index().add_articles, articles)
         
         return {
             "articles": articles[:search_request.limit],
@@ -1,15 +1,80 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import Annotated, List, Optional, Dict, Any
 from datetime import datetime
-import math
+from email.utils import formatdate
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import calendar
+import gzip
+import json
+import time
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from services.gemini_service import get_gemini_service
+from services.geodesy import haversine_km, within_radius
+from services.offline_bundle import BUNDLE_MEDIA_TYPE, get_offline_bundle_store
+from services.offline_maps import MBTILES_MEDIA_TYPE, get_offline_map_store, parse_byte_range
+from services.routing_service import PROFILES, get_routing_service
+from services.danger_zones import get_danger_zone_index
+from services.flood_model import get_flood_model
+from services.catchments import get_shelter_catchments
+from services.route_cache import get_route_cache
+from services.route_monitor import get_route_monitor
+from services.evacuation_planner import get_evacuation_planner
+from services.safe_zones import ACCEPTING_STATUSES, get_safe_zone_index
+from services.vector_tiles import MAX_TILE_ZOOM, MVT_MEDIA_TYPE, VectorTile, get_polygon_simplifier, valid_tile
 
 router = APIRouter()
 
+EMERGENCY_PROCEDURES = {
+    "flood": [
+        "Move to higher ground immediately",
+        "Avoid walking/driving through flood water",
+        "Stay away from electrical lines",
+        "Listen to emergency broadcasts",
+        "If trapped, signal for help from highest point"
+    ],
+    "fire": [
+        "Evacuate immediately using stairs, not elevators",
+        "Stay low to avoid smoke inhalation",
+        "Feel doors before opening - if hot, don't open",
+        "Meet at designated assembly point",
+        "Call emergency services once safe"
+    ],
+    "earthquake": [
+        "Drop, Cover, and Hold On",
+        "Stay away from windows and heavy objects",
+        "If outdoors, move away from buildings",
+        "After shaking stops, evacuate if building is damaged",
+        "Be prepared for aftershocks"
+    ],
+    "heatwave": [
+        "Stay indoors during peak hours (10 AM - 4 PM)",
+        "Drink water regularly, avoid alcohol",
+        "Wear light-colored, loose clothing",
+        "Use fans, AC, or visit cooling centers",
+        "Never leave anyone in parked vehicles"
+    ]
+}
+
+EMERGENCY_NUMBERS = {
+    "national_emergency": "112",
+    "fire": "101",
+    "police": "100",
+    "medical": "108",
+    "disaster_management": "1078"
+}
+
+# Seconds the AI dashboard waits for its slowest source before answering with what it has
+DASHBOARD_DEADLINE_SEC = float(os.getenv("DASHBOARD_DEADLINE_SEC", "4.0"))
+_dashboard_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dashboard")
+# In-flight dashboard jobs by section and arguments. A job that missed the deadline keeps
+# its worker, so the next request joins it instead of submitting the same work again.
+_dashboard_jobs: Dict[tuple, asyncio.Future] = {}
+
 class Location(BaseModel):
     lat: float = Field(..., ge=-90, le=90)
     lng: float = Field(..., ge=-180, le=180)
@@ -33,13 +98,26 @@ class DangerZone(BaseModel):
     risk_type: str  # "flood", "fire", "landslide", "building_collapse"
     risk_level: str  # "low", "medium", "high", "critical"
     description: str
-    last_updated: datetime
+    last_updated: datetime = Field(default_factory=datetime.utcnow)
+
+class ContainmentPoint(BaseModel):
+    id: Optional[str] = None
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+
+class ContainmentRequest(BaseModel):
+    points: List[ContainmentPoint]
+
+class FloodEstimateRequest(BaseModel):
+    rainfall_mm: float = Field(..., ge=0, le=2000)  # Observed or forecast accumulation
+    runoff_coefficient: Optional[float] = Field(None, gt=0, le=1)
+    tiles: Optional[List[str]] = None  # Tile ids from /flood/status; default every tile
 
 class NavigationRequest(BaseModel):
     start_location: Location
     destination_type: str  # "safe_zone", "hospital", "evacuation_center"
     max_distance_km: Optional[float] = 10.0
-    transportation_mode: Optional[str] = "walking"  # "walking", "driving", "cycling"
+    transportation_mode: Optional[str] = "walking"  # "walking", "driving", "cycling", "flood" (on foot, high ground)
 
 class Route(BaseModel):
     distance_km: float
@@ -49,6 +127,17 @@ class Route(BaseModel):
     safety_notes: List[str]
     avoid_zones: List[str]
 
+class PopulationCell(BaseModel):
+    cell_id: Optional[str] = None
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+    population: int = Field(..., ge=0)
+
+class EvacuationPlanRequest(BaseModel):
+    cells: List[PopulationCell]
+    transportation_mode: Optional[str] = "walking"
+    destination_type: Optional[str] = None  # None sends people to any zone type
+
 class OfflineMapData(BaseModel):
     region_id: str
     region_name: str
@@ -57,6 +146,8 @@ class OfflineMapData(BaseModel):
     tile_count: int
     size_mb: float
     last_updated: datetime
+    package_available: bool = False
+    build_status: Optional[str] = None
 
 @router.get("/safezones")
 async def get_safe_zones(
@@ -64,12 +155,34 @@ async def get_safe_zones(
     lat: float,
     lng: float,
     radius_km: float = 10.0,
-    zone_type: Optional[str] = None
+    zone_type: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: Optional[int] = None
 ):
     """
     Get safe zones near a location for disaster navigation.
+    
+    status takes a comma-separated list ("available,nearly_full"); limit
+    returns only the nearest matches.
     """
     try:
+        statuses = [s.strip() for s in status.split(",") if s.strip()] if status else None
+        
+        # Registered zones take over from the sample data once any exist
+        zone_index = get_safe_zone_index()
+        if len(zone_index):
+            matches = zone_index.nearest(
+                lat, lng, k=limit or max(1, len(zone_index)), max_km=radius_km,
+                zone_type=zone_type, statuses=statuses
+            )
+            safe_zones = [SafeZone(**dict(zone, distance_km=round(zone["distance_km"], 2))) for zone in matches]
+            return {
+                "safe_zones": safe_zones,
+                "total_found": len(safe_zones),
+                "search_radius": radius_km,
+                "center_location": {"lat": lat, "lng": lng}
+            }
+        
         # Sample safe zones (would be from database/APIs in production)
         all_safe_zones = [
             {
@@ -118,23 +231,28 @@ async def get_safe_zones(
             }
         ]
         
-        # Filter by type if specified
+        # Filter by type and status if specified
         if zone_type:
             all_safe_zones = [zone for zone in all_safe_zones if zone["type"] == zone_type]
+        if statuses:
+            all_safe_zones = [zone for zone in all_safe_zones if zone["status"] in statuses]
         
         # Calculate distances and filter by radius
-        safe_zones = []
-        for zone in all_safe_zones:
-            distance = _calculate_distance(
-                lat, lng, 
-                zone["location"]["lat"], zone["location"]["lng"]
-            )
-            if distance <= radius_km:
-                zone["distance_km"] = round(distance, 2)
-                safe_zones.append(SafeZone(**zone))
+        inside, distances = within_radius(
+            lat, lng,
+            [zone["location"]["lat"] for zone in all_safe_zones],
+            [zone["location"]["lng"] for zone in all_safe_zones],
+            radius_km
+        )
+        safe_zones = [
+            SafeZone(**zone, distance_km=round(float(distance), 2))
+            for zone, distance, keep in zip(all_safe_zones, distances, inside) if keep
+        ]
         
         # Sort by distance
         safe_zones.sort(key=lambda x: x.distance_km or 0)
+        if limit:
+            safe_zones = safe_zones[:limit]
         
         return {
             "safe_zones": safe_zones,
@@ -151,54 +269,26 @@ async def get_danger_zones(
     request: Request,
     lat: float,
     lng: float,
-    radius_km: float = 15.0
+    radius_km: float = 15.0,
+    zoom: Annotated[Optional[int], Query(ge=0, le=MAX_TILE_ZOOM)] = None
 ):
     """
     Get danger zones to avoid during navigation.
+    With a map zoom, polygons are simplified to what is visible at that zoom.
     """
     try:
-        # Sample danger zones
-        danger_zones = [
-            {
-                "id": "flood_001",
-                "name": "Riverside Flood Zone",
-                "polygon_coordinates": [
-                    [lng - 0.02, lat - 0.01], [lng + 0.01, lat - 0.01],
-                    [lng + 0.01, lat + 0.005], [lng - 0.02, lat + 0.005],
-                    [lng - 0.02, lat - 0.01]
-                ],
-                "risk_type": "flood",
-                "risk_level": "high",
-                "description": "River overflow causing severe flooding. Water level 2-4 feet.",
-                "last_updated": datetime.utcnow()
-            },
-            {
-                "id": "fire_001",
-                "name": "Industrial Fire Hazard",
-                "polygon_coordinates": [
-                    [lng + 0.02, lat + 0.02], [lng + 0.03, lat + 0.02],
-                    [lng + 0.03, lat + 0.03], [lng + 0.02, lat + 0.03],
-                    [lng + 0.02, lat + 0.02]
-                ],
-                "risk_type": "fire",
-                "risk_level": "critical",
-                "description": "Chemical plant fire with toxic smoke. Evacuation zone 3km radius.",
-                "last_updated": datetime.utcnow()
-            },
-            {
-                "id": "landslide_001",
-                "name": "Hill Slope Instability",
-                "polygon_coordinates": [
-                    [lng - 0.01, lat + 0.015], [lng + 0.005, lat + 0.015],
-                    [lng + 0.005, lat + 0.025], [lng - 0.01, lat + 0.025],
-                    [lng - 0.01, lat + 0.015]
-                ],
-                "risk_type": "landslide",
-                "risk_level": "medium",
-                "description": "Unstable hill slope due to heavy rains. Risk of landslide.",
-                "last_updated": datetime.utcnow()
-            }
-        ]
+        # Registered zones take over from the sample data once any exist
+        zone_index = get_danger_zone_index()
+        if zone_index.zones:
+            danger_zones = zone_index.zones_near(lat, lng, radius_km)
+        else:
+            danger_zones = _sample_danger_zones(lat, lng)
+        if zoom is not None:
+            simplifier = get_polygon_simplifier()
+            danger_zones = [
+                dict(zone, polygon_coordinates=simplifier.simplify(zone["polygon_coordinates"], zoom).tolist())
+                for zone in danger_zones
+            ]
         
         return {
             "danger_zones": [DangerZone(**zone) for zone in danger_zones],
@@ -209,6 +299,249 @@ async def get_danger_zones(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get danger zones: {str(e)}")
 
+@router.post("/safezones")
+async def upsert_safe_zone(zone: SafeZone, request: Request):
+    """
+    Register a safe zone or update its location, occupancy or status.
+    """
+    try:
+        result = {"zone": get_safe_zone_index().upsert_zone(zone.dict())}
+        get_shelter_catchments().request_refresh()
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update safe zone: {str(e)}")
+
+@router.post("/safezones/bulk")
+async def upsert_safe_zones(zones: List[SafeZone], request: Request):
+    """
+    Register or update many safe zones at once (e.g. a city-wide shelter list).
+    """
+    try:
+        result = {"upserted": get_safe_zone_index().upsert_zones(zone.dict() for zone in zones)}
+        get_shelter_catchments().request_refresh()
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update safe zones: {str(e)}")
+
+@router.delete("/safezones/{zone_id}")
+async def delete_safe_zone(zone_id: str, request: Request):
+    """
+    Remove a safe zone.
+    """
+    try:
+        if not get_safe_zone_index().remove_zone(zone_id):
+            raise HTTPException(status_code=404, detail="Safe zone not found")
+        get_shelter_catchments().request_refresh()
+        return {"deleted": zone_id}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to delete safe zone: {str(e)}")
+
+@router.post("/dangerzones")
+async def upsert_danger_zone(zone: DangerZone, request: Request):
+    """
+    Register or update a danger zone. Routes avoid it from the next request on:
+    critical zones are closed, lower risk levels make their roads costlier.
+    Subscribed routes that it affects are rerouted and pushed to their streams.
+    """
+    try:
+        result = get_danger_zone_index().upsert_zone(zone.dict())
+        get_shelter_catchments().request_refresh()
+        get_route_monitor().request_refresh()
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update danger zone: {str(e)}")
+
+@router.post("/dangerzones/contains")
+async def tag_points_in_danger_zones(containment: ContainmentRequest, request: Request):
+    """
+    Tag many points (users, reports, route points) with the registered danger zones
+    containing them and the highest risk level among those zones.
+    """
+    try:
+        zone_index = get_danger_zone_index()
+        points = containment.points
+        found = zone_index.containing([p.lat for p in points], [p.lng for p in points])
+        zones = {zone_id: zone_index.zones.get(zone_id) for zone_ids in found for zone_id in zone_ids}
+        summaries = {
+            zone_id: {"id": zone_id, "name": zone["name"], "risk_type": zone.get("risk_type"),
+                      "risk_level": zone["risk_level"]}
+            for zone_id, zone in zones.items() if zone is not None
+        }
+        tagged = []
+        for point, zone_ids in zip(points, found):
+            matches = [summaries[zone_id] for zone_id in zone_ids if zone_id in summaries]
+            tagged.append({
+                "id": point.id,
+                "lat": point.lat,
+                "lng": point.lng,
+                "zones": matches,
+                # Zones come highest risk first
+                "risk_level": matches[0]["risk_level"] if matches else None
+            })
+        return {
+            "points": tagged,
+            "total_points": len(tagged),
+            "points_in_zones": sum(1 for point in tagged if point["zones"])
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to check danger zones: {str(e)}")
+
+@router.delete("/dangerzones/{zone_id}")
+async def delete_danger_zone(zone_id: str, request: Request):
+    """
+    Remove a danger zone and reopen its roads.
+    """
+    try:
+        result = get_danger_zone_index().delete_zone(zone_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Danger zone not found")
+        get_shelter_catchments().request_refresh()
+        get_route_monitor().request_refresh()
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to delete danger zone: {str(e)}")
+
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_navigation_tile(z: int, x: int, y: int, request: Request):
+    """
+    Danger zones and safe zones as a Mapbox Vector Tile, with layers "danger_zones"
+    (polygons simplified for the zoom) and "safe_zones" (points).
+    The ETag changes whenever either set of zones does.
+    """
+    try:
+        if not valid_tile(z, x, y):
+            raise HTTPException(status_code=404, detail="Tile not found")
+        zone_index = get_danger_zone_index()
+        safe_index = get_safe_zone_index()
+        etag = f'"{z}-{x}-{y}-{zone_index.version}-{safe_index.version}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+
+        tile = VectorTile(z, x, y, simplifier=get_polygon_simplifier())
+        west, south, east, north = tile.bounds
+        tile.add_layer("danger_zones", [
+            {"type": "Polygon", "coordinates": zone["polygon_coordinates"],
+             "properties": {"id": zone["id"], "name": zone["name"], "risk_type": zone.get("risk_type"),
+                            "risk_level": zone["risk_level"]}}
+            for zone in zone_index.zones_in_boxes([(west, south, east, north)])
+        ])
+        center_lat, center_lng = (south + north) / 2, (west + east) / 2
+        shelters = safe_index.within(center_lat, center_lng, float(haversine_km(center_lat, center_lng, north, east)))
+        tile.add_layer("safe_zones", [
+            {"type": "Point", "coordinates": [zone["location"]["lng"], zone["location"]["lat"]],
+             "properties": {"id": zone["id"], "name": zone["name"], "type": zone["type"],
+                            "status": zone.get("status"), "capacity": zone.get("capacity"),
+                            "current_occupancy": zone.get("current_occupancy")}}
+            for zone in shelters
+        ])
+        return Response(content=tile.encode(), media_type=MVT_MEDIA_TYPE, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build map tile: {str(e)}")
+
+@router.post("/flood/estimate")
+async def estimate_flooding(estimate: FloodEstimateRequest, request: Request):
+    """
+    Estimate flood extent from rainfall over the DEM and open water, and publish it as
+    flood danger zones by depth. Only the listed tiles are re-estimated; zones of tiles
+    whose flooding did not change are left as they are.
+    """
+    try:
+        model = get_flood_model()
+        if model is None:
+            raise HTTPException(status_code=503, detail="Flood model needs an elevation model (DEM_PATH)")
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, model.update, estimate.rainfall_mm, estimate.tiles, estimate.runoff_coefficient
+        )
+        if any(tile["changed"] for tile in result["tiles"]):
+            get_shelter_catchments().request_refresh()
+            get_route_monitor().request_refresh()
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Flood estimation failed: {str(e)}")
+
+@router.get("/flood/status")
+async def get_flood_status(request: Request):
+    """
+    Get the flood model's tiles and the last estimate for each.
+    """
+    try:
+        model = get_flood_model()
+        if model is None:
+            raise HTTPException(status_code=503, detail="Flood model needs an elevation model (DEM_PATH)")
+        return model.get_stats()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get flood status: {str(e)}")
+
+def _sample_danger_zones(lat: float, lng: float) -> List[Dict[str, Any]]:
+    """Placeholder zones around a location, used until real zones are registered."""
+    return [
+        {
+            "id": "flood_001",
+            "name": "Riverside Flood Zone",
+            "polygon_coordinates": [
+                [lng - 0.02, lat - 0.01], [lng + 0.01, lat - 0.01],
+                [lng + 0.01, lat + 0.005], [lng - 0.02, lat + 0.005],
+                [lng - 0.02, lat - 0.01]
+            ],
+            "risk_type": "flood",
+            "risk_level": "high",
+            "description": "River overflow causing severe flooding. Water level 2-4 feet.",
+            "last_updated": datetime.utcnow()
+        },
+        {
+            "id": "fire_001",
+            "name": "Industrial Fire Hazard",
+            "polygon_coordinates": [
+                [lng + 0.02, lat + 0.02], [lng + 0.03, lat + 0.02],
+                [lng + 0.03, lat + 0.03], [lng + 0.02, lat + 0.03],
+                [lng + 0.02, lat + 0.02]
+            ],
+            "risk_type": "fire",
+            "risk_level": "critical",
+            "description": "Chemical plant fire with toxic smoke. Evacuation zone 3km radius.",
+            "last_updated": datetime.utcnow()
+        },
+        {
+            "id": "landslide_001",
+            "name": "Hill Slope Instability",
+            "polygon_coordinates": [
+                [lng - 0.01, lat + 0.015], [lng + 0.005, lat + 0.015],
+                [lng + 0.005, lat + 0.025], [lng - 0.01, lat + 0.025],
+                [lng - 0.01, lat + 0.015]
+            ],
+            "risk_type": "landslide",
+            "risk_level": "medium",
+            "description": "Unstable hill slope due to heavy rains. Risk of landslide.",
+            "last_updated": datetime.utcnow()
+        }
+    ]
+
+def _road_route(start_lat: float, start_lng: float, end_lat: float, end_lng: float, mode: str):
+    """Road route between two points and the danger zones it crosses; (None, []) without a road network."""
+    zone_index = get_danger_zone_index()
+    road_route = get_routing_service().route(
+        start_lat, start_lng, end_lat, end_lng, mode,
+        factor_overrides=zone_index.exit_overrides([(start_lat, start_lng), (end_lat, end_lng)])
+    )
+    if not road_route:
+        return road_route, []
+    return road_route, zone_index.zones_on_route(road_route["edge_ids"])
+
 @router.post("/route")
 async def calculate_safe_route(nav_request: NavigationRequest, request: Request):
     """
@@ -217,58 +550,99 @@ async def calculate_safe_route(nav_request: NavigationRequest, request: Request)
     try:
         start = nav_request.start_location
         
-        # Find nearest safe zone of requested type
-        safe_zones_response = await get_safe_zones(
-            request, start.lat, start.lng, 
-            nav_request.max_distance_km, nav_request.destination_type
-        )
-        
-        if not safe_zones_response["safe_zones"]:
-            raise HTTPException(status_code=404, detail="No safe zones found within range")
+        # Requests from the same origin cell share a route until zones or shelter status change
+        cache = get_route_cache()
+        version = (get_safe_zone_index().version, get_danger_zone_index().version,
+                   get_shelter_catchments().version)
+        cache_key = cache.key(start.lat, start.lng, nav_request.destination_type,
+                              nav_request.transportation_mode, nav_request.max_distance_km)
+        cached = cache.get(cache_key, version)
+        if cached is not None:
+            return _from_origin(cached, start)
         
-        nearest_zone = safe_zones_response["safe_zones"][0]
+        # Prefer the zone that serves this point by travel time once catchments are computed
+        served = get_shelter_catchments().lookup(start.lat, start.lng, nav_request.transportation_mode)
+        served_zone = get_safe_zone_index().zones.get(served["zone_id"]) if served else None
+        if (served_zone and nav_request.destination_type in ("safe_zone", served_zone["type"]) and
+                (nav_request.max_distance_km is None or served["straight_line_km"] <= nav_request.max_distance_km)):
+            nearest_zone = SafeZone(**dict(served_zone, distance_km=round(served["straight_line_km"], 2)))
+        else:
+            # Find nearest safe zone of requested type that is still admitting people
+            safe_zones_response = await get_safe_zones(
+                request, start.lat, start.lng, 
+                nav_request.max_distance_km, nav_request.destination_type,
+                status=",".join(ACCEPTING_STATUSES), limit=1
+            )
+            
+            if not safe_zones_response["safe_zones"]:
+                raise HTTPException(status_code=404, detail="No safe zones found within range")
+            
+            nearest_zone = safe_zones_response["safe_zones"][0]
         
         # Get danger zones to avoid
         danger_zones_response = await get_danger_zones(request, start.lat, start.lng)
         
-        # Calculate route (simplified - in production would use real routing API)
-        distance_km = _calculate_distance(
-            start.lat, start.lng,
-            nearest_zone.location.lat, nearest_zone.location.lng
+        # Route over the road network when one is loaded, else fall back to a straight line.
+        # Registered danger zones are closed or penalized on the graph; a closed zone the
+        # route starts or ends in is reopened for this query so it can be left.
+        # The graph search is CPU-bound, so it runs off the event loop.
+        road_route, crossed_zones = await asyncio.get_running_loop().run_in_executor(
+            None, _road_route, start.lat, start.lng,
+            nearest_zone.location.lat, nearest_zone.location.lng, nav_request.transportation_mode
         )
         
-        # Estimate duration based on transportation mode
-        speed_kmh = {
-            "walking": 5,
-            "cycling": 15,
-            "driving": 30
-        }.get(nav_request.transportation_mode, 5)
-        
-        duration_minutes = (distance_km / speed_kmh) * 60
-        
-        # Generate simple waypoints
-        waypoints = [
-            start,
-            Location(
-                lat=(start.lat + nearest_zone.location.lat) / 2,
-                lng=(start.lng + nearest_zone.location.lng) / 2
-            ),
-            nearest_zone.location
-        ]
-        
-        # Generate instructions
-        instructions = [
-            f"Start from your location ({start.lat:.4f}, {start.lng:.4f})",
-            f"Head towards {nearest_zone.name}",
-            "Avoid marked danger zones",
-            f"Arrive at {nearest_zone.name}"
-        ]
+        if road_route:
+            distance_km = road_route["distance_km"]
+            duration_minutes = road_route["duration_minutes"]
+            waypoints = [Location(lat=lat, lng=lng) for lat, lng in road_route["coordinates"]]
+            instructions = (
+                [f"Start from your location ({start.lat:.4f}, {start.lng:.4f})"] +
+                road_route["instructions"] +
+                [f"Arrive at {nearest_zone.name}"]
+            )
+        else:
+            distance_km = haversine_km(
+                start.lat, start.lng,
+                nearest_zone.location.lat, nearest_zone.location.lng
+            )
+            
+            # Estimate duration based on transportation mode
+            speed_kmh = {
+                "walking": 5,
+                "cycling": 15,
+                "driving": 30
+            }.get(nav_request.transportation_mode, 5)
+            
+            duration_minutes = (distance_km / speed_kmh) * 60
+            
+            # Generate simple waypoints
+            waypoints = [
+                start,
+                Location(
+                    lat=(start.lat + nearest_zone.location.lat) / 2,
+                    lng=(start.lng + nearest_zone.location.lng) / 2
+                ),
+                nearest_zone.location
+            ]
+            
+            # Generate instructions
+            instructions = [
+                f"Start from your location ({start.lat:.4f}, {start.lng:.4f})",
+                f"Head towards {nearest_zone.name}",
+                "Avoid marked danger zones",
+                f"Arrive at {nearest_zone.name}"
+            ]
         
         safety_notes = [
             "Stay on main roads when possible",
             "Keep emergency contacts handy",
             "Monitor weather conditions"
         ]
+        safety_notes += [f"Route passes through {zone['name']} ({zone['risk_level']} risk)"
+                         for zone in crossed_zones]
+        if road_route and road_route.get("lowest_elevation_m") is not None:
+            safety_notes.append(f"Lowest point on the route is {road_route['lowest_elevation_m']:.0f} m "
+                                f"above sea level, with {road_route['climb_m']:.0f} m of climbing")
         
         avoid_zones = [zone.name for zone in danger_zones_response["danger_zones"] 
                       if zone.risk_level in ["high", "critical"]]
@@ -282,119 +656,362 @@ async def calculate_safe_route(nav_request: NavigationRequest, request: Request)
             avoid_zones=avoid_zones
         )
         
-        return {
+        result = {
             "route": route,
             "destination": nearest_zone,
-            "transportation_mode": nav_request.transportation_mode
+            "transportation_mode": nav_request.transportation_mode,
+            "routing_engine": "road_network" if road_route else "straight_line",
+            "cached": False
         }
+        cache.put(cache_key, version, result)
+        return result
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Route calculation failed: {str(e)}")
 
+def _from_origin(result: Dict[str, Any], start: Location) -> Dict[str, Any]:
+    """A cached route response re-anchored at the caller's own position."""
+    route = result["route"]
+    route = route.copy(update={
+        "waypoints": [start] + route.waypoints[1:],
+        "instructions": [f"Start from your location ({start.lat:.4f}, {start.lng:.4f})"] + route.instructions[1:]
+    })
+    return dict(result, route=route, cached=True)
+
+@router.post("/route/subscriptions")
+async def subscribe_to_route(nav_request: NavigationRequest, request: Request):
+    """
+    Start following a route to the nearest suitable safe zone. While the subscription
+    lasts the route is repaired as danger zones change, and every reroute is pushed on
+    its event stream.
+    """
+    try:
+        if not get_routing_service().available:
+            raise HTTPException(status_code=503, detail="Route subscriptions need a loaded road network")
+        planned = await calculate_safe_route(nav_request, request)
+        destination = planned["destination"]
+        start = nav_request.start_location
+        subscription = await asyncio.get_running_loop().run_in_executor(
+            None, get_route_monitor().subscribe, start.lat, start.lng,
+            destination.location.lat, destination.location.lng,
+            nav_request.transportation_mode, destination.name
+        )
+        if subscription is None:
+            raise HTTPException(status_code=404, detail="No road route to the nearest safe zone")
+        subscription["events_url"] = str(request.url_for(
+            "stream_route_updates", subscription_id=subscription["subscription_id"]
+        ))
+        return subscription
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Route subscription failed: {str(e)}")
+
+@router.get("/route/subscriptions/{subscription_id}/events")
+async def stream_route_updates(subscription_id: str, request: Request):
+    """
+    Server-sent events for a subscribed route: the current route first, then a
+    "reroute" (or "no_route") event each time danger zones change it.
+    """
+    try:
+        monitor = get_route_monitor()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def push(update: Dict[str, Any]):
+            # Called from the monitor's refresh thread
+            loop.call_soon_threadsafe(queue.put_nowait, update)
+
+        current = monitor.listen(subscription_id, push)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Route subscription not found")
+        return StreamingResponse(
+            _route_events(request, subscription_id, push, queue, current),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to stream route updates: {str(e)}")
+
+@router.post("/route/subscriptions/{subscription_id}/position")
+async def update_route_position(subscription_id: str, position: Location, request: Request):
+    """
+    Report the traveller's position. The route is shortened as they follow it and
+    searched again (and pushed) if they leave it.
+    """
+    try:
+        update = await asyncio.get_running_loop().run_in_executor(
+            None, get_route_monitor().move, subscription_id, position.lat, position.lng
+        )
+        if update is None:
+            raise HTTPException(status_code=404, detail="Route subscription not found")
+        return update
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update position: {str(e)}")
+
+@router.delete("/route/subscriptions/{subscription_id}")
+async def unsubscribe_from_route(subscription_id: str, request: Request):
+    """
+    Stop following a route; open event streams receive a final "closed" event.
+    """
+    try:
+        if not get_route_monitor().unsubscribe(subscription_id):
+            raise HTTPException(status_code=404, detail="Route subscription not found")
+        return {"subscription_id": subscription_id, "closed": True}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to close route subscription: {str(e)}")
+
+async def _route_events(request: Request, subscription_id: str, push, queue: asyncio.Queue,
+                        current: Dict[str, Any], keepalive_sec: float = 15.0):
+    """Format route events as SSE, with keep-alive comments, until the client leaves."""
+    try:
+        update = current
+        while True:
+            yield (f"id: {update['sequence']}\nevent: {update['event']}\n"
+                   f"data: {json.dumps(update, default=str)}\n\n")
+            if update["event"] == "closed":
+                break
+            update = None
+            while update is None:
+                if await request.is_disconnected():
+                    return
+                try:
+                    update = await asyncio.wait_for(queue.get(), keepalive_sec)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+    finally:
+        get_route_monitor().unlisten(subscription_id, push)
+
+@router.get("/routing/status")
+async def get_routing_status(request: Request):
+    """
+    Get the road network loaded for route calculation.
+    """
+    try:
+        status = get_routing_service().get_stats()
+        status["danger_zones"] = get_danger_zone_index().get_stats()
+        status["safe_zones"] = get_safe_zone_index().get_stats()
+        status["catchments"] = get_shelter_catchments().get_stats()
+        status["route_cache"] = get_route_cache().get_stats()
+        status["route_monitor"] = get_route_monitor().get_stats()
+        status["polygon_simplifier"] = get_polygon_simplifier().get_stats()
+        return status
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get routing status: {str(e)}")
+
+@router.get("/catchments")
+async def get_catchment(request: Request, lat: float, lng: float, mode: Optional[str] = None):
+    """
+    Get the safe zone serving a location and the travel time to it, per transport mode.
+    Answers come from precomputed isochrones; modes are omitted until they are ready.
+    """
+    try:
+        if mode and mode not in PROFILES:
+            raise HTTPException(status_code=400, detail=f"Unknown mode {mode}; use one of {', '.join(PROFILES)}")
+        catchments = get_shelter_catchments()
+        zones = get_safe_zone_index().zones
+        modes = [mode] if mode else catchments.modes
+        served = {}
+        for travel_mode in modes:
+            match = catchments.lookup(lat, lng, travel_mode)
+            if match:
+                match["zone"] = zones.get(match["zone_id"])
+                match["catchment_km2"] = catchments.isochrone_areas(travel_mode, match["zone_id"])
+            served[travel_mode] = match
+        return {
+            "location": {"lat": lat, "lng": lng},
+            "served_by": served,
+            "ready": catchments.ready
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get catchment: {str(e)}")
+
+@router.post("/evacuation/plan")
+async def plan_evacuation(plan_request: EvacuationPlanRequest, request: Request):
+    """
+    Assign the population of each cell to shelters without exceeding their free capacity,
+    keeping total travel time low. Cells may be split across shelters.
+    """
+    try:
+        cells = [cell.dict(exclude_none=True) for cell in plan_request.cells]
+        return await asyncio.get_running_loop().run_in_executor(
+            None, get_evacuation_planner().plan, cells,
+            plan_request.transportation_mode, plan_request.destination_type
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Evacuation planning failed: {str(e)}")
+
+@router.get("/evacuation/plan")
+async def get_evacuation_plan(request: Request):
+    """
+    Re-solve the last evacuation plan against current shelter occupancy.
+    """
+    try:
+        plan = await asyncio.get_running_loop().run_in_executor(None, get_evacuation_planner().replan)
+        if plan is None:
+            raise HTTPException(status_code=404, detail="No evacuation plan has been requested yet")
+        return plan
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Evacuation planning failed: {str(e)}")
+
 @router.get("/offline-maps")
 async def get_offline_map_regions(request: Request):
     """
     Get available offline map regions for download.
     """
     try:
-        regions = [
-            {
-                "region_id": "delhi_central",
-                "region_name": "Delhi Central District",
-                "bounds": {
-                    "north": 28.7041,
-                    "south": 28.5100,
-                    "east": 77.3300,
-                    "west": 77.1000
-                },
-                "zoom_levels": [10, 11, 12, 13, 14, 15],
-                "tile_count": 15420,
-                "size_mb": 45.2,
-                "last_updated": datetime.utcnow()
-            },
-            {
-                "region_id": "mumbai_suburban",
-                "region_name": "Mumbai Suburban Areas",
-                "bounds": {
-                    "north": 19.2700,
-                    "south": 19.0000,
-                    "east": 72.9700,
-                    "west": 72.7700
-                },
-                "zoom_levels": [10, 11, 12, 13, 14],
-                "tile_count": 12890,
-                "size_mb": 38.7,
-                "last_updated": datetime.utcnow()
-            }
-        ]
+        regions = get_offline_map_store().list_regions()
         
         return {
             "regions": [OfflineMapData(**region) for region in regions],
             "total_regions": len(regions),
-            "total_size_mb": sum(r["size_mb"] for r in regions)
+            "total_size_mb": round(sum(r["size_mb"] for r in regions), 2)
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get offline maps: {str(e)}")
 
+@router.post("/offline-maps/{region_id}/build")
+async def build_offline_map(request: Request, region_id: str):
+    """
+    Build or refresh a region's MBTiles package in the background.
+    Refreshing rewrites only the tiles that changed.
+    """
+    try:
+        return get_offline_map_store().start_build(region_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown offline map region: {region_id}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start offline map build: {str(e)}")
+
+@router.get("/offline-maps/{region_id}/build")
+async def get_offline_map_build(request: Request, region_id: str):
+    """
+    Get the state of a region's latest package build.
+    """
+    try:
+        return get_offline_map_store().build_status(region_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown offline map region: {region_id}")
+
+@router.get("/offline-maps/{region_id}/download")
+async def download_offline_map(request: Request, region_id: str):
+    """
+    Download a region's MBTiles package.
+    Supports Range requests (with If-Range) so interrupted downloads can resume.
+    """
+    try:
+        store = get_offline_map_store()
+        if region_id not in store.regions:
+            raise HTTPException(status_code=404, detail=f"Unknown offline map region: {region_id}")
+        package = store.open_package(region_id)
+        if package is None:
+            raise HTTPException(status_code=404, detail=f"Offline map for {region_id} has not been built yet")
+        handle, info = package
+        
+        headers = {
+            "Accept-Ranges": "bytes",
+            "ETag": info["etag"],
+            "Last-Modified": formatdate(calendar.timegm(info["last_modified"].timetuple()), usegmt=True),
+            "Content-Disposition": f'attachment; filename="{region_id}.mbtiles"'
+        }
+        byte_range = None
+        # A stale If-Range means the package changed since the partial download: send it whole
+        if request.headers.get("if-range") in (None, info["etag"]):
+            try:
+                byte_range = parse_byte_range(request.headers.get("range"), info["size"])
+            except ValueError:
+                handle.close()
+                raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                                    headers={"Content-Range": f"bytes */{info['size']}"})
+        
+        start, end = byte_range or (0, info["size"] - 1)
+        headers["Content-Length"] = str(end - start + 1)
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end}/{info['size']}"
+        
+        return StreamingResponse(
+            _read_file_range(handle, start, end),
+            status_code=206 if byte_range else 200,
+            media_type=MBTILES_MEDIA_TYPE,
+            headers=headers
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to download offline map: {str(e)}")
+
+def _read_file_range(handle, start: int, end: int, chunk_size: int = 256 * 1024):
+    """Yield bytes start..end (inclusive) of an open file, closing it afterwards."""
+    try:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = handle.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+@router.get("/offline-bundle")
+async def get_offline_bundle(request: Request, since: Optional[str] = None):
+    """
+    Safe zones, danger zones and emergency procedures in one gzipped MessagePack bundle
+    for offline use. Pass the version the client holds as `since` to get a patch with
+    only what changed since then; a version too old for a patch gets the full bundle.
+    """
+    try:
+        safe_index = get_safe_zone_index()
+        zone_index = get_danger_zone_index()
+        store = get_offline_bundle_store()
+        procedures = {"procedures": EMERGENCY_PROCEDURES, "emergency_numbers": EMERGENCY_NUMBERS}
+        version = await asyncio.get_running_loop().run_in_executor(
+            None, store.refresh, list(safe_index.zones.values()), list(zone_index.zones.values()), procedures,
+            (safe_index.version, zone_index.version)
+        )
+        etag = f'"{version}"'
+        headers = {"ETag": etag, "X-Bundle-Version": version, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if since == version or (since is None and request.headers.get("if-none-match") == etag):
+            return Response(status_code=304, headers=headers)
+        payload, info = store.payload(since)
+        headers["X-Bundle-Kind"] = info["kind"]
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+        else:
+            payload = gzip.decompress(payload)
+        return Response(content=payload, media_type=BUNDLE_MEDIA_TYPE, headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build offline bundle: {str(e)}")
+
 @router.get("/emergency-procedures")
 async def get_emergency_procedures(request: Request, disaster_type: Optional[str] = None):
     """
     Get emergency procedures for offline storage.
     """
     try:
-        procedures = {
-            "flood": [
-                "Move to higher ground immediately",
-                "Avoid walking/driving through flood water",
-                "Stay away from electrical lines",
-                "Listen to emergency broadcasts",
-                "If trapped, signal for help from highest point"
-            ],
-            "fire": [
-                "Evacuate immediately using stairs, not elevators",
-                "Stay low to avoid smoke inhalation",
-                "Feel doors before opening - if hot, don't open",
-                "Meet at designated assembly point",
-                "Call emergency services once safe"
-            ],
-            "earthquake": [
-                "Drop, Cover, and Hold On",
-                "Stay away from windows and heavy objects",
-                "If outdoors, move away from buildings",
-                "After shaking stops, evacuate if building is damaged",
-                "Be prepared for aftershocks"
-            ],
-            "heatwave": [
-                "Stay indoors during peak hours (10 AM - 4 PM)",
-                "Drink water regularly, avoid alcohol",
-                "Wear light-colored, loose clothing",
-                "Use fans, AC, or visit cooling centers",
-                "Never leave anyone in parked vehicles"
-            ]
-        }
-        
-        if disaster_type and disaster_type in procedures:
+        if disaster_type and disaster_type in EMERGENCY_PROCEDURES:
             return {
                 "disaster_type": disaster_type,
-                "procedures": procedures[disaster_type],
-                "emergency_numbers": {
-                    "national_emergency": "112",
-                    "fire": "101",
-                    "police": "100",
-                    "medical": "108"
-                }
+                "procedures": EMERGENCY_PROCEDURES[disaster_type],
+                "emergency_numbers": EMERGENCY_NUMBERS
             }
         
         return {
-            "all_procedures": procedures,
-            "emergency_numbers": {
-                "national_emergency": "112",
-                "fire": "101",
-                "police": "100",
-                "medical": "108",
-                "disaster_management": "1078"
-            }
+            "all_procedures": EMERGENCY_PROCEDURES,
+            "emergency_numbers": EMERGENCY_NUMBERS
         }
         
     except Exception as e:
@@ -447,91 +1064,98 @@ async def get_ai_enhanced_route(request: NavigationRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get AI-enhanced route: {str(e)}")
 
+def _forget_dashboard_job(key: tuple, job: asyncio.Future):
+    if _dashboard_jobs.get(key) is job:
+        del _dashboard_jobs[key]
+    if not job.cancelled():
+        # Retrieve the outcome so a failure nobody waited for is not reported as unhandled
+        job.exception()
+
+async def _run_off_loop(key: tuple, factory):
+    """
+    Run a coroutine on its own event loop in a worker thread, or join the job already
+    running for the same key.
+    The live-data handlers make blocking HTTP and model calls, which must not stall this loop.
+    Callers that give up waiting leave the job running for whoever asks next.
+    """
+    job = _dashboard_jobs.get(key)
+    if job is None:
+        job = asyncio.get_running_loop().run_in_executor(_dashboard_executor, asyncio.run, factory())
+        _dashboard_jobs[key] = job
+        job.add_done_callback(lambda done: _forget_dashboard_job(key, done))
+    return await asyncio.shield(job)
+
+async def _dashboard_news(background_tasks: BackgroundTasks) -> Dict[str, Any]:
+    from routers.live_data import get_disaster_news_feed
+    return await _run_off_loop(("news",),
+                               lambda: get_disaster_news_feed(background_tasks, limit=10, ai_filter=True))
+
+async def _dashboard_weather(lat: float, lng: float) -> Dict[str, Any]:
+    from routers.live_data import LocationRequest, get_current_weather
+    return await _run_off_loop(("weather", round(lat, 3), round(lng, 3)),
+                               lambda: get_current_weather(LocationRequest(lat=lat, lng=lng), ai_analysis=True))
+
 @router.get("/ai-dashboard-data")
-async def get_ai_dashboard_data(lat: float, lng: float):
+async def get_ai_dashboard_data(request: Request, background_tasks: BackgroundTasks, lat: float, lng: float):
     """
     Get AI-analyzed data for the dashboard including news, weather, and navigation insights.
+    News, weather and safe zones are fetched concurrently in-process under one deadline;
+    sections not ready in time are returned empty with an error instead of delaying the rest.
     """
-    try:
-        # Import live data functions
-        import requests
-        
-        # Get AI-filtered news
-        news_response = requests.get(f"http://localhost:8000/api/live/news/disaster-feed?ai_filter=true&limit=10")
-        news_data = news_response.json() if news_response.status_code == 200 else {"articles": []}
-        
-        # Get AI-analyzed weather
-        weather_response = requests.post(
-            "http://localhost:8000/api/live/weather/current",
-            json={"lat": lat, "lng": lng, "location_name": None}
+    started = time.monotonic()
+    sections = {
+        "news": asyncio.create_task(_dashboard_news(background_tasks)),
+        "weather": asyncio.create_task(_dashboard_weather(lat, lng)),
+        "safe_zones": asyncio.create_task(
+            get_safe_zones(request, lat, lng, radius_km=10.0, status=",".join(ACCEPTING_STATUSES))
         )
-        weather_data = weather_response.json() if weather_response.status_code == 200 else {"weather": {}}
-        
-        # Get safe zones
-        safe_zones_response = await get_safe_zones_near(lat=lat, lng=lng, radius_km=10)
-        
-        return {
-            "ai_dashboard": {
-                "news_intelligence": {
-                    "filtered_articles": news_data.get("articles", [])[:5],
-                    "total_articles": news_data.get("total", 0),
-                    "ai_filtered": news_data.get("ai_filtered", False)
-                },
-                "weather_intelligence": {
-                    "current_conditions": weather_data.get("weather", {}),
-                    "ai_risk_analysis": weather_data.get("weather", {}).get("ai_analysis", {}),
-                    "ai_analyzed": weather_data.get("ai_analyzed", False)
-                },
-                "navigation_intelligence": {
-                    "nearby_safe_zones": safe_zones_response.get("safe_zones", [])[:3],
-                    "total_safe_zones": len(safe_zones_response.get("safe_zones", [])),
-                    "coordinates": {"lat": lat, "lng": lng}
-                }
-            },
-            "last_updated": datetime.utcnow().isoformat()
-        }
-        
-    except Exception as e:
-        # Return fallback data if AI services fail
-        return {
-            "ai_dashboard": {
-                "news_intelligence": {
-                    "filtered_articles": [],
-                    "total_articles": 0,
-                    "ai_filtered": False,
-                    "error": "AI news filtering unavailable"
-                },
-                "weather_intelligence": {
-                    "current_conditions": {},
-                    "ai_risk_analysis": {},
-                    "ai_analyzed": False,
-                    "error": "AI weather analysis unavailable"
-                },
-                "navigation_intelligence": {
-                    "nearby_safe_zones": [],
-                    "total_safe_zones": 0,
-                    "coordinates": {"lat": lat, "lng": lng},
-                    "error": "Navigation data unavailable"
-                }
-            },
-            "error": f"Dashboard data fetch failed: {str(e)}",
-            "last_updated": datetime.utcnow().isoformat()
-        }
-
-def _calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """Calculate distance between two points using Haversine formula."""
-    R = 6371  # Earth's radius in kilometers
+    }
+    _, pending = await asyncio.wait(sections.values(), timeout=DASHBOARD_DEADLINE_SEC)
+    for task in pending:
+        task.cancel()
     
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lng = math.radians(lng2 - lng1)
+    results, errors = {}, {}
+    for name, task in sections.items():
+        if task in pending:
+            errors[name] = f"timed out after {DASHBOARD_DEADLINE_SEC:g}s"
+        elif task.exception() is not None:
+            errors[name] = getattr(task.exception(), "detail", None) or str(task.exception())
+        else:
+            results[name] = task.result()
     
-    a = (math.sin(delta_lat/2) * math.sin(delta_lat/2) +
-         math.cos(lat1_rad) * math.cos(lat2_rad) *
-         math.sin(delta_lng/2) * math.sin(delta_lng/2))
+    news_data = results.get("news", {})
+    weather_data = results.get("weather", {})
+    safe_zones = results.get("safe_zones", {}).get("safe_zones", [])
     
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    distance = R * c
+    news_intelligence = {
+        "filtered_articles": news_data.get("articles", [])[:5],
+        "total_articles": news_data.get("total", 0),
+        "ai_filtered": news_data.get("ai_filtered", False)
+    }
+    weather_intelligence = {
+        "current_conditions": weather_data.get("weather", {}),
+        "ai_risk_analysis": weather_data.get("weather", {}).get("ai_analysis", {}),
+        "ai_analyzed": weather_data.get("ai_analyzed", False)
+    }
+    navigation_intelligence = {
+        "nearby_safe_zones": safe_zones[:3],
+        "total_safe_zones": len(safe_zones),
+        "coordinates": {"lat": lat, "lng": lng}
+    }
+    if "news" in errors:
+        news_intelligence["error"] = f"AI news filtering unavailable: {errors['news']}"
+    if "weather" in errors:
+        weather_intelligence["error"] = f"AI weather analysis unavailable: {errors['weather']}"
+    if "safe_zones" in errors:
+        navigation_intelligence["error"] = f"Navigation data unavailable: {errors['safe_zones']}"
     
-    return distance
\ No newline at end of file
+    return {
+        "ai_dashboard": {
+            "news_intelligence": news_intelligence,
+            "weather_intelligence": weather_intelligence,
+            "navigation_intelligence": navigation_intelligence
+        },
+        "partial": bool(errors),
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        "last_updated": datetime.utcnow().isoformat()
+    }
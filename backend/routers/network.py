@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Annotated, Optional, List, Dict, Any
 from datetime import datetime, timedelta
 import random
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.geodesy import destination_point
+from services.vector_tiles import MAX_TILE_ZOOM, MVT_MEDIA_TYPE, VectorTile, get_polygon_simplifier, valid_tile
 
 router = APIRouter()
 
@@ -112,62 +119,17 @@ async def get_network_outages(
         raise HTTPException(status_code=500, detail=f"Failed to get outages: {str(e)}")
 
 @router.get("/connectivity-map")
-async def get_connectivity_map(request: Request):
+async def get_connectivity_map(request: Request, zoom: Annotated[Optional[int], Query(ge=0, le=MAX_TILE_ZOOM)] = None):
     """
     Get connectivity zones data for choropleth map visualization.
+    With a map zoom, polygons are simplified to what is visible at that zoom.
     """
     try:
-        # Sample connectivity zones (would be generated from real data)
-        zones = [
-            {
-                "zone_id": "zone_001",
-                "zone_name": "Downtown Business District",
-                "polygon_coordinates": [
-                    [77.2090, 28.6139], [77.2150, 28.6139],
-                    [77.2150, 28.6200], [77.2090, 28.6200], [77.2090, 28.6139]
-                ],
-                "connectivity_level": "good",
-                "color_code": "#28a745",
-                "metrics": {
-                    "avg_download": 85.3,
-                    "avg_upload": 42.1,
-                    "avg_ping": 25,
-                    "reports_count": 156
-                }
-            },
-            {
-                "zone_id": "zone_002",
-                "zone_name": "Flood Affected Area",
-                "polygon_coordinates": [
-                    [77.1800, 28.5800], [77.1900, 28.5800],
-                    [77.1900, 28.5900], [77.1800, 28.5900], [77.1800, 28.5800]
-                ],
-                "connectivity_level": "offline",
-                "color_code": "#dc3545",
-                "metrics": {
-                    "avg_download": 0.1,
-                    "avg_upload": 0.05,
-                    "avg_ping": 999,
-                    "reports_count": 89
-                }
-            },
-            {
-                "zone_id": "zone_003",
-                "zone_name": "Suburban Residential",
-                "polygon_coordinates": [
-                    [77.2500, 28.5500], [77.2600, 28.5500],
-                    [77.2600, 28.5600], [77.2500, 28.5600], [77.2500, 28.5500]
-                ],
-                "connectivity_level": "fair",
-                "color_code": "#ffc107",
-                "metrics": {
-                    "avg_download": 25.8,
-                    "avg_upload": 12.3,
-                    "avg_ping": 85,
-                    "reports_count": 67
-                }
-            }
-        ]
+        zones = _sample_connectivity_zones()
+        if zoom is not None:
+            simplifier = get_polygon_simplifier()
+            zones = [dict(zone, polygon_coordinates=simplifier.simplify(zone["polygon_coordinates"], zoom).tolist())
+                     for zone in zones]
         
         return {
             "zones": [ConnectivityZone(**zone) for zone in zones],
@@ -183,6 +145,28 @@ async def get_connectivity_map(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get connectivity map: {str(e)}")
 
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_network_tile(z: int, x: int, y: int, request: Request):
+    """
+    Connectivity zones as a Mapbox Vector Tile with one "connectivity" layer,
+    polygons simplified for the zoom.
+    """
+    try:
+        if not valid_tile(z, x, y):
+            raise HTTPException(status_code=404, detail="Tile not found")
+        tile = VectorTile(z, x, y, simplifier=get_polygon_simplifier())
+        tile.add_layer("connectivity", [
+            {"type": "Polygon", "coordinates": zone["polygon_coordinates"],
+             "properties": {"zone_id": zone["zone_id"], "zone_name": zone["zone_name"],
+                            "connectivity_level": zone["connectivity_level"], "color_code": zone["color_code"]}}
+            for zone in _sample_connectivity_zones()
+        ])
+        return Response(content=tile.encode(), media_type=MVT_MEDIA_TYPE)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build map tile: {str(e)}")
+
 @router.get("/tower-status")
 async def get_tower_status(request: Request, lat: float, lng: float, radius: float = 10.0):
     """
@@ -191,10 +175,13 @@ async def get_tower_status(request: Request, lat: float, lng: float, radius: flo
     try:
         # Sample tower data (would be from real APIs in production)
         towers = []
-        for i in range(random.randint(3, 8)):
-            # Generate random towers around the location
-            tower_lat = lat + random.uniform(-radius/111, radius/111)  # Rough km to degree conversion
-            tower_lng = lng + random.uniform(-radius/111, radius/111)
+        count = random.randint(3, 8)
+        # Generate random towers spread evenly over the search disc
+        distances = [radius * random.random() ** 0.5 for _ in range(count)]
+        bearings = [random.uniform(0, 360) for _ in range(count)]
+        tower_lats, tower_lngs = destination_point(lat, lng, np.array(bearings), np.array(distances))
+        for i in range(count):
+            tower_lat, tower_lng = float(tower_lats[i]), float(tower_lngs[i])
             
             status_options = ["operational", "degraded", "offline", "maintenance"]
             tower = {
@@ -204,9 +191,12 @@ async def get_tower_status(request: Request, lat: float, lng: float, radius: flo
                 "status": random.choice(status_options),
                 "signal_strength": random.uniform(0.1, 1.0),
                 "last_ping": datetime.utcnow() - timedelta(minutes=random.randint(1, 60)),
-                "coverage_radius": random.uniform(2.0, 8.0)
+                "coverage_radius": random.uniform(2.0, 8.0),
+                "distance_km": round(distances[i], 2),
+                "bearing": round(bearings[i], 1)
             }
             towers.append(tower)
+        towers.sort(key=lambda t: t["distance_km"])
         
         # Calculate area coverage
         operational_towers = [t for t in towers if t["status"] == "operational"]
@@ -260,6 +250,59 @@ async def get_network_statistics(request: Request):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get statistics: {str(e)}")
 
+def _sample_connectivity_zones() -> List[Dict[str, Any]]:
+    """Sample connectivity zones (would be generated from real data)."""
+    return [
+        {
+            "zone_id": "zone_001",
+            "zone_name": "Downtown Business District",
+            "polygon_coordinates": [
+                [77.2090, 28.6139], [77.2150, 28.6139],
+                [77.2150, 28.6200], [77.2090, 28.6200], [77.2090, 28.6139]
+            ],
+            "connectivity_level": "good",
+            "color_code": "#28a745",
+            "metrics": {
+                "avg_download": 85.3,
+                "avg_upload": 42.1,
+                "avg_ping": 25,
+                "reports_count": 156
+            }
+        },
+        {
+            "zone_id": "zone_002",
+            "zone_name": "Flood Affected Area",
+            "polygon_coordinates": [
+                [77.1800, 28.5800], [77.1900, 28.5800],
+                [77.1900, 28.5900], [77.1800, 28.5900], [77.1800, 28.5800]
+            ],
+            "connectivity_level": "offline",
+            "color_code": "#dc3545",
+            "metrics": {
+                "avg_download": 0.1,
+                "avg_upload": 0.05,
+                "avg_ping": 999,
+                "reports_count": 89
+            }
+        },
+        {
+            "zone_id": "zone_003",
+            "zone_name": "Suburban Residential",
+            "polygon_coordinates": [
+                [77.2500, 28.5500], [77.2600, 28.5500],
+                [77.2600, 28.5600], [77.2500, 28.5600], [77.2500, 28.5500]
+            ],
+            "connectivity_level": "fair",
+            "color_code": "#ffc107",
+            "metrics": {
+                "avg_download": 25.8,
+                "avg_upload": 12.3,
+                "avg_ping": 85,
+                "reports_count": 67
+            }
+        }
+    ]
+
 def _classify_connectivity(download: float, upload: float) -> str:
     """Classify connectivity level based on speeds."""
     avg_speed = (download + upload) / 2
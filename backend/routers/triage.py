@@ -1,8 +1,14 @@
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_models.triage_scenarios import SIMULATION_SCENARIOS, generate_helpline_messages, parse_mix
+from services.dispatch_service import get_dispatch_engine
 
 router = APIRouter()
 
@@ -26,6 +32,8 @@ class HelplineRequest(BaseModel):
     phone: Optional[str] = Field(None, description="Contact phone number")
     name: Optional[str] = Field(None, description="Person's name")
     additional_info: Optional[str] = Field(None, description="Additional context")
+    lat: Optional[float] = Field(None, ge=-90, le=90, description="Caller latitude, enables dispatch")
+    lng: Optional[float] = Field(None, ge=-180, le=180, description="Caller longitude, enables dispatch")
 
 class TriageResult(BaseModel):
     urgency_score: float = Field(..., ge=0, le=1, description="Urgency score from 0-1")
@@ -36,10 +44,42 @@ class TriageResult(BaseModel):
     location_parsed: Optional[str] = Field(None, description="Parsed location")
     medical_emergency: bool = Field(..., description="Whether this is a medical emergency")
     explanation: str = Field(..., description="Explanation of triage decision")
+    dispatch: Optional[Dict[str, Any]] = Field(None, description="Dispatch record for CRITICAL/HIGH requests with coordinates")
 
 class BatchTriageRequest(BaseModel):
     requests: List[HelplineRequest]
 
+class ResourceUnit(BaseModel):
+    unit_id: str
+    resource_type: ResourceType
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+    status: Optional[str] = Field("available", description="available, assigned or busy")
+    name: Optional[str] = None
+
+class DispatchRequest(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+    triage_level: UrgencyLevel
+    resource_required: List[ResourceType]
+    urgency_score: Optional[float] = Field(0.0, ge=0, le=1)
+    request_id: Optional[str] = None
+    max_distance_km: Optional[float] = None
+
+def _dispatch_if_urgent(request_data: HelplineRequest, result: dict) -> Optional[dict]:
+    """Dispatch CRITICAL/HIGH requests that carry coordinates."""
+    if request_data.lat is None or request_data.lng is None:
+        return None
+    if result["triage_level"] not in ("CRITICAL", "HIGH"):
+        return None
+    return get_dispatch_engine().dispatch(
+        lat=request_data.lat,
+        lng=request_data.lng,
+        triage_level=result["triage_level"],
+        resource_required=result["resource_required"],
+        urgency_score=result["urgency_score"]
+    )
+
 @router.post("/classify", response_model=TriageResult)
 async def classify_helpline_request(request_data: HelplineRequest, request: Request):
     """
@@ -65,6 +105,7 @@ async def classify_helpline_request(request_data: HelplineRequest, request: Requ
             location=request_data.location,
             additional_info=request_data.additional_info
         )
+        result["dispatch"] = _dispatch_if_urgent(request_data, result)
         
         return TriageResult(**result)
         
@@ -83,14 +124,19 @@ async def batch_classify_requests(batch_request: BatchTriageRequest, request: Re
         if not triage_model:
             raise HTTPException(status_code=503, detail="Triage model not available")
         
-        results = []
-        for req in batch_request.requests:
-            result = await triage_model.classify_request(
-                message=req.message,
-                location=req.location,
-                additional_info=req.additional_info
-            )
-            results.append(TriageResult(**result))
+        # Classify the whole batch in one call so the learned scorer can
+        # vectorize across requests
+        batch_results = await triage_model.classify_batch([
+            {
+                "message": req.message,
+                "location": req.location,
+                "additional_info": req.additional_info
+            }
+            for req in batch_request.requests
+        ])
+        for req, result in zip(batch_request.requests, batch_results):
+            result["dispatch"] = _dispatch_if_urgent(req, result)
+        results = [TriageResult(**result) for result in batch_results]
         
         # Generate batch summary
         summary = {
@@ -178,6 +224,110 @@ async def get_triage_queue(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get queue: {str(e)}")
 
+@router.post("/dispatch/units")
+async def register_resource_units(units: List[ResourceUnit]):
+    """
+    Register resource units or update their position/status.
+    """
+    try:
+        engine = get_dispatch_engine()
+        updated = [
+            engine.upsert_unit(
+                unit_id=unit.unit_id,
+                resource_type=unit.resource_type.value,
+                lat=unit.lat,
+                lng=unit.lng,
+                status=unit.status,
+                name=unit.name
+            )
+            for unit in units
+        ]
+        
+        return {
+            "units": updated,
+            "total_units": len(engine.units)
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to register units: {str(e)}")
+
+@router.post("/dispatch/units/{unit_id}/release")
+async def release_resource_unit(unit_id: str):
+    """
+    Mark a unit as free again; it is offered to the most urgent pending request.
+    """
+    try:
+        engine = get_dispatch_engine()
+        if unit_id not in engine.units:
+            raise HTTPException(status_code=404, detail="Unit not found")
+        
+        return {"unit": engine.release_unit(unit_id)}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to release unit: {str(e)}")
+
+@router.post("/dispatch/units/{unit_id}/commit")
+async def commit_resource_unit(unit_id: str):
+    """
+    Mark an assigned unit as en route so re-optimization no longer moves it.
+    """
+    try:
+        engine = get_dispatch_engine()
+        if unit_id not in engine.units:
+            raise HTTPException(status_code=404, detail="Unit not found")
+        
+        return {"unit": engine.commit_unit(unit_id)}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to commit unit: {str(e)}")
+
+@router.post("/dispatch/assign")
+async def assign_nearest_units(dispatch_request: DispatchRequest):
+    """
+    Assign the nearest free unit of each required resource type to a triaged request.
+    """
+    try:
+        record = get_dispatch_engine().dispatch(
+            lat=dispatch_request.lat,
+            lng=dispatch_request.lng,
+            triage_level=dispatch_request.triage_level.value,
+            resource_required=[r.value for r in dispatch_request.resource_required],
+            urgency_score=dispatch_request.urgency_score or 0.0,
+            request_id=dispatch_request.request_id,
+            max_km=dispatch_request.max_distance_km
+        )
+        
+        return {"dispatch": record}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Dispatch failed: {str(e)}")
+
+@router.post("/dispatch/reoptimize")
+async def reoptimize_dispatch():
+    """
+    Re-solve all uncommitted assignments together, e.g. during a surge.
+    """
+    try:
+        return get_dispatch_engine().reoptimize()
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Re-optimization failed: {str(e)}")
+
+@router.get("/dispatch/assignments")
+async def get_dispatch_assignments():
+    """
+    Get current unit assignments, pending requests and unit availability.
+    """
+    try:
+        return get_dispatch_engine().get_assignments()
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get assignments: {str(e)}")
+
 @router.get("/statistics")
 async def get_triage_statistics(request: Request):
     """
@@ -221,38 +371,7 @@ async def simulate_request(request: Request):
     Generate a simulated emergency request for testing purposes.
     """
     try:
-        import random
-        
-        # Sample emergency scenarios
-        scenarios = [
-            {
-                "message": "House is flooding rapidly, water level rising, need immediate evacuation",
-                "location": "Riverside Area",
-                "urgency": "CRITICAL"
-            },
-            {
-                "message": "Elderly person having chest pain, can't reach hospital due to blocked roads",
-                "location": "Suburb District",
-                "urgency": "CRITICAL"
-            },
-            {
-                "message": "Family of 4 without food for 2 days, local stores closed",
-                "location": "Downtown",
-                "urgency": "HIGH"
-            },
-            {
-                "message": "Internet and phone lines down in entire neighborhood",
-                "location": "Tech Park",
-                "urgency": "MEDIUM"
-            },
-            {
-                "message": "Minor injury from falling debris, need first aid supplies",
-                "location": "Construction Zone",
-                "urgency": "LOW"
-            }
-        ]
-        
-        scenario = random.choice(scenarios)
+        scenario = random.choice(SIMULATION_SCENARIOS)
         
         # Create and classify the simulated request
         simulated_request = HelplineRequest(
@@ -266,4 +385,62 @@ async def simulate_request(request: Request):
         return await classify_helpline_request(simulated_request, request)
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
+
+@router.post("/simulate/batch")
+async def simulate_request_batch(
+    request: Request,
+    count: int = 50,
+    urgency_mix: Optional[str] = None,
+    language_mix: Optional[str] = None,
+    seed: Optional[int] = None
+):
+    """
+    Generate a stream of simulated helpline messages and classify them through
+    the batch path.
+    
+    Mixes are "key=weight" lists, e.g. urgency_mix=CRITICAL=1,LOW=4 and
+    language_mix=en=6,hi=2,hinglish=2.
+    """
+    try:
+        if count < 1 or count > 1000:
+            raise HTTPException(status_code=400, detail="count must be between 1 and 1000")
+        
+        ml_models = request.app.state.ml_models
+        triage_model = ml_models.get("triage")
+        
+        if not triage_model:
+            raise HTTPException(status_code=503, detail="Triage model not available")
+        
+        messages = generate_helpline_messages(
+            count, parse_mix(urgency_mix), parse_mix(language_mix), seed
+        )
+        results = await triage_model.classify_batch(messages)
+        
+        agreement = sum(
+            1 for message, result in zip(messages, results)
+            if message["urgency"] == result["triage_level"]
+        )
+        
+        return {
+            "results": [
+                dict(result, simulated_urgency=message["urgency"], language=message["language"],
+                     message=message["message"])
+                for message, result in zip(messages, results)
+            ],
+            "summary": {
+                "total_requests": len(results),
+                "urgency_agreement": agreement / len(results),
+                "language_breakdown": {
+                    language: sum(1 for m in messages if m["language"] == language)
+                    for language in sorted(set(m["language"] for m in messages))
+                }
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch simulation failed: {str(e)}")
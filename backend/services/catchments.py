@@ -0,0 +1,480 @@
+"""
+Shelter catchments: travel time from any point to the nearest safe zone.
+
+For each travel mode a multi-source Dijkstra runs over the reversed road
+graph from every zone that is still admitting people, giving each road node
+its travel time to the closest zone and which zone that is. The node times
+are spread onto a regular raster (a straight walk to a road node within the
+access distance, then the network), so "which shelter serves this point and
+how far is it" is a single array lookup and the 5/10/20/30-minute
+isochrones are thresholds on the raster.
+
+A background worker keeps the tables current without recomputing them.
+A new zone runs a search pruned to the nodes it is closer to. Removing a
+zone, or making a road slower or closing it, invalidates only the nodes
+whose shortest-path tree ran through it and repairs them from the edge of
+the invalidated region; faster roads are repaired from their endpoints.
+Only the raster cells around changed nodes are redrawn.
+"""
+import heapq
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.geodesy import KM_PER_DEGREE, haversine_km
+from services.routing_service import PROFILES, RoadGraph, get_routing_service
+from services.safe_zones import ACCEPTING_STATUSES, SafeZoneIndex, get_safe_zone_index
+
+ISOCHRONE_MINUTES = (5, 10, 20, 30)
+
+
+def _dilate(mask: np.ndarray, reach: int) -> np.ndarray:
+    """Grow a boolean raster by reach cells in every direction (square window)."""
+    out = mask.copy()
+    for axis in (0, 1):
+        grown = out.copy()
+        for shift in range(1, reach + 1):
+            if shift >= out.shape[axis]:
+                break
+            if axis == 0:
+                grown[shift:] |= out[:-shift]
+                grown[:-shift] |= out[shift:]
+            else:
+                grown[:, shift:] |= out[:, :-shift]
+                grown[:, :-shift] |= out[:, shift:]
+        out = grown
+    return out
+
+
+class _Grid:
+    """Regular lat/lng raster over the road network's extent."""
+
+    def __init__(self, graph: RoadGraph, cell_km: float, access_km: float):
+        mid_lat = float(graph.node_lat.mean()) if graph.node_count else 0.0
+        self.cell_km = cell_km
+        self.d_lat = cell_km / KM_PER_DEGREE
+        self.d_lng = cell_km / (KM_PER_DEGREE * max(0.01, math.cos(math.radians(mid_lat))))
+        margin = access_km / cell_km
+        self.south = float(graph.node_lat.min()) - margin * self.d_lat if graph.node_count else 0.0
+        self.west = float(graph.node_lng.min()) - margin * self.d_lng if graph.node_count else 0.0
+        north = float(graph.node_lat.max()) + margin * self.d_lat if graph.node_count else 0.0
+        east = float(graph.node_lng.max()) + margin * self.d_lng if graph.node_count else 0.0
+        self.shape = (int((north - self.south) / self.d_lat) + 1, int((east - self.west) / self.d_lng) + 1)
+        # Offsets (in cells) a road node can serve through a straight access walk
+        self.reach = int(math.ceil(access_km / cell_km)) + 1
+        self.node_row = ((graph.node_lat - self.south) / self.d_lat).astype(np.int64)
+        self.node_col = ((graph.node_lng - self.west) / self.d_lng).astype(np.int64)
+        self.row_lat = self.south + (np.arange(self.shape[0]) + 0.5) * self.d_lat
+        self.col_lng = self.west + (np.arange(self.shape[1]) + 0.5) * self.d_lng
+
+    def cell(self, lat: float, lng: float) -> Optional[Tuple[int, int]]:
+        row, col = int((lat - self.south) // self.d_lat), int((lng - self.west) // self.d_lng)
+        if 0 <= row < self.shape[0] and 0 <= col < self.shape[1]:
+            return row, col
+        return None
+
+
+class _ModeTable:
+    """
+    Node travel times and raster for one travel mode.
+
+    hours[u] is the travel time from node u to its nearest zone, owner[u]
+    that zone's slot, and parent[u] the profile row u leaves by on the way,
+    which makes the parents a shortest-path forest rooted at the zones.
+    """
+
+    def __init__(self, graph: RoadGraph, mode: str, grid: _Grid, access_km: float):
+        prof = graph.profile(mode)
+        node_count = graph.node_count
+        self.mode = mode
+        self.prof = prof
+        self.grid = grid
+        self.access_km = access_km
+        self.speed = PROFILES[mode]["default_speed"]
+        self.node_lat, self.node_lng = graph.node_lat, graph.node_lng
+        self.row_tail = np.repeat(np.arange(node_count), np.diff(prof.indptr))
+        self.row_head = prof.rows[:, 0].astype(np.int64)
+
+        # Reversed adjacency: rows of (tail, hours, forward row) grouped by head
+        order = np.argsort(self.row_head, kind="stable")
+        indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.row_head, minlength=node_count), out=indptr[1:])
+        self.offsets = indptr.tolist()
+        self.costs = prof.rows[:, 1].copy()
+        self.rows = np.column_stack([self.row_tail[order], self.costs[order], order])
+        self.row_position = np.empty(len(order), dtype=np.int64)
+        self.row_position[order] = np.arange(len(order))
+
+        self.hours = np.full(node_count, np.inf)
+        self.owner = np.full(node_count, -1, dtype=np.int64)
+        self.parent = np.full(node_count, -1, dtype=np.int64)
+        self.sources: Dict[int, Tuple[int, float]] = {}  # slot -> (node, access hours)
+        self.minutes = np.full(grid.shape, np.inf, dtype=np.float32)
+        self.cell_owner = np.full(grid.shape, -1, dtype=np.int32)
+        self.candidates = np.nonzero(prof.routable)[0]
+
+    # ------------------------------------------------------------------
+    # Node times
+    # ------------------------------------------------------------------
+
+    def update(self, added: Dict[int, Tuple[int, float]], removed: List[int]) -> np.ndarray:
+        """
+        Apply zone and edge-cost changes since the last update.
+
+        Args:
+            added: slot -> (node, access hours) of new zones
+            removed: Slots of zones that no longer serve
+
+        Returns:
+            Nodes whose time or zone may have changed
+        """
+        for slot in removed:
+            self.sources.pop(slot, None)
+        self.sources.update(added)
+
+        costs = self.prof.rows[:, 1].copy()
+        changed = np.nonzero(costs != self.costs)[0]
+        slower = changed[costs[changed] > self.costs[changed]]
+        faster = changed[costs[changed] < self.costs[changed]]
+        self.costs = costs
+        self.rows[self.row_position[changed], 1] = costs[changed]
+
+        invalid = np.isin(self.owner, removed) if removed else np.zeros(len(self.hours), dtype=bool)
+        if len(slower):
+            # Everything downstream of a slower road in the forest lost its path
+            invalid |= np.isin(self.parent, slower)
+            has_parent = self.parent >= 0
+            parent_node = np.where(has_parent, self.row_head[np.maximum(self.parent, 0)], -1)
+            while True:
+                grown = invalid | (has_parent & invalid[np.maximum(parent_node, 0)])
+                if (grown == invalid).all():
+                    break
+                invalid = grown
+        invalid_nodes = np.nonzero(invalid)[0]
+        self.hours[invalid_nodes] = np.inf
+        self.owner[invalid_nodes] = -1
+        self.parent[invalid_nodes] = -1
+
+        # Re-expand valid nodes bordering the invalidated region and the far ends of faster roads
+        crossing = invalid[self.row_tail] & ~invalid[self.row_head]
+        expand = np.unique(np.concatenate([self.row_head[crossing], self.row_head[faster]]))
+        expand = expand[np.isfinite(self.hours[expand])]
+        seeds = [(node, float(self.hours[node]), int(self.owner[node])) for node in expand.tolist()]
+        seeds += [(node, access, slot) for slot, (node, access) in self.sources.items()
+                  if slot in added or invalid[node]]
+        if not seeds:
+            return invalid_nodes
+        touched = self._search(seeds)
+        return np.union1d(invalid_nodes, touched)
+
+    def _search(self, seeds: List[Tuple[int, float, int]]) -> np.ndarray:
+        """Multi-source Dijkstra over the reversed graph, pruned to nodes it improves."""
+        hours = self.hours.tolist()
+        owner = self.owner.tolist()
+        parent = self.parent.tolist()
+        rows, offsets = self.rows, self.offsets
+        heap = []
+        touched = []
+        for node, start, slot in seeds:
+            if start < hours[node]:
+                hours[node], owner[node], parent[node] = start, slot, -1
+                touched.append(node)
+            if start <= hours[node]:
+                heap.append((start, node))
+        heapq.heapify(heap)
+        while heap:
+            g, u = heapq.heappop(heap)
+            if g > hours[u]:
+                continue
+            slot = owner[u]
+            for v, cost, row in rows[offsets[u]:offsets[u + 1]].tolist():
+                candidate = g + cost
+                v = int(v)
+                if candidate < hours[v]:
+                    hours[v], owner[v], parent[v] = candidate, slot, int(row)
+                    touched.append(v)
+                    heapq.heappush(heap, (candidate, v))
+        touched = np.unique(np.asarray(touched, dtype=np.int64))
+        self.hours[touched] = np.asarray(hours)[touched]
+        self.owner[touched] = np.asarray(owner)[touched]
+        self.parent[touched] = np.asarray(parent)[touched]
+        return touched
+
+    # ------------------------------------------------------------------
+    # Raster
+    # ------------------------------------------------------------------
+
+    def draw(self, dirty_nodes: Optional[np.ndarray] = None) -> int:
+        """
+        Redraw the raster cells a set of nodes can reach (all cells if None).
+
+        A cell's time is the best over road nodes within the access distance
+        of its centre: walk to the node at the mode's default speed, then
+        the node's network time.
+
+        Returns:
+            Number of cells redrawn
+        """
+        grid = self.grid
+        reach = grid.reach
+        nodes = self.candidates
+        if dirty_nodes is None:
+            target = np.ones(grid.shape, dtype=bool)
+        else:
+            if not len(dirty_nodes):
+                return 0
+            target = np.zeros(grid.shape, dtype=bool)
+            target[grid.node_row[dirty_nodes], grid.node_col[dirty_nodes]] = True
+            target = _dilate(target, reach)
+            near = _dilate(target, reach)
+            nodes = nodes[near[grid.node_row[nodes], grid.node_col[nodes]]]
+        nodes = nodes[np.isfinite(self.hours[nodes])]
+
+        cols = grid.shape[1]
+        best = np.full(grid.shape[0] * cols, np.inf)
+        best_owner = np.full(grid.shape[0] * cols, -1, dtype=np.int64)
+        node_minutes = self.hours[nodes] * 60
+        node_owner = self.owner[nodes]
+        node_row, node_col = grid.node_row[nodes], grid.node_col[nodes]
+        # Node position relative to its cell centre in km; cells are small enough to treat as planar
+        km_lng = grid.cell_km / grid.d_lng
+        dy = (self.node_lat[nodes] - grid.row_lat[node_row]) * KM_PER_DEGREE
+        dx = (self.node_lng[nodes] - grid.col_lng[node_col]) * km_lng
+        minutes_per_km = 60.0 / self.speed
+        for d_row in range(-reach, reach + 1):
+            rows = node_row + d_row
+            row_ok = (rows >= 0) & (rows < grid.shape[0])
+            for d_col in range(-reach, reach + 1):
+                # Skip offsets no node in the cell could reach within the access distance
+                if (max(abs(d_row) - 1, 0) ** 2 + max(abs(d_col) - 1, 0) ** 2) * grid.cell_km ** 2 > self.access_km ** 2:
+                    continue
+                cells_col = node_col + d_col
+                access_km = np.hypot(d_col * grid.cell_km - dx, d_row * grid.cell_km - dy)
+                ok = row_ok & (cells_col >= 0) & (cells_col < cols) & (access_km <= self.access_km)
+                index = np.nonzero(ok)[0]
+                total = node_minutes[index] + access_km[index] * minutes_per_km
+                flat = rows[index] * cols + cells_col[index]
+                np.minimum.at(best, flat, total)
+                # The owner follows whichever node now holds the cell's best time
+                won = total == best[flat]
+                best_owner[flat[won]] = node_owner[index[won]]
+
+        mask = target.ravel()
+        self.minutes.ravel()[mask] = best[mask]
+        self.cell_owner.ravel()[mask] = best_owner[mask]
+        return int(mask.sum())
+
+
+class ShelterCatchments:
+    """
+    Per-mode travel times from every point to its nearest admitting safe zone.
+
+    Args:
+        graph: Road graph; without one every lookup returns None
+        zone_index: Safe zones to serve from
+        modes: Travel modes to precompute
+        cell_km: Raster cell size
+        access_km: Longest straight walk from a point onto the road network
+        zone_snap_km: Furthest a zone may be from the road network
+    """
+
+    def __init__(self, graph: Optional[RoadGraph], zone_index: SafeZoneIndex, modes=tuple(PROFILES),
+                 cell_km: float = 0.1, access_km: float = 0.5, zone_snap_km: float = 1.0):
+        self.graph = graph
+        self.zone_index = zone_index
+        self.modes = [mode for mode in modes if mode in PROFILES]
+        self.cell_km = cell_km
+        self.access_km = access_km
+        self.zone_snap_km = zone_snap_km
+        self.grid = _Grid(graph, cell_km, access_km) if graph is not None else None
+        self._tables: Dict[str, _ModeTable] = {}
+        self._zones: Dict[str, Tuple[float, float]] = {}  # zone id -> served location
+        self._slots: Dict[str, int] = {}
+        self._slot_ids: List[Optional[str]] = []
+        self._zone_version = -1
+        self.version = 0
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self.last_refresh: Dict = {}
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._tables)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def refresh(self) -> Dict:
+        """
+        Bring every mode up to date with the zone index and road costs.
+
+        Returns:
+            Per-mode counts of nodes repaired and cells redrawn
+        """
+        if self.graph is None:
+            return {}
+        with self._lock:
+            started = time.perf_counter()
+            added, removed = self._zone_changes()
+            report = {}
+            for mode in self.modes:
+                mode_started = time.perf_counter()
+                table = self._tables.get(mode)
+                if table is None:
+                    table = _ModeTable(self.graph, mode, self.grid, self.access_km)
+                    table.update(self._snap(mode, self._zones), [])
+                    cells = table.draw()
+                    self._tables[mode] = table
+                    touched = len(table.candidates)
+                else:
+                    dirty = table.update(self._snap(mode, added), [self._slots[z] for z in removed])
+                    cells = table.draw(dirty)
+                    touched = len(dirty)
+                report[mode] = {"nodes_updated": int(touched), "cells_redrawn": cells,
+                                "sec": round(time.perf_counter() - mode_started, 3)}
+            for zone_id in removed:
+                if zone_id not in self._zones and zone_id in self._slots:
+                    self._slot_ids[self._slots.pop(zone_id)] = None
+            if any(r["nodes_updated"] or r["cells_redrawn"] for r in report.values()):
+                self.version += 1
+            self.last_refresh = {"modes": report, "zones": len(self._zones), "version": self.version,
+                                 "sec": round(time.perf_counter() - started, 3)}
+            return self.last_refresh
+
+    def _zone_changes(self) -> Tuple[Dict[str, Tuple[float, float]], List[str]]:
+        """Zones to add and remove since the last refresh. Caller holds the lock."""
+        index = self.zone_index
+        if index.version == self._zone_version:
+            return {}, []
+        with index._lock:
+            current = {zone_id: (zone["location"]["lat"], zone["location"]["lng"])
+                       for zone_id, zone in index.zones.items() if zone.get("status") in ACCEPTING_STATUSES}
+            self._zone_version = index.version
+        # A moved zone is both removed (from its old node) and added
+        removed = [z for z, location in self._zones.items() if current.get(z) != location]
+        added = {z: location for z, location in current.items() if self._zones.get(z) != location}
+        for zone_id in removed:
+            del self._zones[zone_id]
+        self._zones.update(added)
+        return added, removed
+
+    def _slot(self, zone_id: str) -> int:
+        slot = self._slots.get(zone_id)
+        if slot is None:
+            slot = self._slots[zone_id] = len(self._slot_ids)
+            self._slot_ids.append(zone_id)
+        return slot
+
+    def _snap(self, mode: str, zones: Dict[str, Tuple[float, float]]) -> Dict[int, Tuple[int, float]]:
+        """slot -> (road node, access hours) for zones near the mode's network."""
+        sources = {}
+        speed = PROFILES[mode]["default_speed"]
+        for zone_id, (lat, lng) in zones.items():
+            slot = self._slot(zone_id)
+            match = self.graph.snap(lat, lng, mode, self.zone_snap_km)
+            if match is not None:
+                sources[slot] = (match[0], match[1] / speed)
+        return sources
+
+    def start(self, interval_sec: float = 10.0):
+        """Refresh on a background thread now, then whenever woken or every interval_sec."""
+        if self._worker is not None or self.graph is None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Shelter catchment refresh failed: {e}")
+                self._wake.wait(interval_sec)
+                self._wake.clear()
+
+        self._worker = threading.Thread(target=run, name="catchments", daemon=True)
+        self._worker.start()
+
+    def request_refresh(self):
+        """Wake the background worker after zones or road costs change."""
+        self._wake.set()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def lookup(self, lat: float, lng: float, mode: str = "walking") -> Optional[Dict]:
+        """
+        The zone serving a point and the travel time to it.
+
+        Returns:
+            {"zone_id", "mode", "travel_minutes", "isochrone_minutes",
+            "straight_line_km"}, or None when no zone is within reach or the
+            tables are not ready
+        """
+        mode = mode if mode in PROFILES else "walking"
+        table = self._tables.get(mode)
+        if table is None:
+            return None
+        cell = self.grid.cell(lat, lng)
+        if cell is None:
+            return None
+        minutes = float(table.minutes[cell])
+        slot = int(table.cell_owner[cell])
+        zone_id = self._slot_ids[slot] if 0 <= slot < len(self._slot_ids) else None
+        if not math.isfinite(minutes) or zone_id is None:
+            return None
+        zone_lat, zone_lng = self._zones.get(zone_id, (lat, lng))
+        return {
+            "zone_id": zone_id,
+            "mode": mode,
+            "travel_minutes": round(minutes, 2),
+            "isochrone_minutes": next((band for band in ISOCHRONE_MINUTES if minutes <= band), None),
+            "straight_line_km": round(haversine_km(lat, lng, zone_lat, zone_lng), 3)
+        }
+
+    def isochrone_areas(self, mode: str = "walking", zone_id: Optional[str] = None) -> Dict[int, float]:
+        """Area in km² reachable within each isochrone band, overall or for one zone's catchment."""
+        table = self._tables.get(mode)
+        if table is None:
+            return {}
+        minutes = table.minutes
+        if zone_id is not None:
+            slot = self._slots.get(zone_id, -2)
+            minutes = np.where(table.cell_owner == slot, minutes, np.inf)
+        cell_area = self.cell_km ** 2
+        return {band: round(float(np.count_nonzero(minutes <= band)) * cell_area, 3) for band in ISOCHRONE_MINUTES}
+
+    def get_stats(self) -> Dict:
+        """Raster size, zone count and per-mode coverage."""
+        if self.graph is None:
+            return {"ready": False, "graph_attached": False}
+        return {
+            "ready": self.ready,
+            "graph_attached": True,
+            "grid": {"rows": self.grid.shape[0], "cols": self.grid.shape[1], "cell_km": self.cell_km},
+            "zones": len(self._zones),
+            "coverage_km2": {mode: self.isochrone_areas(mode) for mode in self._tables},
+            "last_refresh": self.last_refresh
+        }
+
+
+# Create global instance
+shelter_catchments = None
+
+
+def get_shelter_catchments() -> ShelterCatchments:
+    """Get the global shelter catchments, creating them (and their refresh worker) on first use"""
+    global shelter_catchments
+    if shelter_catchments is None:
+        shelter_catchments = ShelterCatchments(
+            get_routing_service().graph, get_safe_zone_index(),
+            cell_km=float(os.getenv("CATCHMENT_CELL_KM", "0.1")),
+            access_km=float(os.getenv("CATCHMENT_ACCESS_KM", "0.5"))
+        )
+        shelter_catchments.start(float(os.getenv("CATCHMENT_REFRESH_SEC", "10")))
+    return shelter_catchments
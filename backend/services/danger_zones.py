@@ -0,0 +1,262 @@
+"""
+Danger-zone overlay for evacuation routing.
+
+Zone polygons are kept in an STR R-tree for area and point queries, each
+with a prepared ring so thousands of points can be tagged per call. When a
+road network is loaded, each zone is resolved once to the road edges it
+touches (edge R-tree candidates, then an exact segment/polygon test) and
+counted into a per-edge tally of zones by risk level. Critical zones close
+their edges; lower levels add to the edge's cost factor. Upserting or
+deleting a zone re-scores only its old and new edges.
+"""
+import math
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.geodesy import bounding_box
+from services.routing_service import RoadGraph, get_routing_service
+from services.spatial_index import PreparedPolygon, STRTree, segments_intersect_polygon
+
+RISK_LEVELS = ("low", "medium", "high", "critical")
+# Cost factor added per zone of each level; critical zones close the edge instead
+RISK_PENALTIES = np.array([0.25, 1.0, 4.0, 0.0])
+BLOCKING_LEVEL = RISK_LEVELS.index("critical")
+# Added factor for crossing a closed zone that the route starts or ends in
+EXIT_PENALTY = 10.0
+
+
+class DangerZoneIndex:
+    """
+    Registry of danger zones and their effect on road edges.
+
+    Args:
+        graph: Road graph whose edge factors the zones drive; zones can be
+            registered before one is attached
+    """
+
+    def __init__(self, graph: Optional[RoadGraph] = None):
+        self.graph: Optional[RoadGraph] = None
+        self.zones: Dict[str, Dict] = {}
+        self._zone_edges: Dict[str, np.ndarray] = {}
+        self._tree = STRTree()
+        self._counts: Optional[np.ndarray] = None  # (edge, risk level) -> zones
+        self.version = 0
+        self._lock = threading.RLock()
+        self.attach(graph)
+
+    def attach(self, graph: Optional[RoadGraph]):
+        """Resolve every registered zone against a (new) road graph."""
+        with self._lock:
+            if self.graph is not None and self._zone_edges:
+                self.graph.set_edge_factors(np.unique(np.concatenate(list(self._zone_edges.values()))), 1.0)
+            self.graph = graph
+            self._zone_edges = {}
+            self._counts = None
+            self.version += 1
+            if graph is None:
+                return
+            self._counts = np.zeros((graph.edge_count, len(RISK_LEVELS)), dtype=np.int16)
+            for zone_id, zone in self.zones.items():
+                edges = self._edges_in(zone)
+                self._zone_edges[zone_id] = edges
+                self._counts[edges, zone["level_index"]] += 1
+            if self._zone_edges:
+                self._rescore(np.unique(np.concatenate(list(self._zone_edges.values()))))
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def upsert_zone(self, zone: Dict) -> Dict:
+        """
+        Register a zone or replace one with the same id.
+
+        Args:
+            zone: DangerZone fields; polygon_coordinates is a [lng, lat] ring
+
+        Returns:
+            {"zone", "edges_in_zone", "affected_edges"}
+        """
+        ring = np.asarray(zone.get("polygon_coordinates") or [], dtype=np.float64)
+        if ring.ndim != 2 or ring.shape[1] < 2 or len(ring) < 3:
+            raise ValueError("polygon_coordinates must be a ring of at least three [lng, lat] points")
+        risk_level = str(zone.get("risk_level", "medium")).lower()
+        record = dict(zone)
+        record.update({
+            "risk_level": risk_level,
+            "level_index": RISK_LEVELS.index(risk_level) if risk_level in RISK_LEVELS else 1,
+            "ring": ring[:, :2],
+            "prepared": PreparedPolygon(ring[:, :2]),
+            "bbox": (float(ring[:, 0].min()), float(ring[:, 1].min()),
+                     float(ring[:, 0].max()), float(ring[:, 1].max())),
+            "last_updated": zone.get("last_updated") or datetime.utcnow()
+        })
+
+        with self._lock:
+            old_edges = self._drop(record["id"])
+            self.zones[record["id"]] = record
+            self._tree.insert(record["id"], record["bbox"])
+            new_edges = np.zeros(0, dtype=np.int64)
+            affected = old_edges
+            if self.graph is not None:
+                new_edges = self._edges_in(record)
+                self._zone_edges[record["id"]] = new_edges
+                self._counts[new_edges, record["level_index"]] += 1
+                affected = np.union1d(old_edges, new_edges)
+                self._rescore(affected)
+            self.version += 1
+            return {
+                "zone": self._public(record),
+                "edges_in_zone": len(new_edges),
+                "affected_edges": len(affected)
+            }
+
+    def delete_zone(self, zone_id: str) -> Optional[Dict]:
+        """Remove a zone and reopen its edges; returns None if it was not registered."""
+        with self._lock:
+            zone = self.zones.get(zone_id)
+            if zone is None:
+                return None
+            old_edges = self._drop(zone_id)
+            if self.graph is not None:
+                self._rescore(old_edges)
+            self.version += 1
+            return {"zone": self._public(zone), "affected_edges": len(old_edges)}
+
+    def _drop(self, zone_id: str) -> np.ndarray:
+        """Unregister a zone and take its edges out of the tally. Caller holds the lock."""
+        zone = self.zones.pop(zone_id, None)
+        self._tree.remove(zone_id)
+        edges = self._zone_edges.pop(zone_id, np.zeros(0, dtype=np.int64))
+        if zone is not None and self._counts is not None:
+            self._counts[edges, zone["level_index"]] -= 1
+        return edges
+
+    def _edges_in(self, zone: Dict) -> np.ndarray:
+        """Road edges touching a zone polygon."""
+        graph = self.graph
+        candidates = np.asarray(graph.edge_tree().search(zone["bbox"]), dtype=np.int64)
+        if not len(candidates):
+            return candidates
+        src, dst = graph.edge_src[candidates], graph.edge_dst[candidates]
+        inside = segments_intersect_polygon(graph.node_lng[src], graph.node_lat[src],
+                                            graph.node_lng[dst], graph.node_lat[dst], zone["ring"])
+        return np.sort(candidates[inside])
+
+    def _factors(self, edges: np.ndarray) -> np.ndarray:
+        counts = self._counts[edges]
+        penalty = 1.0 + counts @ RISK_PENALTIES
+        return np.where(counts[:, BLOCKING_LEVEL] > 0, math.inf, penalty)
+
+    def _rescore(self, edges: np.ndarray):
+        if len(edges):
+            self.graph.set_edge_factors(edges, self._factors(edges))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def zones_containing(self, lat: float, lng: float) -> List[Dict]:
+        """Zones whose polygon contains a point."""
+        with self._lock:
+            return [self._public(self.zones[zone_id]) for zone_id in self._tree.search((lng, lat, lng, lat))
+                    if self.zones[zone_id]["prepared"].contains([lng], [lat])[0]]
+
+    def containing(self, lats, lngs) -> List[List[str]]:
+        """
+        Ids of the zones containing each of many points, highest risk first.
+
+        Points are sorted by longitude once; each zone whose box meets the
+        batch's box takes the slice of points within its longitude span,
+        filters it by latitude and runs its prepared crossing test on the rest.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        found: List[List[str]] = [[] for _ in range(len(lats))]
+        if not len(lats):
+            return found
+        order = np.argsort(lngs, kind="stable")
+        sorted_lngs = lngs[order]
+        with self._lock:
+            zone_ids = self._tree.search((float(lngs.min()), float(lats.min()), float(lngs.max()), float(lats.max())))
+            zone_ids.sort(key=lambda zone_id: (-self.zones[zone_id]["level_index"], zone_id))
+            for zone_id in zone_ids:
+                zone = self.zones[zone_id]
+                west, south, east, north = zone["bbox"]
+                points = order[np.searchsorted(sorted_lngs, west, "left"):np.searchsorted(sorted_lngs, east, "right")]
+                points = points[(lats[points] >= south) & (lats[points] <= north)]
+                for i in points[zone["prepared"].contains(lngs[points], lats[points])].tolist():
+                    found[i].append(zone_id)
+        return found
+
+    def zones_near(self, lat: float, lng: float, radius_km: float) -> List[Dict]:
+        """Zones whose bounding box comes within radius_km of a point."""
+        box = bounding_box(lat, lng, radius_km)
+        if box["west"] <= box["east"]:
+            boxes = [(box["west"], box["south"], box["east"], box["north"])]
+        else:
+            boxes = [(box["west"], box["south"], 180.0, box["north"]), (-180.0, box["south"], box["east"], box["north"])]
+        return self.zones_in_boxes(boxes)
+
+    def zones_in_boxes(self, boxes: List[Tuple[float, float, float, float]]) -> List[Dict]:
+        """Zones whose bounding box overlaps any (west, south, east, north) box."""
+        with self._lock:
+            found = {zone_id for query in boxes for zone_id in self._tree.search(query)}
+            return [self._public(self.zones[zone_id]) for zone_id in sorted(found)]
+
+    def zones_on_route(self, edge_ids: List[int]) -> List[Dict]:
+        """Zones whose edges a route uses."""
+        if not edge_ids:
+            return []
+        with self._lock:
+            return [self._public(self.zones[zone_id]) for zone_id, edges in self._zone_edges.items()
+                    if np.isin(edges, edge_ids, assume_unique=True).any()]
+
+    def exit_overrides(self, points: List[Tuple[float, float]]) -> Dict[int, float]:
+        """
+        Per-query factors that reopen closed zones containing the given points.
+
+        A route that starts (or ends) inside a critical zone must be able to
+        leave (or reach) it; its edges are opened at a steep extra cost unless
+        another closed zone also covers them.
+        """
+        with self._lock:
+            if self.graph is None:
+                return {}
+            exempt = {zone["id"] for lat, lng in points for zone in self.zones_containing(lat, lng)
+                      if self.zones[zone["id"]]["level_index"] == BLOCKING_LEVEL}
+            if not exempt:
+                return {}
+            edges, exempt_counts = np.unique(np.concatenate([self._zone_edges[z] for z in exempt]), return_counts=True)
+            counts = self._counts[edges]
+            reopen = counts[:, BLOCKING_LEVEL] == exempt_counts
+            factors = 1.0 + counts[reopen] @ RISK_PENALTIES + EXIT_PENALTY
+            return dict(zip(edges[reopen].tolist(), factors.tolist()))
+
+    @staticmethod
+    def _public(zone: Dict) -> Dict:
+        return {k: v for k, v in zone.items() if k not in ("ring", "prepared", "bbox", "level_index")}
+
+    def get_stats(self) -> Dict:
+        """Zone count and the number of closed and penalized edges."""
+        with self._lock:
+            stats = {"zones": len(self.zones), "graph_attached": self.graph is not None}
+            if self._counts is not None:
+                stats["blocked_edges"] = int(np.count_nonzero(self._counts[:, BLOCKING_LEVEL]))
+                stats["penalized_edges"] = int(np.count_nonzero(self._counts[:, :BLOCKING_LEVEL].any(axis=1)))
+            return stats
+
+
+# Create global instance
+danger_zone_index = None
+
+
+def get_danger_zone_index() -> DangerZoneIndex:
+    """Get the global danger zone index, creating it on first use"""
+    global danger_zone_index
+    if danger_zone_index is None:
+        danger_zone_index = DangerZoneIndex(get_routing_service().graph)
+    return danger_zone_index
@@ -0,0 +1,333 @@
+"""
+Nearest-resource dispatch for triaged helpline requests.
+
+Resource units are kept in one spherical k-d tree per resource type, so an
+incoming CRITICAL/HIGH request is matched to the nearest free unit of each
+required type in O(log n). During surges, reoptimize() re-solves all
+outstanding matches together so early greedy choices do not strand later,
+more urgent requests.
+"""
+import itertools
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.spatial_index import SphericalKDTree, _to_unit_vectors, chord_to_km
+
+DISPATCHABLE_LEVELS = ("CRITICAL", "HIGH")
+LEVEL_PRIORITY = {"CRITICAL": 2, "HIGH": 1}
+
+
+class DispatchEngine:
+    """
+    Matches urgent requests to the nearest free resource unit.
+
+    Unit status is "available", "assigned" (matched but may still be
+    re-optimized) or "busy" (committed, e.g. on scene). Requests that cannot
+    be served immediately wait in a pending queue and are matched as units
+    are released.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.units: Dict[str, Dict] = {}
+        self.requests: Dict[str, Dict] = {}
+        self.assignments: Dict[str, Dict] = {}  # unit_id -> assignment
+        self._trees: Dict[str, SphericalKDTree] = {}
+        self._request_ids = itertools.count(1)
+
+    # ------------------------------------------------------------------
+    # Units
+    # ------------------------------------------------------------------
+
+    def upsert_unit(self, unit_id: str, resource_type: str, lat: float, lng: float,
+                    status: str = "available", name: Optional[str] = None) -> Dict:
+        """Register a resource unit or update its position/status."""
+        with self._lock:
+            existing = self.units.get(unit_id)
+            if existing and existing["resource_type"] != resource_type:
+                self._trees[existing["resource_type"]].remove(unit_id)
+
+            unit = existing or {"unit_id": unit_id, "assigned_request": None}
+            unit.update({
+                "resource_type": resource_type,
+                "name": name or unit.get("name") or unit_id,
+                "location": {"lat": lat, "lng": lng},
+                "status": status if not unit.get("assigned_request") else unit["status"],
+                "last_updated": datetime.utcnow().isoformat()
+            })
+            self.units[unit_id] = unit
+            self._trees.setdefault(resource_type, SphericalKDTree()).insert(unit_id, lat, lng)
+
+            if unit["status"] == "available":
+                self._serve_pending(unit_id)
+            return unit
+
+    def release_unit(self, unit_id: str) -> Dict:
+        """Mark a unit free again and complete its assignment."""
+        with self._lock:
+            unit = self.units[unit_id]
+            assignment = self.assignments.pop(unit_id, None)
+            if assignment:
+                request = self.requests.get(assignment["request_id"])
+                if request:
+                    request["assigned_units"].pop(unit["resource_type"], None)
+                    if not request["assigned_units"] and not request["missing_resources"]:
+                        request["status"] = "completed"
+            unit["status"] = "available"
+            unit["assigned_request"] = None
+            self._serve_pending(unit_id)
+            return unit
+
+    def commit_unit(self, unit_id: str) -> Dict:
+        """Lock a unit's current assignment so re-optimization leaves it alone."""
+        with self._lock:
+            unit = self.units[unit_id]
+            if unit["status"] == "assigned":
+                unit["status"] = "busy"
+            return unit
+
+    def _is_free(self, unit_id: str) -> bool:
+        return self.units[unit_id]["status"] == "available"
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def dispatch(self, lat: float, lng: float, triage_level: str, resource_required: List[str],
+                 urgency_score: float = 0.0, request_id: Optional[str] = None,
+                 max_km: Optional[float] = None) -> Dict:
+        """
+        Assign the nearest free unit of each required resource type.
+
+        Only CRITICAL/HIGH requests are dispatched; other levels are returned
+        with status "not_dispatched".
+
+        Returns:
+            The request record, including its assigned units
+        """
+        level = str(getattr(triage_level, "value", triage_level))
+        resources = [str(getattr(r, "value", r)) for r in resource_required]
+        request_id = request_id or f"req_{next(self._request_ids)}"
+
+        record = {
+            "request_id": request_id,
+            "location": {"lat": lat, "lng": lng},
+            "triage_level": level,
+            "urgency_score": urgency_score,
+            "resource_required": resources,
+            "assigned_units": {},
+            "missing_resources": [],
+            "max_km": max_km,
+            "status": "not_dispatched",
+            "created_at": datetime.utcnow().isoformat()
+        }
+        if level not in DISPATCHABLE_LEVELS:
+            return record
+
+        with self._lock:
+            self.requests[request_id] = record
+            for resource_type in resources:
+                tree = self._trees.get(resource_type)
+                match = tree.nearest(lat, lng, k=1, max_km=max_km, predicate=self._is_free) if tree else []
+                if match:
+                    unit_id, distance_km = match[0]
+                    self._assign(unit_id, record, distance_km)
+                else:
+                    record["missing_resources"].append(resource_type)
+            record["status"] = "pending" if record["missing_resources"] else "assigned"
+            return record
+
+    def _assign(self, unit_id: str, request: Dict, distance_km: float):
+        unit = self.units[unit_id]
+        unit["status"] = "assigned"
+        unit["assigned_request"] = request["request_id"]
+        request["assigned_units"][unit["resource_type"]] = unit_id
+        self.assignments[unit_id] = {
+            "unit_id": unit_id,
+            "request_id": request["request_id"],
+            "resource_type": unit["resource_type"],
+            "triage_level": request["triage_level"],
+            "distance_km": round(distance_km, 3),
+            "assigned_at": datetime.utcnow().isoformat()
+        }
+
+    def _unassign(self, unit_id: str):
+        unit = self.units[unit_id]
+        assignment = self.assignments.pop(unit_id, None)
+        if assignment:
+            request = self.requests[assignment["request_id"]]
+            request["assigned_units"].pop(unit["resource_type"], None)
+        unit["status"] = "available"
+        unit["assigned_request"] = None
+
+    @staticmethod
+    def _priority_key(request: Dict):
+        return (-LEVEL_PRIORITY.get(request["triage_level"], 0),
+                -request["urgency_score"], request["created_at"])
+
+    def _serve_pending(self, unit_id: str):
+        """Offer a newly free unit to the most urgent pending request that needs it and is in range."""
+        unit = self.units[unit_id]
+        resource_type = unit["resource_type"]
+        waiting = [
+            r for r in self.requests.values()
+            if r["status"] == "pending" and resource_type in r["missing_resources"]
+        ]
+        if not waiting:
+            return
+
+        unit_vector = _to_unit_vectors(unit["location"]["lat"], unit["location"]["lng"])
+        for request in sorted(waiting, key=self._priority_key):
+            distance_km = chord_to_km(float(np.linalg.norm(
+                unit_vector - _to_unit_vectors(request["location"]["lat"], request["location"]["lng"]))))
+            if request["max_km"] is not None and distance_km > request["max_km"]:
+                continue
+
+            self._assign(unit_id, request, distance_km)
+            request["missing_resources"].remove(resource_type)
+            if not request["missing_resources"]:
+                request["status"] = "assigned"
+            return
+
+    # ------------------------------------------------------------------
+    # Batch re-optimization
+    # ------------------------------------------------------------------
+
+    def reoptimize(self) -> Dict:
+        """
+        Re-solve all uncommitted matches together.
+
+        For each resource type, open requests are matched in priority order
+        (CRITICAL before HIGH, then by urgency) against available and
+        not-yet-committed units; within a priority tier, pairwise swaps are
+        then applied while they reduce total travel distance.
+
+        Returns:
+            Summary of the re-optimization
+        """
+        with self._lock:
+            before = sum(a["distance_km"] for a in self.assignments.values())
+            changed = 0
+
+            for resource_type in list(self._trees.keys()):
+                requests = [
+                    r for r in self.requests.values()
+                    if r["status"] in ("pending", "assigned") and resource_type in r["resource_required"]
+                    and not self._is_committed(r, resource_type)
+                ]
+                unit_ids = [
+                    u_id for u_id, u in self.units.items()
+                    if u["resource_type"] == resource_type and u["status"] in ("available", "assigned")
+                ]
+                if not requests or not unit_ids:
+                    continue
+
+                previous = {r["request_id"]: r["assigned_units"].get(resource_type) for r in requests}
+                for unit_id in unit_ids:
+                    if self.units[unit_id]["status"] == "assigned":
+                        self._unassign(unit_id)
+
+                matches = self._solve(requests, unit_ids)
+                for request in requests:
+                    if resource_type in request["missing_resources"]:
+                        request["missing_resources"].remove(resource_type)
+                    unit_index = matches.get(request["request_id"])
+                    if unit_index is None:
+                        request["missing_resources"].append(resource_type)
+                    else:
+                        unit_id, distance_km = unit_index
+                        self._assign(unit_id, request, distance_km)
+                    if previous[request["request_id"]] != request["assigned_units"].get(resource_type):
+                        changed += 1
+
+            for request in self.requests.values():
+                if request["status"] in ("pending", "assigned"):
+                    request["status"] = "pending" if request["missing_resources"] else "assigned"
+
+            after = sum(a["distance_km"] for a in self.assignments.values())
+            return {
+                "reassigned": changed,
+                "total_distance_km_before": round(before, 3),
+                "total_distance_km_after": round(after, 3),
+                "pending_requests": sum(1 for r in self.requests.values() if r["status"] == "pending")
+            }
+
+    def _is_committed(self, request: Dict, resource_type: str) -> bool:
+        unit_id = request["assigned_units"].get(resource_type)
+        return unit_id is not None and self.units[unit_id]["status"] == "busy"
+
+    def _solve(self, requests: List[Dict], unit_ids: List[str]) -> Dict[str, tuple]:
+        """Priority-ordered greedy matching followed by 2-opt swaps within each tier."""
+        requests = sorted(requests, key=self._priority_key)
+        req_xyz = _to_unit_vectors([r["location"]["lat"] for r in requests],
+                                   [r["location"]["lng"] for r in requests])
+        unit_xyz = _to_unit_vectors([self.units[u]["location"]["lat"] for u in unit_ids],
+                                    [self.units[u]["location"]["lng"] for u in unit_ids])
+        # Chord distances are monotonic in great-circle distance
+        chords = np.linalg.norm(req_xyz[:, None, :] - unit_xyz[None, :, :], axis=2)
+        for i, request in enumerate(requests):
+            if request["max_km"] is not None:
+                limit = 2 * np.sin(request["max_km"] / 6371.0 / 2)
+                chords[i, chords[i] > limit] = np.inf
+
+        taken = np.zeros(len(unit_ids), dtype=bool)
+        chosen: Dict[int, int] = {}
+        for i in range(len(requests)):
+            row = np.where(taken, np.inf, chords[i])
+            j = int(np.argmin(row))
+            if np.isfinite(row[j]):
+                chosen[i] = j
+                taken[j] = True
+
+        improved = True
+        while improved:
+            improved = False
+            matched = list(chosen.items())
+            for a in range(len(matched)):
+                for b in range(a + 1, len(matched)):
+                    (i, ui), (k, uk) = matched[a], matched[b]
+                    if self._priority_key(requests[i])[0] != self._priority_key(requests[k])[0]:
+                        continue
+                    if chords[i, uk] + chords[k, ui] < chords[i, ui] + chords[k, uk] - 1e-12:
+                        chosen[i], chosen[k] = uk, ui
+                        matched[a], matched[b] = (i, uk), (k, ui)
+                        improved = True
+
+        return {
+            requests[i]["request_id"]: (unit_ids[j], chord_to_km(float(chords[i, j])))
+            for i, j in chosen.items()
+        }
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def get_assignments(self) -> Dict:
+        """Snapshot of current assignments, pending requests and unit availability."""
+        with self._lock:
+            availability: Dict[str, Dict[str, int]] = {}
+            for unit in self.units.values():
+                counts = availability.setdefault(unit["resource_type"], {"available": 0, "assigned": 0, "busy": 0})
+                counts[unit["status"]] = counts.get(unit["status"], 0) + 1
+
+            return {
+                "assignments": list(self.assignments.values()),
+                "pending_requests": [r for r in self.requests.values() if r["status"] == "pending"],
+                "unit_availability": availability,
+                "total_units": len(self.units)
+            }
+
+
+# Create global instance
+dispatch_engine = None
+
+
+def get_dispatch_engine() -> DispatchEngine:
+    """Get the global dispatch engine, creating it on first use"""
+    global dispatch_engine
+    if dispatch_engine is None:
+        dispatch_engine = DispatchEngine()
+    return dispatch_engine
@@ -0,0 +1,295 @@
+"""
+Digital elevation model for terrain-aware routing.
+
+The raster is memory-mapped rather than read: a .npy grid (with its
+georeferencing in a .json sidecar) through np.load(mmap_mode="r"), or an
+uncompressed GeoTIFF whose strips or tiles are laid out contiguously, which
+covers what gdal_translate writes by default. Sampling is plain index
+arithmetic over the mapped array, so only the pages under the queried
+points are ever read and millions of points can be sampled at once.
+Compressed GeoTIFFs need rasterio (pip install rasterio) and are read into
+memory instead.
+
+Rasters are expected in geographic coordinates (EPSG:4326) with heights in
+metres.
+"""
+import json
+import math
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# TIFF tags read from the first image directory
+_TIFF_TAGS = {
+    256: "width", 257: "height", 258: "bits_per_sample", 259: "compression", 273: "strip_offsets",
+    277: "samples_per_pixel", 279: "strip_byte_counts", 322: "tile_width", 323: "tile_length",
+    324: "tile_offsets", 325: "tile_byte_counts", 339: "sample_format",
+    33550: "pixel_scale", 33922: "tiepoint", 34735: "geokeys", 42113: "nodata"
+}
+# TIFF field type -> struct format of one value
+_TIFF_TYPES = {1: "B", 2: "s", 3: "H", 4: "I", 6: "b", 8: "h", 9: "i", 11: "f", 12: "d", 16: "Q"}
+# (SampleFormat, bits) -> dtype kind and size
+_SAMPLE_DTYPES = {(1, 8): "u1", (1, 16): "u2", (1, 32): "u4", (2, 8): "i1", (2, 16): "i2", (2, 32): "i4",
+                  (3, 32): "f4", (3, 64): "f8"}
+# GTModelTypeGeoKey value of geographic (lat/lng) rasters
+_MODEL_GEOGRAPHIC = 2
+
+
+def tobler_speed_kmh(grade) -> np.ndarray:
+    """Walking speed on a slope (rise over run) by Tobler's hiking function; fastest slightly downhill."""
+    return 6.0 * np.exp(-3.5 * np.abs(np.asarray(grade, dtype=np.float64) + 0.05))
+
+
+class ElevationModel:
+    """
+    A north-up elevation raster.
+
+    Args:
+        data: 2-D heights, row 0 along the north edge; a memory map is kept as is
+        west: Longitude of the raster's west edge
+        north: Latitude of the raster's north edge
+        d_lng: Cell width in degrees
+        d_lat: Cell height in degrees
+        nodata: Height marking missing cells
+        tile_shape: (rows, cols) per tile when data holds tiles as
+            (tile rows, tile cols, rows, cols) instead of one 2-D grid
+        shape: (rows, cols) of the raster when tiles pad it out
+        source: Path the raster was loaded from
+    """
+
+    def __init__(self, data: np.ndarray, west: float, north: float, d_lng: float, d_lat: float,
+                 nodata: Optional[float] = None, tile_shape: Optional[Tuple[int, int]] = None,
+                 shape: Optional[Tuple[int, int]] = None, source: Optional[str] = None):
+        self.data = data
+        self.west = west
+        self.north = north
+        self.d_lng = d_lng
+        self.d_lat = d_lat
+        self.nodata = nodata
+        self.tile_shape = tile_shape
+        self.shape = shape or data.shape[:2]
+        self.source = source
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: str) -> "ElevationModel":
+        """Open a DEM, picking the reader from the file extension."""
+        if path.lower().endswith(".npy"):
+            return cls.from_npy(path)
+        return cls.from_geotiff(path)
+
+    @classmethod
+    def from_npy(cls, path: str, transform: Optional[Dict] = None) -> "ElevationModel":
+        """
+        Memory-map a .npy height grid.
+
+        Args:
+            transform: {"west", "north", "d_lng", "d_lat", "nodata"}; read from
+                the .json file next to the grid when not given
+        """
+        if transform is None:
+            with open(os.path.splitext(path)[0] + ".json", "r", encoding="utf-8") as f:
+                transform = json.load(f)
+        data = np.load(path, mmap_mode="r")
+        if data.ndim != 2:
+            raise ValueError(f"{path}: expected a 2-D height grid, got shape {data.shape}")
+        return cls(data, float(transform["west"]), float(transform["north"]), float(transform["d_lng"]),
+                   float(transform["d_lat"]), transform.get("nodata"), source=path)
+
+    def save_npy(self, path: str):
+        """Write the grid as .npy plus its .json georeferencing, the fastest format to map."""
+        np.save(path, self.grid())
+        with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+            json.dump({"west": self.west, "north": self.north, "d_lng": self.d_lng, "d_lat": self.d_lat,
+                       "nodata": self.nodata}, f)
+
+    @classmethod
+    def from_geotiff(cls, path: str) -> "ElevationModel":
+        """Memory-map the first band of an uncompressed GeoTIFF; compressed files need rasterio."""
+        with open(path, "rb") as f:
+            tags, order = _read_tiff_tags(f)
+        scale, tiepoint = tags.get("pixel_scale"), tags.get("tiepoint")
+        if not scale or not tiepoint:
+            raise ValueError(f"{path}: not a GeoTIFF (no pixel scale or tiepoint)")
+        geokeys = tags.get("geokeys") or ()
+        for i in range(4, len(geokeys) - 3, 4):
+            if geokeys[i] == 1024 and geokeys[i + 3] != _MODEL_GEOGRAPHIC:
+                raise ValueError(f"{path}: DEM must be in geographic coordinates (EPSG:4326); reproject it first")
+        d_lng, d_lat = float(scale[0]), float(scale[1])
+        west = float(tiepoint[3]) - float(tiepoint[0]) * d_lng
+        north = float(tiepoint[4]) + float(tiepoint[1]) * d_lat
+        nodata = tags.get("nodata")
+        nodata = float(nodata.strip("\x00 ")) if nodata else None
+        height, width = int(tags["height"]), int(tags["width"])
+
+        if tags.get("compression", 1) != 1:
+            try:
+                import rasterio
+            except ImportError as e:
+                raise ImportError("Compressed GeoTIFF DEMs require rasterio (pip install rasterio)") from e
+            with rasterio.open(path) as raster:
+                return cls(raster.read(1), west, north, d_lng, d_lat, nodata, source=path)
+
+        bits = tags.get("bits_per_sample", 8)
+        bits = bits[0] if isinstance(bits, tuple) else bits
+        kind = _SAMPLE_DTYPES.get((tags.get("sample_format", 1), bits))
+        if kind is None:
+            raise ValueError(f"{path}: unsupported sample type")
+        dtype = np.dtype(order + kind)
+        if "tile_offsets" in tags:
+            offsets, counts = tags["tile_offsets"], tags["tile_byte_counts"]
+            tile_shape = (int(tags["tile_length"]), int(tags["tile_width"]))
+            layout = (math.ceil(height / tile_shape[0]), math.ceil(width / tile_shape[1])) + tile_shape
+        else:
+            offsets, counts = tags["strip_offsets"], tags["strip_byte_counts"]
+            tile_shape = None
+            layout = (height, width)
+        offsets = offsets if isinstance(offsets, tuple) else (offsets,)
+        counts = counts if isinstance(counts, tuple) else (counts,)
+        contiguous = all(offsets[i] + counts[i] == offsets[i + 1] for i in range(len(offsets) - 1))
+        if not contiguous or tags.get("samples_per_pixel", 1) != 1:
+            raise ValueError(f"{path}: only single-band GeoTIFFs stored contiguously can be memory-mapped; "
+                             "rewrite it with gdal_translate or save it as .npy")
+        data = np.memmap(path, dtype=dtype, mode="r", offset=offsets[0], shape=layout)
+        return cls(data, west, north, d_lng, d_lat, nodata, tile_shape, (height, width), source=path)
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def grid(self) -> np.ndarray:
+        """The whole raster as one 2-D array (copied out of the tiles when tiled)."""
+        if self.tile_shape is None:
+            return np.asarray(self.data)
+        rows, cols, tile_rows, tile_cols = self.data.shape
+        whole = np.asarray(self.data).transpose(0, 2, 1, 3).reshape(rows * tile_rows, cols * tile_cols)
+        return whole[:self.shape[0], :self.shape[1]]
+
+    def _cells(self, row: np.ndarray, col: np.ndarray) -> np.ndarray:
+        """Heights at integer cells (already clipped to the raster); NaN for nodata."""
+        if self.tile_shape is None:
+            values = self.data[row, col]
+        else:
+            tile_rows, tile_cols = self.tile_shape
+            values = self.data[row // tile_rows, col // tile_cols, row % tile_rows, col % tile_cols]
+        values = values.astype(np.float64)
+        if self.nodata is not None:
+            values[values == self.nodata] = np.nan
+        return values
+
+    def sample(self, lats, lngs, bilinear: bool = True) -> np.ndarray:
+        """
+        Heights at many points; NaN outside the raster or over missing cells.
+
+        Bilinear interpolation between the four surrounding cell centres, or
+        the containing cell when bilinear is False.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        rows, cols = self.shape
+        y = (self.north - lats) / self.d_lat
+        x = (lngs - self.west) / self.d_lng
+        inside = (y >= 0) & (y < rows) & (x >= 0) & (x < cols)
+        out = np.full(lats.shape, np.nan)
+        if not inside.any():
+            return out
+        y, x = y[inside], x[inside]
+        if not bilinear:
+            out[inside] = self._cells(y.astype(np.int64), x.astype(np.int64))
+            return out
+        # Offsets from the cell centre above-left of each point
+        y, x = np.clip(y - 0.5, 0, rows - 1), np.clip(x - 0.5, 0, cols - 1)
+        row, col = np.minimum(y.astype(np.int64), rows - 2).clip(0), np.minimum(x.astype(np.int64), cols - 2).clip(0)
+        fy, fx = np.clip(y - row, 0, 1), np.clip(x - col, 0, 1)
+        row1, col1 = np.minimum(row + 1, rows - 1), np.minimum(col + 1, cols - 1)
+        top = self._cells(row, col) * (1 - fx) + self._cells(row, col1) * fx
+        bottom = self._cells(row1, col) * (1 - fx) + self._cells(row1, col1) * fx
+        out[inside] = top * (1 - fy) + bottom * fy
+        return out
+
+    def profile_segments(self, lat_a, lng_a, lat_b, lng_b, length_km, sample_m: float = 30.0) -> Dict[str, np.ndarray]:
+        """
+        Terrain along many straight segments, sampled every sample_m metres.
+
+        Returns:
+            {"low_m": lowest height, "climb_m": total ascent from a to b,
+            "walk_factor": walking time over time on the flat (Tobler)};
+            segments off the raster get NaN heights and a factor of 1
+        """
+        lat_a, lng_a, lat_b, lng_b, length_km = (np.asarray(v, dtype=np.float64)
+                                                 for v in (lat_a, lng_a, lat_b, lng_b, length_km))
+        count = len(lat_a)
+        pieces = np.maximum(np.ceil(length_km * 1000 / sample_m).astype(np.int64), 1)
+        points = pieces + 1
+        start = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(points, out=start[1:])
+        segment = np.repeat(np.arange(count), points)
+        t = (np.arange(start[-1]) - start[segment]) / pieces[segment]
+        heights = self.sample(lat_a[segment] + (lat_b - lat_a)[segment] * t,
+                              lng_a[segment] + (lng_b - lng_a)[segment] * t)
+
+        low = np.fmin.reduceat(heights, start[:-1]) if count else np.zeros(0)
+        # Rise over each piece; the piece that would span two segments is dropped
+        rise = np.diff(heights)
+        rise[start[1:-1] - 1] = 0.0
+        piece_segment = segment[:-1]
+        run_m = (length_km * 1000 / pieces)[piece_segment]
+        valid = np.isfinite(rise)
+        climb = np.bincount(piece_segment[valid], weights=np.maximum(rise[valid], 0), minlength=count)
+        flat_speed = float(tobler_speed_kmh(0.0))
+        slow = np.where(valid, flat_speed / tobler_speed_kmh(np.where(valid, rise, 0.0) / np.maximum(run_m, 1e-9)), 1.0)
+        slow[start[1:-1] - 1] = 0.0
+        walk_factor = np.bincount(piece_segment, weights=slow, minlength=count) / pieces
+        return {"low_m": low, "climb_m": climb, "walk_factor": walk_factor}
+
+    def get_stats(self) -> Dict:
+        """Extent and resolution."""
+        rows, cols = self.shape
+        return {
+            "source": self.source,
+            "rows": rows,
+            "cols": cols,
+            "bounds": {"west": self.west, "north": self.north, "east": self.west + cols * self.d_lng,
+                       "south": self.north - rows * self.d_lat},
+            "cell_deg": [self.d_lng, self.d_lat],
+            "memory_mapped": isinstance(self.data, np.memmap),
+            "tiled": self.tile_shape is not None
+        }
+
+
+def _read_tiff_tags(f) -> Tuple[Dict, str]:
+    """Tags of the first image directory of a classic (not Big) TIFF, and its byte order."""
+    header = f.read(8)
+    order = {b"II": "<", b"MM": ">"}.get(header[:2])
+    if order is None or struct.unpack(order + "H", header[2:4])[0] != 42:
+        raise ValueError("not a classic TIFF file")
+    (ifd,) = struct.unpack(order + "I", header[4:8])
+    f.seek(ifd)
+    (entries,) = struct.unpack(order + "H", f.read(2))
+    raw = f.read(12 * entries)
+    tags = {}
+    for i in range(entries):
+        tag, field_type, count = struct.unpack(order + "HHI", raw[12 * i:12 * i + 8])
+        name = _TIFF_TAGS.get(tag)
+        fmt = _TIFF_TYPES.get(field_type)
+        if name is None or fmt is None:
+            continue
+        size = struct.calcsize(fmt) * count
+        value = raw[12 * i + 8:12 * i + 12]
+        if size > 4:
+            (offset,) = struct.unpack(order + "I", value)
+            here = f.tell()
+            f.seek(offset)
+            value = f.read(size)
+            f.seek(here)
+        if fmt == "s":
+            tags[name] = value[:count].decode("ascii", "replace")
+            continue
+        values = struct.unpack(order + fmt * count, value[:size])
+        tags[name] = values[0] if count == 1 else values
+    return tags, order
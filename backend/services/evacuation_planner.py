@@ -0,0 +1,488 @@
+"""
+Capacity-aware evacuation planning.
+
+Given how many people are in each cell of an area and how many places each
+shelter has left, people are assigned to shelters so that none is overfilled
+and total travel time stays low. This is a transportation problem, solved
+with an auction: shelters carry prices in minutes, cells bid for the
+shelter with the lowest travel time plus price, and a shelter that gets
+more bids than places keeps the highest and raises its price. Cells may be
+split across shelters. People with no shelter in reach, or for whom there
+is no room, are reported as unassigned.
+
+Each cell only considers its nearest few shelters. Travel times come from
+searches over the reversed road graph, one per shelter, that are resumed
+when farther cells are asked for and kept until the shelter moves or road
+costs change; without a road network a straight-line estimate is used.
+Prices and places are kept between solves, so when only occupancy changes
+the costs are reused and only the places that no longer fit are auctioned.
+"""
+import heapq
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.geodesy import distance_matrix, haversine_km
+from services.routing_service import PROFILES, RoadGraph, get_routing_service
+from services.safe_zones import ACCEPTING_STATUSES, SafeZoneIndex, get_safe_zone_index
+
+# Road distance over straight-line distance assumed when there is no road network
+DETOUR_FACTOR = 1.3
+# Cell positions whose road snap is remembered, least recently used dropped first
+SNAP_CACHE_SIZE = 200000
+
+
+class _ShelterSearch:
+    """Dijkstra outward from one shelter over reversed edges, resumed on demand."""
+
+    def __init__(self, node: int, offsets: List[int], rows: np.ndarray, horizon_hours: float):
+        self.offsets = offsets
+        self.rows = rows
+        self.horizon = horizon_hours
+        self.best = {node: 0.0}
+        self.settled: Dict[int, float] = {}
+        self.heap = [(0.0, node)]
+
+    def hours(self, targets: np.ndarray) -> np.ndarray:
+        """Travel hours from each target node to the shelter; inf beyond the horizon."""
+        pending = {t for t in targets.tolist() if t not in self.settled}
+        heap, best, settled, offsets, rows = self.heap, self.best, self.settled, self.offsets, self.rows
+        while pending and heap:
+            g, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            if g > self.horizon:
+                heapq.heappush(heap, (g, u))
+                break
+            settled[u] = g
+            pending.discard(u)
+            for v, cost, _ in rows[offsets[u]:offsets[u + 1]].tolist():
+                candidate = g + cost
+                if candidate < best.get(v, math.inf):
+                    v = int(v)
+                    best[v] = candidate
+                    heapq.heappush(heap, (candidate, v))
+        return np.array([settled.get(t, math.inf) for t in targets.tolist()], dtype=np.float64)
+
+
+class _Holdings:
+    """Places won in an auction: parallel arrays of cell, candidate slot, people and winning bid."""
+
+    def __init__(self, cell=None, slot=None, people=None, bid=None):
+        self.cell = np.zeros(0, dtype=np.int64) if cell is None else cell
+        self.slot = np.zeros(0, dtype=np.int64) if slot is None else slot
+        self.people = np.zeros(0, dtype=np.int64) if people is None else people
+        self.bid = np.zeros(0) if bid is None else bid
+
+    def select(self, mask: np.ndarray) -> "_Holdings":
+        return _Holdings(self.cell[mask], self.slot[mask], self.people[mask], self.bid[mask])
+
+    def load(self, candidates: np.ndarray, shelters: int) -> np.ndarray:
+        return np.bincount(candidates[self.cell, self.slot], weights=self.people, minlength=shelters).astype(np.int64)
+
+
+def _settle(entries: _Holdings, candidates: np.ndarray, capacity: np.ndarray, prices: np.ndarray,
+            waiting: np.ndarray) -> _Holdings:
+    """Each shelter keeps its highest bids up to capacity; the rest go back to waiting. Raises full shelters' prices."""
+    shelter = candidates[entries.cell, entries.slot]
+    order = np.lexsort((-entries.bid, shelter))
+    entries, shelter = _Holdings(entries.cell[order], entries.slot[order], entries.people[order],
+                                 entries.bid[order]), shelter[order]
+    total = np.cumsum(entries.people)
+    starts = np.concatenate([[0], np.nonzero(np.diff(shelter))[0] + 1]) if len(shelter) else np.zeros(0, dtype=np.int64)
+    group_base = np.repeat(total[starts] - entries.people[starts], np.diff(np.append(starts, len(total))))
+    kept = np.clip(capacity[shelter] - (total - entries.people - group_base), 0, entries.people)
+    np.add.at(waiting, entries.cell, entries.people - kept)
+
+    keep = kept > 0
+    held = _Holdings(entries.cell[keep], entries.slot[keep], kept[keep], entries.bid[keep])
+    held_shelter = shelter[keep]
+    load = np.bincount(held_shelter, weights=held.people, minlength=len(capacity))
+    lowest = np.full(len(capacity), np.inf)
+    np.minimum.at(lowest, held_shelter, held.bid)
+    full = (load >= capacity) & (capacity > 0)
+    prices[full] = np.maximum(prices[full], lowest[full])
+    return held
+
+
+def _auction(cost: np.ndarray, candidates: np.ndarray, capacity: np.ndarray, prices: np.ndarray,
+             held: _Holdings, waiting: np.ndarray, unserved_minutes: float, epsilon: float,
+             max_rounds: int) -> Tuple[_Holdings, int]:
+    """Bid until every waiting person is placed or their cell has given up. Updates prices and waiting in place."""
+    reachable = np.isfinite(cost)
+    rounds = 0
+    while rounds < max_rounds:
+        active = np.nonzero(waiting > 0)[0]
+        if not len(active):
+            break
+        rounds += 1
+        reduced = np.where(reachable[active], cost[active] + prices[candidates[active]], np.inf)
+        ranked = np.argsort(reduced, axis=1, kind="stable")
+        rows = np.arange(len(active))
+        best = reduced[rows, ranked[:, 0]]
+        runner_up = reduced[rows, ranked[:, 1]] if cost.shape[1] > 1 else np.full(len(active), np.inf)
+        runner_up = np.minimum(runner_up, unserved_minutes)
+        # Cells whose every shelter now costs more than staying unassigned stop bidding
+        bidding = best < unserved_minutes
+        waiting[active[~bidding]] = 0
+        bidders, slots = active[bidding], ranked[bidding, 0]
+        bids = prices[candidates[bidders, slots]] + (runner_up[bidding] - best[bidding]) + epsilon
+        entries = _Holdings(np.concatenate([held.cell, bidders]), np.concatenate([held.slot, slots]),
+                            np.concatenate([held.people, waiting[bidders]]), np.concatenate([held.bid, bids]))
+        waiting[bidders] = 0
+        held = _settle(entries, candidates, capacity, prices, waiting)
+    return held, rounds
+
+
+def assign(cost: np.ndarray, candidates: np.ndarray, population: np.ndarray, capacity: np.ndarray,
+           prices: np.ndarray, unserved_minutes: float, epsilon: float = 0.5, max_rounds: int = 5000,
+           previous: Optional[_Holdings] = None) -> Tuple[List[Tuple[int, int, int, float]], np.ndarray, int, _Holdings]:
+    """
+    Assign cell populations to capacity-limited shelters by auction.
+
+    Every round each cell with people still waiting bids for the shelter
+    with the lowest travel time plus price, offering to pay up to the point
+    where its next best option (or staying unassigned) would be as good,
+    plus epsilon. A shelter keeps the highest bids that fit its capacity and
+    sends the rest back to bid again; once full, its price is the lowest bid
+    it kept. The result is within epsilon minutes per person of the optimum.
+
+    Given the previous solve's prices and places, only what changed is
+    re-auctioned: bids that no longer fit a shelter go back to waiting, and
+    a shelter that now has room loses its price, releasing the cells that
+    would rather go there. If that keeps cascading, it is solved afresh.
+
+    Args:
+        cost: (cells, k) travel minutes to each candidate shelter; inf if out of reach
+        candidates: (cells, k) shelter index of each candidate
+        population: People per cell
+        capacity: Free places per shelter
+        prices: Shelter prices in minutes; zeros, or the previous solve's to warm start
+        unserved_minutes: Cost of leaving a person unassigned; caps what anyone bids
+        epsilon: Bid increment in minutes
+        max_rounds: Bidding rounds before the people still waiting are placed greedily
+        previous: Places from the previous solve over the same cells and candidates
+
+    Returns:
+        (allocations as (cell, shelter, people, travel minutes), prices, bidding rounds run, places)
+    """
+    population = population.astype(np.int64)
+    capacity = capacity.astype(np.int64)
+    prices = np.clip(prices.astype(np.float64), 0.0, unserved_minutes)
+    prices[capacity <= 0] = unserved_minutes
+    reachable = np.isfinite(cost)
+
+    held = previous if previous is not None else _Holdings()
+    waiting = population - np.bincount(held.cell, weights=held.people, minlength=len(population)).astype(np.int64)
+    if (waiting < 0).any():
+        # A cell's population fell: it bids again from scratch
+        shrunk = waiting < 0
+        held = held.select(~shrunk[held.cell])
+        waiting[shrunk] = population[shrunk]
+    held = _settle(held, candidates, capacity, prices, waiting)
+
+    rounds = 0
+    warm = previous is not None or prices[capacity > 0].any()
+    for attempt in range(0 if warm else 3, 4):
+        # Warm attempts share half the rounds; solving afresh gets a full budget
+        fresh = attempt == 3
+        if fresh:
+            prices = np.where(capacity > 0, 0.0, unserved_minutes)
+            held, waiting = _Holdings(), population.copy()
+        budget = max_rounds if fresh else max(0, max_rounds // 2 - rounds)
+        held, used = _auction(cost, candidates, capacity, prices, held, waiting, unserved_minutes, epsilon, budget)
+        rounds += used
+        if fresh:
+            break
+        if waiting.any():
+            continue
+        stale = np.nonzero((held.load(candidates, len(capacity)) < capacity) & (prices > 0))[0]
+        if not len(stale):
+            break
+        # Free up overpriced shelters; cells that would now rather go there bid again
+        prices[stale] = 0.0
+        reduced = np.where(reachable, cost + prices[candidates], np.inf)
+        held_value = np.zeros(len(population))
+        np.maximum.at(held_value, held.cell, reduced[held.cell, held.slot])
+        unplaced = population - np.bincount(held.cell, weights=held.people, minlength=len(population))
+        held_value[unplaced > 0] = unserved_minutes
+        tempted = (np.isin(candidates, stale) & (reduced + epsilon < held_value[:, None])).any(axis=1)
+        held = held.select(~tempted[held.cell])
+        waiting = np.where(tempted, population, 0)
+
+    placed: Dict[Tuple[int, int], int] = {}
+    for cell, slot, people in zip(held.cell.tolist(), held.slot.tolist(), held.people.tolist()):
+        placed[(cell, slot)] = placed.get((cell, slot), 0) + people
+
+    # People still waiting when the rounds ran out take any room left, nearest first
+    left = capacity - held.load(candidates, len(capacity))
+    unplaced = population - np.bincount(held.cell, weights=held.people, minlength=len(population)).astype(np.int64)
+    if left.any():
+        for cell in np.nonzero(unplaced > 0)[0].tolist():
+            need = int(unplaced[cell])
+            for slot in np.argsort(cost[cell], kind="stable").tolist():
+                s = candidates[cell, slot]
+                if need <= 0 or not reachable[cell, slot]:
+                    break
+                take = min(need, int(left[s]))
+                if take > 0:
+                    placed[(cell, slot)] = placed.get((cell, slot), 0) + take
+                    left[s] -= take
+                    need -= take
+
+    allocations = [(cell, int(candidates[cell, slot]), people, float(cost[cell, slot]))
+                   for (cell, slot), people in placed.items()]
+    return allocations, prices, rounds, held
+
+
+class EvacuationPlanner:
+    """
+    Assigns population cells to shelters within their free capacity.
+
+    Args:
+        zone_index: Safe zones with capacity, current_occupancy and status
+        graph: Road network for travel times; None uses straight-line estimates
+        candidates: Nearest shelters each cell may be sent to
+        max_travel_minutes: Longest trip a cell may be assigned
+        snap_km: Furthest a cell or shelter may be from the road network
+    """
+
+    def __init__(self, zone_index: SafeZoneIndex, graph: Optional[RoadGraph] = None, candidates: int = 8,
+                 max_travel_minutes: float = 90.0, snap_km: float = 1.0):
+        self.zone_index = zone_index
+        self.graph = graph
+        self.candidates = candidates
+        self.max_travel_minutes = max_travel_minutes
+        self.snap_km = snap_km
+        self._prices: Dict[Tuple[str, Optional[str]], Dict[str, float]] = {}
+        self._held: Dict[Tuple[str, Optional[str]], Tuple[np.ndarray, _Holdings]] = {}
+        self._snapped: "OrderedDict[Tuple[str, float, float], Optional[Tuple[int, float]]]" = OrderedDict()
+        self._reverse: Dict[str, Tuple[List[int], np.ndarray, np.ndarray]] = {}
+        self._reverse_builds = 0
+        self._searches: Dict[Tuple[str, str], Tuple[Tuple[float, float], Optional[_ShelterSearch], float]] = {}
+        self._last_request: Optional[Tuple[List[Dict], str, Optional[str]]] = None
+        self._costs: Optional[Tuple[Tuple, np.ndarray, np.ndarray]] = None  # (inputs, candidates, minutes)
+        self._lock = threading.Lock()
+
+    def plan(self, cells: List[Dict], mode: str = "walking", zone_type: Optional[str] = None) -> Dict:
+        """
+        Assign people to shelters that are admitting them.
+
+        Args:
+            cells: {"lat", "lng", "population"} and an optional "cell_id"
+            mode: Travel mode for travel times
+            zone_type: Only send people to zones of this type; None for any
+
+        Returns:
+            {"assignments", "shelters", "summary"}
+        """
+        mode = mode if mode in PROFILES else "walking"
+        with self._lock:
+            self._last_request = (cells, mode, zone_type)
+            return self._solve(cells, mode, zone_type)
+
+    def replan(self) -> Optional[Dict]:
+        """Re-solve the last plan against current occupancy; None if nothing was planned yet."""
+        with self._lock:
+            if self._last_request is None:
+                return None
+            return self._solve(*self._last_request)
+
+    def _solve(self, cells: List[Dict], mode: str, zone_type: Optional[str]) -> Dict:
+        started = time.perf_counter()
+        with self.zone_index._lock:
+            zones = [dict(zone) for zone in self.zone_index.zones.values()
+                     if zone.get("status") in ACCEPTING_STATUSES and (zone_type is None or zone["type"] == zone_type)]
+        zone_ids = [zone["id"] for zone in zones]
+        # Full shelters stay in the problem with no room, so filling one up does not invalidate the costs
+        capacity = np.array([max(0, zone.get("capacity", 0) - zone.get("current_occupancy", 0)) for zone in zones],
+                            dtype=np.int64)
+        cell_lat = np.array([cell["lat"] for cell in cells], dtype=np.float64)
+        cell_lng = np.array([cell["lng"] for cell in cells], dtype=np.float64)
+        population = np.array([max(0, int(cell["population"])) for cell in cells], dtype=np.int64)
+
+        known = self._prices.setdefault((mode, zone_type), {})
+        warm = False
+        allocations, rounds = [], 0
+        if zones and cells:
+            candidates, cost = self._candidate_costs(cells, cell_lat, cell_lng, mode, zones)
+            prices = np.array([known.get(zone_id, 0.0) for zone_id in zone_ids])
+            # Places won last time carry over only while the cost matrix is the same one
+            previous = self._held.get((mode, zone_type))
+            previous = previous[1] if previous is not None and previous[0] is cost else None
+            warm = previous is not None or bool(prices.any())
+            allocations, prices, rounds, held = assign(cost, candidates, population, capacity, prices,
+                                                       unserved_minutes=2 * self.max_travel_minutes,
+                                                       previous=previous)
+            known.update(zip(zone_ids, prices.tolist()))
+            self._held[(mode, zone_type)] = (cost, held)
+
+        per_cell: List[List[Dict]] = [[] for _ in cells]
+        assigned = np.zeros(len(zones), dtype=np.int64)
+        travel = 0.0
+        longest = 0.0
+        for cell, s, people, trip in allocations:
+            per_cell[cell].append({"zone_id": zone_ids[s], "people": people, "travel_minutes": round(trip, 1)})
+            assigned[s] += people
+            travel += trip * people
+            longest = max(longest, trip)
+
+        placed = int(assigned.sum())
+        return {
+            "mode": mode,
+            "zone_type": zone_type,
+            "assignments": [
+                {
+                    "cell_id": cell.get("cell_id", i),
+                    "lat": cell["lat"],
+                    "lng": cell["lng"],
+                    "population": int(population[i]),
+                    "shelters": per_cell[i],
+                    "unassigned": int(population[i]) - sum(a["people"] for a in per_cell[i])
+                }
+                for i, cell in enumerate(cells)
+            ],
+            "shelters": [
+                {
+                    "zone_id": zone["id"],
+                    "name": zone.get("name"),
+                    "free_capacity": int(capacity[s]),
+                    "assigned": int(assigned[s]),
+                    "price_minutes": round(known.get(zone["id"], 0.0), 2)
+                }
+                for s, zone in enumerate(zones)
+            ],
+            "summary": {
+                "population": int(population.sum()),
+                "assigned": placed,
+                "unassigned": int(population.sum()) - placed,
+                "mean_travel_minutes": round(travel / placed, 1) if placed else None,
+                "max_travel_minutes": round(longest, 1),
+                "bidding_rounds": rounds,
+                "warm_start": warm,
+                "routing_engine": "road_network" if self.graph is not None else "straight_line",
+                "sec": round(time.perf_counter() - started, 3)
+            }
+        }
+
+    def _candidate_costs(self, cells: List[Dict], cell_lat: np.ndarray, cell_lng: np.ndarray, mode: str,
+                         zones: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidate zones and travel minutes per cell, reused while cells, zones and road costs are unchanged."""
+        zone_ids = [zone["id"] for zone in zones]
+        zone_lat = np.array([zone["location"]["lat"] for zone in zones])
+        zone_lng = np.array([zone["location"]["lng"] for zone in zones])
+        if self.graph is not None:
+            self._reversed(mode)
+        inputs = (mode, tuple(zone_ids), zone_lat.tobytes(), zone_lng.tobytes(), self._reverse_builds)
+        if self._costs is not None and self._costs[0][0] is cells and self._costs[0][1:] == inputs:
+            return self._costs[1], self._costs[2]
+        candidates = self._nearest(cell_lat, cell_lng, zone_lat, zone_lng)
+        cost = self._travel_minutes(mode, cell_lat, cell_lng, candidates, zone_ids, zone_lat, zone_lng)
+        cost[cost > self.max_travel_minutes] = np.inf
+        self._costs = ((cells,) + inputs, candidates, cost)
+        return candidates, cost
+
+    def _nearest(self, cell_lat: np.ndarray, cell_lng: np.ndarray, zone_lat: np.ndarray,
+                 zone_lng: np.ndarray, chunk: int = 4096) -> np.ndarray:
+        """(cells, k) indices of each cell's nearest zones by straight-line distance."""
+        k = min(self.candidates, len(zone_lat))
+        out = np.empty((len(cell_lat), k), dtype=np.int64)
+        for lo in range(0, len(cell_lat), chunk):
+            km = distance_matrix(cell_lat[lo:lo + chunk], cell_lng[lo:lo + chunk], zone_lat, zone_lng)
+            nearest = np.argpartition(km, k - 1, axis=1)[:, :k] if k < len(zone_lat) else np.tile(
+                np.arange(k), (len(km), 1))
+            order = np.argsort(np.take_along_axis(km, nearest, axis=1), axis=1)
+            out[lo:lo + chunk] = np.take_along_axis(nearest, order, axis=1)
+        return out
+
+    def _travel_minutes(self, mode: str, cell_lat: np.ndarray, cell_lng: np.ndarray, candidates: np.ndarray,
+                        zone_ids: List[str], zone_lat: np.ndarray, zone_lng: np.ndarray) -> np.ndarray:
+        """(cells, k) travel minutes to each candidate zone."""
+        speed = PROFILES[mode]["default_speed"]
+        straight = haversine_km(cell_lat[:, None], cell_lng[:, None], zone_lat[candidates], zone_lng[candidates])
+        minutes = straight * DETOUR_FACTOR / speed * 60
+        if self.graph is None:
+            return minutes
+
+        offsets, rows = self._reversed(mode)
+        horizon = self.max_travel_minutes / 60
+        cell_nodes = np.full(len(cell_lat), -1, dtype=np.int64)
+        cell_access = np.zeros(len(cell_lat))
+        for i, (lat, lng) in enumerate(zip(cell_lat.tolist(), cell_lng.tolist())):
+            key = (mode, lat, lng)
+            if key in self._snapped:
+                self._snapped.move_to_end(key)
+            else:
+                self._snapped[key] = self.graph.snap(lat, lng, mode, self.snap_km)
+                if len(self._snapped) > SNAP_CACHE_SIZE:
+                    self._snapped.popitem(last=False)
+            match = self._snapped[key]
+            if match is not None:
+                cell_nodes[i], cell_access[i] = match
+
+        # Pairs where either end is off the network keep the straight-line estimate
+        for s, zone_id in enumerate(zone_ids):
+            at, slot = np.nonzero((candidates == s) & (cell_nodes[:, None] >= 0))
+            if not len(at):
+                continue
+            search, zone_access = self._search(mode, zone_id, (float(zone_lat[s]), float(zone_lng[s])),
+                                               offsets, rows, horizon)
+            if search is None:
+                continue
+            hours = search.hours(cell_nodes[at]) + (cell_access[at] + zone_access) / speed
+            minutes[at, slot] = hours * 60
+        return minutes
+
+    def _reversed(self, mode: str) -> Tuple[List[int], np.ndarray]:
+        """Reversed adjacency of the mode's current costs, rebuilt (and searches dropped) when costs change."""
+        prof = self.graph.profile(mode)
+        costs = prof.rows[:, 1]
+        cached = self._reverse.get(mode)
+        if cached is not None and np.array_equal(cached[2], costs):
+            return cached[0], cached[1]
+        node_count = self.graph.node_count
+        tails = np.repeat(np.arange(node_count), np.diff(prof.indptr))
+        heads = prof.rows[:, 0].astype(np.int64)
+        order = np.argsort(heads, kind="stable")
+        indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=node_count), out=indptr[1:])
+        rows = np.column_stack([tails[order], costs[order], order])
+        self._reverse[mode] = (indptr.tolist(), rows, costs.copy())
+        self._reverse_builds += 1
+        for key in [key for key in self._searches if key[0] == mode]:
+            del self._searches[key]
+        return indptr.tolist(), rows
+
+    def _search(self, mode: str, zone_id: str, location: Tuple[float, float], offsets: List[int],
+                rows: np.ndarray, horizon: float) -> Tuple[Optional[_ShelterSearch], float]:
+        """The kept search for a zone, restarted if the zone moved."""
+        cached = self._searches.get((mode, zone_id))
+        if cached is not None and cached[0] == location:
+            return cached[1], cached[2]
+        match = self.graph.snap(location[0], location[1], mode, self.snap_km)
+        search = _ShelterSearch(match[0], offsets, rows, horizon) if match is not None else None
+        access = match[1] if match is not None else 0.0
+        self._searches[(mode, zone_id)] = (location, search, access)
+        return search, access
+
+
+# Create global instance
+evacuation_planner = None
+
+
+def get_evacuation_planner() -> EvacuationPlanner:
+    """Get the global evacuation planner, creating it on first use"""
+    global evacuation_planner
+    if evacuation_planner is None:
+        evacuation_planner = EvacuationPlanner(
+            get_safe_zone_index(),
+            get_routing_service().graph,
+            candidates=int(os.getenv("EVACUATION_CANDIDATES", "8")),
+            max_travel_minutes=float(os.getenv("EVACUATION_MAX_TRAVEL_MINUTES", "90"))
+        )
+    return evacuation_planner
@@ -0,0 +1,445 @@
+"""
+Flood-extent estimates that feed the danger-zone overlay.
+
+The DEM is cut into square tiles. In each tile a priority flood spreads out
+from the water already on the ground (NDWI water-mask cells, or the tile's
+lowest cells when there is no mask) and records for every cell the water
+surface it drains to and the spill level at which water rising from that
+surface first reaches it, so ridges and embankments between basins hold
+water back (fill-and-spill). That ordering depends only on the terrain and
+the mask and is kept per tile. Rainfall then only sets how far the water
+rises: the runoff over the tile fills cells in spill-level order, and the
+rise that stores the runoff volume is solved in closed form over sorted
+cumulative sums; once water tops a sill it stays there while the basins
+behind fill from the bottom. Depth bands are traced to polygons and registered as
+danger zones tile by tile, and a tile whose polygons did not change leaves
+its zones alone.
+"""
+import heapq
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.danger_zones import DangerZoneIndex, get_danger_zone_index
+from services.elevation import ElevationModel
+from services.geodesy import KM_PER_DEGREE
+from services.routing_service import get_routing_service
+
+# Flood depth (m) from which a cell counts at each risk level: ankle deep,
+# enough to float a car, hard to wade, and over a child's head
+DEPTH_LEVELS = ((0.1, "low"), (0.3, "medium"), (0.6, "high"), (1.2, "critical"))
+# Vertex steps (row, col) along east, south, west and north cell edges
+_STEPS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+
+class _FloodTile:
+    """A block of DEM cells, its fill order and the zones last registered for it."""
+
+    def __init__(self, tile_id: str, row0: int, col0: int, rows: int, cols: int, cell_km2: float):
+        self.id = tile_id
+        self.row0 = row0
+        self.col0 = col0
+        self.rows = rows
+        self.cols = cols
+        self.cell_km2 = cell_km2
+        self.spill: Optional[np.ndarray] = None  # Rise above the drained-to surface before water reaches a cell
+        self.floor: Optional[np.ndarray] = None  # Cell height minus that surface
+        self.spill_sorted: Optional[np.ndarray] = None  # By spill level, then floor
+        self.floor_sorted: Optional[np.ndarray] = None
+        self.floor_cumsum: Optional[np.ndarray] = None
+        self.water_cells = 0
+        self.rainfall_mm: Optional[float] = None
+        self.runoff_coefficient: Optional[float] = None
+        self.rise_m = 0.0
+        self.pond_m: Optional[float] = None  # Level in the basins spilling at rise_m while they fill
+        self.flooded_cells = 0
+        self.max_depth_m = 0.0
+        self.zones: Dict[str, Dict] = {}
+        self.updated: Optional[float] = None
+
+
+def _fill_order(heights: np.ndarray, sources: np.ndarray):
+    """
+    Priority flood from the source cells over 4-connected neighbours.
+
+    Args:
+        heights: 2-D cell heights; NaN cells are never flooded
+        sources: Mask of cells already under water
+
+    Returns:
+        (spill level, source surface) per cell, flattened; inf where no
+        source reaches
+    """
+    rows, cols = heights.shape
+    z = np.where(np.isnan(heights), np.inf, heights).ravel().tolist()
+    level: List[Optional[float]] = [None] * len(z)
+    surface = [math.inf] * len(z)
+    for i in np.flatnonzero(np.isnan(heights)).tolist():
+        level[i] = math.inf
+    heap = []
+    for i in np.flatnonzero(sources & ~np.isnan(heights)).tolist():
+        level[i] = surface[i] = z[i]
+        heap.append((z[i], i))
+    heapq.heapify(heap)
+    # Cells at or below the current level fill from a plain queue without heap traffic
+    pit = deque()
+    push, pop = heapq.heappush, heapq.heappop
+    while heap or pit:
+        w, i = pit.popleft() if pit else pop(heap)
+        s = surface[i]
+        r, c = divmod(i, cols)
+        for j in (i - cols if r else -1, i + cols if r < rows - 1 else -1, i - 1 if c else -1,
+                  i + 1 if c < cols - 1 else -1):
+            if j < 0 or level[j] is not None:
+                continue
+            surface[j] = s
+            if z[j] <= w:
+                level[j] = w
+                pit.append((w, j))
+            else:
+                level[j] = z[j]
+                push(heap, (z[j], j))
+    return (np.array([math.inf if v is None else v for v in level]), np.array(surface))
+
+
+def _outer_rings(mask: np.ndarray, min_cells: int) -> List[np.ndarray]:
+    """
+    Outlines of the 4-connected regions of a mask along cell edges.
+
+    Holes are left out, so each ring covers its region's whole footprint.
+
+    Returns:
+        (vertex row, vertex col) corner arrays, clockwise, largest first;
+        regions under min_cells cells are dropped
+    """
+    rows, cols = mask.shape
+    padded = np.pad(mask, 1)
+    width = cols + 1
+    starts, dirs = [], []
+    # Each exposed side of an inside cell is an edge with the inside on its right
+    for d, (outside, dr, dc) in enumerate(((padded[:-2, 1:-1], 0, 0), (padded[1:-1, 2:], 0, 1),
+                                           (padded[2:, 1:-1], 1, 1), (padded[1:-1, :-2], 1, 0))):
+        r, c = np.nonzero(mask & ~outside)
+        starts.append((r + dr) * width + c + dc)
+        dirs.append(np.full(len(r), d))
+    start = np.concatenate(starts)
+    direction = np.concatenate(dirs)
+    if not len(start):
+        return []
+    # At most two edges leave a vertex, where regions touch corner to corner
+    first = np.full((rows + 1) * width, -1)
+    second = np.full((rows + 1) * width, -1)
+    order = np.argsort(start, kind="stable")
+    sorted_start = start[order]
+    lead = np.ones(len(order), dtype=bool)
+    lead[1:] = sorted_start[1:] != sorted_start[:-1]
+    first[sorted_start[lead]] = order[lead]
+    second[sorted_start[~lead]] = order[~lead]
+
+    start_l, dir_l, first_l, second_l = start.tolist(), direction.tolist(), first.tolist(), second.tolist()
+    offsets = [dr * width + dc for dr, dc in _STEPS]
+    used = bytearray(len(start_l))
+    rings = []
+    for e0 in range(len(start_l)):
+        if used[e0]:
+            continue
+        corners = []
+        e = e0
+        while not used[e]:
+            used[e] = 1
+            d = dir_l[e]
+            vertex = start_l[e] + offsets[d]
+            nxt = first_l[vertex]
+            # Turning right keeps corner-touching regions apart
+            if second_l[vertex] >= 0 and dir_l[nxt] != (d + 1) % 4:
+                nxt = second_l[vertex]
+            if dir_l[nxt] != d:
+                corners.append(vertex)
+            e = nxt
+        ring = np.array(corners)
+        vr, vc = ring // width, ring % width
+        area = 0.5 * float(np.dot(vc, np.roll(vr, -1)) - np.dot(np.roll(vc, -1), vr))
+        if area >= min_cells:
+            rings.append((area, np.stack([vr, vc], axis=1)))
+    rings.sort(key=lambda item: -item[0])
+    return [ring for _, ring in rings]
+
+
+class FloodModel:
+    """
+    Tiled flood-extent estimates over a DEM, published as danger zones.
+
+    Args:
+        dem: Elevation raster; tiles are cut from its grid
+        zone_index: Danger-zone registry the flood polygons go to
+        water: NDWI raster (or a 0/1 water mask) over any part of the DEM,
+            sampled at DEM cell centres
+        ndwi_threshold: NDWI from which a cell counts as open water
+        tile_cells: Tile side in DEM cells
+        runoff_coefficient: Share of rainfall that runs off rather than soaking in
+        min_cells: Smallest flooded patch, in cells, that becomes a zone
+        drain_percentile: Without a water mask, cells of a tile at or below
+            this height percentile stand in for its drainage
+    """
+
+    def __init__(self, dem: ElevationModel, zone_index: DangerZoneIndex, water: Optional[ElevationModel] = None,
+                 ndwi_threshold: float = 0.2, tile_cells: int = 512, runoff_coefficient: float = 0.5,
+                 min_cells: int = 4, drain_percentile: float = 2.0):
+        self.dem = dem
+        self.zone_index = zone_index
+        self.water = water
+        self.ndwi_threshold = ndwi_threshold
+        self.runoff_coefficient = runoff_coefficient
+        self.min_cells = min_cells
+        self.drain_percentile = drain_percentile
+        self.tiles: Dict[str, _FloodTile] = {}
+        rows, cols = dem.shape
+        for row0 in range(0, rows, tile_cells):
+            for col0 in range(0, cols, tile_cells):
+                tile_rows, tile_cols = min(tile_cells, rows - row0), min(tile_cells, cols - col0)
+                lat = dem.north - (row0 + tile_rows / 2) * dem.d_lat
+                cell_km2 = (dem.d_lat * KM_PER_DEGREE) * (dem.d_lng * KM_PER_DEGREE * math.cos(math.radians(lat)))
+                tile_id = f"r{row0 // tile_cells}c{col0 // tile_cells}"
+                self.tiles[tile_id] = _FloodTile(tile_id, row0, col0, tile_rows, tile_cols, cell_km2)
+        self._lock = threading.Lock()
+
+    def set_water_mask(self, water: Optional[ElevationModel], ndwi_threshold: Optional[float] = None):
+        """Replace the water mask; every tile recomputes its fill order on its next update."""
+        with self._lock:
+            self.water = water
+            if ndwi_threshold is not None:
+                self.ndwi_threshold = ndwi_threshold
+            for tile in self.tiles.values():
+                tile.spill = None
+
+    def tiles_in(self, south: float, west: float, north: float, east: float) -> List[str]:
+        """Ids of the tiles overlapping a bounding box."""
+        found = []
+        for tile in self.tiles.values():
+            bounds = self._bounds(tile)
+            if bounds["west"] < east and bounds["east"] > west and bounds["south"] < north and bounds["north"] > south:
+                found.append(tile.id)
+        return found
+
+    def _bounds(self, tile: _FloodTile) -> Dict[str, float]:
+        dem = self.dem
+        return {"west": dem.west + tile.col0 * dem.d_lng, "north": dem.north - tile.row0 * dem.d_lat,
+                "east": dem.west + (tile.col0 + tile.cols) * dem.d_lng,
+                "south": dem.north - (tile.row0 + tile.rows) * dem.d_lat}
+
+    # ------------------------------------------------------------------
+    # Estimation
+    # ------------------------------------------------------------------
+
+    def _prepare(self, tile: _FloodTile):
+        """Fill order of a tile from its heights and open water."""
+        dem = self.dem
+        rows = tile.row0 + np.arange(tile.rows)
+        cols = tile.col0 + np.arange(tile.cols)
+        row_grid, col_grid = np.meshgrid(rows, cols, indexing="ij")
+        heights = dem._cells(row_grid.ravel(), col_grid.ravel()).reshape(tile.rows, tile.cols)
+        sources = np.zeros(heights.shape, dtype=bool)
+        if self.water is not None:
+            ndwi = self.water.sample(dem.north - (row_grid + 0.5) * dem.d_lat, dem.west + (col_grid + 0.5) * dem.d_lng,
+                                     bilinear=False)
+            sources = np.nan_to_num(ndwi, nan=-np.inf) >= self.ndwi_threshold
+        tile.water_cells = int(np.count_nonzero(sources & ~np.isnan(heights)))
+        if not tile.water_cells and not np.isnan(heights).all():
+            sources = heights <= np.nanpercentile(heights, self.drain_percentile)
+
+        level, surface = _fill_order(heights, sources)
+        reached = np.isfinite(level)
+        tile.spill = np.where(reached, level - np.where(reached, surface, 0.0), np.inf)
+        tile.floor = np.where(reached, heights.ravel() - np.where(reached, surface, 0.0), np.inf)
+        reached = np.flatnonzero(reached)
+        order = reached[np.lexsort((tile.floor[reached], tile.spill[reached]))]
+        tile.spill_sorted = tile.spill[order]
+        tile.floor_sorted = tile.floor[order]
+        tile.floor_cumsum = np.cumsum(tile.floor_sorted)
+
+    def _rise(self, tile: _FloodTile, runoff_m: float) -> Tuple[float, Optional[float]]:
+        """
+        Water levels that store runoff_m spread over the whole tile.
+
+        Returns:
+            (rise over the drained-to surfaces, level in the basins that
+            spill at exactly that rise while they are still filling, or None)
+        """
+        spill, cumsum = tile.spill_sorted, tile.floor_cumsum
+        count = len(spill)
+        if not count or runoff_m <= 0:
+            return 0.0, None
+        volume = runoff_m * count  # In cell areas times metres
+        # Cells sharing a spill level start to flood together; volume held with water at each level
+        ends = np.flatnonzero(np.append(spill[1:] != spill[:-1], True))
+        full = (ends + 1) * spill[ends] - cumsum[ends]
+        group = int(np.searchsorted(full, volume))
+        if group == len(ends):
+            return float((volume + cumsum[-1]) / count), None
+        level = float(spill[ends[group]])
+        below = int(ends[group - 1]) + 1 if group else 0
+        held = below * level - (cumsum[below - 1] if below else 0.0)
+        if held >= volume:
+            return float((volume + cumsum[below - 1]) / below), None
+        # Water stands at the sill and the overflow fills the basins behind it from the bottom up
+        floors = tile.floor_sorted[below:ends[group] + 1]
+        pond_cumsum = np.cumsum(floors)
+        pond_held = np.arange(1, len(floors) + 1) * floors - pond_cumsum
+        filled = max(int(np.searchsorted(pond_held, volume - held, side="right")), 1)
+        return level, float((volume - held + pond_cumsum[filled - 1]) / filled)
+
+    def depth(self, tile_id: str) -> np.ndarray:
+        """Estimated water depth (m) over a tile's cells at its last update."""
+        tile = self.tiles[tile_id]
+        if tile.spill is None:
+            return np.zeros((tile.rows, tile.cols))
+        depth = np.where(tile.spill <= tile.rise_m, tile.rise_m - tile.floor, 0.0)
+        if tile.pond_m is not None:
+            filling = tile.spill == tile.rise_m
+            depth[filling] = np.maximum(tile.pond_m - tile.floor[filling], 0.0)
+        return depth.reshape(tile.rows, tile.cols)
+
+    def _zones(self, tile: _FloodTile, depth: np.ndarray) -> Dict[str, Dict]:
+        """Nested depth-band polygons of a tile as danger zones."""
+        dem = self.dem
+        zones = {}
+        for threshold, risk_level in DEPTH_LEVELS:
+            for k, ring in enumerate(_outer_rings(depth >= threshold, self.min_cells)):
+                lngs = dem.west + (tile.col0 + ring[:, 1]) * dem.d_lng
+                lats = dem.north - (tile.row0 + ring[:, 0]) * dem.d_lat
+                zone_id = f"flood-{tile.id}-{risk_level}-{k}"
+                zones[zone_id] = {
+                    "id": zone_id,
+                    "name": f"Flooding ({risk_level})",
+                    "polygon_coordinates": np.stack([lngs, lats], axis=1).tolist(),
+                    "risk_type": "flood",
+                    "risk_level": risk_level,
+                    "description": f"Estimated flood water over {threshold:g} m deep"
+                }
+        return zones
+
+    def update(self, rainfall_mm: float, tile_ids: Optional[List[str]] = None,
+               runoff_coefficient: Optional[float] = None) -> Dict:
+        """
+        Re-estimate flooding for some tiles and sync their danger zones.
+
+        Args:
+            rainfall_mm: Rain over the period, observed or forecast
+            tile_ids: Tiles to update; default every tile
+            runoff_coefficient: Overrides the model's default for these tiles
+
+        Returns:
+            {"tiles": per-tile summaries, "zones_added", "zones_updated",
+            "zones_removed", "elapsed_sec"}
+        """
+        started = time.time()
+        coefficient = self.runoff_coefficient if runoff_coefficient is None else runoff_coefficient
+        ids = list(self.tiles) if tile_ids is None else tile_ids
+        unknown = [tile_id for tile_id in ids if tile_id not in self.tiles]
+        if unknown:
+            raise ValueError(f"Unknown flood tiles: {', '.join(unknown)}")
+
+        summaries, added, updated, removed = [], 0, 0, 0
+        with self._lock:
+            for tile_id in ids:
+                tile = self.tiles[tile_id]
+                if tile.spill is None:
+                    self._prepare(tile)
+                elif tile.rainfall_mm == rainfall_mm and tile.runoff_coefficient == coefficient:
+                    summaries.append(self._summary(tile, changed=False))
+                    continue
+                tile.rainfall_mm, tile.runoff_coefficient = rainfall_mm, coefficient
+                tile.rise_m, tile.pond_m = self._rise(tile, coefficient * rainfall_mm / 1000.0)
+                depth = self.depth(tile_id)
+                tile.flooded_cells = int(np.count_nonzero(depth >= DEPTH_LEVELS[0][0]))
+                tile.max_depth_m = float(depth.max()) if depth.size else 0.0
+
+                zones = self._zones(tile, depth)
+                for zone_id in set(tile.zones) - set(zones):
+                    self.zone_index.delete_zone(zone_id)
+                    removed += 1
+                changed = False
+                for zone_id, zone in zones.items():
+                    previous = tile.zones.get(zone_id)
+                    if previous is not None and previous["polygon_coordinates"] == zone["polygon_coordinates"]:
+                        continue
+                    self.zone_index.upsert_zone(zone)
+                    changed = True
+                    if previous is None:
+                        added += 1
+                    else:
+                        updated += 1
+                changed = changed or len(zones) != len(tile.zones)
+                tile.zones = zones
+                tile.updated = time.time()
+                summaries.append(self._summary(tile, changed=changed))
+
+        return {
+            "tiles": summaries,
+            "zones_added": added,
+            "zones_updated": updated,
+            "zones_removed": removed,
+            "elapsed_sec": round(time.time() - started, 3)
+        }
+
+    def _summary(self, tile: _FloodTile, changed: bool) -> Dict:
+        return {
+            "tile": tile.id,
+            "bounds": self._bounds(tile),
+            "rainfall_mm": tile.rainfall_mm,
+            "rise_m": round(tile.rise_m, 3),
+            "max_depth_m": round(tile.max_depth_m, 3),
+            "flooded_km2": round(tile.flooded_cells * tile.cell_km2, 4),
+            "water_cells": tile.water_cells,
+            "zones": len(tile.zones),
+            "changed": changed
+        }
+
+    def get_stats(self) -> Dict:
+        """Tiles, water mask and the last estimate of each tile."""
+        with self._lock:
+            return {
+                "dem": self.dem.get_stats(),
+                "water_mask": self.water.source if self.water is not None else None,
+                "ndwi_threshold": self.ndwi_threshold,
+                "runoff_coefficient": self.runoff_coefficient,
+                "tiles": [self._summary(tile, changed=False) for tile in self.tiles.values()],
+                "zones": sum(len(tile.zones) for tile in self.tiles.values())
+            }
+
+
+# Create global instance
+flood_model = None
+
+
+def get_flood_model() -> Optional[FloodModel]:
+    """Get the global flood model, creating it on first use; None without a DEM"""
+    global flood_model
+    if flood_model is None:
+        graph = get_routing_service().graph
+        dem = graph.elevation if graph is not None else None
+        dem_path = os.getenv("DEM_PATH")
+        if dem is None and dem_path:
+            try:
+                dem = ElevationModel.load(dem_path)
+            except Exception as e:
+                print(f"Failed to load elevation model {dem_path}: {e}")
+        if dem is None:
+            return None
+        water = None
+        ndwi_path = os.getenv("FLOOD_NDWI_PATH")
+        if ndwi_path:
+            try:
+                water = ElevationModel.load(ndwi_path)
+            except Exception as e:
+                print(f"Failed to load water mask {ndwi_path}: {e}")
+        flood_model = FloodModel(dem, get_danger_zone_index(), water,
+                                 ndwi_threshold=float(os.getenv("FLOOD_NDWI_THRESHOLD", "0.2")),
+                                 tile_cells=int(os.getenv("FLOOD_TILE_CELLS", "512")),
+                                 runoff_coefficient=float(os.getenv("FLOOD_RUNOFF_COEFFICIENT", "0.5")))
+    return flood_model
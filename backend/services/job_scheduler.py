@@ -0,0 +1,166 @@
+"""
+Urgency-aware scheduling for CPU-bound jobs.
+
+Jobs are queued per urgency class and started on a dedicated thread pool in
+priority order: a queued high-urgency job always starts before any queued
+normal or low job. Each class has its own concurrency budget, and a number
+of workers is reserved for the high class, so a bulk low-urgency backfill can
+never occupy every worker. Running jobs are not interrupted; pre-emption
+happens at the queue.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+URGENCY_CLASSES = ("high", "normal", "low")  # in priority order
+URGENCY_ALIASES = {
+    "critical": "high", "urgent": "high", "life_safety": "high",
+    "medium": "normal", "default": "normal",
+    "batch": "low", "backfill": "low", "bulk": "low"
+}
+
+
+def normalize_urgency(urgency: Optional[str]) -> str:
+    """Map a free-form urgency label onto high, normal or low."""
+    label = (urgency or "normal").strip().lower()
+    label = URGENCY_ALIASES.get(label, label)
+    return label if label in URGENCY_CLASSES else "normal"
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class UrgencyScheduler:
+    """
+    Priority scheduler with per-class worker budgets.
+
+    Args:
+        max_workers: Size of the worker pool
+        budgets: Max concurrently running jobs per class
+        reserved_high: Workers only the high class may use
+    """
+
+    def __init__(self, max_workers: int = 6, budgets: Optional[Dict[str, int]] = None,
+                 reserved_high: int = 2, name: str = "jobs"):
+        self.max_workers = max_workers
+        self.budgets = {"high": max_workers, "normal": max(1, max_workers - reserved_high), "low": 1}
+        self.budgets.update(budgets or {})
+        self.reserved_high = min(reserved_high, max_workers - 1)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queues = {c: deque() for c in URGENCY_CLASSES}
+        self._running = {c: 0 for c in URGENCY_CLASSES}
+        self._completed = {c: 0 for c in URGENCY_CLASSES}
+        self._failed = {c: 0 for c in URGENCY_CLASSES}
+        self._waits = {c: deque(maxlen=1000) for c in URGENCY_CLASSES}
+        self._max_wait = {c: 0.0 for c in URGENCY_CLASSES}
+
+    def submit(self, urgency: Optional[str], func: Callable, *args, **kwargs) -> Future:
+        """Queue func(*args, **kwargs) under an urgency class; returns a concurrent Future."""
+        urgency = normalize_urgency(urgency)
+        future: Future = Future()
+        with self._lock:
+            self._queues[urgency].append((urgency, time.monotonic(), func, args, kwargs, future))
+            self._pump()
+        return future
+
+    async def run(self, urgency: Optional[str], func: Callable, *args, **kwargs):
+        """Await a scheduled call from asyncio code."""
+        return await asyncio.wrap_future(self.submit(urgency, func, *args, **kwargs))
+
+    def _can_start(self, urgency: str) -> bool:
+        busy = sum(self._running.values())
+        if busy >= self.max_workers or self._running[urgency] >= self.budgets[urgency]:
+            return False
+        if urgency != "high":
+            non_high = self._running["normal"] + self._running["low"]
+            return non_high < self.max_workers - self.reserved_high
+        return True
+
+    def _pump(self):
+        """Start every queued job that fits its budget, most urgent first. Caller holds the lock."""
+        for urgency in URGENCY_CLASSES:
+            queue = self._queues[urgency]
+            while queue and self._can_start(urgency):
+                job = queue.popleft()
+                if job[5].cancelled():
+                    continue
+                self._running[urgency] += 1
+                wait = time.monotonic() - job[1]
+                self._waits[urgency].append(wait)
+                self._max_wait[urgency] = max(self._max_wait[urgency], wait)
+                self._executor.submit(self._execute, job)
+
+    def _execute(self, job):
+        urgency, _, func, args, kwargs, future = job
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                    failed = False
+                except BaseException as exc:
+                    future.set_exception(exc)
+                    failed = True
+                with self._lock:
+                    self._completed[urgency] += 1
+                    self._failed[urgency] += int(failed)
+        finally:
+            with self._lock:
+                self._running[urgency] -= 1
+                self._pump()
+
+    def get_metrics(self) -> Dict:
+        """Queue depth, running jobs and wait-time distribution per urgency class."""
+        with self._lock:
+            now = time.monotonic()
+            classes = {}
+            for urgency in URGENCY_CLASSES:
+                waits = sorted(self._waits[urgency])
+                queue = self._queues[urgency]
+                classes[urgency] = {
+                    "queue_depth": len(queue),
+                    "running": self._running[urgency],
+                    "budget": self.budgets[urgency],
+                    "completed": self._completed[urgency],
+                    "failed": self._failed[urgency],
+                    "oldest_queued_sec": round(now - queue[0][1], 4) if queue else 0.0,
+                    "wait_ms": {
+                        "p50": round(_percentile(waits, 50) * 1000, 3),
+                        "p95": round(_percentile(waits, 95) * 1000, 3),
+                        "max": round(self._max_wait[urgency] * 1000, 3)
+                    }
+                }
+            return {
+                "max_workers": self.max_workers,
+                "reserved_high": self.reserved_high,
+                "busy_workers": sum(self._running.values()),
+                "classes": classes
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool."""
+        self._executor.shutdown(wait=wait)
+
+
+# Create global instance
+factcheck_scheduler = None
+
+
+def get_factcheck_scheduler() -> UrgencyScheduler:
+    """Get the global fact-check scheduler, creating it on first use"""
+    global factcheck_scheduler
+    if factcheck_scheduler is None:
+        factcheck_scheduler = UrgencyScheduler(
+            max_workers=int(os.getenv("FACTCHECK_WORKERS", "6")),
+            reserved_high=int(os.getenv("FACTCHECK_RESERVED_HIGH_WORKERS", "2")),
+            name="factcheck"
+        )
+    return factcheck_scheduler
@@ -0,0 +1,271 @@
+"""
+Versioned binary bundle of the data the PWA keeps offline.
+
+Safe zones, danger zones and emergency procedures are packed with
+MessagePack into one payload. Records are rows in a field order named once
+in the header, coordinates are quantized to integers of 1e-5 degrees
+(about a metre) and danger-zone rings are stored as integer steps from
+vertex to vertex, which MessagePack writes in one to three bytes each.
+
+A version is a digest of the records, so it means the same thing across
+restarts. A client that sends the version it holds gets a patch with only
+the records that changed or went away, as long as that version is one of
+the last few; otherwise it gets the whole bundle. Each payload is gzipped
+once per version and served precompressed.
+"""
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import msgpack
+
+BUNDLE_FORMAT = 1
+BUNDLE_MEDIA_TYPE = "application/msgpack"
+# Quantization steps per degree
+COORDINATE_SCALE = 100000
+SAFE_ZONE_FIELDS = ("id", "name", "lat", "lng", "type", "capacity", "current_occupancy", "amenities",
+                    "contact_info", "status")
+DANGER_ZONE_FIELDS = ("id", "name", "ring", "risk_type", "risk_level", "description", "last_updated")
+_FIELDS = {"safe_zones": list(SAFE_ZONE_FIELDS), "danger_zones": list(DANGER_ZONE_FIELDS)}
+
+
+def _quantize(value: float) -> int:
+    return int(round(float(value) * COORDINATE_SCALE))
+
+
+def _epoch(value) -> Optional[int]:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value).timestamp())
+        except ValueError:
+            return None
+    return value
+
+
+def _safe_row(zone: Dict) -> List:
+    return [zone["id"], zone.get("name"), _quantize(zone["location"]["lat"]), _quantize(zone["location"]["lng"]),
+            zone.get("type"), zone.get("capacity"), zone.get("current_occupancy"), list(zone.get("amenities") or []),
+            zone.get("contact_info"), zone.get("status")]
+
+
+def _danger_row(zone: Dict) -> List:
+    ring = []
+    last_x = last_y = 0
+    for point in zone["polygon_coordinates"]:
+        x, y = _quantize(point[0]), _quantize(point[1])
+        ring += [x - last_x, y - last_y]
+        last_x, last_y = x, y
+    return [zone["id"], zone.get("name"), ring, zone.get("risk_type"), zone.get("risk_level"),
+            zone.get("description"), _epoch(zone.get("last_updated"))]
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=12).digest()
+
+
+class OfflineBundleStore:
+    """
+    Builds offline bundles and patches between their versions.
+
+    Args:
+        history: Past versions a client can still get a patch from
+        max_payloads: Compressed bundles and patches kept for the current version
+    """
+
+    def __init__(self, history: int = 32, max_payloads: int = 64):
+        self.history = history
+        self.max_payloads = max_payloads
+        self.version: Optional[str] = None
+        self.generated_at: Optional[int] = None
+        self._source_key: Optional[Hashable] = None
+        self._rows: Dict[str, Dict[str, List]] = {"safe_zones": {}, "danger_zones": {}}
+        self._procedures: Dict = {}
+        # version -> {(section, id): row digest}, oldest first
+        self._versions: "OrderedDict[str, Dict[Tuple[str, str], bytes]]" = OrderedDict()
+        self._payloads: "OrderedDict[Optional[str], Tuple[bytes, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.patches_served = 0
+        self.full_served = 0
+
+    def refresh(self, safe_zones: Iterable[Dict], danger_zones: Iterable[Dict], procedures: Dict,
+                source_key: Optional[Hashable] = None) -> str:
+        """
+        Bring the bundle up to date with the current data.
+
+        Args:
+            safe_zones: SafeZone dicts with a location {lat, lng}
+            danger_zones: DangerZone dicts with a [lng, lat] polygon ring
+            procedures: Emergency procedures and numbers, stored as given
+            source_key: Versions of the inputs; when it matches the last
+                refresh nothing is rebuilt
+
+        Returns:
+            The current version
+        """
+        with self._lock:
+            if source_key is not None and source_key == self._source_key and self.version is not None:
+                return self.version
+            rows = {"safe_zones": {zone["id"]: _safe_row(zone) for zone in safe_zones},
+                    "danger_zones": {zone["id"]: _danger_row(zone) for zone in danger_zones}}
+            digests = {(section, zone_id): _digest(msgpack.packb(row))
+                       for section, section_rows in rows.items() for zone_id, row in section_rows.items()}
+            digests[("procedures", "")] = _digest(msgpack.packb(procedures))
+            version = hashlib.blake2b(b"".join(key[0].encode() + b"\0" + key[1].encode() + b"\0" + digest
+                                               for key, digest in sorted(digests.items())),
+                                      digest_size=8).hexdigest()
+            self._source_key = source_key
+            if version == self.version:
+                return version
+            self.version = version
+            self.generated_at = int(time.time())
+            self._rows = rows
+            self._procedures = procedures
+            self._versions.pop(version, None)
+            self._versions[version] = digests
+            while len(self._versions) > self.history:
+                self._versions.popitem(last=False)
+            self._payloads.clear()
+            self.builds += 1
+            return version
+
+    def _header(self, kind: str) -> Dict:
+        return {"format": BUNDLE_FORMAT, "kind": kind, "version": self.version, "generated_at": self.generated_at,
+                "scale": COORDINATE_SCALE, "fields": _FIELDS}
+
+    def _build(self, since: Optional[str]) -> Tuple[bytes, Dict]:
+        """Packed full bundle, or patch from a known version. Caller holds the lock."""
+        base = self._versions.get(since) if since is not None else None
+        if base is None:
+            body = self._header("full")
+            for section, section_rows in self._rows.items():
+                body[section] = [section_rows[zone_id] for zone_id in sorted(section_rows)]
+            body["procedures"] = self._procedures
+        else:
+            current = self._versions[self.version]
+            body = self._header("patch")
+            body["base"] = since
+            body["upsert"] = {section: [] for section in self._rows}
+            body["delete"] = {section: [] for section in self._rows}
+            for key in sorted(current):
+                if base.get(key) != current[key] and key[0] in self._rows:
+                    body["upsert"][key[0]].append(self._rows[key[0]][key[1]])
+            for key in sorted(base):
+                if key not in current and key[0] in self._rows:
+                    body["delete"][key[0]].append(key[1])
+            if base.get(("procedures", "")) != current[("procedures", "")]:
+                body["procedures"] = self._procedures
+        packed = msgpack.packb(body)
+        payload = gzip.compress(packed, compresslevel=9, mtime=0)
+        return payload, {"version": self.version, "kind": body["kind"], "base": body.get("base"),
+                         "size": len(payload), "raw_size": len(packed)}
+
+    def payload(self, since: Optional[str] = None) -> Optional[Tuple[bytes, Dict]]:
+        """
+        Gzipped bundle for a client holding version since.
+
+        Returns:
+            (payload, {"version", "kind", "base", "size", "raw_size"}); a patch
+            when since is a recent version, the full bundle otherwise, and
+            None when the client is already current
+        """
+        with self._lock:
+            if self.version is None:
+                raise ValueError("Offline bundle has not been built")
+            if since == self.version:
+                return None
+            key = since if since in self._versions else None
+            cached = self._payloads.get(key)
+            if cached is None:
+                cached = self._build(key)
+                self._payloads[key] = cached
+                while len(self._payloads) > self.max_payloads:
+                    self._payloads.popitem(last=False)
+            else:
+                self._payloads.move_to_end(key)
+            if cached[1]["kind"] == "patch":
+                self.patches_served += 1
+            else:
+                self.full_served += 1
+            return cached
+
+    def get_stats(self) -> Dict:
+        """Current version, record counts and what has been served."""
+        with self._lock:
+            return {
+                "version": self.version,
+                "generated_at": self.generated_at,
+                "safe_zones": len(self._rows["safe_zones"]),
+                "danger_zones": len(self._rows["danger_zones"]),
+                "versions_kept": len(self._versions),
+                "builds": self.builds,
+                "full_served": self.full_served,
+                "patches_served": self.patches_served
+            }
+
+
+def decode_bundle(payload: bytes, state: Optional[Dict] = None) -> Dict:
+    """
+    Read a gzipped bundle or patch back into plain records, as a client would.
+
+    Args:
+        payload: Bytes from OfflineBundleStore.payload
+        state: Previously decoded bundle a patch applies to
+
+    Returns:
+        {"version", "safe_zones": {id: SafeZone dict}, "danger_zones":
+        {id: DangerZone dict}, "procedures"}
+    """
+    body = msgpack.unpackb(gzip.decompress(payload))
+    scale = body["scale"]
+    fields = body["fields"]
+
+    def expand(section: str, row: List) -> Dict:
+        record = dict(zip(fields[section], row))
+        if section == "safe_zones":
+            record["location"] = {"lat": record.pop("lat") / scale, "lng": record.pop("lng") / scale}
+        else:
+            ring, x, y = [], 0, 0
+            steps = record.pop("ring")
+            for i in range(0, len(steps), 2):
+                x, y = x + steps[i], y + steps[i + 1]
+                ring.append([x / scale, y / scale])
+            record["polygon_coordinates"] = ring
+        return record
+
+    if body["kind"] == "full":
+        return {
+            "version": body["version"],
+            "safe_zones": {row[0]: expand("safe_zones", row) for row in body["safe_zones"]},
+            "danger_zones": {row[0]: expand("danger_zones", row) for row in body["danger_zones"]},
+            "procedures": body["procedures"]
+        }
+    if state is None or state["version"] != body["base"]:
+        raise ValueError("Patch does not apply to this bundle version")
+    result = {"version": body["version"], "procedures": body.get("procedures", state["procedures"])}
+    for section in ("safe_zones", "danger_zones"):
+        records = dict(state[section])
+        for zone_id in body["delete"][section]:
+            records.pop(zone_id, None)
+        for row in body["upsert"][section]:
+            records[row[0]] = expand(section, row)
+        result[section] = records
+    return result
+
+
+# Create global instance
+offline_bundle_store = None
+
+
+def get_offline_bundle_store() -> OfflineBundleStore:
+    """Get the global offline bundle store, creating it on first use"""
+    global offline_bundle_store
+    if offline_bundle_store is None:
+        offline_bundle_store = OfflineBundleStore()
+    return offline_bundle_store
@@ -0,0 +1,492 @@
+"""
+Offline map packages in MBTiles format.
+
+Each region (bounds plus zoom levels) is packed into one SQLite MBTiles
+file using the deduplicated layout: tile images are stored once per content
+hash in `images` and the `map` table points every (zoom, column, row) at a
+hash, so the thousands of identical tiles of open water, fields or empty
+land cost a single blob. Refreshing a package collects the tiles again but
+rewrites only the rows whose hash changed. Builds work on a copy that
+atomically replaces the old file, so a download in progress keeps reading
+a consistent snapshot, and an unchanged refresh leaves the file (and its
+ETag) untouched so interrupted downloads can still resume.
+"""
+import hashlib
+import math
+import os
+import shutil
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MAX_LATITUDE = 85.0511287798
+MBTILES_MEDIA_TYPE = "application/x-sqlite3"
+
+# Regions offered for download; tile counts and sizes come from the packages
+DEFAULT_REGIONS = [
+    {
+        "region_id": "delhi_central",
+        "region_name": "Delhi Central District",
+        "bounds": {"north": 28.7041, "south": 28.5100, "east": 77.3300, "west": 77.1000},
+        "zoom_levels": [10, 11, 12, 13, 14, 15]
+    },
+    {
+        "region_id": "mumbai_suburban",
+        "region_name": "Mumbai Suburban Areas",
+        "bounds": {"north": 19.2700, "south": 19.0000, "east": 72.9700, "west": 72.7700},
+        "zoom_levels": [10, 11, 12, 13, 14]
+    }
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT, value TEXT);
+CREATE UNIQUE INDEX IF NOT EXISTS metadata_name ON metadata (name);
+CREATE TABLE IF NOT EXISTS map (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_id TEXT);
+CREATE UNIQUE INDEX IF NOT EXISTS map_index ON map (zoom_level, tile_column, tile_row);
+CREATE TABLE IF NOT EXISTS images (tile_data BLOB, tile_id TEXT);
+CREATE UNIQUE INDEX IF NOT EXISTS images_id ON images (tile_id);
+CREATE VIEW IF NOT EXISTS tiles AS
+    SELECT map.zoom_level AS zoom_level, map.tile_column AS tile_column,
+           map.tile_row AS tile_row, images.tile_data AS tile_data
+    FROM map JOIN images ON images.tile_id = map.tile_id;
+"""
+
+
+# ----------------------------------------------------------------------
+# Tile arithmetic (XYZ / Web Mercator)
+# ----------------------------------------------------------------------
+
+def lnglat_to_tile(lng: float, lat: float, zoom: int) -> Tuple[int, int]:
+    """XYZ tile column and row containing a point."""
+    n = 1 << zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of an XYZ tile in degrees."""
+    n = 1 << z
+    west, east = x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def _tile_ranges(bounds: Dict[str, float], zoom: int) -> Tuple[int, int, int, int]:
+    x0, y0 = lnglat_to_tile(bounds["west"], bounds["north"], zoom)
+    x1, y1 = lnglat_to_tile(bounds["east"], bounds["south"], zoom)
+    return x0, x1, y0, y1
+
+
+def region_tiles(bounds: Dict[str, float], zoom_levels: List[int]) -> Iterator[Tuple[int, int, int]]:
+    """Every (z, x, y) tile covering the bounds at the given zooms."""
+    for z in sorted(zoom_levels):
+        x0, x1, y0, y1 = _tile_ranges(bounds, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+def count_tiles(bounds: Dict[str, float], zoom_levels: List[int]) -> int:
+    """Number of tiles region_tiles yields."""
+    total = 0
+    for z in zoom_levels:
+        x0, x1, y0, y1 = _tile_ranges(bounds, z)
+        total += (x1 - x0 + 1) * (y1 - y0 + 1)
+    return total
+
+
+# ----------------------------------------------------------------------
+# Tile sources
+# ----------------------------------------------------------------------
+
+class UrlTileSource:
+    """
+    Collect tiles from an XYZ tile server.
+
+    Args:
+        template: URL with {z}, {x} and {y} placeholders
+        tile_format: Image format recorded in the package metadata
+        timeout: Per-request timeout in seconds
+    """
+
+    concurrent = True
+
+    def __init__(self, template: str, tile_format: str = "png", timeout: float = 10.0):
+        self.template = template
+        self.format = tile_format
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """Tile bytes, or None when the server has no tile there."""
+        import requests
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers["User-Agent"] = "disaster-response-offline-maps/1.0"
+        response = session.get(self.template.format(z=z, x=x, y=y), timeout=self.timeout)
+        if response.status_code in (204, 404):
+            return None
+        response.raise_for_status()
+        return response.content
+
+
+class RoadTileRenderer:
+    """
+    Render PNG tiles of a road network: roads as dark lines on a light
+    background. Tiles without roads all encode to the same bytes.
+
+    Args:
+        graph: Loaded RoadGraph
+        size: Tile edge in pixels
+    """
+
+    concurrent = False
+    format = "png"
+    BACKGROUND = 242
+    ROAD = 64
+
+    def __init__(self, graph, size: int = 256):
+        self.graph = graph
+        self.size = size
+        # One segment per road; the graph also stores a reverse twin of each
+        forward = np.flatnonzero(graph.edge_src < graph.edge_dst)
+        self._edges = np.zeros(graph.edge_count, dtype=bool)
+        self._edges[forward] = True
+
+    def __call__(self, z: int, x: int, y: int) -> bytes:
+        graph, size = self.graph, self.size
+        pixels = np.full((size, size), self.BACKGROUND, dtype=np.uint8)
+        west, south, east, north = tile_bounds(z, x, y)
+        # Pad by a pixel so lines ending just outside the tile still reach its edge
+        pad_lng, pad_lat = (east - west) / size, (north - south) / size
+        candidates = np.asarray(graph.edge_tree().search(
+            (west - pad_lng, south - pad_lat, east + pad_lng, north + pad_lat)), dtype=np.int64)
+        candidates = candidates[self._edges[candidates]] if len(candidates) else candidates
+        if len(candidates):
+            n = 1 << z
+
+            def project(nodes):
+                lat = np.radians(np.clip(graph.node_lat[nodes], -MAX_LATITUDE, MAX_LATITUDE))
+                return (((graph.node_lng[nodes] + 180.0) / 360.0 * n - x) * size,
+                        ((1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * n - y) * size)
+
+            x0, y0 = project(graph.edge_src[candidates])
+            x1, y1 = project(graph.edge_dst[candidates])
+            # Sample every segment at least once per pixel along its longer axis
+            steps = np.ceil(np.maximum(np.abs(x1 - x0), np.abs(y1 - y0))).astype(np.int64) + 1
+            segment = np.repeat(np.arange(len(candidates)), steps)
+            offsets = np.repeat(np.cumsum(steps) - steps, steps)
+            t = (np.arange(len(segment)) - offsets) / np.maximum(steps[segment] - 1, 1)
+            cols = np.floor(x0[segment] + (x1 - x0)[segment] * t).astype(np.int64)
+            rows = np.floor(y0[segment] + (y1 - y0)[segment] * t).astype(np.int64)
+            keep = (cols >= 0) & (cols < size) & (rows >= 0) & (rows < size)
+            pixels[rows[keep], cols[keep]] = self.ROAD
+        return encode_png(pixels)
+
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    """Encode a 2D uint8 array as an 8-bit grayscale PNG."""
+    height, width = pixels.shape
+    raw = np.zeros((height, width + 1), dtype=np.uint8)  # filter byte 0 per scanline
+    raw[:, 1:] = pixels
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n" +
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) +
+            chunk(b"IEND", b""))
+
+
+def default_tile_source():
+    """Tile server from OFFLINE_TILE_URL, else tiles rendered from the loaded road network."""
+    template = os.getenv("OFFLINE_TILE_URL")
+    if template:
+        return UrlTileSource(template, tile_format=os.getenv("OFFLINE_TILE_FORMAT", "png"))
+    from services.routing_service import get_routing_service
+
+    graph = get_routing_service().graph
+    if graph is None:
+        raise ValueError("No tile source: set OFFLINE_TILE_URL or load a road network (ROAD_NETWORK_PATH)")
+    return RoadTileRenderer(graph)
+
+
+# ----------------------------------------------------------------------
+# Package builder
+# ----------------------------------------------------------------------
+
+def build_mbtiles(path: str, region: Dict, source: Callable, workers: int = 4,
+                  batch_size: int = 256) -> Dict:
+    """
+    Create or refresh the MBTiles package of a region.
+
+    Args:
+        path: Package file; refreshed in place if it exists
+        region: region_id, region_name, bounds {north, south, east, west}, zoom_levels
+        source: Callable (z, x, y) -> tile bytes or None
+        workers: Parallel fetches for sources marked concurrent
+        batch_size: Tiles collected per write batch
+
+    Returns:
+        Build statistics; "changed" is False when the package was left untouched
+    """
+    started = time.perf_counter()
+    work_path = path + ".building"
+    if os.path.exists(work_path):
+        os.remove(work_path)
+    if os.path.exists(path):
+        shutil.copyfile(path, work_path)
+
+    conn = sqlite3.connect(work_path)
+    try:
+        conn.executescript(SCHEMA)
+        existing = {(z, col, row): tile_id for z, col, row, tile_id in
+                    conn.execute("SELECT zoom_level, tile_column, tile_row, tile_id FROM map")}
+        kept = set()
+        written = unchanged = missing = 0
+
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 and getattr(source, "concurrent", False) else None
+        tiles = region_tiles(region["bounds"], region["zoom_levels"])
+        try:
+            while True:
+                batch = [tile for _, tile in zip(range(batch_size), tiles)]
+                if not batch:
+                    break
+                images = pool.map(lambda t: source(*t), batch) if pool else (source(*t) for t in batch)
+                map_rows, image_rows = [], {}
+                for (z, x, y), data in zip(batch, images):
+                    if data is None:
+                        missing += 1
+                        continue
+                    key = (z, x, (1 << z) - 1 - y)  # MBTiles rows count from the south (TMS)
+                    kept.add(key)
+                    tile_id = hashlib.sha1(data).hexdigest()
+                    if existing.get(key) == tile_id:
+                        unchanged += 1
+                        continue
+                    image_rows[tile_id] = data
+                    map_rows.append(key + (tile_id,))
+                conn.executemany("INSERT OR IGNORE INTO images (tile_data, tile_id) VALUES (?, ?)",
+                                 [(sqlite3.Binary(data), tile_id) for tile_id, data in image_rows.items()])
+                conn.executemany("INSERT OR REPLACE INTO map (zoom_level, tile_column, tile_row, tile_id) "
+                                 "VALUES (?, ?, ?, ?)", map_rows)
+                written += len(map_rows)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        stale = [key for key in existing if key not in kept]
+        conn.executemany("DELETE FROM map WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", stale)
+        orphans = conn.execute("DELETE FROM images WHERE tile_id NOT IN (SELECT tile_id FROM map)").rowcount
+
+        bounds = region["bounds"]
+        metadata = {
+            "name": region.get("region_name", region["region_id"]),
+            "description": f"Offline map of {region.get('region_name', region['region_id'])}",
+            "format": getattr(source, "format", "png"),
+            "type": "baselayer",
+            "version": "1.1",
+            "bounds": f"{bounds['west']},{bounds['south']},{bounds['east']},{bounds['north']}",
+            "center": f"{(bounds['west'] + bounds['east']) / 2},{(bounds['south'] + bounds['north']) / 2},"
+                      f"{min(region['zoom_levels'])}",
+            "minzoom": str(min(region["zoom_levels"])),
+            "maxzoom": str(max(region["zoom_levels"])),
+            "region_id": region["region_id"]
+        }
+        changed = bool(written or stale or dict(conn.execute("SELECT name, value FROM metadata")) != metadata)
+        if changed:
+            conn.execute("DELETE FROM metadata")
+            conn.executemany("INSERT INTO metadata (name, value) VALUES (?, ?)", metadata.items())
+        conn.commit()
+        if stale or orphans:
+            conn.execute("VACUUM")
+        unique_images = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+    finally:
+        conn.close()
+
+    if changed:
+        os.replace(work_path, path)
+    else:
+        os.remove(work_path)
+
+    return {
+        "region_id": region["region_id"],
+        "tiles": len(kept),
+        "unique_images": unique_images,
+        "written": written,
+        "unchanged": unchanged,
+        "removed": len(stale),
+        "missing": missing,
+        "changed": changed,
+        "size_bytes": os.path.getsize(path),
+        "build_sec": round(time.perf_counter() - started, 3)
+    }
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Resolve a Range header against a file size.
+
+    Returns:
+        Inclusive (start, end), or None to send the whole file (no header,
+        a malformed one, or several ranges)
+
+    Raises:
+        ValueError: The range lies entirely past the end of the file
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = (part.strip() for part in spec.partition("-"))
+    if not all(part == "" or part.isdigit() for part in (first, last)) or first == last == "":
+        return None
+    if first == "":
+        if int(last) == 0:
+            raise ValueError(f"Range {header} is empty")
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+# ----------------------------------------------------------------------
+# Region registry
+# ----------------------------------------------------------------------
+
+class OfflineMapStore:
+    """
+    Offline map regions and their packages.
+
+    Args:
+        directory: Where packages (<region_id>.mbtiles) are kept
+        regions: Region definitions; DEFAULT_REGIONS if omitted
+        source_factory: Returns the tile source for a build
+    """
+
+    def __init__(self, directory: str, regions: Optional[List[Dict]] = None,
+                 source_factory: Callable = default_tile_source):
+        self.directory = directory
+        self.regions = {r["region_id"]: dict(r) for r in (regions if regions is not None else DEFAULT_REGIONS)}
+        self.source_factory = source_factory
+        self._builds: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def package_path(self, region_id: str) -> str:
+        return os.path.join(self.directory, f"{region_id}.mbtiles")
+
+    def open_package(self, region_id: str):
+        """
+        Open a region's package for reading.
+
+        Returns:
+            (file handle, {"size", "etag", "last_modified"}), or None if not built.
+            The handle keeps reading the same snapshot if a rebuild replaces the file.
+        """
+        try:
+            handle = open(self.package_path(region_id), "rb")
+        except FileNotFoundError:
+            return None
+        info = self._describe(os.fstat(handle.fileno()))
+        return handle, info
+
+    @staticmethod
+    def _describe(stat) -> Dict:
+        return {
+            "size": stat.st_size,
+            "etag": f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+            "last_modified": datetime.utcfromtimestamp(stat.st_mtime)
+        }
+
+    def list_regions(self) -> List[Dict]:
+        """Regions with tile counts, package sizes and build state."""
+        regions = []
+        for region_id, region in self.regions.items():
+            try:
+                package = self._describe(os.stat(self.package_path(region_id)))
+            except FileNotFoundError:
+                package = None
+            build = self._builds.get(region_id, {})
+            regions.append(dict(
+                region,
+                tile_count=build.get("stats", {}).get("tiles") or count_tiles(region["bounds"], region["zoom_levels"]),
+                size_mb=round(package["size"] / (1024 * 1024), 2) if package else 0.0,
+                last_updated=package["last_modified"] if package else datetime.utcnow(),
+                package_available=package is not None,
+                build_status=build.get("status")
+            ))
+        return regions
+
+    def build(self, region_id: str, source: Optional[Callable] = None, workers: int = 4) -> Dict:
+        """Build or refresh a region's package now; raises KeyError for unknown regions."""
+        region = self.regions[region_id]
+        if not self._claim(region_id):
+            raise RuntimeError(f"Region {region_id} is already being built")
+        return self._run_build(region, source, workers)
+
+    def start_build(self, region_id: str, workers: int = 4) -> Dict:
+        """Build a region's package on a background thread; returns its build status."""
+        region = self.regions[region_id]
+        if self._claim(region_id):
+            def run():
+                try:
+                    self._run_build(region, None, workers)
+                except Exception as e:
+                    print(f"Offline map build failed for {region_id}: {e}")
+
+            threading.Thread(target=run, daemon=True).start()
+        return self.build_status(region_id)
+
+    def _claim(self, region_id: str) -> bool:
+        """Mark a region as building; False if a build is already running."""
+        with self._lock:
+            if self._builds.get(region_id, {}).get("status") == "building":
+                return False
+            self._builds[region_id] = {"status": "building", "started_at": datetime.utcnow()}
+            return True
+
+    def _run_build(self, region: Dict, source: Optional[Callable], workers: int) -> Dict:
+        region_id = region["region_id"]
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stats = build_mbtiles(self.package_path(region_id), region, source or self.source_factory(), workers)
+        except Exception as e:
+            self._builds[region_id] = {"status": "failed", "error": str(e), "finished_at": datetime.utcnow()}
+            raise
+        self._builds[region_id] = {"status": "ready", "stats": stats, "finished_at": datetime.utcnow()}
+        return stats
+
+    def build_status(self, region_id: str) -> Dict:
+        """State of the latest build of a region; raises KeyError for unknown regions."""
+        if region_id not in self.regions:
+            raise KeyError(region_id)
+        return dict(self._builds.get(region_id, {"status": "not_built"}), region_id=region_id)
+
+
+# Create global instance
+offline_map_store = None
+
+
+def get_offline_map_store() -> OfflineMapStore:
+    """Get the global offline map store, creating it on first use"""
+    global offline_map_store
+    if offline_map_store is None:
+        offline_map_store = OfflineMapStore(os.getenv("OFFLINE_MAPS_DIR", "offline_maps"))
+    return offline_map_store
@@ -0,0 +1,122 @@
+"""
+Result cache for evacuation route requests.
+
+Requests are keyed by the grid cell their origin snaps to, the destination
+type, travel mode and search radius. Every entry also records the version
+of the data it was computed from (safe-zone, danger-zone and catchment
+versions); a lookup under a newer version misses and the first request to
+see a new version drops the whole cache, so a route computed before a zone
+changed is never served after it.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from services.geodesy import KM_PER_DEGREE
+
+
+class RouteCache:
+    """
+    Thread-safe LRU cache of route responses.
+
+    Args:
+        max_entries: Entries kept before the least recently used is evicted
+        cell_m: Edge of the origin grid cells in metres
+    """
+
+    def __init__(self, max_entries: int = 10000, cell_m: float = 50.0):
+        self.max_entries = max_entries
+        self.cell_m = cell_m
+        self._d_lat = cell_m / 1000 / KM_PER_DEGREE
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def origin_cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        """Grid cell of a point; cells are cell_m square at their own latitude."""
+        row = math.floor(lat / self._d_lat)
+        d_lng = self._d_lat / max(0.01, math.cos(math.radians((row + 0.5) * self._d_lat)))
+        return row, math.floor(lng / d_lng)
+
+    def key(self, lat: float, lng: float, *params: Hashable) -> Tuple:
+        return self.origin_cell(lat, lng) + params
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        """Cached value for key computed under version, or None."""
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, version: Hashable, value: Any):
+        """Store a value computed under version; ignored if the data has moved on since."""
+        with self._lock:
+            self._check_version(version)
+            if version != self._version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _check_version(self, version: Hashable):
+        """Drop every entry when a newer data version is seen. Caller holds the lock."""
+        if self._version is None or _newer(version, self._version):
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Size, hit rate and invalidation counts."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "cell_m": self.cell_m,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "version": self._version
+            }
+
+
+def _newer(version: Hashable, current: Hashable) -> bool:
+    """Whether version is ahead of current; versions are tuples of counters that only grow."""
+    if isinstance(version, tuple) and isinstance(current, tuple) and len(version) == len(current):
+        return version != current and all(a >= b for a, b in zip(version, current))
+    return version != current
+
+
+# Create global instance
+route_cache = None
+
+
+def get_route_cache() -> RouteCache:
+    """Get the global route cache, creating it on first use"""
+    global route_cache
+    if route_cache is None:
+        route_cache = RouteCache(
+            max_entries=int(os.getenv("ROUTE_CACHE_SIZE", "10000")),
+            cell_m=float(os.getenv("ROUTE_CACHE_CELL_M", "50"))
+        )
+    return route_cache
@@ -0,0 +1,494 @@
+"""
+Live rerouting for routes that travellers are following.
+
+A subscription keeps the road path of one active route. When danger zones
+change, each travel profile's edge costs are compared with the costs seen
+at the last refresh, and only routes the change can affect are searched:
+
+* A route over a road that became slower or closed is repaired in place.
+  A* is seeded with the path's nodes up to the first affected edge at their
+  travel time so far, and every node of the path after the last affected
+  edge is a way back with its remaining time known. The search stops once
+  no frontier node can beat the best way back found, and the untouched head
+  and tail are spliced around the detour. While costs only rise the head
+  and tail stay shortest paths, so the repair is exact and explores little
+  more than the detour itself.
+* A road that became faster can only help a route if travelling to it and
+  on from it in a straight line at the profile's top speed beats the
+  route's remaining time; only those routes are searched again.
+
+Changed routes are pushed to the subscription's listeners (the SSE stream).
+"""
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.danger_zones import DangerZoneIndex, get_danger_zone_index
+from services.geodesy import haversine_km
+from services.routing_service import PROFILES, RoutingService, _ProfileGraph, get_routing_service
+
+# Nodes a splice repair may settle before falling back to a fresh search
+REPAIR_MAX_SETTLED = 50000
+
+
+class _ActiveRoute:
+    """A subscribed route: where the traveller is, where they are going and the path between."""
+
+    def __init__(self, subscription_id: str, mode: str, position: Tuple[float, float],
+                 destination: Tuple[float, float], destination_name: Optional[str], target: Tuple[int, float]):
+        self.id = subscription_id
+        self.mode = mode
+        self.position = position
+        self.destination = destination
+        self.destination_name = destination_name
+        self.target = target
+        self.node = -1
+        self.edges: List[int] = []
+        self.nodes: List[int] = []
+        self.blocked = False
+        self.sequence = 0
+        self.listeners: List[Callable[[Dict], None]] = []
+        self.touched = time.time()
+
+
+def _splice(prof: _ProfileGraph, h: List[float], seeds: Dict[int, float], exits: Dict[int, float],
+            overrides: Optional[Dict[int, float]], max_settled: int) -> Optional[Tuple[int, List[int], int, int]]:
+    """
+    A* from several start nodes to the cheapest of several exit nodes.
+
+    Args:
+        h: Lower bound on hours from every node to the route's target
+        seeds: start node -> hours already spent reaching it
+        exits: exit node -> hours still needed from it to the target
+        overrides: Per-edge hours replacing the profile's own
+
+    Returns:
+        (start node, detour edges, exit node, nodes settled), or None when no
+        exit is reachable within max_settled
+    """
+    rows, offsets = prof.rows, prof.offsets
+    best = dict(seeds)
+    parent = {node: (-1, -1) for node in seeds}
+    heap = [(g + h[node], g, node) for node, g in seeds.items()]
+    heapq.heapify(heap)
+    found, found_total, settled = None, math.inf, 0
+    while heap:
+        f, g, u = heapq.heappop(heap)
+        if f >= found_total:
+            break
+        if g > best[u]:
+            continue
+        if u in exits:
+            # The path on from an exit is already known, so there is nothing to expand
+            if g + exits[u] < found_total:
+                found, found_total = u, g + exits[u]
+            continue
+        settled += 1
+        if settled > max_settled:
+            return None
+        for v, cost, edge in rows[offsets[u]:offsets[u + 1]].tolist():
+            if overrides and edge in overrides:
+                cost = overrides[edge]
+            candidate = g + cost
+            if candidate < best.get(v, math.inf):
+                v = int(v)
+                best[v] = candidate
+                parent[v] = (u, int(edge))
+                heapq.heappush(heap, (candidate + h[v], candidate, v))
+    if found is None:
+        return None
+    detour, u = [], found
+    while parent[u][0] >= 0:
+        u, edge = parent[u]
+        detour.append(edge)
+    return u, detour[::-1], found, settled
+
+
+class RouteMonitor:
+    """
+    Active routes kept current as edge costs change.
+
+    Args:
+        routing: Routing service whose road graph the routes follow
+        zone_index: Danger zones, for exits from closed zones and zones crossed
+        ttl_sec: Idle time after which a route nobody listens to is dropped
+        max_routes: Routes kept before the least recently active is dropped
+        off_route_km: How far a reported position may be from the path
+            before the route is searched again from there
+    """
+
+    def __init__(self, routing: RoutingService, zone_index: DangerZoneIndex, ttl_sec: float = 3600.0,
+                 max_routes: int = 10000, off_route_km: float = 0.05):
+        self.routing = routing
+        self.zone_index = zone_index
+        self.ttl_sec = ttl_sec
+        self.max_routes = max_routes
+        self.off_route_km = off_route_km
+        self.routes: Dict[str, _ActiveRoute] = {}
+        self._costs: Dict[str, np.ndarray] = {}  # mode -> profile row costs at the last refresh
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self.repairs = {"splice": 0, "full": 0}
+        self.last_refresh: Dict = {}
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+
+    def subscribe(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float,
+                  mode: str = "walking", destination_name: Optional[str] = None) -> Optional[Dict]:
+        """
+        Start following a road route between two points.
+
+        Returns:
+            The first "route" event, or None without a road network or a
+            connection between the points
+        """
+        graph = self.routing.graph
+        if graph is None:
+            return None
+        mode = mode if mode in PROFILES else "walking"
+        origin = graph.snap(start_lat, start_lng, mode, self.routing.max_snap_km)
+        target = graph.snap(end_lat, end_lng, mode, self.routing.max_snap_km)
+        if origin is None or target is None:
+            return None
+        with self._lock:
+            # Catch up first so this route is only checked against later changes
+            pushes = self._refresh()
+            if mode not in self._costs:
+                self._costs[mode] = graph.profile(mode).rows[:, 1].copy()
+            route = _ActiveRoute(str(uuid.uuid4()), mode, (start_lat, start_lng), (end_lat, end_lng),
+                                 destination_name, target)
+            route.node = origin[0]
+            self._search(route)
+            if route.blocked:
+                result = None
+            else:
+                if len(self.routes) >= self.max_routes:
+                    oldest = min(self.routes.values(), key=lambda r: (bool(r.listeners), r.touched))
+                    pushes += self._close(oldest.id)
+                self.routes[route.id] = route
+                result = self._event(route, "route")
+        self._notify(pushes)
+        return result
+
+    def listen(self, subscription_id: str, callback: Callable[[Dict], None]) -> Optional[Dict]:
+        """Register a callback for a route's updates; returns its current event, or None if unknown."""
+        with self._lock:
+            route = self.routes.get(subscription_id)
+            if route is None:
+                return None
+            route.listeners.append(callback)
+            route.touched = time.time()
+            return self._event(route, "no_route" if route.blocked else "route")
+
+    def unlisten(self, subscription_id: str, callback: Callable[[Dict], None]):
+        with self._lock:
+            route = self.routes.get(subscription_id)
+            if route is not None and callback in route.listeners:
+                route.listeners.remove(callback)
+                route.touched = time.time()
+
+    def unsubscribe(self, subscription_id: str) -> bool:
+        """Stop following a route; listeners get a final "closed" event."""
+        with self._lock:
+            if subscription_id not in self.routes:
+                return False
+            pushes = self._close(subscription_id)
+        self._notify(pushes)
+        return True
+
+    def move(self, subscription_id: str, lat: float, lng: float) -> Optional[Dict]:
+        """
+        Report the traveller's position.
+
+        Near the path, the route is shortened to the closest node on it;
+        further away it is searched again from the new position and the
+        reroute is pushed.
+
+        Returns:
+            The route's current event, or None if the subscription is unknown
+        """
+        with self._lock:
+            route = self.routes.get(subscription_id)
+            if route is None:
+                return None
+            graph = self.routing.graph
+            route.position = (lat, lng)
+            route.touched = time.time()
+            nodes = np.asarray(route.nodes)
+            gap_km = haversine_km(lat, lng, graph.node_lat[nodes], graph.node_lng[nodes])
+            closest = int(np.argmin(gap_km))
+            if gap_km[closest] <= self.off_route_km and not route.blocked:
+                route.node = route.nodes[closest]
+                route.edges, route.nodes = route.edges[closest:], route.nodes[closest:]
+                return self._event(route, "route")
+
+            origin = graph.snap(lat, lng, route.mode, self.routing.max_snap_km)
+            if origin is None:
+                return self._event(route, "no_route" if route.blocked else "route")
+            route.node = origin[0]
+            self._search(route)
+            self.repairs["full"] += 1
+            pushes = self._push(route, "off_route")
+        self._notify(pushes)
+        return pushes[0][1] if pushes else self._event(route, "route")
+
+    # ------------------------------------------------------------------
+    # Rerouting
+    # ------------------------------------------------------------------
+
+    def refresh(self) -> Dict:
+        """
+        Repair or re-search every route affected by edge cost changes since the last refresh.
+
+        Returns:
+            Counts of routes checked, repaired and pushed
+        """
+        with self._lock:
+            pushes = self._refresh()
+        self._notify(pushes)
+        return self.last_refresh
+
+    def _refresh(self) -> List[Tuple[List[Callable], Dict]]:
+        """Caller holds the lock. Returns the updates to push once it is released."""
+        graph = self.routing.graph
+        if graph is None:
+            return []
+        started = time.perf_counter()
+        pushes = self._expire()
+        by_mode: Dict[str, List[_ActiveRoute]] = {}
+        for route in self.routes.values():
+            by_mode.setdefault(route.mode, []).append(route)
+        report = {"routes": len(self.routes), "checked": 0, "spliced": 0, "searched": 0, "pushed": 0, "settled": 0}
+
+        for mode in set(by_mode) | set(self._costs):
+            prof = graph.profile(mode)
+            costs = prof.rows[:, 1].copy()
+            previous = self._costs.get(mode)
+            self._costs[mode] = costs
+            if previous is None or mode not in by_mode:
+                continue
+            changed = np.nonzero(costs != previous)[0]
+            if not len(changed):
+                continue
+            slower = np.zeros(graph.edge_count, dtype=bool)
+            slower[prof.rows[changed[costs[changed] > previous[changed]], 2].astype(np.int64)] = True
+            faster_rows = changed[costs[changed] < previous[changed]]
+            faster = prof.rows[faster_rows, 2].astype(np.int64)
+            heuristics: Dict[int, List[float]] = {}
+
+            for route in by_mode[mode]:
+                report["checked"] += 1
+                if len(faster) and self._may_improve(route, prof, faster, costs[faster_rows]):
+                    before = route.edges
+                    self._search(route)
+                    self.repairs["full"] += 1
+                    report["searched"] += 1
+                    if route.edges != before or route.blocked:
+                        pushes += self._push(route, "faster_roads")
+                elif not route.blocked and route.edges and slower[route.edges].any():
+                    if route.target[0] not in heuristics:
+                        heuristics[route.target[0]] = graph._heuristic(prof, route.node, route.target[0])
+                    before = route.edges
+                    report["settled"] += self._repair(route, prof, slower, heuristics[route.target[0]])
+                    report["spliced"] += 1
+                    if route.edges != before or route.blocked:
+                        pushes += self._push(route, "zone_change")
+
+        report["pushed"] = len(pushes)
+        report["sec"] = round(time.perf_counter() - started, 4)
+        if report["checked"] or pushes:
+            self.last_refresh = report
+        return pushes
+
+    def _repair(self, route: _ActiveRoute, prof: _ProfileGraph, slower: np.ndarray, h: List[float]) -> int:
+        """Splice a detour around the path's slower edges; returns the nodes settled."""
+        factors = self._overrides(route)
+        overrides = prof.override_costs(factors)
+        row_costs = prof.rows[prof.edge_row[route.edges], 1]
+        costs = [overrides.get(edge, cost) for edge, cost in zip(route.edges, row_costs.tolist())]
+        affected = np.nonzero(slower[route.edges])[0]
+        first, last = int(affected[0]), int(affected[-1])
+        spent = [0.0] + list(itertools.accumulate(costs[:first]))
+        remaining = list(itertools.accumulate(reversed(costs[last + 1:])))[::-1] + [0.0]
+        seeds = dict(zip(route.nodes[:first + 1], spent))
+        exits = dict(zip(route.nodes[last + 1:], remaining))
+
+        found = _splice(prof, h, seeds, exits, overrides, REPAIR_MAX_SETTLED)
+        if found is None:
+            # No way back onto the path nearby: search the whole network
+            self._search(route, factors)
+            self.repairs["full"] += 1
+            return 0
+        start, detour, end, settled = found
+        head, tail = route.nodes.index(start), route.nodes.index(end)
+        self._set_path(route, route.edges[:head] + detour + route.edges[tail:])
+        self.repairs["splice"] += 1
+        return settled
+
+    def _may_improve(self, route: _ActiveRoute, prof: _ProfileGraph, faster: np.ndarray,
+                     faster_costs: np.ndarray) -> bool:
+        """Whether any faster edge could shorten the route's remaining travel time."""
+        graph = self.routing.graph
+        if route.blocked:
+            return True
+        if not route.edges:
+            return False
+        overrides = prof.override_costs(self._overrides(route))
+        row_costs = prof.rows[prof.edge_row[route.edges], 1]
+        remaining = sum(overrides.get(edge, cost) for edge, cost in zip(route.edges, row_costs.tolist()))
+        off_path = ~np.isin(faster, route.edges)
+        tails, heads = graph.edge_src[faster[off_path]], graph.edge_dst[faster[off_path]]
+        source, target = route.node, route.target[0]
+        lat, lng = graph.node_lat, graph.node_lng
+        to_tail = haversine_km(lat[source], lng[source], lat[tails], lng[tails]) / prof.max_speed
+        from_head = haversine_km(lat[heads], lng[heads], lat[target], lng[target]) / prof.max_speed
+        if prof.landmarks is not None:
+            _, from_landmarks, to_landmarks = prof.landmarks
+            with np.errstate(invalid="ignore"):
+                # Same triangle-inequality bounds as the A* heuristic; fmax skips NaN from unreachable landmarks
+                for bound, a, b in ((to_tail, [source], tails), (from_head, heads, [target])):
+                    np.fmax(bound, (from_landmarks[:, b] - from_landmarks[:, a]).max(axis=0, initial=-np.inf),
+                            out=bound)
+                    np.fmax(bound, (to_landmarks[:, a] - to_landmarks[:, b]).max(axis=0, initial=-np.inf),
+                            out=bound)
+        return bool((to_tail + faster_costs[off_path] + from_head < remaining * (1 - 1e-9)).any())
+
+    def _search(self, route: _ActiveRoute, factors: Optional[Dict[int, float]] = None):
+        """Search the route again from the traveller's node."""
+        if factors is None:
+            factors = self._overrides(route)
+        found = self.routing.graph.shortest_path(route.node, route.target[0], route.mode, factors)
+        if found is None:
+            route.blocked = True
+        else:
+            route.blocked = False
+            self._set_path(route, found[1])
+
+    def _set_path(self, route: _ActiveRoute, edges: List[int]):
+        route.edges = [int(edge) for edge in edges]
+        route.nodes = [route.node] + self.routing.graph.edge_dst[route.edges].tolist()
+
+    def _overrides(self, route: _ActiveRoute) -> Dict[int, float]:
+        """Edge factors opening exits from closed zones the traveller or destination is in."""
+        return self.zone_index.exit_overrides([route.position, route.destination])
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def _event(self, route: _ActiveRoute, event: str, reason: Optional[str] = None) -> Dict:
+        """A route's state as pushed to listeners."""
+        update = {
+            "event": event,
+            "subscription_id": route.id,
+            "sequence": route.sequence,
+            "mode": route.mode,
+            "destination": {"lat": route.destination[0], "lng": route.destination[1],
+                            "name": route.destination_name}
+        }
+        if reason:
+            update["reason"] = reason
+        if event not in ("route", "reroute"):
+            return update
+        graph = self.routing.graph
+        lat, lng = route.position
+        node = route.node
+        origin = (node, haversine_km(lat, lng, float(graph.node_lat[node]), float(graph.node_lng[node])))
+        described = self.routing.describe_path(lat, lng, route.destination[0], route.destination[1],
+                                               route.edges, route.mode, origin, route.target)
+        update["route"] = {
+            "distance_km": round(described["distance_km"], 2),
+            "duration_minutes": round(described["duration_minutes"]),
+            "waypoints": [{"lat": p_lat, "lng": p_lng} for p_lat, p_lng in described["coordinates"]],
+            "instructions": described["instructions"],
+            "zones_on_route": [{"id": zone["id"], "name": zone.get("name"), "risk_level": zone["risk_level"]}
+                               for zone in self.zone_index.zones_on_route(route.edges)]
+        }
+        return update
+
+    def _push(self, route: _ActiveRoute, reason: str) -> List[Tuple[List[Callable], Dict]]:
+        route.sequence += 1
+        return [(list(route.listeners), self._event(route, "no_route" if route.blocked else "reroute", reason))]
+
+    def _close(self, subscription_id: str) -> List[Tuple[List[Callable], Dict]]:
+        route = self.routes.pop(subscription_id)
+        route.sequence += 1
+        return [(route.listeners, self._event(route, "closed"))] if route.listeners else []
+
+    def _expire(self) -> List[Tuple[List[Callable], Dict]]:
+        """Drop routes nobody has listened to or moved along within ttl_sec."""
+        cutoff = time.time() - self.ttl_sec
+        stale = [r.id for r in self.routes.values() if not r.listeners and r.touched < cutoff]
+        return [push for subscription_id in stale for push in self._close(subscription_id)]
+
+    @staticmethod
+    def _notify(pushes: List[Tuple[List[Callable], Dict]]):
+        for listeners, update in pushes:
+            for callback in listeners:
+                try:
+                    callback(update)
+                except Exception as e:
+                    print(f"Route update listener failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Background refresh
+    # ------------------------------------------------------------------
+
+    def start(self, interval_sec: float = 5.0):
+        """Refresh on a background thread whenever woken, or every interval_sec."""
+        if self._worker is not None or self.routing.graph is None:
+            return
+
+        def run():
+            while True:
+                self._wake.wait(interval_sec)
+                self._wake.clear()
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Route monitor refresh failed: {e}")
+
+        self._worker = threading.Thread(target=run, name="route-monitor", daemon=True)
+        self._worker.start()
+
+    def request_refresh(self):
+        """Wake the background worker after danger zones change."""
+        self._wake.set()
+
+    def get_stats(self) -> Dict:
+        """Active routes, listeners and repair counts."""
+        with self._lock:
+            return {
+                "routes": len(self.routes),
+                "listeners": sum(len(route.listeners) for route in self.routes.values()),
+                "blocked": sum(route.blocked for route in self.routes.values()),
+                "repairs": dict(self.repairs),
+                "last_refresh": self.last_refresh
+            }
+
+
+# Create global instance
+route_monitor = None
+
+
+def get_route_monitor() -> RouteMonitor:
+    """Get the global route monitor, creating it (and its refresh worker) on first use"""
+    global route_monitor
+    if route_monitor is None:
+        route_monitor = RouteMonitor(
+            get_routing_service(), get_danger_zone_index(),
+            ttl_sec=float(os.getenv("ROUTE_MONITOR_TTL_SEC", "3600")),
+            max_routes=int(os.getenv("ROUTE_MONITOR_MAX_ROUTES", "10000"))
+        )
+        route_monitor.start(float(os.getenv("ROUTE_MONITOR_REFRESH_SEC", "5")))
+    return route_monitor
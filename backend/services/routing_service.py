@@ -0,0 +1,719 @@
+"""
+Road-network routing for evacuation navigation.
+
+A local road extract (GeoJSON LineStrings, an OSM PBF when pyosmium is
+installed, or a previously saved .npz) is loaded into flat NumPy arrays:
+one row per directed road segment, plus a CSR adjacency (indptr, targets,
+costs) per travel profile. Queries snap both ends to the nearest routable
+node with the spherical k-d tree and run A* with a haversine heuristic, so
+a cross-town route on a city-scale graph takes milliseconds.
+
+With an elevation model attached, every edge also carries its lowest point
+and a walking-time factor for its slopes, which the flood profile uses to
+keep evacuees on high ground.
+"""
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.elevation import ElevationModel
+from services.geodesy import EARTH_RADIUS_KM, haversine_km
+from services.spatial_index import SphericalKDTree, STRTree, _to_unit_vectors
+
+# Road classes, indexed by edge_class. "*_link" roads share their parent class.
+HIGHWAY_CLASSES = (
+    "motorway", "trunk", "primary", "secondary", "tertiary", "unclassified", "residential",
+    "service", "living_street", "track", "path", "footway", "cycleway", "pedestrian", "steps", "other"
+)
+HIGHWAY_INDEX = {name: i for i, name in enumerate(HIGHWAY_CLASSES)}
+
+# highway=* values that are not usable roads
+NON_ROUTABLE = {"construction", "proposed", "abandoned", "platform", "raceway", "bus_stop", "corridor", "elevator"}
+
+# Speeds in km/h per road class; a class missing from "speeds" uses
+# default_speed, a class in "excluded" is not traversable. Defaults match the
+# flat speeds the navigation router used before road routing existed.
+PROFILES = {
+    "walking": {
+        "default_speed": 5.0,
+        "speeds": {"steps": 2.0},
+        "excluded": {"motorway", "trunk"},
+        "oneway": False
+    },
+    "cycling": {
+        "default_speed": 15.0,
+        "speeds": {"track": 10.0, "path": 8.0, "footway": 5.0, "pedestrian": 5.0, "steps": 2.0},
+        "excluded": {"motorway"},
+        "oneway": True
+    },
+    "driving": {
+        "default_speed": 30.0,
+        "speeds": {
+            "motorway": 80.0, "trunk": 60.0, "primary": 50.0, "secondary": 40.0, "tertiary": 35.0,
+            "unclassified": 30.0, "residential": 25.0, "service": 15.0, "living_street": 10.0,
+            "track": 15.0
+        },
+        "excluded": {"path", "footway", "cycleway", "pedestrian", "steps"},
+        "oneway": True
+    },
+    # On foot through flooding terrain. With an elevation model, slopes set the
+    # pace and an edge costs up to 1 + lowland_penalty times more the lower its
+    # lowest point lies between the network's high and low ground; without
+    # one it routes like walking.
+    "flood": {
+        "default_speed": 5.0,
+        "speeds": {"steps": 2.0},
+        "excluded": {"motorway", "trunk"},
+        "oneway": False,
+        "terrain": {"lowland_penalty": 3.0, "high_percentile": 90, "low_percentile": 10}
+    }
+}
+
+ONEWAY_VALUES = {"yes", "true", "1"}
+
+
+def _parse_maxspeed(value) -> float:
+    """km/h from an OSM maxspeed tag ("50", "30 mph"); 0 when unknown."""
+    if value is None:
+        return 0.0
+    text = str(value).strip().lower()
+    factor = 1.609 if text.endswith("mph") else 1.0
+    try:
+        return float(text.replace("mph", "").replace("km/h", "").strip()) * factor
+    except ValueError:
+        return 0.0
+
+
+class _GraphBuilder:
+    """Accumulates ways and interns shared vertices as junction nodes."""
+
+    def __init__(self):
+        self.node_ids: Dict[Tuple[float, float], int] = {}
+        self.lats: List[float] = []
+        self.lngs: List[float] = []
+        self.src: List[int] = []
+        self.dst: List[int] = []
+        self.classes: List[int] = []
+        self.oneway: List[bool] = []
+        self.maxspeed: List[float] = []
+        self.name_ids: List[int] = []
+        self.names: List[str] = []
+        self._name_index: Dict[str, int] = {}
+
+    def _node(self, lng: float, lat: float) -> int:
+        key = (round(lng, 7), round(lat, 7))
+        node = self.node_ids.get(key)
+        if node is None:
+            node = self.node_ids[key] = len(self.lats)
+            self.lats.append(key[1])
+            self.lngs.append(key[0])
+        return node
+
+    def add_way(self, coordinates, tags: Dict):
+        """Add a polyline of [lng, lat] pairs with its OSM-style tags."""
+        highway = str(tags.get("highway") or "other")
+        if highway in NON_ROUTABLE or len(coordinates) < 2:
+            return
+        highway = highway[:-5] if highway.endswith("_link") else highway
+        road_class = HIGHWAY_INDEX.get(highway, HIGHWAY_INDEX["other"])
+
+        oneway = str(tags.get("oneway", "")).lower()
+        if oneway == "-1":
+            coordinates = list(reversed(coordinates))
+        is_oneway = oneway in ONEWAY_VALUES or oneway == "-1" or tags.get("junction") == "roundabout"
+
+        name = tags.get("name") or tags.get("ref")
+        name_id = -1
+        if name:
+            name_id = self._name_index.setdefault(name, len(self.names))
+            if name_id == len(self.names):
+                self.names.append(name)
+
+        maxspeed = _parse_maxspeed(tags.get("maxspeed"))
+        nodes = [self._node(float(c[0]), float(c[1])) for c in coordinates]
+        for a, b in zip(nodes, nodes[1:]):
+            if a == b:
+                continue
+            self.src.append(a)
+            self.dst.append(b)
+            self.classes.append(road_class)
+            self.oneway.append(is_oneway)
+            self.maxspeed.append(maxspeed)
+            self.name_ids.append(name_id)
+
+    def build(self) -> "RoadGraph":
+        """Each segment becomes a forward edge and its reverse (flagged when against a oneway)."""
+        src = np.asarray(self.src, dtype=np.int32)
+        dst = np.asarray(self.dst, dtype=np.int32)
+        oneway = np.asarray(self.oneway, dtype=bool)
+        return RoadGraph(
+            node_lat=np.asarray(self.lats, dtype=np.float64),
+            node_lng=np.asarray(self.lngs, dtype=np.float64),
+            edge_src=np.concatenate([src, dst]),
+            edge_dst=np.concatenate([dst, src]),
+            edge_class=np.tile(np.asarray(self.classes, dtype=np.uint8), 2),
+            edge_backward=np.concatenate([np.zeros(len(src), dtype=bool), oneway]),
+            edge_maxspeed=np.tile(np.asarray(self.maxspeed, dtype=np.float32), 2),
+            edge_name=np.tile(np.asarray(self.name_ids, dtype=np.int32), 2),
+            names=self.names
+        )
+
+
+def _dijkstra(rows: np.ndarray, offsets: List[int], source: int, node_count: int) -> np.ndarray:
+    """Travel hours from source to every node over (target, hours, edge) rows; inf if unreachable."""
+    best = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        g, u = heapq.heappop(heap)
+        if g > best[u]:
+            continue
+        for v, cost, _ in rows[offsets[u]:offsets[u + 1]].tolist():
+            candidate = g + cost
+            if candidate < best.get(v, math.inf):
+                v = int(v)
+                best[v] = candidate
+                heapq.heappush(heap, (candidate, v))
+    dist = np.full(node_count, np.inf)
+    dist[np.fromiter(best.keys(), dtype=np.int64, count=len(best))] = np.fromiter(best.values(), dtype=np.float64,
+                                                                                   count=len(best))
+    return dist
+
+
+def _lowness(graph: "RoadGraph", terrain: Dict) -> np.ndarray:
+    """
+    How low each edge lies, from 0 (at or above the network's high ground) to 1
+    (at or below its low ground); 0 where the elevation model has no data.
+    """
+    known = graph.node_elevation[np.isfinite(graph.node_elevation)]
+    if not len(known):
+        return np.zeros(graph.edge_count)
+    high, low = np.percentile(known, [terrain["high_percentile"], terrain["low_percentile"]])
+    lowness = (high - graph.edge_low_m) / max(high - low, 1e-6)
+    return np.nan_to_num(np.clip(lowness, 0.0, 1.0), nan=0.0)
+
+
+class _ProfileGraph:
+    """
+    CSR adjacency of the edges one travel profile may use.
+
+    Each node's outgoing edges are rows[offsets[u]:offsets[u + 1]], with
+    rows of (target, hours, edge id), so expanding a node in the search is
+    a single slice. Landmark distance tables are attached by
+    RoadGraph.prepare(). travel_hours is the time each row takes;
+    base_hours, what the search minimizes before edge factors, adds the
+    profile's terrain preference.
+    """
+
+    def __init__(self, graph: "RoadGraph", profile: Dict):
+        speeds = np.array([0.0 if name in profile["excluded"] else profile["speeds"].get(name, profile["default_speed"])
+                           for name in HIGHWAY_CLASSES])
+        edge_speed = speeds[graph.edge_class]
+        if profile is PROFILES["driving"]:
+            posted = (graph.edge_maxspeed > 0) & (edge_speed > 0)
+            edge_speed = np.where(posted, graph.edge_maxspeed, edge_speed)
+        usable = edge_speed > 0
+        if profile["oneway"]:
+            usable &= ~graph.edge_backward
+        edge_hours = graph.edge_length_km / np.where(usable, edge_speed, 1.0)
+        preference = np.ones(graph.edge_count)
+        terrain = profile.get("terrain")
+        if terrain and graph.edge_low_m is not None:
+            edge_hours = edge_hours * graph.edge_walk_factor
+            preference += terrain["lowland_penalty"] * _lowness(graph, terrain)
+
+        self.node_count = graph.node_count
+        self.symmetric = not profile["oneway"]
+        self.edge_speed = edge_speed.astype(np.float32)
+        # Fastest pace on any usable edge, slopes included, keeps the distance heuristic a lower bound
+        pace = graph.edge_length_km[usable] / edge_hours[usable]
+        self.max_speed = float(pace.max()) if usable.any() else profile["default_speed"]
+        self.usable = usable
+        self.indptr, self.rows = self._csr(graph.edge_src, graph.edge_dst, edge_hours)
+        self.offsets = self.indptr.tolist()
+        self.travel_hours = self.rows[:, 1].copy()
+        self.rows[:, 1] *= preference[self.rows[:, 2].astype(np.int64)]
+        # rows[:, 1] is base_hours scaled by the graph's per-edge factors
+        self.base_hours = self.rows[:, 1].copy()
+        self.edge_row = np.full(graph.edge_count, -1, dtype=np.int64)
+        self.edge_row[self.rows[:, 2].astype(np.int64)] = np.arange(len(self.rows))
+        self.rows[:, 1] *= graph.edge_factor[self.rows[:, 2].astype(np.int64)]
+        # Nodes with an outgoing or incoming usable edge can be snapped to
+        self.routable = (np.diff(self.indptr) > 0) | (np.bincount(graph.edge_dst[usable], minlength=self.node_count) > 0)
+        self.landmarks: Optional[Tuple[List[int], np.ndarray, np.ndarray]] = None
+        self._edges = (graph.edge_src, graph.edge_dst, edge_hours * preference)
+
+    def _csr(self, tails: np.ndarray, heads: np.ndarray, edge_hours: np.ndarray):
+        ids = np.nonzero(self.usable)[0]
+        order = ids[np.argsort(tails[ids], kind="stable")]
+        indptr = np.zeros(self.node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails[order], minlength=self.node_count), out=indptr[1:])
+        rows = np.column_stack([heads[order], edge_hours[order], order])
+        return indptr, rows
+
+    def apply_factors(self, edge_ids: np.ndarray, factors: np.ndarray):
+        """Rescale the search cost of the given edges in place."""
+        rows = self.edge_row[edge_ids]
+        usable = rows >= 0
+        self.rows[rows[usable], 1] = self.base_hours[rows[usable]] * factors[usable]
+
+    def override_costs(self, factors: Dict[int, float]) -> Dict[int, float]:
+        """Search costs for edges whose factor is overridden for one query."""
+        costs = {}
+        for edge, factor in factors.items():
+            row = self.edge_row[edge]
+            if row >= 0:
+                costs[int(edge)] = float(self.base_hours[row]) * factor
+        return costs
+
+    def compute_landmarks(self, lat: np.ndarray, lng: np.ndarray, count: int):
+        """
+        Pick landmarks on the network's periphery and store travel times to and from each.
+
+        One landmark is taken per compass sector around the centroid (the
+        routable node furthest out), which keeps them spread without extra
+        searches.
+        """
+        candidates = np.nonzero(self.routable)[0]
+        if not len(candidates) or count <= 0:
+            return
+        d_lat = lat[candidates] - lat[candidates].mean()
+        d_lng = (lng[candidates] - lng[candidates].mean()) * math.cos(math.radians(lat[candidates].mean()))
+        sector = ((np.arctan2(d_lat, d_lng) + math.pi) / (2 * math.pi) * count).astype(np.int64) % count
+        radius = d_lat ** 2 + d_lng ** 2
+        picks = []
+        for s in range(count):
+            members = np.nonzero(sector == s)[0]
+            if len(members):
+                picks.append(int(candidates[members[np.argmax(radius[members])]]))
+
+        # Landmark bounds use base costs so they stay valid however edge factors change
+        base_rows = self.rows.copy()
+        base_rows[:, 1] = self.base_hours
+        from_landmarks = np.stack([_dijkstra(base_rows, self.offsets, node, self.node_count) for node in picks])
+        if self.symmetric:
+            to_landmarks = from_landmarks
+        else:
+            tails, heads, edge_hours = self._edges
+            reverse_indptr, reverse_rows = self._csr(heads, tails, edge_hours)
+            reverse_offsets = reverse_indptr.tolist()
+            to_landmarks = np.stack([_dijkstra(reverse_rows, reverse_offsets, node, self.node_count) for node in picks])
+        self.landmarks = (picks, from_landmarks, to_landmarks)
+
+
+class RoadGraph:
+    """
+    Directed road graph stored as flat arrays.
+
+    Edges are indexed 0..edge_count-1; node coordinates are degrees.
+    Per-profile adjacency is built on first use.
+    """
+
+    ACTIVE_LANDMARKS = 4
+
+    def __init__(self, node_lat: np.ndarray, node_lng: np.ndarray, edge_src: np.ndarray, edge_dst: np.ndarray,
+                 edge_class: np.ndarray, edge_backward: np.ndarray, edge_maxspeed: np.ndarray,
+                 edge_name: np.ndarray, names: List[str]):
+        self.node_lat = node_lat
+        self.node_lng = node_lng
+        self.edge_src = edge_src
+        self.edge_dst = edge_dst
+        self.edge_class = edge_class
+        self.edge_backward = edge_backward
+        self.edge_maxspeed = edge_maxspeed
+        self.edge_name = edge_name
+        self.names = list(names)
+        self.edge_length_km = haversine_km(node_lat[edge_src], node_lng[edge_src],
+                                            node_lat[edge_dst], node_lng[edge_dst])
+        self._xyz = _to_unit_vectors(node_lat, node_lng)
+        # Cost multipliers per edge (inf blocks it), e.g. from danger zones
+        self.edge_factor = np.ones(len(edge_src))
+        # Terrain, filled in by set_elevation()
+        self.elevation: Optional[ElevationModel] = None
+        self.node_elevation: Optional[np.ndarray] = None
+        self.edge_low_m: Optional[np.ndarray] = None
+        self.edge_climb_m: Optional[np.ndarray] = None
+        self.edge_walk_factor: Optional[np.ndarray] = None
+        self._profiles: Dict[str, _ProfileGraph] = {}
+        self._edge_tree: Optional[STRTree] = None
+        self._tree: Optional[SphericalKDTree] = None
+        self._lock = threading.Lock()
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_lat)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_src)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_geojson(cls, source) -> "RoadGraph":
+        """Build from a GeoJSON FeatureCollection (dict or file path) of LineString/MultiLineString roads."""
+        if not isinstance(source, dict):
+            with open(source, "r", encoding="utf-8") as f:
+                source = json.load(f)
+        builder = _GraphBuilder()
+        for feature in source.get("features", []):
+            geometry = feature.get("geometry") or {}
+            tags = feature.get("properties") or {}
+            if geometry.get("type") == "LineString":
+                builder.add_way(geometry["coordinates"], tags)
+            elif geometry.get("type") == "MultiLineString":
+                for line in geometry["coordinates"]:
+                    builder.add_way(line, tags)
+        return builder.build()
+
+    @classmethod
+    def from_pbf(cls, path: str) -> "RoadGraph":
+        """Build from an OSM PBF extract. Requires pyosmium (pip install osmium)."""
+        try:
+            import osmium
+        except ImportError as e:
+            raise ImportError("Loading .osm.pbf road networks requires pyosmium (pip install osmium)") from e
+
+        builder = _GraphBuilder()
+
+        class WayHandler(osmium.SimpleHandler):
+            def way(self, way):
+                if "highway" not in way.tags:
+                    return
+                coordinates = [(n.lon, n.lat) for n in way.nodes if n.location.valid()]
+                builder.add_way(coordinates, {tag.k: tag.v for tag in way.tags})
+
+        WayHandler().apply_file(path, locations=True)
+        return builder.build()
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        """Load a road network, picking the reader from the file extension."""
+        lowered = path.lower()
+        if lowered.endswith(".npz"):
+            data = np.load(path, allow_pickle=False)
+            return cls(data["node_lat"], data["node_lng"], data["edge_src"], data["edge_dst"],
+                       data["edge_class"], data["edge_backward"], data["edge_maxspeed"],
+                       data["edge_name"], data["names"].tolist())
+        if lowered.endswith(".pbf"):
+            return cls.from_pbf(path)
+        return cls.from_geojson(path)
+
+    def save(self, path: str):
+        """Save the compact arrays as .npz for fast reloads."""
+        np.savez_compressed(
+            path, node_lat=self.node_lat, node_lng=self.node_lng, edge_src=self.edge_src,
+            edge_dst=self.edge_dst, edge_class=self.edge_class, edge_backward=self.edge_backward,
+            edge_maxspeed=self.edge_maxspeed, edge_name=self.edge_name, names=np.asarray(self.names, dtype=str)
+        )
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def profile(self, mode: str) -> _ProfileGraph:
+        """Adjacency for a travel mode, built on first use."""
+        mode = mode if mode in PROFILES else "walking"
+        prof = self._profiles.get(mode)
+        if prof is None:
+            with self._lock:
+                prof = self._profiles.get(mode)
+                if prof is None:
+                    prof = self._profiles[mode] = _ProfileGraph(self, PROFILES[mode])
+        return prof
+
+    def set_elevation(self, dem: ElevationModel, sample_m: float = 30.0):
+        """
+        Sample a DEM under every node and along every edge.
+
+        Each edge gets its lowest height, total climb and a walking-time
+        factor for its slopes (Tobler's hiking function, sampled every
+        sample_m metres). Profiles that weigh terrain are rebuilt on next
+        use, so attach the DEM before routing starts.
+        """
+        started = time.perf_counter()
+        terrain = dem.profile_segments(self.node_lat[self.edge_src], self.node_lng[self.edge_src],
+                                       self.node_lat[self.edge_dst], self.node_lng[self.edge_dst],
+                                       self.edge_length_km, sample_m)
+        with self._lock:
+            self.elevation = dem
+            self.node_elevation = dem.sample(self.node_lat, self.node_lng)
+            self.edge_low_m = terrain["low_m"]
+            self.edge_climb_m = terrain["climb_m"]
+            self.edge_walk_factor = terrain["walk_factor"]
+            for mode in [m for m in self._profiles if PROFILES[m].get("terrain")]:
+                del self._profiles[mode]
+        covered = int(np.isfinite(self.edge_low_m).sum())
+        print(f"Elevation sampled for {covered}/{self.edge_count} edges in {time.perf_counter() - started:.1f}s")
+
+    def set_edge_factors(self, edge_ids, factors):
+        """
+        Set cost multipliers for some edges; math.inf closes an edge.
+
+        Only the listed edges are touched in each built profile, so zone
+        updates never rebuild the adjacency.
+        """
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        factors = np.broadcast_to(np.asarray(factors, dtype=np.float64), edge_ids.shape)
+        with self._lock:
+            self.edge_factor[edge_ids] = factors
+            for prof in self._profiles.values():
+                prof.apply_factors(edge_ids, factors)
+
+    def edge_tree(self) -> STRTree:
+        """R-tree over edge bounding boxes in (lng, lat) order, built on first use."""
+        if self._edge_tree is None:
+            with self._lock:
+                if self._edge_tree is None:
+                    lng_a, lng_b = self.node_lng[self.edge_src], self.node_lng[self.edge_dst]
+                    lat_a, lat_b = self.node_lat[self.edge_src], self.node_lat[self.edge_dst]
+                    self._edge_tree = STRTree.from_arrays(np.column_stack([
+                        np.minimum(lng_a, lng_b), np.minimum(lat_a, lat_b),
+                        np.maximum(lng_a, lng_b), np.maximum(lat_a, lat_b)
+                    ]))
+        return self._edge_tree
+
+    def _node_tree(self) -> SphericalKDTree:
+        if self._tree is None:
+            with self._lock:
+                if self._tree is None:
+                    self._tree = SphericalKDTree(
+                        {i: (lat, lng) for i, (lat, lng) in enumerate(zip(self.node_lat.tolist(), self.node_lng.tolist()))}
+                    )
+        return self._tree
+
+    def snap(self, lat: float, lng: float, mode: str = "walking",
+             max_km: Optional[float] = None) -> Optional[Tuple[int, float]]:
+        """Nearest node usable by the mode, as (node, distance_km)."""
+        routable = self.profile(mode).routable
+        match = self._node_tree().nearest(lat, lng, k=1, max_km=max_km, predicate=lambda i: routable[i])
+        return match[0] if match else None
+
+    def prepare(self, modes=None, landmarks: int = 8):
+        """
+        Precompute landmark tables so A* can use triangle-inequality bounds.
+
+        This runs a few full Dijkstra searches per mode; until it finishes,
+        queries use the haversine bound alone.
+        """
+        for mode in modes or PROFILES:
+            started = time.perf_counter()
+            self.profile(mode).compute_landmarks(self.node_lat, self.node_lng, landmarks)
+            print(f"Road network landmarks for {mode} ready in {time.perf_counter() - started:.1f}s")
+
+    def _heuristic(self, prof: _ProfileGraph, source: int, target: int) -> List[float]:
+        """
+        Lower bound on travel hours from every node to target.
+
+        The haversine distance at the profile's top speed, raised by the
+        landmark bounds d(L, t) - d(L, v) and d(v, L) - d(t, L) of the
+        landmarks that are tightest at the source.
+        """
+        # haversine term sin^2(d/2) is (1 - cos d) / 2, a single dot product per node
+        a = np.clip((1.0 - self._xyz @ self._xyz[target]) / 2, 0.0, 1.0)
+        bound = (2 * EARTH_RADIUS_KM / prof.max_speed) * np.arcsin(np.sqrt(a))
+
+        if prof.landmarks is not None:
+            _, from_landmarks, to_landmarks = prof.landmarks
+            with np.errstate(invalid="ignore"):
+                at_source = np.fmax(from_landmarks[:, target] - from_landmarks[:, source],
+                                    to_landmarks[:, source] - to_landmarks[:, target])
+                for i in np.argsort(np.nan_to_num(at_source, nan=0.0))[-self.ACTIVE_LANDMARKS:]:
+                    # fmax skips the NaN of nodes unreachable from and to a landmark
+                    np.fmax(bound, from_landmarks[i, target] - from_landmarks[i], out=bound)
+                    np.fmax(bound, to_landmarks[i] - to_landmarks[i, target], out=bound)
+        return bound.tolist()
+
+    def shortest_path(self, source: int, target: int, mode: str = "walking",
+                      factor_overrides: Optional[Dict[int, float]] = None) -> Optional[Tuple[float, List[int]]]:
+        """
+        A* between two nodes.
+
+        Edge factors are never below 1, so the heuristic never
+        overestimates and the first time the target is popped its cost is
+        optimal.
+
+        Args:
+            factor_overrides: Per-query edge factors replacing the graph's own,
+                e.g. to let a route leave a closed zone it starts in
+
+        Returns:
+            (travel hours, edge ids along the path), or None if unreachable
+        """
+        prof = self.profile(mode)
+        rows, offsets = prof.rows, prof.offsets
+        h = self._heuristic(prof, source, target)
+        overrides = prof.override_costs(factor_overrides) if factor_overrides else None
+
+        best = {source: 0.0}
+        parent = {source: (-1, -1)}
+        heap = [(h[source], 0.0, source)]
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if u == target:
+                path = []
+                while u != source:
+                    u, edge = parent[u]
+                    path.append(int(edge))
+                return g, path[::-1]
+            if g > best[u]:
+                continue
+            for v, cost, edge in rows[offsets[u]:offsets[u + 1]].tolist():
+                if overrides and edge in overrides:
+                    cost = overrides[edge]
+                candidate = g + cost
+                # Float node ids hash like ints, so lookups need no conversion
+                if candidate < best.get(v, math.inf):
+                    v = int(v)
+                    best[v] = candidate
+                    parent[v] = (u, edge)
+                    heapq.heappush(heap, (candidate + h[v], candidate, v))
+        return None
+
+    def describe(self, edge_ids: List[int]) -> List[str]:
+        """Turn-by-turn style instructions, one per run of same-named road."""
+        instructions = []
+        run_name, run_km = None, 0.0
+        for edge in edge_ids + [None]:
+            name = None if edge is None else self.edge_name[edge]
+            if edge is not None and (run_name is None or name == run_name):
+                run_name, run_km = name, run_km + float(self.edge_length_km[edge])
+                continue
+            if run_name is not None:
+                road = self.names[run_name] if run_name >= 0 else "unnamed road"
+                verb = "Continue on" if instructions else "Head along"
+                instructions.append(f"{verb} {road} for {run_km:.2f} km")
+            if edge is not None:
+                run_name, run_km = name, float(self.edge_length_km[edge])
+        return instructions
+
+
+class RoutingService:
+    """
+    Point-to-point routing over a loaded road network.
+
+    Args:
+        graph: Road graph; when None, route() returns None and callers fall back
+        max_snap_km: Furthest a query point may be from the road network
+    """
+
+    def __init__(self, graph: Optional[RoadGraph] = None, max_snap_km: float = 1.0):
+        self.graph = graph
+        self.max_snap_km = max_snap_km
+
+    @property
+    def available(self) -> bool:
+        return self.graph is not None
+
+    def route(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float,
+              mode: str = "walking", factor_overrides: Optional[Dict[int, float]] = None) -> Optional[Dict]:
+        """
+        Fastest road route between two points for a travel mode.
+
+        The search minimizes cost including edge factors (danger-zone
+        penalties); the reported duration is plain travel time. Distances
+        to and from the snapped road nodes are covered in a straight line
+        at the profile's default speed.
+
+        Returns:
+            {"distance_km", "duration_minutes", "coordinates", "instructions", ...}
+            or None when there is no graph or no connection
+        """
+        if self.graph is None:
+            return None
+        started = time.perf_counter()
+        graph = self.graph
+        mode = mode if mode in PROFILES else "walking"
+        origin = graph.snap(start_lat, start_lng, mode, self.max_snap_km)
+        destination = graph.snap(end_lat, end_lng, mode, self.max_snap_km)
+        if origin is None or destination is None:
+            return None
+        found = graph.shortest_path(origin[0], destination[0], mode, factor_overrides)
+        if found is None:
+            return None
+        result = self.describe_path(start_lat, start_lng, end_lat, end_lng, found[1], mode, origin, destination)
+        result["query_ms"] = (time.perf_counter() - started) * 1000
+        return result
+
+    def describe_path(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float,
+                      edges: List[int], mode: str, origin: Tuple[int, float],
+                      destination: Tuple[int, float]) -> Dict:
+        """
+        Route fields for a known edge path between two snapped points.
+
+        Args:
+            origin: (node, distance_km) the start point snapped to
+            destination: (node, distance_km) the end point snapped to
+        """
+        graph = self.graph
+        prof = graph.profile(mode)
+        hours = float(prof.travel_hours[prof.edge_row[edges]].sum()) if edges else 0.0
+        access_km = origin[1] + destination[1]
+        road_km = float(graph.edge_length_km[edges].sum()) if edges else 0.0
+        nodes = [origin[0]] + [int(graph.edge_dst[e]) for e in edges]
+        coordinates = [(start_lat, start_lng)]
+        coordinates += [(float(graph.node_lat[n]), float(graph.node_lng[n])) for n in nodes]
+        coordinates.append((end_lat, end_lng))
+        result = {
+            "mode": mode,
+            "distance_km": road_km + access_km,
+            "duration_minutes": (hours + access_km / PROFILES[mode]["default_speed"]) * 60,
+            "coordinates": coordinates,
+            "edge_ids": edges,
+            "instructions": graph.describe(edges),
+            "snap_km": {"origin": origin[1], "destination": destination[1]}
+        }
+        if graph.edge_low_m is not None and edges:
+            low = graph.edge_low_m[edges]
+            result["lowest_elevation_m"] = float(np.nanmin(low)) if np.isfinite(low).any() else None
+            result["climb_m"] = float(np.nansum(graph.edge_climb_m[edges]))
+        return result
+
+    def get_stats(self) -> Dict:
+        """Size of the loaded network."""
+        if self.graph is None:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            "nodes": self.graph.node_count,
+            "edges": self.graph.edge_count,
+            "profiles_built": sorted(self.graph._profiles),
+            "elevation": self.graph.elevation.get_stats() if self.graph.elevation is not None else None
+        }
+
+
+# Create global instance
+routing_service = None
+
+
+def get_routing_service() -> RoutingService:
+    """Get the global routing service, creating it on first use"""
+    global routing_service
+    if routing_service is None:
+        path = os.getenv("ROAD_NETWORK_PATH")
+        graph = None
+        if path:
+            try:
+                graph = RoadGraph.load(path)
+                print(f"Loaded road network from {path}: {graph.node_count} nodes, {graph.edge_count} edges")
+                dem_path = os.getenv("DEM_PATH")
+                if dem_path:
+                    try:
+                        graph.set_elevation(ElevationModel.load(dem_path),
+                                            sample_m=float(os.getenv("DEM_SAMPLE_M", "30")))
+                    except Exception as e:
+                        print(f"Failed to load elevation model {dem_path}: {e}")
+                landmarks = int(os.getenv("ROAD_NETWORK_LANDMARKS", "8"))
+                if landmarks > 0:
+                    threading.Thread(target=graph.prepare, kwargs={"landmarks": landmarks}, daemon=True).start()
+            except Exception as e:
+                print(f"Failed to load road network {path}: {e}")
+        routing_service = RoutingService(graph, max_snap_km=float(os.getenv("ROAD_NETWORK_MAX_SNAP_KM", "1.0")))
+    return routing_service
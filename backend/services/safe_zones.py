@@ -0,0 +1,143 @@
+"""
+Nearest safe-zone lookup for navigation.
+
+Shelters, hospitals and other safe zones are kept in one spherical k-d tree
+per zone type plus one over all zones, so "the k nearest available shelters
+within R km" is an O(log n) query however many zones a city registers.
+Status and free-capacity filters are applied as tree predicates, so
+occupancy updates never rebuild anything.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from services.spatial_index import SphericalKDTree
+
+# Statuses of zones that still admit people
+ACCEPTING_STATUSES = ("available", "nearly_full")
+
+
+class SafeZoneIndex:
+    """
+    Registry of safe zones with k-nearest-neighbour queries.
+
+    Zones are SafeZone-shaped dicts: id, name, location {lat, lng}, type,
+    capacity, current_occupancy, status, ...
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.zones: Dict[str, Dict] = {}
+        self._trees: Dict[str, SphericalKDTree] = {}
+        self._all = SphericalKDTree()
+        # Bumped on every change so callers can tell when cached answers are stale
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    def upsert_zone(self, zone: Dict) -> Dict:
+        """Register a zone or update its position, type, occupancy or status."""
+        with self._lock:
+            record = self._store(zone)
+            lat, lng = record["location"]["lat"], record["location"]["lng"]
+            self._trees.setdefault(record["type"], SphericalKDTree()).insert(record["id"], lat, lng)
+            self._all.insert(record["id"], lat, lng)
+            self.version += 1
+            return dict(record)
+
+    def upsert_zones(self, zones: Iterable[Dict]) -> int:
+        """Register or update many zones, rebuilding each affected tree once."""
+        with self._lock:
+            by_type: Dict[str, Dict] = {}
+            for zone in zones:
+                record = self._store(zone)
+                location = (record["location"]["lat"], record["location"]["lng"])
+                by_type.setdefault(record["type"], {})[record["id"]] = location
+            for zone_type, points in by_type.items():
+                self._trees.setdefault(zone_type, SphericalKDTree()).insert_many(points)
+            count = sum(len(points) for points in by_type.values())
+            if count:
+                self._all.insert_many({k: v for points in by_type.values() for k, v in points.items()})
+                self.version += 1
+            return count
+
+    def _store(self, zone: Dict) -> Dict:
+        """Save a zone record, dropping it from its old type's tree if the type changed. Caller holds the lock."""
+        existing = self.zones.get(zone["id"])
+        if existing and existing["type"] != zone["type"]:
+            self._trees[existing["type"]].remove(zone["id"])
+        record = dict(zone, last_updated=datetime.utcnow().isoformat())
+        record.pop("distance_km", None)
+        self.zones[record["id"]] = record
+        return record
+
+    def remove_zone(self, zone_id: str) -> bool:
+        """Unregister a zone; returns False if it was not registered."""
+        with self._lock:
+            zone = self.zones.pop(zone_id, None)
+            if zone is None:
+                return False
+            self._trees[zone["type"]].remove(zone_id)
+            self._all.remove(zone_id)
+            self.version += 1
+            return True
+
+    def nearest(self, lat: float, lng: float, k: int = 1, max_km: Optional[float] = None,
+                zone_type: Optional[str] = None, statuses: Optional[Iterable[str]] = None,
+                min_free_capacity: int = 0) -> List[Dict]:
+        """
+        Find the k nearest zones matching the filters.
+
+        Args:
+            lat, lng: Query location in degrees
+            k: Number of zones to return
+            max_km: Optional search radius in kilometres
+            zone_type: Only zones of this type ("shelter", "hospital", ...)
+            statuses: Only zones with one of these statuses
+            min_free_capacity: Only zones with at least this many free places
+
+        Returns:
+            Zone dicts with distance_km, nearest first
+        """
+        statuses = set(statuses) if statuses else None
+
+        def admits(zone_id) -> bool:
+            zone = self.zones[zone_id]
+            if statuses is not None and zone.get("status") not in statuses:
+                return False
+            return zone.get("capacity", 0) - zone.get("current_occupancy", 0) >= min_free_capacity
+
+        with self._lock:
+            tree = self._all if zone_type is None else self._trees.get(zone_type)
+            if tree is None:
+                return []
+            predicate = admits if statuses is not None or min_free_capacity > 0 else None
+            matches = tree.nearest(lat, lng, k=k, max_km=max_km, predicate=predicate)
+            return [dict(self.zones[zone_id], distance_km=distance_km) for zone_id, distance_km in matches]
+
+    def within(self, lat: float, lng: float, radius_km: float, **filters) -> List[Dict]:
+        """All zones matching the filters within radius_km, nearest first."""
+        return self.nearest(lat, lng, k=max(1, len(self.zones)), max_km=radius_km, **filters)
+
+    def get_stats(self) -> Dict:
+        """Zone counts by type and status."""
+        with self._lock:
+            by_type: Dict[str, int] = {}
+            by_status: Dict[str, int] = {}
+            for zone in self.zones.values():
+                by_type[zone["type"]] = by_type.get(zone["type"], 0) + 1
+                by_status[zone.get("status")] = by_status.get(zone.get("status"), 0) + 1
+            return {"zones": len(self.zones), "by_type": by_type, "by_status": by_status, "version": self.version}
+
+
+# Create global instance
+safe_zone_index = None
+
+
+def get_safe_zone_index() -> SafeZoneIndex:
+    """Get the global safe zone index, creating it on first use"""
+    global safe_zone_index
+    if safe_zone_index is None:
+        safe_zone_index = SafeZoneIndex()
+    return safe_zone_index
@@ -0,0 +1,430 @@
+"""
+Spatial indexes shared by the dispatch and navigation services.
+"""
+import heapq
+import math
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from services.geodesy import EARTH_RADIUS_KM
+
+
+def _to_unit_vectors(lat, lng) -> np.ndarray:
+    """Convert lat/lng degrees to 3D unit vectors (rows)."""
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    lng_rad = np.radians(np.asarray(lng, dtype=np.float64))
+    cos_lat = np.cos(lat_rad)
+    return np.stack([cos_lat * np.cos(lng_rad), cos_lat * np.sin(lng_rad), np.sin(lat_rad)], axis=-1)
+
+
+def chord_to_km(chord: float) -> float:
+    """Convert a chord length on the unit sphere to great-circle kilometres."""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km: float) -> float:
+    """Convert great-circle kilometres to a chord length on the unit sphere."""
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+class SphericalKDTree:
+    """
+    k-d tree over points on the sphere.
+
+    Points are stored as 3D unit vectors, so Euclidean (chord) distance is
+    monotonic in great-circle distance and the usual k-d tree pruning applies
+    everywhere, including across the antimeridian. Nearest-neighbour queries
+    are O(log n) on average and accept a predicate, so callers can skip
+    points (busy units, full shelters) without rebuilding.
+
+    Inserts go to a small unindexed buffer and removals are tombstoned; the
+    tree is rebuilt once either grows past a fraction of the indexed size.
+    """
+
+    LEAF_SIZE = 8
+
+    def __init__(self, points: Optional[Dict[Hashable, Tuple[float, float]]] = None):
+        self._coords: Dict[Hashable, Tuple[float, float]] = {}
+        self._pending: Dict[Hashable, np.ndarray] = {}
+        self._removed = set()
+        self._ids: List[Hashable] = []
+        self._xyz = np.zeros((0, 3))
+        self._nodes: List[Tuple] = []
+        if points:
+            for point_id, (lat, lng) in points.items():
+                self._coords[point_id] = (lat, lng)
+            self.rebuild()
+
+    def __len__(self) -> int:
+        return len(self._coords)
+
+    def __contains__(self, point_id: Hashable) -> bool:
+        return point_id in self._coords
+
+    def location(self, point_id: Hashable) -> Tuple[float, float]:
+        return self._coords[point_id]
+
+    def insert(self, point_id: Hashable, lat: float, lng: float):
+        """Add or move a point."""
+        if point_id in self._coords:
+            self.remove(point_id)
+        self._coords[point_id] = (lat, lng)
+        self._pending[point_id] = _to_unit_vectors(lat, lng)
+        if len(self._pending) > 16 + int(math.sqrt(len(self._ids))):
+            self.rebuild()
+
+    def insert_many(self, points: Dict[Hashable, Tuple[float, float]]):
+        """Add or move many points with a single rebuild."""
+        self._coords.update(points)
+        self.rebuild()
+
+    def remove(self, point_id: Hashable):
+        """Remove a point if present."""
+        if point_id not in self._coords:
+            return
+        del self._coords[point_id]
+        if point_id in self._pending:
+            del self._pending[point_id]
+        else:
+            self._removed.add(point_id)
+            if len(self._removed) > len(self._ids) // 2:
+                self.rebuild()
+
+    def rebuild(self):
+        """Rebuild the tree from all live points."""
+        self._ids = list(self._coords.keys())
+        if self._ids:
+            lats, lngs = zip(*(self._coords[i] for i in self._ids))
+            self._xyz = _to_unit_vectors(lats, lngs)
+        else:
+            self._xyz = np.zeros((0, 3))
+        self._pending = {}
+        self._removed = set()
+        self._nodes = []
+        if self._ids:
+            self._build(np.arange(len(self._ids)))
+
+    def _build(self, order: np.ndarray) -> int:
+        """Recursively build nodes; returns the node index."""
+        points = self._xyz[order]
+        lo, hi = points.min(axis=0), points.max(axis=0)
+        node_index = len(self._nodes)
+
+        if len(order) <= self.LEAF_SIZE:
+            self._nodes.append((lo, hi, None, None, order))
+            return node_index
+
+        axis = int(np.argmax(hi - lo))
+        mid = len(order) // 2
+        partition = np.argpartition(points[:, axis], mid)
+        self._nodes.append(None)
+        left = self._build(order[partition[:mid]])
+        right = self._build(order[partition[mid:]])
+        self._nodes[node_index] = (lo, hi, left, right, None)
+        return node_index
+
+    @staticmethod
+    def _box_distance(query: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> float:
+        delta = np.maximum(0.0, np.maximum(lo - query, query - hi))
+        return float(math.sqrt(float(delta @ delta)))
+
+    def nearest(self, lat: float, lng: float, k: int = 1, max_km: Optional[float] = None,
+                predicate: Optional[Callable[[Hashable], bool]] = None) -> List[Tuple[Hashable, float]]:
+        """
+        Find the k nearest points.
+
+        Args:
+            lat, lng: Query location in degrees
+            k: Number of neighbours to return
+            max_km: Optional search radius in kilometres
+            predicate: Optional filter; points for which it returns False are skipped
+
+        Returns:
+            List of (point_id, distance_km) sorted by distance
+        """
+        query = _to_unit_vectors(lat, lng)
+        bound = km_to_chord(max_km) if max_km is not None else float("inf")
+
+        # Max-heap (negated) of the best k candidates found so far
+        best: List[Tuple[float, int, Hashable]] = []
+        counter = 0
+
+        def consider(point_id, chord):
+            nonlocal counter
+            if chord > bound or (predicate is not None and not predicate(point_id)):
+                return
+            counter += 1
+            if len(best) < k:
+                heapq.heappush(best, (-chord, counter, point_id))
+            elif chord < -best[0][0]:
+                heapq.heapreplace(best, (-chord, counter, point_id))
+
+        def worst() -> float:
+            return -best[0][0] if len(best) == k else bound
+
+        for point_id, xyz in self._pending.items():
+            consider(point_id, float(np.linalg.norm(xyz - query)))
+
+        if self._nodes:
+            frontier = [(0.0, 0)]
+            while frontier:
+                box_dist, node_index = heapq.heappop(frontier)
+                if box_dist > worst():
+                    break
+                lo, hi, left, right, order = self._nodes[node_index]
+                if order is not None:
+                    chords = np.linalg.norm(self._xyz[order] - query, axis=1)
+                    for idx, chord in zip(order, chords):
+                        point_id = self._ids[idx]
+                        if point_id not in self._removed:
+                            consider(point_id, float(chord))
+                    continue
+                for child in (left, right):
+                    child_lo, child_hi = self._nodes[child][0], self._nodes[child][1]
+                    child_dist = self._box_distance(query, child_lo, child_hi)
+                    if child_dist <= worst():
+                        heapq.heappush(frontier, (child_dist, child))
+
+        results = sorted(((-neg_chord, point_id) for neg_chord, _, point_id in best), key=lambda r: r[0])
+        return [(point_id, chord_to_km(chord)) for chord, point_id in results]
+
+    def within(self, lat: float, lng: float, radius_km: float,
+               predicate: Optional[Callable[[Hashable], bool]] = None) -> List[Tuple[Hashable, float]]:
+        """Return all points within radius_km, sorted by distance."""
+        return self.nearest(lat, lng, k=max(1, len(self._coords)), max_km=radius_km, predicate=predicate)
+
+
+def points_in_polygon(x, y, ring) -> np.ndarray:
+    """
+    Even-odd containment test of many points against one polygon ring.
+
+    Args:
+        x, y: Point coordinates (arrays of equal length)
+        ring: Polygon vertices as [x, y] pairs; closed or not
+
+    Returns:
+        Boolean array, True where the point is inside
+    """
+    ring = np.asarray(ring, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)[:, None]
+    y = np.asarray(y, dtype=np.float64)[:, None]
+    x1, y1 = ring[:, 0], ring[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(straddles & (x < x_cross), axis=1) % 2 == 1
+
+
+def segments_intersect_polygon(x1, y1, x2, y2, ring, chunk: int = 4096) -> np.ndarray:
+    """
+    Whether each segment (x1, y1)-(x2, y2) touches a polygon ring: an end
+    lies inside it or the segment crosses one of its sides.
+    """
+    ring = np.asarray(ring, dtype=np.float64)
+    ax, ay = ring[:, 0], ring[:, 1]
+    bx, by = np.roll(ax, -1), np.roll(ay, -1)
+    x1, y1, x2, y2 = (np.asarray(v, dtype=np.float64) for v in (x1, y1, x2, y2))
+    hits = points_in_polygon(x1, y1, ring) | points_in_polygon(x2, y2, ring)
+
+    for start in range(0, len(x1), chunk):
+        sl = slice(start, start + chunk)
+        px, py, qx, qy = x1[sl, None], y1[sl, None], x2[sl, None], y2[sl, None]
+        # Orientation of each side's ends about the segment, and of the segment's ends about each side
+        d1 = (qx - px) * (ay - py) - (qy - py) * (ax - px)
+        d2 = (qx - px) * (by - py) - (qy - py) * (bx - px)
+        d3 = (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+        d4 = (bx - ax) * (qy - ay) - (by - ay) * (qx - ax)
+        boxes_meet = ((np.minimum(px, qx) <= np.maximum(ax, bx)) & (np.minimum(ax, bx) <= np.maximum(px, qx)) &
+                      (np.minimum(py, qy) <= np.maximum(ay, by)) & (np.minimum(ay, by) <= np.maximum(py, qy)))
+        crossing = (d1 * d2 <= 0) & (d3 * d4 <= 0) & boxes_meet
+        hits[sl] |= crossing.any(axis=1)
+    return hits
+
+
+class PreparedPolygon:
+    """
+    A polygon ring set up for repeated containment tests.
+
+    The ring's sides are bucketed into horizontal bands, so a point is only
+    tested against the sides spanning its band; a ring with thousands of
+    vertices costs each point a handful of crossing tests instead of one
+    per side. Results match points_in_polygon (even-odd rule).
+
+    Args:
+        ring: Polygon vertices as [x, y] pairs; closed or not
+        sides_per_band: Average number of sides per band
+    """
+
+    def __init__(self, ring, sides_per_band: int = 4):
+        ring = np.asarray(ring, dtype=np.float64)[:, :2]
+        self.bbox = (float(ring[:, 0].min()), float(ring[:, 1].min()),
+                     float(ring[:, 0].max()), float(ring[:, 1].max()))
+        x1, y1 = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        # Horizontal sides (including a repeated closing vertex) never straddle a point
+        sloped = y1 != y2
+        x1, y1, x2, y2 = x1[sloped], y1[sloped], x2[sloped], y2[sloped]
+        self._x1, self._y1 = x1, y1
+        self._slope = (x2 - x1) / (y2 - y1)
+        self._y_low, self._y_high = np.minimum(y1, y2), np.maximum(y1, y2)
+
+        bands = max(1, len(x1) // sides_per_band)
+        self._y0 = self.bbox[1]
+        self._band_height = (self.bbox[3] - self.bbox[1]) / bands or 1.0
+        self._bands = bands
+        first, last = self._band(self._y_low), self._band(self._y_high)
+        spans = last - first + 1
+        side = np.repeat(np.arange(len(x1)), spans)
+        band = first[side] + (np.arange(len(side)) - np.repeat(np.cumsum(spans) - spans, spans))
+        order = np.argsort(band, kind="stable")
+        self._band_sides = side[order]
+        self._band_start = np.zeros(bands + 1, dtype=np.int64)
+        np.cumsum(np.bincount(band, minlength=bands), out=self._band_start[1:])
+
+    def _band(self, y: np.ndarray) -> np.ndarray:
+        return np.clip(((y - self._y0) / self._band_height).astype(np.int64), 0, self._bands - 1)
+
+    def contains(self, x, y, chunk: int = 65536) -> np.ndarray:
+        """Boolean array, True where the point (x[i], y[i]) is inside."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        inside = np.zeros(len(x), dtype=bool)
+        x_min, y_min, x_max, y_max = self.bbox
+        candidates = np.nonzero((x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max))[0]
+        # Points are expanded into (point, side) pairs for their band's sides, chunk by chunk
+        for start in range(0, len(candidates), chunk):
+            points = candidates[start:start + chunk]
+            px, py = x[points], y[points]
+            band = self._band(py)
+            counts = self._band_start[band + 1] - self._band_start[band]
+            pair_point = np.repeat(np.arange(len(points)), counts)
+            offset = np.arange(len(pair_point)) - np.repeat(np.cumsum(counts) - counts, counts)
+            pair_side = self._band_sides[self._band_start[band][pair_point] + offset]
+            pair_y = py[pair_point]
+            straddles = (self._y_low[pair_side] <= pair_y) & (pair_y < self._y_high[pair_side])
+            x_cross = self._x1[pair_side] + (pair_y - self._y1[pair_side]) * self._slope[pair_side]
+            crossings = np.bincount(pair_point, weights=straddles & (px[pair_point] < x_cross), minlength=len(points))
+            inside[points] = crossings.astype(np.int64) % 2 == 1
+        return inside
+
+
+class STRTree:
+    """
+    Packed R-tree over bounding boxes (min_x, min_y, max_x, max_y).
+
+    Bulk-loaded with Sort-Tile-Recursive: items are sorted into vertical
+    slices by x and each slice by y, then packed NODE_CAPACITY at a time.
+    Node i of a level covers entries [i * NODE_CAPACITY, (i + 1) * NODE_CAPACITY)
+    of the level below, so a search descends a whole level per NumPy
+    operation instead of walking nodes one by one.
+
+    Like SphericalKDTree, inserts go to an unindexed buffer and removals are
+    tombstoned until a rebuild.
+    """
+
+    NODE_CAPACITY = 16
+
+    def __init__(self, boxes: Optional[Dict[Hashable, Tuple[float, float, float, float]]] = None):
+        self._boxes: Dict[Hashable, Tuple[float, float, float, float]] = dict(boxes or {})
+        self._pending: Dict[Hashable, Tuple[float, float, float, float]] = {}
+        self._removed = set()
+        self._ids = np.zeros(0, dtype=object)
+        self._levels: List[np.ndarray] = []
+        self.rebuild()
+
+    @classmethod
+    def from_arrays(cls, boxes: np.ndarray) -> "STRTree":
+        """Bulk-load a static tree whose item ids are the row numbers of boxes."""
+        tree = cls.__new__(cls)
+        tree._boxes = None
+        tree._pending, tree._removed = {}, set()
+        tree._pack(np.arange(len(boxes)), np.asarray(boxes, dtype=np.float64))
+        return tree
+
+    def __len__(self) -> int:
+        return len(self._boxes) if self._boxes is not None else len(self._ids)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._boxes
+
+    def insert(self, item_id: Hashable, box: Tuple[float, float, float, float]):
+        """Add or move an item."""
+        if item_id in self._boxes:
+            self.remove(item_id)
+        self._boxes[item_id] = tuple(box)
+        self._pending[item_id] = tuple(box)
+        if len(self._pending) > 16 + int(math.sqrt(len(self._ids))):
+            self.rebuild()
+
+    def remove(self, item_id: Hashable):
+        """Remove an item if present."""
+        if item_id not in self._boxes:
+            return
+        del self._boxes[item_id]
+        if item_id in self._pending:
+            del self._pending[item_id]
+        else:
+            self._removed.add(item_id)
+            if len(self._removed) > len(self._ids) // 2:
+                self.rebuild()
+
+    def rebuild(self):
+        """Repack the tree from all live items."""
+        ids = list(self._boxes.keys())
+        boxes = np.array([self._boxes[i] for i in ids], dtype=np.float64).reshape(-1, 4)
+        self._pending = {}
+        self._removed = set()
+        ids_array = np.empty(len(ids), dtype=object)
+        ids_array[:] = ids
+        self._pack(ids_array, boxes)
+
+    def _pack(self, ids: np.ndarray, boxes: np.ndarray):
+        capacity = self.NODE_CAPACITY
+        count = len(boxes)
+        if count:
+            leaves = math.ceil(count / capacity)
+            slice_size = math.ceil(math.sqrt(leaves)) * capacity
+            order = np.argsort(boxes[:, 0] + boxes[:, 2], kind="stable")
+            for start in range(0, count, slice_size):
+                part = order[start:start + slice_size]
+                order[start:start + slice_size] = part[np.argsort(boxes[part, 1] + boxes[part, 3], kind="stable")]
+            ids, boxes = ids[order], boxes[order]
+        self._ids = ids
+        self._levels = [boxes]
+        while len(self._levels[-1]) > capacity:
+            below = self._levels[-1]
+            padded = -(-len(below) // capacity) * capacity
+            groups = np.full((padded, 4), np.nan)
+            groups[:len(below)] = below
+            groups = groups.reshape(-1, capacity, 4)
+            self._levels.append(np.column_stack([
+                np.nanmin(groups[:, :, 0], axis=1), np.nanmin(groups[:, :, 1], axis=1),
+                np.nanmax(groups[:, :, 2], axis=1), np.nanmax(groups[:, :, 3], axis=1)
+            ]))
+
+    @staticmethod
+    def _overlaps(boxes: np.ndarray, box) -> np.ndarray:
+        return ((boxes[:, 0] <= box[2]) & (boxes[:, 2] >= box[0]) &
+                (boxes[:, 1] <= box[3]) & (boxes[:, 3] >= box[1]))
+
+    def search_indices(self, box: Tuple[float, float, float, float]) -> np.ndarray:
+        """Packed positions of indexed items whose boxes intersect box (pending items excluded)."""
+        capacity = self.NODE_CAPACITY
+        if not len(self._levels[0]):
+            return np.zeros(0, dtype=np.int64)
+        candidates = np.arange(len(self._levels[-1]))
+        for depth in range(len(self._levels) - 1, 0, -1):
+            hits = candidates[self._overlaps(self._levels[depth][candidates], box)]
+            children = (hits[:, None] * capacity + np.arange(capacity)).ravel()
+            candidates = children[children < len(self._levels[depth - 1])]
+        return candidates[self._overlaps(self._levels[0][candidates], box)]
+
+    def search(self, box: Tuple[float, float, float, float]) -> List[Hashable]:
+        """Ids of all items whose boxes intersect box."""
+        found = [item_id for item_id in self._ids[self.search_indices(box)].tolist() if item_id not in self._removed]
+        for item_id, (x0, y0, x1, y1) in self._pending.items():
+            if x0 <= box[2] and x1 >= box[0] and y0 <= box[3] and y1 >= box[1]:
+                found.append(item_id)
+        return found
@@ -0,0 +1,353 @@
+"""
+Zoom-dependent polygon simplification and Mapbox Vector Tiles.
+
+Rings are simplified with Douglas-Peucker in Web Mercator pixels of the
+requested zoom, so the default tolerance of half a pixel only drops
+vertices the screen could not show. Simplified rings keep a subset of the
+original vertices and are cached per ring content and zoom, so serving the
+same layer again costs a hash per polygon.
+
+Tiles are written straight to the MVT 2.1 protobuf layout without a
+protobuf dependency: polygons are simplified for the tile's zoom, clipped
+to the tile plus a buffer, quantized to the tile extent and encoded as
+command streams, with per-layer key and value tables.
+"""
+import hashlib
+import math
+import struct
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.offline_maps import MAX_LATITUDE, tile_bounds
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+# Pixels per tile edge that zoom levels and tolerances refer to
+TILE_PIXELS = 256
+# Deepest zoom tiles are served at
+MAX_TILE_ZOOM = 22
+# MVT geometry types
+_GEOMETRY_TYPES = {"Point": 1, "LineString": 2, "Polygon": 3}
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    """Whether an XYZ address names a tile."""
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 1 << z and 0 <= y < 1 << z
+
+
+def mercator_pixels(lngs, lats, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Web Mercator pixel coordinates at a zoom, y growing southwards."""
+    scale = TILE_PIXELS * (1 << zoom)
+    lats = np.clip(np.asarray(lats, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE)
+    x = (np.asarray(lngs, dtype=np.float64) + 180.0) / 360.0 * scale
+    y = (1.0 - np.arcsinh(np.tan(np.radians(lats))) / math.pi) / 2.0 * scale
+    return x, y
+
+
+def douglas_peucker(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Vertices of an open polyline that Douglas-Peucker keeps.
+
+    Returns:
+        Boolean mask over the vertices; both ends are always kept
+    """
+    count = len(x)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    spans = [(0, count - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = math.hypot(dx, dy)
+        # Distance to the chord, or to the first point when the chord is degenerate
+        distance = np.abs(px * dy - py * dx) / length if length > 0 else np.hypot(px, py)
+        far = int(np.argmax(distance))
+        if distance[far] > tolerance:
+            split = first + 1 + far
+            keep[split] = True
+            spans.append((first, split))
+            spans.append((split, last))
+    return keep
+
+
+def simplify_ring(ring, zoom: int, tolerance_px: float = 0.5) -> np.ndarray:
+    """
+    Simplify a polygon ring for display at a zoom.
+
+    Args:
+        ring: [lng, lat] vertices, closed or not
+        zoom: Web Mercator zoom level
+        tolerance_px: Largest deviation allowed, in pixels of 256-pixel tiles
+
+    Returns:
+        (n, 2) [lng, lat] vertices, at least three, closed if the input was
+    """
+    ring = np.asarray(ring, dtype=np.float64)[:, :2]
+    closed = len(ring) > 1 and np.array_equal(ring[0], ring[-1])
+    open_ring = ring[:-1] if closed else ring
+    if len(open_ring) <= 3:
+        return ring
+    x, y = mercator_pixels(open_ring[:, 0], open_ring[:, 1], zoom)
+    # Split the ring at the vertex farthest from the first one and simplify both halves
+    far = int(np.argmax(np.hypot(x - x[0], y - y[0])))
+    keep = np.zeros(len(open_ring), dtype=bool)
+    keep[:far + 1] = douglas_peucker(x[:far + 1], y[:far + 1], tolerance_px)
+    rest = np.append(np.arange(far, len(open_ring)), 0)
+    keep[rest] |= douglas_peucker(x[rest], y[rest], tolerance_px)
+    if np.count_nonzero(keep) < 3:
+        # A sub-pixel polygon keeps the triangle spanned by its widest vertices
+        dx, dy = x[far] - x[0], y[far] - y[0]
+        keep[int(np.argmax(np.abs((x - x[0]) * dy - (y - y[0]) * dx)))] = True
+    simplified = open_ring[keep]
+    if closed:
+        simplified = np.vstack([simplified, simplified[:1]])
+    return simplified
+
+
+class PolygonSimplifier:
+    """
+    Thread-safe LRU cache of simplified rings.
+
+    Args:
+        max_entries: Rings kept before the least recently used is evicted
+        tolerance_px: Simplification tolerance in pixels of 256-pixel tiles
+    """
+
+    def __init__(self, max_entries: int = 50000, tolerance_px: float = 0.5):
+        self.max_entries = max_entries
+        self.tolerance_px = tolerance_px
+        self._entries: "OrderedDict[Tuple[bytes, int], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.vertices_in = 0
+        self.vertices_out = 0
+
+    def simplify(self, ring, zoom: int) -> np.ndarray:
+        """Simplified ring for a zoom, from the cache when the same ring was seen before."""
+        ring = np.ascontiguousarray(ring, dtype=np.float64)
+        key = (hashlib.blake2b(ring.tobytes(), digest_size=16).digest() + struct.pack("<I", len(ring)), zoom)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+        simplified = simplify_ring(ring, zoom, self.tolerance_px)
+        with self._lock:
+            self.misses += 1
+            self.vertices_in += len(ring)
+            self.vertices_out += len(simplified)
+            self._entries[key] = simplified
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return simplified
+
+    def get_stats(self) -> Dict:
+        """Size, hit rate and the share of vertices simplification kept."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "tolerance_px": self.tolerance_px,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "vertices_kept": round(self.vertices_out / self.vertices_in, 4) if self.vertices_in else None
+            }
+
+
+# ----------------------------------------------------------------------
+# Mapbox Vector Tile encoding
+# ----------------------------------------------------------------------
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """A length-delimited protobuf field."""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _varint_field(number: int, value: int) -> bytes:
+    return _varint(number << 3) + _varint(value)
+
+
+def _packed(number: int, values: Sequence[int]) -> bytes:
+    return _field(number, b"".join(_varint(v) for v in values))
+
+
+def _value(value) -> bytes:
+    """A Tile.Value message."""
+    if isinstance(value, bool):
+        return _varint_field(7, int(value))
+    if isinstance(value, int):
+        return _varint_field(6, _zigzag(value)) if value < 0 else _varint_field(5, value)
+    if isinstance(value, float):
+        return _varint(3 << 3 | 1) + struct.pack("<d", value)
+    return _field(1, str(value).encode("utf-8"))
+
+
+def _clip_ring(points: List[Tuple[float, float]], low: float, high: float) -> List[Tuple[float, float]]:
+    """Sutherland-Hodgman clip of a ring to the square [low, high] on both axes."""
+    for axis, bound, inside_low in ((0, low, True), (0, high, False), (1, low, True), (1, high, False)):
+        if not points:
+            break
+        clipped = []
+        previous = points[-1]
+        for point in points:
+            point_in = point[axis] >= bound if inside_low else point[axis] <= bound
+            previous_in = previous[axis] >= bound if inside_low else previous[axis] <= bound
+            if point_in != previous_in:
+                t = (bound - previous[axis]) / (point[axis] - previous[axis])
+                crossing = [previous[0] + t * (point[0] - previous[0]), previous[1] + t * (point[1] - previous[1])]
+                crossing[axis] = bound
+                clipped.append(tuple(crossing))
+            if point_in:
+                clipped.append(point)
+            previous = point
+        points = clipped
+    return points
+
+
+def _command(command: int, count: int) -> int:
+    return command & 0x7 | count << 3
+
+
+class VectorTile:
+    """
+    One MVT tile being assembled layer by layer.
+
+    Args:
+        z, x, y: XYZ tile address
+        extent: Integer coordinates across the tile
+        buffer: Extent units kept beyond each tile edge so polygon
+            outlines do not show seams
+        simplifier: Cache that simplifies polygons for the tile's zoom
+    """
+
+    def __init__(self, z: int, x: int, y: int, extent: int = 4096, buffer: int = 64,
+                 simplifier: Optional[PolygonSimplifier] = None):
+        self.z, self.x, self.y = z, x, y
+        self.extent = extent
+        self.buffer = buffer
+        self.simplifier = simplifier
+        self.bounds = tile_bounds(z, x, y)  # west, south, east, north
+        self._layers: List[bytes] = []
+        self.features = 0
+
+    def _project(self, lngs, lats) -> Tuple[np.ndarray, np.ndarray]:
+        px, py = mercator_pixels(lngs, lats, self.z)
+        scale = self.extent / TILE_PIXELS
+        return (px - self.x * TILE_PIXELS) * scale, (py - self.y * TILE_PIXELS) * scale
+
+    def _polygon(self, ring) -> Optional[List[int]]:
+        """Command stream of one polygon ring, or None when nothing of it is left in the tile."""
+        if self.simplifier is not None:
+            ring = self.simplifier.simplify(ring, self.z)
+        ring = np.asarray(ring, dtype=np.float64)
+        tx, ty = self._project(ring[:, 0], ring[:, 1])
+        clipped = _clip_ring(list(zip(tx.tolist(), ty.tolist())), -self.buffer, self.extent + self.buffer)
+        points = []
+        for px, py in clipped:
+            point = (int(round(px)), int(round(py)))
+            if not points or point != points[-1]:
+                points.append(point)
+        while len(points) > 1 and points[-1] == points[0]:
+            points.pop()
+        if len(points) < 3:
+            return None
+        area = sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]))
+        if area == 0:
+            return None
+        # Exterior rings run clockwise on screen: positive area with y pointing down
+        if area < 0:
+            points.reverse()
+        geometry = [_command(1, 1)]
+        cx = cy = 0
+        for i, (px, py) in enumerate(points):
+            if i == 1:
+                geometry.append(_command(2, len(points) - 1))
+            geometry += [_zigzag(px - cx), _zigzag(py - cy)]
+            cx, cy = px, py
+        geometry.append(_command(7, 1))
+        return geometry
+
+    def _point(self, lng: float, lat: float) -> Optional[List[int]]:
+        tx, ty = self._project([lng], [lat])
+        px, py = int(math.floor(tx[0])), int(math.floor(ty[0]))
+        if not (0 <= px < self.extent and 0 <= py < self.extent):
+            return None
+        return [_command(1, 1), _zigzag(px), _zigzag(py)]
+
+    def add_layer(self, name: str, features: List[Dict]) -> int:
+        """
+        Add a layer of features.
+
+        Args:
+            name: Layer name
+            features: {"type": "Polygon" or "Point", "coordinates": [lng, lat]
+                ring or point, "properties": {...}}; None properties are left out
+
+        Returns:
+            Number of features that fell in the tile
+        """
+        keys: Dict[str, int] = {}
+        values: Dict[Tuple[type, object], int] = {}
+        encoded = []
+        for feature in features:
+            kind = feature["type"]
+            coordinates = feature["coordinates"]
+            geometry = self._polygon(coordinates) if kind == "Polygon" else self._point(*coordinates[:2])
+            if geometry is None:
+                continue
+            tags = []
+            for key, value in (feature.get("properties") or {}).items():
+                if value is None:
+                    continue
+                tags.append(keys.setdefault(key, len(keys)))
+                tags.append(values.setdefault((type(value), value), len(values)))
+            encoded.append(_packed(2, tags) + _varint_field(3, _GEOMETRY_TYPES[kind]) + _packed(4, geometry))
+
+        layer = _varint_field(15, 2) + _field(1, name.encode("utf-8"))
+        layer += b"".join(_field(2, feature) for feature in encoded)
+        layer += b"".join(_field(3, key.encode("utf-8")) for key in keys)
+        layer += b"".join(_field(4, _value(value)) for _, value in values)
+        layer += _varint_field(5, self.extent)
+        self._layers.append(_field(3, layer))
+        self.features += len(encoded)
+        return len(encoded)
+
+    def encode(self) -> bytes:
+        """The tile as MVT protobuf bytes."""
+        return b"".join(self._layers)
+
+
+# Create global instance
+polygon_simplifier = None
+
+
+def get_polygon_simplifier() -> PolygonSimplifier:
+    """Get the global polygon simplifier, creating it on first use"""
+    global polygon_simplifier
+    if polygon_simplifier is None:
+        polygon_simplifier = PolygonSimplifier()
+    return polygon_simplifier
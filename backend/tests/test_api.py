@@ -146,6 +146,21 @@ class TestSentinelXAPI:
         assert "safe_zones" in data
         assert isinstance(data["safe_zones"], list)
 
+    async def test_safe_route(self):
+        """Test route calculation to the nearest safe zone"""
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            test_data = {
+                "start_location": {"lat": 26.9124, "lng": 75.7873},
+                "destination_type": "shelter",
+                "transportation_mode": "walking"
+            }
+            response = await ac.post("/api/navigation/route", json=test_data)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert "route" in data
+        assert data["route"]["distance_km"] > 0
+
     async def test_disaster_news_feed(self):
         """Test disaster news feed endpoint"""
         async with AsyncClient(app=app, base_url="http://test") as ac:
@@ -0,0 +1,96 @@
+import math
+import random
+import sys
+import os
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.catchments import ShelterCatchments
+from services.routing_service import RoadGraph, _dijkstra
+from services.safe_zones import SafeZoneIndex
+from tests.test_routing_service import LAT0, LNG0, STEP, _grid_network
+
+
+def _zone(zone_id, lat, lng, status="available"):
+    return {"id": zone_id, "name": zone_id, "location": {"lat": lat, "lng": lng}, "type": "shelter",
+            "capacity": 100, "current_occupancy": 0, "status": status}
+
+
+def _fresh(graph, zones, modes):
+    """Catchments computed from scratch for the same zones and edge factors."""
+    copy = RoadGraph(graph.node_lat, graph.node_lng, graph.edge_src, graph.edge_dst, graph.edge_class,
+                     graph.edge_backward, graph.edge_maxspeed, graph.edge_name, graph.names)
+    copy.set_edge_factors(np.arange(graph.edge_count), graph.edge_factor)
+    index = SafeZoneIndex()
+    index.upsert_zones(zones.zones.values())
+    catchments = ShelterCatchments(copy, index, modes=modes)
+    catchments.refresh()
+    return catchments
+
+
+class TestShelterCatchments:
+
+    def test_node_times_match_dijkstra(self):
+        """Every node's time is the best network time to any zone plus the zone's access walk"""
+        graph = RoadGraph.from_geojson(_grid_network(10))
+        zones = SafeZoneIndex()
+        zones.upsert_zones([_zone("a", LAT0 + 0.0011, LNG0 + 0.0019), _zone("b", LAT0 + 0.0082, LNG0 + 0.0061)])
+        catchments = ShelterCatchments(graph, zones, modes=("walking", "driving"))
+        catchments.refresh()
+
+        for mode in ("walking", "driving"):
+            prof = graph.profile(mode)
+            table = catchments._tables[mode]
+            snapped = {zone_id: graph.snap(*location, mode) for zone_id, location in catchments._zones.items()}
+            speed = 5.0 if mode == "walking" else 30.0
+            for node in random.Random(4).sample(range(graph.node_count), 20):
+                to_zone = _dijkstra(prof.rows, prof.offsets, node, graph.node_count)
+                options = {zone_id: to_zone[target] + km / speed for zone_id, (target, km) in snapped.items()}
+                best = min(options.values())
+                assert abs(table.hours[node] - best) < 1e-9 or (math.isinf(best) and math.isinf(table.hours[node]))
+                if math.isfinite(best):
+                    assert abs(options[catchments._slot_ids[table.owner[node]]] - best) < 1e-9
+
+        served = catchments.lookup(LAT0 + 0.001, LNG0 + 0.002, "walking")
+        assert served["zone_id"] == "a" and served["isochrone_minutes"] == 5
+        assert catchments.lookup(LAT0 + 0.5, LNG0, "walking") is None
+        assert catchments.isochrone_areas("walking")[30] >= catchments.isochrone_areas("walking", "a")[30] > 0
+
+    def test_incremental_updates_match_full_rebuild(self):
+        """Adding, moving and closing zones and changing road costs repairs to the same tables"""
+        graph = RoadGraph.from_geojson(_grid_network(14))
+        rng = random.Random(8)
+        zones = SafeZoneIndex()
+
+        def spot():
+            return LAT0 + rng.uniform(0, 13 * STEP), LNG0 + rng.uniform(0, 13 * STEP)
+
+        zones.upsert_zones([_zone(f"z{i}", *spot()) for i in range(3)])
+        catchments = ShelterCatchments(graph, zones, modes=("walking", "driving"))
+        catchments.refresh()
+
+        steps = [
+            lambda: zones.upsert_zone(_zone("z3", *spot())),
+            lambda: zones.upsert_zone(_zone("z0", *spot())),
+            lambda: zones.upsert_zone(_zone("z1", *spot(), status="full")),
+            lambda: graph.set_edge_factors(rng.sample(range(graph.edge_count), 40), math.inf),
+            lambda: graph.set_edge_factors(rng.sample(range(graph.edge_count), 40), 3.0),
+            lambda: graph.set_edge_factors(np.arange(graph.edge_count), 1.0),
+            lambda: zones.remove_zone("z2"),
+        ]
+        for step in steps:
+            step()
+            report = catchments.refresh()
+            expected = _fresh(graph, zones, ("walking", "driving"))
+            for mode in ("walking", "driving"):
+                ours, theirs = catchments._tables[mode], expected._tables[mode]
+                assert np.allclose(ours.hours, theirs.hours, equal_nan=True)
+                assert np.allclose(ours.minutes, theirs.minutes)
+                ids = np.asarray(catchments._slot_ids + [None], dtype=object)
+                fresh_ids = np.asarray(expected._slot_ids + [None], dtype=object)
+                assert (ids[ours.owner] == fresh_ids[theirs.owner]).all()
+                assert (ids[ours.cell_owner] == fresh_ids[theirs.cell_owner]).all()
+            assert report["zones"] == len(expected._zones)
@@ -0,0 +1,60 @@
+import pytest
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_models.claim_cache import ClaimCache
+from ml_models.factcheck_engine import FactCheckEngine
+from ml_models.news_index import NewsIndex
+
+RUMOUR = "BREAKING: Dam burst in Rajasthan causing massive flooding, share with everyone!!"
+VARIANT = "Dam burst in Rajasthan causing massive flooding - please forward https://t.co/xyz"
+UNRELATED = "Heatwave temperatures reaching 52 degrees in Delhi"
+
+
+class TestClaimCache:
+
+    def test_near_duplicates_reuse_verdict(self):
+        """Boilerplate variants of a rumour hit the cached verdict; unrelated claims miss"""
+        cache = ClaimCache()
+        cluster_id = cache.store(RUMOUR, {"verdict": "False"})
+
+        result, similarity, hit_cluster = cache.lookup(VARIANT)
+        assert result["verdict"] == "False"
+        assert hit_cluster == cluster_id
+        assert similarity >= 0.6
+        assert cache.lookup(UNRELATED) is None
+
+    def test_ttl_and_evidence_invalidation(self):
+        """Expired or contradicted verdicts are not reused but still count as trending"""
+        cache = ClaimCache(ttl_seconds=0)
+        cache.store(RUMOUR, {"verdict": "False"})
+        assert cache.lookup(VARIANT) is None
+
+        cache = ClaimCache()
+        cache.store(RUMOUR, {"verdict": "False"})
+        invalidated = cache.invalidate_for_documents([
+            {"title": "Dam burst confirmed in Rajasthan, massive flooding downstream"}
+        ])
+        assert invalidated == 1
+        assert cache.lookup(VARIANT) is None
+        assert cache.trending()[0]["check_count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_engine_clusters_claims_for_trending(self):
+        """verify_claim serves repeats from the cache and trending reports cluster counts"""
+        cache = ClaimCache()
+        engine = FactCheckEngine(news_index=NewsIndex(), claim_cache=cache)
+
+        first = await engine.verify_claim(RUMOUR)
+        second = await engine.verify_claim(VARIANT)
+        await engine.verify_claim(UNRELATED)
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["verdict"] == first["verdict"]
+        trending = cache.trending()
+        assert [c["check_count"] for c in trending] == [2, 1]
+        assert trending[0]["claim"] == RUMOUR
@@ -0,0 +1,152 @@
+import random
+import sys
+import os
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.spatial_index import PreparedPolygon, STRTree, points_in_polygon
+from services.routing_service import RoadGraph, RoutingService
+from services.danger_zones import DangerZoneIndex
+
+STEP = 0.001
+LAT0, LNG0 = 28.60, 77.20
+
+
+def _grid(size):
+    features = []
+    for i in range(size):
+        for j in range(size):
+            for di, dj in ((0, 1), (1, 0)):
+                if i + di < size and j + dj < size:
+                    features.append({
+                        "type": "Feature",
+                        "geometry": {"type": "LineString", "coordinates": [
+                            [LNG0 + j * STEP, LAT0 + i * STEP], [LNG0 + (j + dj) * STEP, LAT0 + (i + di) * STEP]
+                        ]},
+                        "properties": {"highway": "residential", "name": f"Street {i}" if di == 0 else f"Avenue {j}"}
+                    })
+    return RoadGraph.from_geojson({"type": "FeatureCollection", "features": features})
+
+
+def _zone(zone_id, lng0, lat0, lng1, lat1, risk_level):
+    return {
+        "id": zone_id, "name": zone_id, "risk_type": "flood", "risk_level": risk_level, "description": "",
+        "polygon_coordinates": [[lng0, lat0], [lng1, lat0], [lng1, lat1], [lng0, lat1], [lng0, lat0]]
+    }
+
+
+class TestSTRTree:
+
+    def test_search_matches_brute_force(self):
+        """Box searches match an exhaustive scan through inserts, moves and removals"""
+        rng = random.Random(5)
+        boxes = {}
+        for i in range(1500):
+            x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+            boxes[i] = (x, y, x + rng.uniform(0, 4), y + rng.uniform(0, 4))
+        tree = STRTree(boxes)
+        for i in range(0, 300, 3):
+            tree.remove(i)
+            del boxes[i]
+        for i in range(1400, 1440):
+            x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+            boxes[i] = (x, y, x + 1, y + 1)
+            tree.insert(i, boxes[i])
+
+        static = STRTree.from_arrays(np.array([boxes[i] for i in sorted(boxes)]))
+        keys = sorted(boxes)
+        for _ in range(50):
+            x, y = rng.uniform(-5, 100), rng.uniform(-5, 100)
+            query = (x, y, x + rng.uniform(0, 15), y + rng.uniform(0, 15))
+            expected = sorted(k for k, (x0, y0, x1, y1) in boxes.items()
+                              if x0 <= query[2] and x1 >= query[0] and y0 <= query[3] and y1 >= query[1])
+            assert sorted(tree.search(query)) == expected
+            assert sorted(keys[i] for i in static.search(query)) == expected
+
+
+class TestPreparedPolygon:
+
+    def test_matches_plain_crossing_test(self):
+        """Banded containment agrees with the plain even-odd test, including points level with vertices"""
+        rng = np.random.default_rng(7)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 300))
+        radii = 0.8 + 0.15 * np.sin(7 * angles) + 0.03 * rng.standard_normal(300)
+        ring = np.column_stack([radii * np.cos(angles), radii * np.sin(angles)])
+        x, y = rng.uniform(-1.1, 1.1, 5000), rng.uniform(-1.1, 1.1, 5000)
+        y[:300] = ring[:, 1]
+
+        for polygon in (ring, np.vstack([ring, ring[:1]]), [[0, 0], [2, 0], [2, 2], [1, 1], [0, 2]]):
+            prepared = PreparedPolygon(polygon)
+            assert (prepared.contains(x, y) == points_in_polygon(x, y, polygon)).all()
+
+
+class TestDangerZoneIndex:
+
+    def test_critical_zone_blocks_and_penalties_detour(self):
+        """Routes leave critical zones out, weigh lower risk levels, and recover when zones are removed"""
+        graph = _grid(11)
+        service = RoutingService(graph)
+        zones = DangerZoneIndex(graph)
+        start, end = (LAT0 + 5 * STEP, LNG0), (LAT0 + 5 * STEP, LNG0 + 10 * STEP)
+        direct = service.route(*start, *end)
+
+        # A critical wall across the middle with a gap along the top row
+        wall = _zone("wall", LNG0 + 4.5 * STEP, LAT0 - STEP, LNG0 + 5.5 * STEP, LAT0 + 9.5 * STEP, "critical")
+        result = zones.upsert_zone(wall)
+        detour = service.route(*start, *end)
+        assert result["edges_in_zone"] == result["affected_edges"] > 0
+        assert all(graph.edge_factor[e] == 1.0 for e in detour["edge_ids"])
+        assert detour["distance_km"] > direct["distance_km"] + 0.8
+        assert zones.zones_on_route(detour["edge_ids"]) == []
+
+        # Downgrading to low risk reopens the wall at a small penalty, so the direct line wins again
+        zones.upsert_zone(dict(wall, risk_level="low"))
+        crossing = service.route(*start, *end)
+        assert abs(crossing["distance_km"] - direct["distance_km"]) < 1e-9
+        assert [z["id"] for z in zones.zones_on_route(crossing["edge_ids"])] == ["wall"]
+        assert abs(crossing["duration_minutes"] - direct["duration_minutes"]) < 1e-9
+
+        assert zones.delete_zone("wall")["affected_edges"] == result["edges_in_zone"]
+        assert np.all(graph.edge_factor == 1.0)
+        assert zones.get_stats() == {"zones": 0, "graph_attached": True, "blocked_edges": 0, "penalized_edges": 0}
+
+    def test_updates_touch_only_affected_edges_and_exits_open(self):
+        """Moving a zone re-scores only its old and new edges; a route may leave a closed zone it starts in"""
+        graph = _grid(11)
+        service = RoutingService(graph)
+        zones = DangerZoneIndex(graph)
+        zones.upsert_zone(_zone("fire", LNG0 - STEP / 2, LAT0 - STEP / 2, LNG0 + 2.5 * STEP, LAT0 + 2.5 * STEP,
+                                "critical"))
+        before = graph.edge_factor.copy()
+        result = zones.upsert_zone(_zone("fire", LNG0 + 7.5 * STEP, LAT0 + 7.5 * STEP,
+                                         LNG0 + 10.5 * STEP, LAT0 + 10.5 * STEP, "critical"))
+        changed = np.nonzero(before != graph.edge_factor)[0]
+        assert 0 < len(changed) <= result["affected_edges"]
+
+        inside, outside = (LAT0 + 9 * STEP, LNG0 + 9 * STEP), (LAT0 + 2 * STEP, LNG0 + 2 * STEP)
+        assert service.route(*inside, *outside) is None
+        overrides = zones.exit_overrides([inside, outside])
+        escape = service.route(*inside, *outside, factor_overrides=overrides)
+        assert escape is not None
+        assert [z["id"] for z in zones.zones_containing(*inside)] == ["fire"]
+        assert [z["id"] for z in zones.zones_on_route(escape["edge_ids"])] == ["fire"]
+
+    def test_batch_containment_tags_points(self):
+        """A batch of points gets the zones containing each one, highest risk first"""
+        zones = DangerZoneIndex()
+        zones.upsert_zone(_zone("river", LNG0, LAT0, LNG0 + 10 * STEP, LAT0 + 4 * STEP, "medium"))
+        zones.upsert_zone(_zone("fire", LNG0 + 3 * STEP, LAT0 + 2 * STEP, LNG0 + 6 * STEP, LAT0 + 8 * STEP,
+                                "critical"))
+        rng = random.Random(9)
+        points = [(LAT0 + rng.uniform(-2, 12) * STEP, LNG0 + rng.uniform(-2, 12) * STEP) for _ in range(2000)]
+        found = zones.containing([lat for lat, _ in points], [lng for _, lng in points])
+
+        for (lat, lng), zone_ids in zip(points, found):
+            assert sorted(zone_ids) == sorted(z["id"] for z in zones.zones_containing(lat, lng))
+            if len(zone_ids) == 2:
+                assert zone_ids == ["fire", "river"]
+        assert any(len(zone_ids) == 2 for zone_ids in found) and any(not zone_ids for zone_ids in found)
+        assert zones.containing([], []) == []
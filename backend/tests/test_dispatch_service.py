@@ -0,0 +1,101 @@
+import math
+import random
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.spatial_index import SphericalKDTree
+from services.dispatch_service import DispatchEngine
+
+
+def _calculate_distance(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))
+
+
+class TestSphericalKDTree:
+
+    def test_nearest_matches_brute_force(self):
+        """k-NN results should match an exhaustive haversine search"""
+        rng = random.Random(7)
+        points = {f"p{i}": (rng.uniform(26.0, 29.0), rng.uniform(75.0, 78.0)) for i in range(500)}
+        tree = SphericalKDTree(points)
+        tree.insert("late", 27.5, 76.5)
+        tree.remove("p3")
+
+        for _ in range(20):
+            lat, lng = rng.uniform(26.0, 29.0), rng.uniform(75.0, 78.0)
+            live = {k: v for k, v in points.items() if k != "p3"}
+            live["late"] = (27.5, 76.5)
+            expected = sorted(live, key=lambda k: _calculate_distance(lat, lng, *live[k]))[:5]
+
+            result = tree.nearest(lat, lng, k=5)
+            assert [point_id for point_id, _ in result] == expected
+            assert abs(result[0][1] - _calculate_distance(lat, lng, *live[expected[0]])) < 1e-6
+
+    def test_predicate_and_radius(self):
+        """Filtered points are skipped and the radius is honoured"""
+        tree = SphericalKDTree({"a": (28.60, 77.20), "b": (28.61, 77.21), "c": (28.90, 77.50)})
+
+        assert tree.nearest(28.60, 77.20, predicate=lambda p: p != "a")[0][0] == "b"
+        assert [p for p, _ in tree.within(28.60, 77.20, radius_km=5)] == ["a", "b"]
+
+
+class TestDispatchEngine:
+
+    def test_assigns_nearest_free_unit_per_type(self):
+        """CRITICAL requests get the nearest free unit of each required type"""
+        engine = DispatchEngine()
+        engine.upsert_unit("amb_near", "medical", 28.61, 77.21)
+        engine.upsert_unit("amb_far", "medical", 28.70, 77.30)
+        engine.upsert_unit("boat", "rescue", 28.65, 77.25)
+
+        first = engine.dispatch(28.60, 77.20, "CRITICAL", ["medical", "rescue"], 0.95)
+        second = engine.dispatch(28.60, 77.20, "HIGH", ["medical"], 0.7)
+        low = engine.dispatch(28.60, 77.20, "LOW", ["medical"], 0.1)
+
+        assert first["assigned_units"] == {"medical": "amb_near", "rescue": "boat"}
+        assert second["assigned_units"] == {"medical": "amb_far"}
+        assert low["status"] == "not_dispatched"
+
+    def test_pending_request_served_on_release(self):
+        """A request waiting for a unit is matched as soon as one is released"""
+        engine = DispatchEngine()
+        engine.upsert_unit("amb", "medical", 28.61, 77.21)
+        first = engine.dispatch(28.60, 77.20, "HIGH", ["medical"], 0.7)
+        waiting = engine.dispatch(28.62, 77.22, "CRITICAL", ["medical"], 0.9)
+
+        assert waiting["status"] == "pending"
+        engine.release_unit("amb")
+        assert waiting["assigned_units"] == {"medical": "amb"}
+        assert first["status"] == "completed"
+
+    def test_released_unit_skips_out_of_range_request(self):
+        """A freed unit goes to the most urgent waiting request it can reach"""
+        engine = DispatchEngine()
+        engine.upsert_unit("amb", "medical", 28.61, 77.21)
+        first = engine.dispatch(28.60, 77.20, "HIGH", ["medical"], 0.7)
+        far = engine.dispatch(28.90, 77.60, "CRITICAL", ["medical"], 0.9, max_km=5)
+        near = engine.dispatch(28.62, 77.22, "HIGH", ["medical"], 0.8, max_km=5)
+
+        engine.release_unit("amb")
+        assert far["status"] == "pending" and near["assigned_units"] == {"medical": "amb"}
+        assert engine.commit_unit("amb")["status"] == "busy"
+
+    def test_reoptimize_reduces_total_distance(self):
+        """Batch re-optimization should undo poor greedy matches within a tier"""
+        engine = DispatchEngine()
+        engine.upsert_unit("west", "rescue", 28.60, 77.00)
+        engine.upsert_unit("east", "rescue", 28.60, 77.40)
+
+        # The first request grabs "east" (closest to it), leaving "west" for a
+        # request that sits right next to "east"
+        engine.dispatch(28.60, 77.22, "HIGH", ["rescue"], 0.7)
+        engine.dispatch(28.60, 77.39, "HIGH", ["rescue"], 0.7)
+
+        summary = engine.reoptimize()
+        assert summary["total_distance_km_after"] < summary["total_distance_km_before"]
+        assert engine.get_assignments()["pending_requests"] == []
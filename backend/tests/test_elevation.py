@@ -0,0 +1,129 @@
+import struct
+import sys
+import os
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.elevation import ElevationModel, tobler_speed_kmh
+from services.routing_service import RoadGraph, RoutingService
+from tests.test_routing_service import LAT0, LNG0, STEP, _grid_network
+
+
+def _write_geotiff(path, grid, west, north, cell, tile=None, nodata=None):
+    """Minimal uncompressed float32 GeoTIFF, in strips of 7 rows or in square tiles."""
+    height, width = grid.shape
+    if tile:
+        padded = np.zeros((-(-height // tile) * tile, -(-width // tile) * tile), dtype="<f4")
+        padded[:height, :width] = grid
+        chunks = [padded[r:r + tile, c:c + tile].tobytes() for r in range(0, padded.shape[0], tile)
+                  for c in range(0, padded.shape[1], tile)]
+    else:
+        chunks = [grid[r:r + 7].astype("<f4").tobytes() for r in range(0, height, 7)]
+    extra = [(33550, 12, (cell, cell, 0.0)), (33922, 12, (0.0, 0.0, 0.0, west, north, 0.0)),
+             (34735, 3, (1, 1, 0, 1, 1024, 0, 1, 2))]
+    if nodata is not None:
+        extra.append((42113, 2, str(nodata).encode() + b"\0"))
+    layout = [(322, 3, (tile,)), (323, 3, (tile,)), (324, 4, None), (325, 4, tuple(map(len, chunks)))] if tile else \
+        [(273, 4, None), (279, 4, tuple(map(len, chunks)))]
+    entries = sorted([(256, 4, (width,)), (257, 4, (height,)), (258, 3, (32,)), (259, 3, (1,)), (277, 3, (1,)),
+                      (339, 3, (3,))] + layout + extra)
+    formats = {2: "s", 3: "H", 4: "I", 12: "d"}
+
+    ifd_size = 2 + 12 * len(entries) + 4
+    data_start = 8 + ifd_size + 512
+    offsets = tuple(data_start + sum(map(len, chunks[:i])) for i in range(len(chunks)))
+    directory, overflow = [], b""
+    for tag, field_type, values in entries:
+        if values is None:
+            values = offsets
+        fmt = formats[field_type]
+        payload = values if fmt == "s" else struct.pack("<" + fmt * len(values), *values)
+        count = len(values)
+        if len(payload) <= 4:
+            directory.append(struct.pack("<HHI", tag, field_type, count) + payload.ljust(4, b"\0"))
+        else:
+            directory.append(struct.pack("<HHII", tag, field_type, count, 8 + ifd_size + len(overflow)))
+            overflow += payload
+    with open(path, "wb") as f:
+        f.write(b"II" + struct.pack("<HI", 42, 8) + struct.pack("<H", len(entries)) + b"".join(directory))
+        f.write(struct.pack("<I", 0) + overflow.ljust(512, b"\0") + b"".join(chunks))
+
+
+class TestElevationModel:
+
+    def test_formats_are_memory_mapped_and_agree(self, tmp_path):
+        """Stripped and tiled GeoTIFFs and .npy grids map without reading and sample identically"""
+        rng = np.random.default_rng(4)
+        grid = rng.uniform(0, 100, (45, 37)).astype(np.float32)
+        grid[3, 5] = -9999
+        west, north, cell = 77.0, 28.7, 0.001
+        models = []
+        for name, tile in (("strips.tif", None), ("tiles.tif", 16)):
+            _write_geotiff(str(tmp_path / name), grid, west, north, cell, tile=tile, nodata=-9999)
+            models.append(ElevationModel.load(str(tmp_path / name)))
+        models[0].save_npy(str(tmp_path / "grid.npy"))
+        models.append(ElevationModel.load(str(tmp_path / "grid.npy")))
+        assert all(isinstance(model.data, np.memmap) for model in models)
+        assert models[1].tile_shape == (16, 16) and models[1].shape == (45, 37)
+
+        lats = north - rng.uniform(-0.005, 0.05, 5000)
+        lngs = west + rng.uniform(-0.005, 0.042, 5000)
+        expected = models[0].sample(lats, lngs)
+        for model in models[1:]:
+            np.testing.assert_array_equal(model.sample(lats, lngs), expected)
+            np.testing.assert_array_equal(model.sample(lats, lngs, bilinear=False),
+                                          models[0].sample(lats, lngs, bilinear=False))
+
+        # Cell centres give the cell's own height; outside the raster and nodata give NaN
+        rows, cols = rng.integers(0, 45, 200), rng.integers(0, 37, 200)
+        centre = models[1].sample(north - (rows + 0.5) * cell, west + (cols + 0.5) * cell)
+        keep = grid[rows, cols] != -9999
+        np.testing.assert_allclose(centre[keep], grid[rows, cols][keep], rtol=1e-6)
+        assert np.isnan(centre[~keep]).all()
+        outside = (lats > north) | (lngs < west) | (lats <= north - 45 * cell) | (lngs >= west + 37 * cell)
+        assert outside.any() and np.isnan(expected[outside]).all()
+
+    def test_segments_on_a_slope(self):
+        """Climb and walking-time factors follow the terrain along each segment"""
+        # Heights rise 10 m per 0.0001 degree row northwards
+        rows = np.arange(200, dtype=np.float64)[::-1, None] * 10.0
+        dem = ElevationModel(np.repeat(rows, 50, axis=1), 77.0, 28.62, 0.0001, 0.0001)
+        lat_a, lat_b = np.array([28.61, 28.615, 28.605]), np.array([28.615, 28.61, 28.605])
+        lng = np.full(3, 77.002)
+        length_km = np.array([0.556, 0.556, 0.0])
+        terrain = dem.profile_segments(lat_a, lng, lat_b, lng, length_km, sample_m=20)
+        np.testing.assert_allclose(terrain["climb_m"], [500.0, 0.0, 0.0], atol=1e-6)
+        np.testing.assert_allclose(terrain["low_m"][:2], dem.sample([28.61, 28.61], [77.002, 77.002]))
+        grade = 500.0 / 556.0
+        flat = tobler_speed_kmh(0.0)
+        np.testing.assert_allclose(terrain["walk_factor"][:2], [flat / tobler_speed_kmh(grade),
+                                                                flat / tobler_speed_kmh(-grade)], rtol=1e-3)
+        assert terrain["walk_factor"][2] == 1.0
+
+
+class TestFloodProfile:
+
+    def test_flood_routes_keep_to_high_ground(self):
+        """With a DEM the flood profile detours along the raised edge of a low basin; walking cuts across"""
+        graph = RoadGraph.from_geojson(_grid_network(12))
+        # A basin 0-2 m deep everywhere except a 10 m ridge along the south and east edges of the grid
+        cell = STEP / 4
+        shape = (60, 60)
+        row_lat = LAT0 + 13 * STEP - (np.arange(shape[0]) + 0.5) * cell
+        col_lng = LNG0 - STEP + (np.arange(shape[1]) + 0.5) * cell
+        ridge = (row_lat[:, None] < LAT0 + 0.5 * STEP) | (col_lng[None, :] > LNG0 + 10.5 * STEP)
+        heights = np.where(ridge, 10.0, 1.0 + np.sin(row_lat[:, None] * 1e4))
+        routing = RoutingService(graph)
+        walking_before = routing.route(LAT0, LNG0, LAT0 + 11 * STEP, LNG0 + 11 * STEP, "walking")
+
+        graph.set_elevation(ElevationModel(heights, LNG0 - STEP, LAT0 + 13 * STEP, cell, cell), sample_m=20)
+        walking = routing.route(LAT0, LNG0, LAT0 + 11 * STEP, LNG0 + 11 * STEP, "walking")
+        flood = routing.route(LAT0, LNG0, LAT0 + 11 * STEP, LNG0 + 11 * STEP, "flood")
+
+        assert walking["edge_ids"] == walking_before["edge_ids"]
+        assert walking["lowest_elevation_m"] < 5 and flood["lowest_elevation_m"] >= 9.9
+        # Durations are travel time only; the low-ground penalty steers but is not reported
+        assert flood["duration_minutes"] < 2 * walking["duration_minutes"]
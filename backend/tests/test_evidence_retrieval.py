@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_models.evidence_retrieval import EvidenceRetriever, link_in_source
+from ml_models.evidence_standin import EvidenceStandInServer
+from ml_models.factcheck_engine import FactCheckEngine
+from ml_models.claim_cache import ClaimCache
+
+TRUSTED_SOURCES = {"government": ["imd.gov.in", "ndma.gov.in"], "news": ["ptinews.com"]}
+RELIABILITY = {"imd.gov.in": 0.95, "ndma.gov.in": 0.92, "ptinews.com": 0.88}
+
+
+@pytest.mark.asyncio
+class TestEvidenceRetriever:
+
+    async def test_retrieves_and_scores_evidence(self):
+        """Matching articles are fetched, scored and split by stance"""
+        server = EvidenceStandInServer()
+        await server.start()
+        retriever = EvidenceRetriever(TRUSTED_SOURCES, RELIABILITY, base_urls=server.base_urls())
+        try:
+            result = await retriever.retrieve("Dam collapse causes flood in Assam", deadline=5.0)
+        finally:
+            await retriever.close()
+            await server.stop()
+
+        assert result["partial"] is False
+        assert [s["source"] for s in result["supporting_sources"]] == ["ndma.gov.in"]
+        assert [s["source"] for s in result["contradicting_sources"]] == ["ptinews.com"]
+        assert result["contradicting_sources"][0]["url"].endswith("/ptinews.com/article/dam-rumour")
+
+    async def test_deadline_returns_partial_evidence(self):
+        """A slow host does not hold back evidence that already arrived"""
+        server = EvidenceStandInServer(delays={"ptinews.com": 2.0})
+        await server.start()
+        retriever = EvidenceRetriever(TRUSTED_SOURCES, RELIABILITY, base_urls=server.base_urls())
+        try:
+            result = await retriever.retrieve("Dam collapse causes flood in Assam", deadline=0.5)
+        finally:
+            await retriever.close()
+            await server.stop()
+
+        assert result["partial"] is True
+        assert result["retrieval_time"] < 1.5
+        assert [s["source"] for s in result["supporting_sources"]] == ["ndma.gov.in"]
+        assert result["contradicting_sources"] == []
+
+    async def test_other_loops_get_their_own_session(self):
+        """A call from another thread's loop leaves the shared session alone and closes its own"""
+        server = EvidenceStandInServer()
+        await server.start()
+        retriever = EvidenceRetriever(TRUSTED_SOURCES, RELIABILITY, base_urls=server.base_urls())
+        try:
+            shared, _ = await retriever._get_session()
+            result = await asyncio.to_thread(asyncio.run, retriever.retrieve("Dam collapse causes flood in Assam",
+                                                                            deadline=5.0))
+            assert retriever._session is shared and not shared.closed
+        finally:
+            await retriever.close()
+            await server.stop()
+
+        assert [s["source"] for s in result["supporting_sources"]] == ["ndma.gov.in"]
+
+    async def test_engine_uses_retriever(self):
+        """FactCheckEngine verdicts are built from retrieved evidence when a retriever is set"""
+        server = EvidenceStandInServer()
+        await server.start()
+        engine = FactCheckEngine(claim_cache=ClaimCache())
+        engine.evidence_retriever = EvidenceRetriever(
+            TRUSTED_SOURCES, engine.source_reliability, base_urls=server.base_urls()
+        )
+        try:
+            result = await engine.verify_claim("Cyclone warning for Odisha coast with heavy rainfall")
+        finally:
+            await engine.evidence_retriever.close()
+            await server.stop()
+
+        assert result["evidence_partial"] is False
+        assert result["related_articles"][0]["source"] == "imd.gov.in"
+        assert "/imd.gov.in/article/cyclone-warning" in result["related_articles"][0]["url"]
+
+
+class TestLinkFilter:
+
+    def test_links_stay_within_the_source(self):
+        """Subdomains of the source host are followed; look-alike hosts and other path prefixes are not"""
+        assert link_in_source("https://www.reuters.com/world/flood", "https://reuters.com")
+        assert link_in_source("https://reuters.com/world/flood", "https://reuters.com")
+        assert not link_in_source("https://reuters.com.evil.example/world", "https://reuters.com")
+        assert not link_in_source("https://notreuters.com/world", "https://reuters.com")
+        assert not link_in_source("mailto:desk@reuters.com", "https://reuters.com")
+
+        base = "http://127.0.0.1:8765/imd.gov.in"
+        assert link_in_source("http://127.0.0.1:8765/imd.gov.in/article/cyclone", base)
+        assert not link_in_source("http://127.0.0.1:8765/imd.gov.in.example/article", base)
+        assert not link_in_source("http://127.0.0.1:8765/ndma.gov.in/article/dam", base)
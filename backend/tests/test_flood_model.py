@@ -0,0 +1,97 @@
+import sys
+import os
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.danger_zones import DangerZoneIndex
+from services.elevation import ElevationModel
+from services.flood_model import FloodModel, _outer_rings
+
+WEST, NORTH, CELL = 77.0, 28.7, 0.0002
+
+
+def _river_valley(rows=40, cols=60):
+    """A river along the west edge, a floodplain rising east, a 3 m levee and a low basin behind it."""
+    x = np.arange(cols, dtype=np.float64)
+    profile = 10.0 + 0.05 * x
+    profile[:3] = 10.0
+    profile[20:22] = 13.0
+    profile[22:40] = 10.5
+    profile[40:] = 20.0
+    heights = np.repeat(profile[None, :], rows, axis=0)
+    ndwi = np.where(x < 3, 0.6, -0.4)[None, :].repeat(rows, axis=0)
+    return heights, ndwi
+
+
+class TestFloodModel:
+
+    def test_levee_holds_until_overtopped(self):
+        """Water spreads from the river, fills the basin only once it spills over the levee, and stores the runoff"""
+        heights, ndwi = _river_valley()
+        model = FloodModel(ElevationModel(heights, WEST, NORTH, CELL, CELL), DangerZoneIndex(),
+                           ElevationModel(ndwi, WEST, NORTH, CELL, CELL), runoff_coefficient=1.0)
+
+        model.update(20.0)
+        depth = model.depth("r0c0")
+        assert depth[:, 3:6].min() > 0 and depth[:, 22:40].max() == 0
+        # Every cell of the tile drains somewhere, so the runoff over all of them is what stands in the water
+        np.testing.assert_allclose(depth.sum(), 0.020 * heights.size)
+
+        # Water stops at the levee crest while the overflow fills the basin behind it
+        model.update(1500.0)
+        depth = model.depth("r0c0")
+        assert model.tiles["r0c0"].rise_m == 3.0
+        assert 0 < depth[0, 30] < 2.5 and (depth[:, 22:40] == depth[0, 30]).all()
+        np.testing.assert_allclose(depth.sum(), 1.5 * heights.size)
+
+        model.update(2500.0)
+        depth = model.depth("r0c0")
+        rise = model.tiles["r0c0"].rise_m
+        assert rise > 3.0
+        np.testing.assert_allclose(depth[:, 30], 10.0 + rise - 10.5)
+        np.testing.assert_allclose(depth.sum(), 2.5 * heights.size)
+        assert depth[:, 40:].max() == 0
+
+    def test_zones_follow_depth_and_update_per_tile(self):
+        """Depth bands become nested zones tile by tile, and an unchanged tile keeps its zones"""
+        heights, ndwi = _river_valley(rows=120, cols=120)
+        # Four tiles, the river in the western ones
+        zones = DangerZoneIndex()
+        model = FloodModel(ElevationModel(heights, WEST, NORTH, CELL, CELL), zones,
+                           ElevationModel(ndwi, WEST, NORTH, CELL, CELL), tile_cells=60)
+        assert sorted(model.tiles) == ["r0c0", "r0c1", "r1c0", "r1c1"]
+
+        first = model.update(60.0)
+        assert first["zones_added"] > 0 and all(zone.startswith("flood-") for zone in zones.zones)
+        depth = model.depth("r0c0")
+        row, col = np.unravel_index(np.argmax(depth), depth.shape)
+        lat, lng = NORTH - (row + 0.5) * CELL, WEST + (col + 0.5) * CELL
+        found = zones.containing([lat], [lng])[0]
+        levels = [zones.zones[zone_id]["risk_level"] for zone_id in found]
+        # Nested bands: the deepest cell lies in one zone per level up to its own depth
+        assert len(levels) == len(set(levels)) and zones.zones[found[0]]["risk_type"] == "flood"
+        assert len(levels) == sum(depth.max() >= threshold for threshold in (0.1, 0.3, 0.6, 1.2))
+
+        version = zones.version
+        again = model.update(60.0, ["r0c0"])
+        assert not again["tiles"][0]["changed"] and zones.version == version
+        western = {zone_id for zone_id in zones.zones if "-r0c0-" in zone_id}
+        dry = model.update(0.0, ["r0c0", "r1c0"])
+        assert dry["zones_removed"] >= len(western) and not any("-r0c0-" in zone_id for zone_id in zones.zones)
+        assert model.tiles["r1c1"].rainfall_mm == 60.0
+
+    def test_outer_rings(self):
+        """Regions are traced clockwise along cell edges; holes are filled and corner contacts stay apart"""
+        mask = np.zeros((8, 9), dtype=bool)
+        mask[1:6, 1:6] = True
+        mask[3, 3] = False
+        mask[6, 6] = True
+        mask[7, 7] = mask[7, 8] = True
+        rings = _outer_rings(mask, min_cells=1)
+        assert [len(ring) for ring in rings] == [4, 4, 4]
+        assert rings[0].tolist() == [[1, 6], [6, 6], [6, 1], [1, 1]]
+        assert sorted(ring.min(axis=0).tolist() for ring in rings[1:]) == [[6, 6], [7, 7]]
+        assert len(_outer_rings(mask, min_cells=2)) == 2
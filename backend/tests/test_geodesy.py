@@ -0,0 +1,76 @@
+import math
+import random
+import sys
+import os
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.geodesy import (
+    bearing_deg, bounding_box, destination_point, distance_matrix, distances_from, haversine_km, within_radius
+)
+
+
+def _scalar_haversine(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+class TestGeodesy:
+
+    def test_distances_match_scalar_formula(self):
+        """Scalar, one-to-many and many-to-many distances agree with the math-based formula"""
+        rng = random.Random(5)
+        a = [(rng.uniform(-80, 80), rng.uniform(-180, 180)) for _ in range(20)]
+        b = [(rng.uniform(-80, 80), rng.uniform(-180, 180)) for _ in range(30)]
+        lats_a, lngs_a = zip(*a)
+        lats_b, lngs_b = zip(*b)
+
+        matrix = distance_matrix(lats_a, lngs_a, lats_b, lngs_b)
+        row = distances_from(a[0][0], a[0][1], lats_b, lngs_b)
+
+        assert matrix.shape == (20, 30)
+        assert isinstance(haversine_km(*a[0], *b[0]), float)
+        for i, p in enumerate(a):
+            for j, q in enumerate(b):
+                assert abs(matrix[i, j] - _scalar_haversine(*p, *q)) < 1e-6
+        assert np.allclose(row, matrix[0])
+        square = distance_matrix(lats_a, lngs_a)
+        assert np.allclose(square, square.T) and np.allclose(np.diag(square), 0.0)
+
+    def test_bearing_and_destination_round_trip(self):
+        """Travelling along a bearing lands at that distance and bearing, including across the antimeridian"""
+        assert abs(bearing_deg(0, 0, 1, 0)) < 1e-9
+        assert abs(bearing_deg(0, 0, 0, 1) - 90) < 1e-9
+        assert abs(bearing_deg(0, 0, -1, 0) - 180) < 1e-9
+
+        rng = np.random.default_rng(2)
+        lats, lngs = rng.uniform(-70, 70, 50), rng.uniform(-180, 180, 50)
+        bearings, km = rng.uniform(0, 360, 50), rng.uniform(0.1, 500, 50)
+        dest_lats, dest_lngs = destination_point(lats, lngs, bearings, km)
+
+        assert np.allclose(haversine_km(lats, lngs, dest_lats, dest_lngs), km)
+        assert np.allclose(np.cos(np.radians(bearing_deg(lats, lngs, dest_lats, dest_lngs) - bearings)), 1.0)
+        assert -180 <= destination_point(0, 179.9, 90, 50)[1] < -179
+
+    def test_bounding_box_and_radius_filter(self):
+        """Bounding boxes contain the whole circle, and the filter matches brute force"""
+        for lat, lng, radius in ((28.6, 77.2, 15), (65.0, 10.0, 300), (0.0, 179.95, 20)):
+            box = bounding_box(lat, lng, radius)
+            edge_lats, edge_lngs = destination_point(lat, lng, np.arange(0, 360, 0.5), radius * 0.999)
+            assert (edge_lats <= box["north"]).all() and (edge_lats >= box["south"]).all()
+            if box["west"] <= box["east"]:
+                assert ((edge_lngs >= box["west"]) & (edge_lngs <= box["east"])).all()
+            else:
+                assert ((edge_lngs >= box["west"]) | (edge_lngs <= box["east"])).all()
+        assert bounding_box(89.9, 0, 50)["west"] == -180.0
+
+        rng = np.random.default_rng(9)
+        lats, lngs = rng.uniform(28.0, 29.2, 2000), rng.uniform(76.6, 77.8, 2000)
+        inside, distances = within_radius(28.6, 77.2, lats, lngs, 25.0)
+        expected = np.array([_scalar_haversine(28.6, 77.2, la, ln) <= 25.0 for la, ln in zip(lats, lngs)])
+        assert (inside == expected).all()
+        assert np.allclose(distances[inside], haversine_km(28.6, 77.2, lats[inside], lngs[inside]))
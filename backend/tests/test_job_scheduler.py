@@ -0,0 +1,49 @@
+import threading
+import time
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.job_scheduler import UrgencyScheduler, normalize_urgency
+
+
+class TestUrgencyScheduler:
+
+    def test_high_urgency_jumps_queued_low_work(self):
+        """A high-urgency job starts before a backlog of queued low-urgency jobs"""
+        scheduler = UrgencyScheduler(max_workers=2, reserved_high=1)
+        started = []
+        gate = threading.Event()
+
+        def job(name):
+            started.append(name)
+            gate.wait(5)
+            return name
+
+        backlog = [scheduler.submit("low", job, f"low{i}") for i in range(5)]
+        time.sleep(0.05)
+        urgent = scheduler.submit("high", job, "high")
+
+        time.sleep(0.05)
+        # The urgent job took a reserved worker while the low backlog waits
+        assert started == ["low0", "high"]
+        assert scheduler.get_metrics()["classes"]["low"]["queue_depth"] == 4
+
+        gate.set()
+        assert urgent.result(timeout=5) == "high"
+        assert [f.result(timeout=5) for f in backlog] == [f"low{i}" for i in range(5)]
+        scheduler.shutdown()
+
+    def test_metrics_and_urgency_labels(self):
+        """Metrics report per-class completions and unknown labels map to normal"""
+        scheduler = UrgencyScheduler(max_workers=2)
+        for urgency in ("critical", "normal", "backfill", "whatever"):
+            scheduler.submit(urgency, lambda: None).result(timeout=2)
+
+        classes = scheduler.get_metrics()["classes"]
+        assert [classes[c]["completed"] for c in ("high", "normal", "low")] == [1, 2, 1]
+        assert classes["low"]["queue_depth"] == 0
+        assert normalize_urgency(None) == "normal"
+        scheduler.shutdown()
@@ -0,0 +1,90 @@
+import json
+import random
+import sys
+import os
+from datetime import datetime
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.offline_bundle import OfflineBundleStore, decode_bundle
+
+PROCEDURES = {"procedures": {"flood": ["Move to higher ground immediately"]}, "emergency_numbers": {"fire": "101"}}
+
+
+def _zones(rng, count):
+    safe, danger = {}, {}
+    for i in range(count):
+        lat, lng = 28.6 + rng.uniform(-0.1, 0.1), 77.2 + rng.uniform(-0.1, 0.1)
+        safe[f"s{i}"] = {"id": f"s{i}", "name": f"Shelter {i}", "location": {"lat": lat, "lng": lng},
+                         "type": "shelter", "capacity": 500, "current_occupancy": rng.randint(0, 500),
+                         "amenities": ["water", "medical"], "contact_info": None, "status": "available"}
+        ring = [[round(lng + 0.0002 * k, 6), round(lat + 0.0001 * (k % 5), 6)] for k in range(40)]
+        danger[f"d{i}"] = {"id": f"d{i}", "name": f"Flooding {i}", "polygon_coordinates": ring,
+                           "risk_type": "flood", "risk_level": "high", "description": "Water over 0.6 m deep",
+                           "last_updated": datetime(2026, 10, 1, 12, 0)}
+    return safe, danger
+
+
+def _matches(decoded, safe, danger):
+    """Decoded records equal the source up to the 1e-5 degree quantization."""
+    assert decoded["safe_zones"].keys() == safe.keys() and decoded["danger_zones"].keys() == danger.keys()
+    for zone_id, zone in safe.items():
+        record = decoded["safe_zones"][zone_id]
+        assert abs(record["location"]["lat"] - zone["location"]["lat"]) <= 5.01e-6
+        assert record["current_occupancy"] == zone["current_occupancy"] and record["amenities"] == zone["amenities"]
+    for zone_id, zone in danger.items():
+        ring = decoded["danger_zones"][zone_id]["polygon_coordinates"]
+        assert len(ring) == len(zone["polygon_coordinates"])
+        assert all(abs(a - b) <= 5.01e-6 for p, q in zip(ring, zone["polygon_coordinates"]) for a, b in zip(p, q))
+
+
+class TestOfflineBundle:
+
+    def test_patches_rebuild_the_latest_bundle(self):
+        """A client applying patches ends up with what a fresh download gives, and patches stay small"""
+        rng = random.Random(3)
+        safe, danger = _zones(rng, 300)
+        store = OfflineBundleStore()
+        first = store.refresh(safe.values(), danger.values(), PROCEDURES)
+        payload, info = store.payload()
+        client = decode_bundle(payload)
+        assert info["kind"] == "full" and client["version"] == first
+        _matches(client, safe, danger)
+        verbose = len(json.dumps({"safe": list(safe.values()), "danger": list(danger.values())}, default=str))
+        assert info["size"] * 10 < verbose
+
+        for step in range(4):
+            for zone_id in rng.sample(sorted(safe), 5):
+                safe[zone_id] = dict(safe[zone_id], current_occupancy=rng.randint(0, 500))
+            danger.pop(rng.choice(sorted(danger)))
+            if step == 2:
+                ring = [[77.3, 28.7], [77.31, 28.7], [77.31, 28.71]]
+                danger["new"] = {"id": "new", "name": "Fire", "polygon_coordinates": ring, "risk_level": "critical"}
+            version = store.refresh(safe.values(), danger.values(), PROCEDURES)
+            payload, info = store.payload(client["version"])
+            assert info["kind"] == "patch" and info["base"] == client["version"]
+            assert info["size"] * 20 < store.payload()[1]["size"]
+            client = decode_bundle(payload, client)
+            assert client["version"] == version
+            _matches(client, safe, danger)
+        assert store.payload(client["version"]) is None
+
+        # Versions are content digests: the same data gives the same version in a new store
+        again = OfflineBundleStore()
+        assert again.refresh(safe.values(), danger.values(), PROCEDURES) == client["version"]
+        # A version the store never saw gets the full bundle
+        assert again.payload(first)[1]["kind"] == "full"
+
+    def test_source_key_skips_rebuilds(self):
+        """An unchanged source key reuses the current version; procedures changes ship in the patch"""
+        safe, danger = _zones(random.Random(1), 5)
+        store = OfflineBundleStore()
+        first = store.refresh(safe.values(), danger.values(), PROCEDURES, source_key=(1, 1))
+        assert store.refresh([], [], {}, source_key=(1, 1)) == first and store.builds == 1
+        client = decode_bundle(store.payload()[0])
+
+        updated = dict(PROCEDURES, emergency_numbers={"fire": "101", "police": "100"})
+        second = store.refresh(safe.values(), danger.values(), updated, source_key=(1, 2))
+        client = decode_bundle(store.payload(first)[0], client)
+        assert second != first and client["procedures"] == updated
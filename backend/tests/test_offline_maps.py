@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.offline_maps import (
+    OfflineMapStore, RoadTileRenderer, build_mbtiles, count_tiles, parse_byte_range, region_tiles
+)
+from services.routing_service import RoadGraph
+
+REGION = {
+    "region_id": "test_city",
+    "region_name": "Test City",
+    "bounds": {"north": 28.62, "south": 28.58, "east": 77.24, "west": 77.18},
+    "zoom_levels": [12, 13, 14]
+}
+
+
+class _Source:
+    """Tile source whose tiles are blank except where set; counts fetches."""
+
+    format = "png"
+
+    def __init__(self):
+        self.special = {}
+        self.calls = 0
+
+    def __call__(self, z, x, y):
+        self.calls += 1
+        return self.special.get((z, x, y), b"blank")
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        tiles = {(z, x, row): data for z, x, row, data in
+                 conn.execute("SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles")}
+        images = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        metadata = dict(conn.execute("SELECT name, value FROM metadata"))
+    return tiles, images, metadata
+
+
+class TestOfflineMaps:
+
+    def test_build_deduplicates_and_refreshes_incrementally(self, tmp_path):
+        """Identical tiles share one image, and a refresh rewrites only changed tiles"""
+        path = str(tmp_path / "city.mbtiles")
+        source = _Source()
+        tiles = list(region_tiles(REGION["bounds"], REGION["zoom_levels"]))
+        z, x, y = tiles[-1]
+        source.special[(z, x, y)] = b"landmark"
+
+        first = build_mbtiles(path, REGION, source)
+        stored, images, metadata = _rows(path)
+        assert first["tiles"] == len(tiles) == count_tiles(REGION["bounds"], REGION["zoom_levels"])
+        assert images == first["unique_images"] == 2
+        assert stored[(z, x, (1 << z) - 1 - y)] == b"landmark"
+        assert metadata["minzoom"] == "12" and metadata["maxzoom"] == "14" and metadata["format"] == "png"
+
+        mtime = os.stat(path).st_mtime_ns
+        again = build_mbtiles(path, REGION, source)
+        assert again["changed"] is False and again["written"] == 0
+        assert os.stat(path).st_mtime_ns == mtime
+
+        source.special[tiles[0]] = b"flooded"
+        del source.special[(z, x, y)]
+        refreshed = build_mbtiles(path, dict(REGION, zoom_levels=[12, 13]), source)
+        stored, images, _ = _rows(path)
+        assert refreshed["written"] == 1
+        assert refreshed["removed"] == len(tiles) - count_tiles(REGION["bounds"], [12, 13])
+        assert images == 2 and b"landmark" not in stored.values()
+        assert not os.path.exists(path + ".building")
+
+    def test_road_renderer_and_store(self, tmp_path):
+        """Rendered road tiles are valid PNGs, empty tiles dedupe, and the store reports packages"""
+        graph = RoadGraph.from_geojson({"type": "FeatureCollection", "features": [
+            {"type": "Feature", "properties": {"highway": "primary"},
+             "geometry": {"type": "LineString", "coordinates": [[77.19, 28.59], [77.23, 28.61]]}}
+        ]})
+        store = OfflineMapStore(str(tmp_path), regions=[REGION], source_factory=lambda: RoadTileRenderer(graph))
+        assert store.list_regions()[0]["package_available"] is False
+
+        stats = store.build("test_city")
+        stored, images, _ = _rows(store.package_path("test_city"))
+        region = store.list_regions()[0]
+
+        assert all(data.startswith(b"\x89PNG\r\n\x1a\n") for data in stored.values())
+        assert 2 <= images < stats["tiles"]
+        assert region["package_available"] and region["build_status"] == "ready" and region["size_mb"] > 0
+        handle, info = store.open_package("test_city")
+        handle.close()
+        assert info["size"] == stats["size_bytes"]
+
+    def test_parse_byte_range(self):
+        """Single byte ranges resolve; malformed or multiple ranges fall back to the whole file"""
+        assert parse_byte_range(None, 100) is None
+        assert parse_byte_range("bytes=10-19", 100) == (10, 19)
+        assert parse_byte_range("bytes=90-", 100) == (90, 99)
+        assert parse_byte_range("bytes=90-500", 100) == (90, 99)
+        assert parse_byte_range("bytes=-30", 100) == (70, 99)
+        assert parse_byte_range("bytes=-300", 100) == (0, 99)
+        assert parse_byte_range("bytes=0-1,5-9", 100) is None
+        assert parse_byte_range("bytes=abc", 100) is None
+        assert parse_byte_range("items=0-5", 100) is None
+        with pytest.raises(ValueError):
+            parse_byte_range("bytes=100-", 100)
@@ -0,0 +1,50 @@
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.danger_zones import DangerZoneIndex
+from services.route_cache import RouteCache
+
+SQUARE = [[77.20, 28.60], [77.21, 28.60], [77.21, 28.61], [77.20, 28.61], [77.20, 28.60]]
+
+
+class TestRouteCache:
+
+    def test_origin_cells_share_entries(self):
+        """Nearby origins share a cell, distant ones and different parameters do not"""
+        cache = RouteCache(cell_m=50)
+        key = cache.key(28.61390, 77.20900, "shelter", "walking", 10.0)
+        cache.put(key, (1, 1, 1), "route")
+
+        assert cache.get(cache.key(28.61391, 77.20901, "shelter", "walking", 10.0), (1, 1, 1)) == "route"
+        assert cache.get(cache.key(28.61390, 77.21000, "shelter", "walking", 10.0), (1, 1, 1)) is None
+        assert cache.get(cache.key(28.61390, 77.20900, "shelter", "driving", 10.0), (1, 1, 1)) is None
+        stats = cache.get_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 2
+
+    def test_version_change_invalidates_and_lru_evicts(self):
+        """A newer data version empties the cache; stale writes are dropped; the oldest entry goes first"""
+        cache = RouteCache(max_entries=2)
+        cache.put("a", (1, 0, 0), 1)
+        assert cache.get("a", (1, 1, 0)) is None
+        cache.put("a", (1, 0, 0), 1)
+        assert cache.get("a", (1, 1, 0)) is None and cache.get_stats()["entries"] == 0
+
+        for name in ("a", "b"):
+            cache.put(name, (1, 1, 0), name)
+        cache.get("a", (1, 1, 0))
+        cache.put("c", (1, 1, 0), "c")
+        assert cache.get("b", (1, 1, 0)) is None and cache.get("a", (1, 1, 0)) == "a"
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_danger_zone_version_tracks_changes(self):
+        """Registering and removing danger zones bumps the index version"""
+        index = DangerZoneIndex()
+        start = index.version
+        index.upsert_zone({"id": "flood", "name": "Flood", "polygon_coordinates": SQUARE, "risk_level": "high"})
+        assert index.version == start + 1
+        assert index.delete_zone("missing") is None and index.version == start + 1
+        index.delete_zone("flood")
+        assert index.version == start + 2
@@ -0,0 +1,97 @@
+import random
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.danger_zones import DangerZoneIndex
+from services.route_monitor import RouteMonitor
+from services.routing_service import RoadGraph, RoutingService
+from tests.test_routing_service import LAT0, LNG0, STEP, _grid_network
+
+
+def _square(zone_id, lat, lng, half, risk_level):
+    ring = [[lng - half, lat - half], [lng + half, lat - half], [lng + half, lat + half], [lng - half, lat + half]]
+    return {"id": zone_id, "name": zone_id, "polygon_coordinates": ring, "risk_level": risk_level}
+
+
+def _cost(monitor, route):
+    """Search cost of a route's remaining path, as A* would count it."""
+    prof = monitor.routing.graph.profile(route.mode)
+    overrides = prof.override_costs(monitor._overrides(route))
+    return sum(overrides.get(edge, cost) for edge, cost in
+               zip(route.edges, prof.rows[prof.edge_row[route.edges], 1].tolist()))
+
+
+class TestRouteMonitor:
+
+    def test_repairs_match_fresh_searches(self):
+        """After zones come and go, every followed route is as fast as a search from scratch"""
+        rng = random.Random(5)
+        graph = RoadGraph.from_geojson(_grid_network(16))
+        graph.prepare(landmarks=4)
+        zones = DangerZoneIndex(graph)
+        monitor = RouteMonitor(RoutingService(graph), zones)
+        updates = []
+        for _ in range(30):
+            subscription = monitor.subscribe(LAT0 + rng.uniform(0, 15) * STEP, LNG0 + rng.uniform(0, 15) * STEP,
+                                             LAT0 + rng.uniform(0, 15) * STEP, LNG0 + rng.uniform(0, 15) * STEP,
+                                             rng.choice(["walking", "cycling", "driving"]))
+            if subscription is not None:
+                monitor.listen(subscription["subscription_id"], updates.append)
+
+        for step in range(12):
+            if step % 4 == 3:
+                zones.delete_zone(rng.choice(sorted(zones.zones)))
+            else:
+                lat, lng = LAT0 + rng.uniform(2, 13) * STEP, LNG0 + rng.uniform(2, 13) * STEP
+                zones.upsert_zone(_square(f"z{step}", lat, lng, rng.uniform(0.5, 2) * STEP,
+                                          rng.choice(["high", "critical"])))
+            monitor.refresh()
+            for route in monitor.routes.values():
+                fresh = graph.shortest_path(route.node, route.target[0], route.mode, monitor._overrides(route))
+                assert route.blocked == (fresh is None)
+                if fresh is not None:
+                    assert abs(_cost(monitor, route) - fresh[0]) <= 1e-6 * fresh[0]
+                    assert route.nodes[-1] == route.target[0]
+
+        assert monitor.repairs["splice"] > 0
+        assert updates and all(update["event"] in ("reroute", "no_route") for update in updates)
+        # Only routes a change reached were pushed
+        assert len(updates) < 12 * len(monitor.routes)
+
+    def test_blocked_road_reroutes_and_reopens(self):
+        """Closing a road on the route pushes a detour; reopening it brings the route back"""
+        graph = RoadGraph.from_geojson(_grid_network(10))
+        zones = DangerZoneIndex(graph)
+        monitor = RouteMonitor(RoutingService(graph), zones)
+        first = monitor.subscribe(LAT0, LNG0, LAT0 + 9 * STEP, LNG0 + 9 * STEP, "walking", "Shelter")
+        route = monitor.routes[first["subscription_id"]]
+        original = list(route.edges)
+        updates = []
+        monitor.listen(route.id, updates.append)
+
+        middle = route.nodes[len(route.nodes) // 2]
+        zones.upsert_zone(_square("fire", float(graph.node_lat[middle]), float(graph.node_lng[middle]),
+                                  0.3 * STEP, "critical"))
+        monitor.refresh()
+        assert middle not in route.nodes and updates[-1]["event"] == "reroute"
+        assert updates[-1]["reason"] == "zone_change" and updates[-1]["sequence"] == 1
+
+        zones.delete_zone("fire")
+        monitor.refresh()
+        assert route.edges == original and updates[-1]["reason"] == "faster_roads"
+
+        # Following the route shortens it; stepping well off it searches again
+        ahead = route.nodes[3]
+        assert monitor.move(route.id, float(graph.node_lat[ahead]), float(graph.node_lng[ahead]))["event"] == "route"
+        assert route.nodes[0] == ahead and route.edges == original[3:]
+        gap = [min(abs(graph.node_lat[n] - graph.node_lat[m]) + abs(graph.node_lng[n] - graph.node_lng[m])
+                   for m in route.nodes) for n in range(graph.node_count)]
+        away = max(range(graph.node_count), key=gap.__getitem__)
+        monitor.move(route.id, float(graph.node_lat[away]), float(graph.node_lng[away]))
+        assert route.node == away and updates[-1]["reason"] == "off_route"
+
+        assert monitor.unsubscribe(route.id) and updates[-1]["event"] == "closed"
+        assert not monitor.unsubscribe(route.id)
@@ -0,0 +1,105 @@
+import random
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.routing_service import RoadGraph, RoutingService, _dijkstra
+
+STEP = 0.001
+LAT0, LNG0 = 28.60, 77.20
+
+
+def _grid_network(size, seed=3):
+    """GeoJSON grid of mixed road classes with some oneway streets."""
+    rng = random.Random(seed)
+    classes = ["residential", "residential", "tertiary", "primary", "service", "footway"]
+    features = []
+    for i in range(size):
+        for j in range(size):
+            for di, dj in ((0, 1), (1, 0)):
+                if i + di >= size or j + dj >= size:
+                    continue
+                properties = {"highway": rng.choice(classes), "name": f"Street {i}" if di == 0 else f"Avenue {j}"}
+                if rng.random() < 0.15:
+                    properties["oneway"] = rng.choice(["yes", "-1"])
+                features.append({
+                    "type": "Feature",
+                    "geometry": {"type": "LineString", "coordinates": [
+                        [LNG0 + j * STEP, LAT0 + i * STEP], [LNG0 + (j + dj) * STEP, LAT0 + (i + di) * STEP]
+                    ]},
+                    "properties": properties
+                })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _line(coordinates, **properties):
+    return {"type": "Feature", "geometry": {"type": "LineString", "coordinates": coordinates}, "properties": properties}
+
+
+class TestRoadGraph:
+
+    def test_astar_matches_dijkstra(self):
+        """A* costs equal exhaustive Dijkstra for every mode, with and without landmarks"""
+        graph = RoadGraph.from_geojson(_grid_network(12))
+        rng = random.Random(11)
+        pairs = [(rng.randrange(graph.node_count), rng.randrange(graph.node_count)) for _ in range(15)]
+
+        for use_landmarks in (False, True):
+            if use_landmarks:
+                graph.prepare(landmarks=4)
+            for mode in ("walking", "cycling", "driving"):
+                prof = graph.profile(mode)
+                for source, target in pairs:
+                    expected = _dijkstra(prof.rows, prof.offsets, source, graph.node_count)[target]
+                    found = graph.shortest_path(source, target, mode)
+                    if found is None:
+                        assert expected == float("inf")
+                        continue
+                    hours, edges = found
+                    assert abs(hours - expected) < 1e-9
+                    assert abs(sum(prof.rows[prof.rows[:, 2] == e][0, 1] for e in edges) - hours) < 1e-9
+                    if edges:
+                        assert graph.edge_src[edges[0]] == source and graph.edge_dst[edges[-1]] == target
+
+    def test_profiles_respect_oneway_and_road_class(self):
+        """Driving obeys oneway streets, walking ignores them but cannot use motorways"""
+        a, b, c, d = [77.200, 28.600], [77.210, 28.600], [77.210, 28.610], [77.200, 28.610]
+        graph = RoadGraph.from_geojson({"type": "FeatureCollection", "features": [
+            _line([a, b], highway="residential", oneway="yes", name="Short Lane"),
+            _line([b, c, d, a], highway="residential", name="Long Way"),
+            _line([a, c], highway="motorway", name="Expressway")
+        ]})
+        service = RoutingService(graph)
+
+        walk_ab = service.route(28.600, 77.200, 28.600, 77.210, "walking")
+        walk_ba = service.route(28.600, 77.210, 28.600, 77.200, "walking")
+        drive_ba = service.route(28.600, 77.210, 28.600, 77.200, "driving")
+        walk_ac = service.route(28.600, 77.200, 28.610, 77.210, "walking")
+        drive_ac = service.route(28.600, 77.200, 28.610, 77.210, "driving")
+
+        assert walk_ab["instructions"] == ["Head along Short Lane for 0.98 km"]
+        assert abs(walk_ba["distance_km"] - walk_ab["distance_km"]) < 1e-9
+        assert drive_ba["instructions"][0].startswith("Head along Long Way")
+        assert drive_ba["distance_km"] > 2.5 * walk_ab["distance_km"]
+        assert "Expressway" not in " ".join(walk_ac["instructions"])
+        assert drive_ac["instructions"] == ["Head along Expressway for 1.48 km"]
+
+    def test_service_snaps_and_round_trips(self, tmp_path):
+        """Queries snap to the network, far-off points fall back, and .npz reloads route the same"""
+        path = tmp_path / "roads.npz"
+        graph = RoadGraph.from_geojson(_grid_network(8))
+        graph.save(str(path))
+        reloaded = RoadGraph.load(str(path))
+
+        route = RoutingService(graph).route(LAT0 + 0.0002, LNG0 + 0.0001, LAT0 + 0.0069, LNG0 + 0.0071, "walking")
+        again = RoutingService(reloaded).route(LAT0 + 0.0002, LNG0 + 0.0001, LAT0 + 0.0069, LNG0 + 0.0071, "walking")
+
+        assert route["coordinates"][0] == (LAT0 + 0.0002, LNG0 + 0.0001)
+        assert route["coordinates"][1] == (LAT0, LNG0)
+        assert route["coordinates"][-2] == (round(LAT0 + 0.007, 7), round(LNG0 + 0.007, 7))
+        assert abs(route["distance_km"] - again["distance_km"]) < 1e-9
+        assert route["edge_ids"] == again["edge_ids"]
+        assert RoutingService(graph).route(LAT0, LNG0, LAT0 + 0.5, LNG0, "walking") is None
+        assert RoutingService(None).route(LAT0, LNG0, LAT0 + 0.001, LNG0) is None
@@ -0,0 +1,77 @@
+import math
+import random
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.safe_zones import ACCEPTING_STATUSES, SafeZoneIndex
+
+ZONE_TYPES = ["shelter", "hospital", "evacuation_center", "safe_building"]
+STATUSES = ["available", "nearly_full", "full", "closed"]
+
+
+def _calculate_distance(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))
+
+
+def _zone(zone_id, lat, lng, zone_type, status, capacity=100, occupancy=0):
+    return {
+        "id": zone_id, "name": zone_id, "location": {"lat": lat, "lng": lng}, "type": zone_type,
+        "capacity": capacity, "current_occupancy": occupancy, "amenities": [], "status": status
+    }
+
+
+class TestSafeZoneIndex:
+
+    def test_filtered_knn_matches_brute_force(self):
+        """k nearest zones by type, status, capacity and radius match an exhaustive search"""
+        rng = random.Random(9)
+        index = SafeZoneIndex()
+        zones = {}
+        for i in range(2000):
+            zone = _zone(f"z{i}", rng.uniform(28.4, 28.9), rng.uniform(76.9, 77.4), rng.choice(ZONE_TYPES),
+                         rng.choice(STATUSES), capacity=100, occupancy=rng.randint(0, 100))
+            zones[zone["id"]] = zone
+            if i < 300:
+                index.upsert_zone(zone)
+        assert index.upsert_zones(list(zones.values())[300:]) == 1700
+
+        for _ in range(25):
+            lat, lng = rng.uniform(28.4, 28.9), rng.uniform(76.9, 77.4)
+            zone_type = rng.choice(ZONE_TYPES + [None])
+            min_free = rng.choice([0, 30])
+            expected = sorted(
+                (z for z in zones.values()
+                 if (zone_type is None or z["type"] == zone_type) and z["status"] in ACCEPTING_STATUSES
+                 and z["capacity"] - z["current_occupancy"] >= min_free
+                 and _calculate_distance(lat, lng, z["location"]["lat"], z["location"]["lng"]) <= 8.0),
+                key=lambda z: _calculate_distance(lat, lng, z["location"]["lat"], z["location"]["lng"])
+            )[:5]
+
+            result = index.nearest(lat, lng, k=5, max_km=8.0, zone_type=zone_type,
+                                   statuses=ACCEPTING_STATUSES, min_free_capacity=min_free)
+            assert [z["id"] for z in result] == [z["id"] for z in expected]
+
+    def test_updates_are_reflected_without_rebuild(self):
+        """Status changes, moves, type changes and removals apply to the next query"""
+        index = SafeZoneIndex()
+        index.upsert_zone(_zone("near", 28.600, 77.200, "shelter", "available"))
+        index.upsert_zone(_zone("far", 28.650, 77.200, "shelter", "available"))
+        assert [z["id"] for z in index.nearest(28.6, 77.2, statuses=["available"])] == ["near"]
+
+        index.upsert_zone(_zone("near", 28.600, 77.200, "shelter", "full"))
+        assert [z["id"] for z in index.nearest(28.6, 77.2, statuses=["available"])] == ["far"]
+
+        index.upsert_zone(_zone("far", 28.601, 77.200, "hospital", "available"))
+        assert index.nearest(28.6, 77.2, zone_type="shelter", statuses=["available"]) == []
+        assert [z["id"] for z in index.nearest(28.6, 77.2, k=2)] == ["near", "far"]
+        assert round(index.nearest(28.6, 77.2, zone_type="hospital")[0]["distance_km"], 3) == 0.111
+
+        version = index.version
+        assert index.remove_zone("near") and not index.remove_zone("near")
+        assert index.version == version + 1
+        assert [z["id"] for z in index.within(28.6, 77.2, 1.0)] == ["far"]
@@ -0,0 +1,39 @@
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_models.source_reliability import SourceReliabilityIndex
+
+TRUSTED = {"government": ["imd.gov.in", "pib.gov.in"], "news": ["thehindu.com"]}
+SCORES = {"imd.gov.in": 0.95, "thehindu.com": 0.82}
+
+
+class TestSourceReliabilityIndex:
+
+    def test_subdomains_and_urls_resolve_to_registered_suffix(self):
+        """Subdomains, URLs and unknown hosts under a zone resolve to the nearest suffix"""
+        index = SourceReliabilityIndex.from_sources(TRUSTED, SCORES)
+
+        hit = index.lookup("https://mausam.IMD.gov.in:443/warnings?id=1")
+        assert (hit["matched_suffix"], hit["reliability"], hit["category"]) == ("imd.gov.in", 0.95, "government")
+        assert index.get("www.thehindu.com") == 0.82
+        # Registered without a score: inherits the gov.in default
+        assert index.get("pib.gov.in") == 0.85
+        assert index.lookup("floods.assam.gov.in")["matched_suffix"] == "gov.in"
+        assert index.get("example.org", 0.7) == 0.7
+        assert index.category("example.org") is None
+
+    def test_feedback_and_removal_update_without_rebuild(self):
+        """Moderation feedback moves scores immediately; removal falls back to the parent"""
+        index = SourceReliabilityIndex.from_sources(TRUSTED, SCORES, learning_rate=0.5)
+
+        updated = index.apply_feedback("https://rumours.gov.in/post/1", reliable=False)
+        assert updated["exact"] is True
+        assert updated["reliability"] == 0.425
+        assert index.get("imd.gov.in") == 0.95
+
+        assert index.remove("rumours.gov.in") is True
+        assert index.get("rumours.gov.in") == 0.85
+        assert index.remove("rumours.gov.in") is False
@@ -0,0 +1,62 @@
+import pytest
+import sys
+import os
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_models.triage_linear_model import (
+    HashingTfidfVectorizer, TriageLinearModel, load_training_examples
+)
+from ml_models.triage_classifier import TriageClassifier
+
+
+class TestTriageLinearModel:
+
+    def test_vectorizer_rows_are_normalised(self):
+        """Each CSR row should be L2-normalised and hashing deterministic"""
+        vectorizer = HashingTfidfVectorizer(n_features=1024)
+        indptr, indices, data = vectorizer.transform(["trapped in flood water", "", "help help"])
+
+        assert list(indptr[:2]) == [0, len(vectorizer._features("trapped in flood water"))]
+        assert indptr[2] == indptr[1]  # empty text produces an empty row
+        first_row = data[indptr[0]:indptr[1]]
+        assert abs(float((first_row ** 2).sum()) - 1.0) < 1e-5
+        assert list(vectorizer.transform(["help help"])[1]) == list(indices[indptr[2]:indptr[3]])
+
+    def test_training_ranks_critical_above_low(self):
+        """A model trained on the simulation scenarios should order urgencies sensibly"""
+        model = TriageLinearModel.train(load_training_examples(), n_features=4096)
+        scores = model.score_batch([
+            "water level rising, need immediate evacuation",
+            "need first aid supplies for minor injury",
+        ])
+
+        assert scores[0] > scores[1]
+        assert all(0 <= s <= 1 for s in scores)
+
+    def test_save_and_memory_mapped_load(self, tmp_path):
+        """Loaded artifacts should be memory-mapped and score identically"""
+        model = TriageLinearModel.train(load_training_examples(), n_features=4096)
+        model.save(str(tmp_path))
+        loaded = TriageLinearModel.load(str(tmp_path))
+
+        text = "elderly person having chest pain"
+        assert loaded.weights.__class__.__name__ == "memmap"
+        assert loaded.score(text) == pytest.approx(model.score(text), abs=1e-6)
+
+    def test_classifier_blends_learned_score(self, tmp_path, monkeypatch):
+        """The classifier should blend the learned score and batch-score consistently"""
+        TriageLinearModel.train(load_training_examples(), n_features=4096).save(str(tmp_path))
+        monkeypatch.setenv("TRIAGE_MODEL_DIR", str(tmp_path))
+        monkeypatch.setenv("TRIAGE_MODEL_WEIGHT", "0.5")
+
+        classifier = TriageClassifier()
+        assert classifier.learned_model is not None
+
+        message = "Family without food for 2 days"
+        single = classifier._classify_request_sync(message)
+        batch = classifier._classify_batch_sync([{"message": message}, {"message": "status update"}])
+
+        assert batch[0]["urgency_score"] == pytest.approx(single["urgency_score"])
+        assert len(batch) == 2
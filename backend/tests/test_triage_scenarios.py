@@ -0,0 +1,57 @@
+import sys
+import os
+
+import pytest
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.triage_load import build_schedule, burst_shape, rate_profile
+from ml_models.triage_scenarios import generate_helpline_messages, parse_mix
+
+
+class TestMixes:
+
+    def test_parse_mix(self):
+        """Weights default to 1 and must be finite and non-negative"""
+        assert parse_mix(None) is None and parse_mix("") is None
+        assert parse_mix("CRITICAL=1, LOW=4,HIGH") == {"CRITICAL": 1.0, "LOW": 4.0, "HIGH": 1.0}
+        for spec in ("LOW=-1", "LOW=nan", "LOW=inf", "LOW=abc"):
+            with pytest.raises(ValueError):
+                parse_mix(spec)
+
+    def test_seeded_stream_follows_the_mix(self):
+        """A seeded stream repeats exactly and samples levels and languages in the requested proportions"""
+        urgency, language = parse_mix("CRITICAL=1,LOW=3"), parse_mix("en=1,hi=1")
+        messages = generate_helpline_messages(4000, urgency, language, seed=7)
+        assert messages == generate_helpline_messages(4000, urgency, language, seed=7)
+        assert {m["urgency"] for m in messages} == {"CRITICAL", "LOW"}
+        critical = sum(m["urgency"] == "CRITICAL" for m in messages) / len(messages)
+        english = sum(m["language"] == "en" for m in messages) / len(messages)
+        assert abs(critical - 0.25) < 0.03 and abs(english - 0.5) < 0.03
+
+    def test_invalid_mixes(self):
+        """Unknown levels or languages and all-zero weights are rejected"""
+        with pytest.raises(ValueError, match="SEVERE"):
+            generate_helpline_messages(10, parse_mix("SEVERE=1"))
+        with pytest.raises(ValueError, match="fr"):
+            generate_helpline_messages(10, language_mix=parse_mix("fr=1"))
+        with pytest.raises(ValueError):
+            generate_helpline_messages(10, parse_mix("CRITICAL=0,LOW=0"))
+
+
+class TestLoadSchedule:
+
+    def test_spikes_land_on_whole_ticks(self):
+        """Spikes come every EVERY seconds by tick index, including periods that are not exact in binary"""
+        quiet = rate_profile("constant:0", 3.0)
+        arrivals = build_schedule(3.0, quiet, burst_shape("spike:0.3:2"))
+        assert len(arrivals) == 18
+        spikes = sorted(set(arrivals))
+        assert [round(t, 6) for t in spikes] == [round(0.3 * k, 6) for k in range(1, 10)]
+
+        rate = rate_profile("constant:10", 30.0)
+        base = build_schedule(30.0, rate, burst_shape(None))
+        steady = build_schedule(30.0, rate, burst_shape("spike:10:300"))
+        assert len(steady) == len(base) + 600
+        assert steady.count(10.0) == base.count(10.0) + 300 and steady.count(20.0) == base.count(20.0) + 300
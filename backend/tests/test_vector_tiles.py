@@ -0,0 +1,151 @@
+import struct
+import sys
+import os
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.offline_maps import lnglat_to_tile
+from services.vector_tiles import PolygonSimplifier, VectorTile, mercator_pixels, simplify_ring
+
+
+def _wavy_ring(points=2000):
+    angle = np.linspace(0, 2 * np.pi, points, endpoint=False)
+    return np.stack([77.205 + 0.01 * np.cos(angle) * (1 + 0.05 * np.sin(7 * angle)),
+                     28.61 + 0.008 * np.sin(angle)], axis=1)
+
+
+def _fields(data):
+    """(field number, value) pairs of a protobuf message; length-delimited values as bytes."""
+    i = 0
+    while i < len(data):
+        key, i = _read_varint(data, i)
+        wire = key & 7
+        if wire == 0:
+            value, i = _read_varint(data, i)
+        elif wire == 1:
+            value, i = struct.unpack_from("<d", data, i)[0], i + 8
+        else:
+            size, i = _read_varint(data, i)
+            value, i = data[i:i + size], i + size
+        yield key >> 3, value
+
+
+def _read_varint(data, i):
+    shift = value = 0
+    while True:
+        byte = data[i]
+        value |= (byte & 0x7F) << shift
+        i += 1
+        shift += 7
+        if byte < 0x80:
+            return value, i
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _decode(tile):
+    """Layers of an MVT as {name: [(properties, type, [(x, y), ...])]}."""
+    layers = {}
+    for _, layer in _fields(tile):
+        fields = list(_fields(layer))
+        keys = [value.decode() for number, value in fields if number == 3]
+        values = []
+        for number, value in fields:
+            if number == 4:
+                kind, raw = next(_fields(value))
+                values.append(raw.decode() if kind == 1 else _unzigzag(raw) if kind == 6 else
+                              bool(raw) if kind == 7 else raw)
+        features = []
+        for number, value in fields:
+            if number != 2:
+                continue
+            feature = dict(_fields(value))
+            packed = []
+            for name in (2, 4):
+                raw, i, items = feature.get(name, b""), 0, []
+                while i < len(raw):
+                    item, i = _read_varint(raw, i)
+                    items.append(item)
+                packed.append(items)
+            tags, geometry = packed
+            points, x, y, i = [], 0, 0, 0
+            while i < len(geometry):
+                command, count = geometry[i] & 7, geometry[i] >> 3
+                i += 1
+                if command == 7:
+                    continue
+                for _ in range(count):
+                    x, y = x + _unzigzag(geometry[i]), y + _unzigzag(geometry[i + 1])
+                    points.append((x, y))
+                    i += 2
+            properties = {keys[tags[k]]: values[tags[k + 1]] for k in range(0, len(tags), 2)}
+            features.append((properties, feature[3], points))
+        name = next(value.decode() for number, value in fields if number == 1)
+        layers[name] = features
+    return layers
+
+
+class TestSimplification:
+
+    def test_simplified_rings_stay_within_tolerance(self):
+        """Dropped vertices lie within the pixel tolerance of the kept outline; fewer survive at low zoom"""
+        ring = _wavy_ring()
+        counts = []
+        for zoom in (8, 12, 16):
+            simplified = simplify_ring(ring, zoom)
+            counts.append(len(simplified))
+            x, y = mercator_pixels(ring[:, 0], ring[:, 1], zoom)
+            sx, sy = mercator_pixels(simplified[:, 0], simplified[:, 1], zoom)
+            ax, ay, bx, by = sx, sy, np.roll(sx, -1), np.roll(sy, -1)
+            # Distance from every original vertex to the nearest simplified edge
+            t = np.clip(((x[:, None] - ax) * (bx - ax) + (y[:, None] - ay) * (by - ay)) /
+                        np.maximum((bx - ax) ** 2 + (by - ay) ** 2, 1e-12), 0, 1)
+            gap = np.hypot(x[:, None] - ax - t * (bx - ax), y[:, None] - ay - t * (by - ay)).min(axis=1)
+            assert gap.max() <= 0.5 + 1e-9
+        assert 3 <= counts[0] < counts[1] < counts[2] < len(ring)
+
+        # Closed rings stay closed; a sub-pixel polygon keeps a triangle
+        closed = np.vstack([ring, ring[:1]])
+        tiny = simplify_ring(closed, 2)
+        assert len(tiny) == 4 and (tiny[0] == tiny[-1]).all()
+
+        simplifier = PolygonSimplifier()
+        first = simplifier.simplify(ring.tolist(), 12)
+        assert simplifier.simplify(ring.tolist(), 12) is first and simplifier.hits == 1
+        assert len(simplifier.simplify(ring.tolist(), 13)) > len(first)
+
+
+class TestVectorTile:
+
+    def test_tile_round_trip(self):
+        """Polygons are clipped to the tile with exterior winding; points and typed properties survive"""
+        z = 14
+        x, y = lnglat_to_tile(77.205, 28.61, z)
+        tile = VectorTile(z, x, y, simplifier=PolygonSimplifier())
+        added = tile.add_layer("danger_zones", [
+            {"type": "Polygon", "coordinates": _wavy_ring().tolist(),
+             "properties": {"id": "fire", "risk_level": "high", "level": -2, "weight": 1.5, "closed": True,
+                            "note": None}},
+            {"type": "Polygon", "coordinates": [[70.0, 20.0], [70.1, 20.0], [70.1, 20.1]], "properties": {"id": "far"}}
+        ])
+        tile.add_layer("safe_zones", [{"type": "Point", "coordinates": [77.205, 28.61], "properties": {"id": "s1"}}])
+        assert added == 1
+
+        layers = _decode(tile.encode())
+        [(properties, kind, ring)] = layers["danger_zones"]
+        assert properties == {"id": "fire", "risk_level": "high", "level": -2, "weight": 1.5, "closed": True}
+        assert kind == 3
+        ring = np.array(ring)
+        assert ring.min() >= -64 and ring.max() <= 4096 + 64
+        area = np.sum(ring[:, 0] * np.roll(ring[:, 1], -1) - np.roll(ring[:, 0], -1) * ring[:, 1])
+        assert area > 0
+
+        [(properties, kind, [point])] = layers["safe_zones"]
+        px, py = mercator_pixels([77.205], [28.61], z)
+        assert kind == 1 and properties == {"id": "s1"}
+        assert point == (int((px[0] - x * 256) * 16), int((py[0] - y * 256) * 16))
@@ -153,9 +153,11 @@ export const fetchNetworkOutages = async (params = {}) => {
   }
 };
 
-export const fetchConnectivityMap = async () => {
+export const fetchConnectivityMap = async (zoom) => {
   try {
-    const response = await api.get('/network/connectivity-map');
+    const response = await api.get('/network/connectivity-map', {
+      params: { zoom }
+    });
     return response.data;
   } catch (error) {
     console.error('Failed to fetch connectivity map:', error);